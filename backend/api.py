@@ -2,10 +2,15 @@
 """
 Flask REST API - Interface for Next.js frontend communication.
 Provides endpoints for chat handling and report generation.
+
+Compatibility shim: the same endpoints are served asynchronously by the
+FastAPI app in backend/main.py, which is the preferred entry point.
 """
 
+import math
 import os
-from flask import Flask, request, jsonify
+import threading
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 
@@ -17,17 +22,69 @@ CORS(app)  # Enable CORS for Next.js frontend
 # Import services
 from backend.chat_service import (
     handle_user_message,
+    stream_user_message,
     get_chat_history,
     get_session_info,
     clear_session
 )
+from backend.sse import SSE_HEADERS, sse_from_tokens
+from backend.extraction_cache import get_cache_stats
+from backend.cohort_rollups import get_assessments, get_cohort_summary, get_cohort_timeseries, validate_assessment_id
+from backend.llm_limiter import LLMRateLimited, get_limiter_stats
+from backend.framework_search import get_role_skills, load_framework_in_background, search_framework
+from backend.graph_driver import get_neo4j_driver, get_pool_stats, warm_up_pool_in_background
+from backend.graph_schema import GRAPH_SCHEMA_BOOTSTRAP, bootstrap_graph_schema_in_background
+from backend.match_engine import (
+    get_match_stats,
+    load_match_engine_in_background,
+    rank_candidates,
+    rank_candidates_for_role
+)
+from backend.metrics import metrics_payload
+from backend.report_store import get_materialised_report, rebuild_report, verify_report
 from backend.report_service import (
+    EXPORT_HEADERS,
+    NDJSON_MEDIA_TYPE,
+    export_reports_ndjson,
     get_candidate_report,
+    parse_export_request,
     get_skills_with_evidence,
     get_traits_with_evidence,
     get_domain_deep_dive
 )
 
+FRAMEWORK_MISSING = "Skills framework not generated (run process_excel.py)"
+
+
+_startup_lock = threading.Lock()
+_started = False
+
+
+def start_background_tasks() -> None:
+    """
+    Startup hook (main.py's lifespan): pool warm-up, schema bootstrap and
+    in-memory indexes, each in a background thread so a slow or unreachable
+    Neo4j does not delay startup. Runs once per process, on its first
+    request, so importing this module starts nothing and a preforking
+    server runs it in each worker rather than in the master.
+    """
+    global _started
+    with _startup_lock:
+        if _started:
+            return
+        _started = True
+    warm_up_pool_in_background()
+    if GRAPH_SCHEMA_BOOTSTRAP:
+        bootstrap_graph_schema_in_background(get_neo4j_driver)
+    load_framework_in_background()
+    load_match_engine_in_background()
+
+
+@app.before_request
+def ensure_started():
+    if not _started:
+        start_background_tasks()
+
 
 @app.route("/health", methods=["GET"])
 def health_check():
@@ -44,7 +101,8 @@ def chat():
     {
         "session_id": "uuid",
         "message": "user message text",
-        "system_prompt": "optional system prompt"
+        "system_prompt": "optional system prompt",
+        "assessment_id": "optional assessment the session belongs to"
     }
     
     Response:
@@ -64,17 +122,60 @@ def chat():
     
     if not session_id or not message:
         return jsonify({"error": "session_id and message are required"}), 400
+    try:
+        assessment_id = validate_assessment_id(data.get("assessment_id"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     try:
-        response = handle_user_message(session_id, message, system_prompt)
+        response = handle_user_message(session_id, message, system_prompt, assessment_id)
         return jsonify({
             "response": response,
             "session_id": session_id
         })
+    except LLMRateLimited as e:
+        # Queued for the LLM past the chat deadline
+        return jsonify({"error": str(e)}), 429, {"Retry-After": str(math.ceil(e.retry_after))}
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/chat/stream", methods=["POST"])
+def chat_stream():
+    """
+    Handle a chat message and stream the reply as Server-Sent Events.
+    
+    Request body: same as /api/chat
+    
+    Response (text/event-stream):
+        event: token  data: {"token": "..."}
+        event: done   data: {"response": "full reply", "session_id": "uuid"}
+        event: error  data: {"error": "..."}
+    """
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({"error": "Request body required"}), 400
+    
+    session_id = data.get("session_id")
+    message = data.get("message")
+    system_prompt = data.get("system_prompt")
+    
+    if not session_id or not message:
+        return jsonify({"error": "session_id and message are required"}), 400
+    try:
+        assessment_id = validate_assessment_id(data.get("assessment_id"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    tokens = stream_user_message(session_id, message, system_prompt, assessment_id)
+    return Response(
+        stream_with_context(sse_from_tokens(tokens, session_id)),
+        mimetype="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
 @app.route("/api/session/<session_id>/history", methods=["GET"])
 def get_history(session_id: str):
     """
@@ -117,14 +218,37 @@ def get_report(session_id: str):
     Get the complete assessment report for a candidate.
     
     Returns skills grouped by domain and OCEAN trait analysis.
+    Served from the materialised report; ?source=live queries the graph.
     """
     try:
-        report = get_candidate_report(session_id)
+        if request.args.get("source") == "live":
+            report = get_candidate_report(session_id)
+        else:
+            report = get_materialised_report(session_id)
         return jsonify(report)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/report/<session_id>/verify", methods=["GET"])
+def verify_materialised_report(session_id: str):
+    """Compare the materialised report with the live graph."""
+    try:
+        return jsonify(verify_report(session_id))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/report/<session_id>/rebuild", methods=["POST"])
+def rebuild_materialised_report(session_id: str):
+    """Rebuild the materialised report from the live graph."""
+    try:
+        rebuild_report(session_id)
+        return jsonify(get_materialised_report(session_id))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/report/<session_id>/skills", methods=["GET"])
 def get_skills(session_id: str):
     """Get skills with evidence for a session."""
@@ -161,6 +285,191 @@ def get_domain(session_id: str, domain: str):
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/reports/export", methods=["POST"])
+def export_reports():
+    """
+    Bulk export of live reports as NDJSON, one report per line.
+    
+    Request body (JSON), one of:
+    - session_ids: candidates to export, in this order
+    - filter: {prefix, since, until} on session id / creation time
+      ({} exports every candidate)
+    """
+    try:
+        session_ids, filters = parse_export_request(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return Response(
+        stream_with_context(export_reports_ndjson(session_ids, filters)),
+        mimetype=NDJSON_MEDIA_TYPE,
+        headers=EXPORT_HEADERS
+    )
+
+
+@app.route("/api/analytics/cohort", methods=["GET"])
+def analytics_cohort():
+    """
+    Cohort summary from the precomputed rollups: evidence counts, domain
+    coverage, top skills and trait intensity histograms.
+    
+    Query params:
+    - since, until: UTC days (YYYY-MM-DD, default the last 7 days)
+    - assessment_id: one assessment (default all candidates)
+    - top: number of skills (default 20)
+    """
+    try:
+        return jsonify(get_cohort_summary(
+            request.args.get("since"),
+            request.args.get("until"),
+            request.args.get("assessment_id"),
+            request.args.get("top", 20, type=int)
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/analytics/timeseries", methods=["GET"])
+def analytics_timeseries():
+    """Per-day evidence counts and distinct candidates (same params as /api/analytics/cohort)."""
+    try:
+        return jsonify(get_cohort_timeseries(
+            request.args.get("since"),
+            request.args.get("until"),
+            request.args.get("assessment_id")
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/analytics/assessments", methods=["GET"])
+def analytics_assessments():
+    """Assessments with rollups, most recently active first."""
+    try:
+        return jsonify(get_assessments())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/framework/search", methods=["GET"])
+def framework_search():
+    """
+    Search the skills framework.
+    
+    Query params:
+    - q: search text; every word must match, the last one as a prefix
+    - type: "skills" (titles and descriptions, default) or "roles" (titles)
+    - offset, limit: paging (default 0, 20)
+    """
+    try:
+        return jsonify(search_framework(
+            request.args.get("q", ""),
+            request.args.get("type", "skills"),
+            request.args.get("offset", 0, type=int),
+            request.args.get("limit", 20, type=int)
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({"error": FRAMEWORK_MISSING}), 503
+
+
+@app.route("/api/framework/roles/<sector_id>/<track_id>/<role_id>/skills", methods=["GET"])
+def framework_role_skills(sector_id: str, track_id: str, role_id: str):
+    """A job role's skills with proficiency levels and descriptions."""
+    try:
+        role = get_role_skills(sector_id, track_id, role_id)
+    except FileNotFoundError:
+        return jsonify({"error": FRAMEWORK_MISSING}), 503
+    if role is None:
+        return jsonify({"error": "Role not found"}), 404
+    return jsonify(role)
+
+
+@app.route("/api/match/roles/<sector_id>/<track_id>/<role_id>/candidates", methods=["GET"])
+def match_role_candidates(sector_id: str, track_id: str, role_id: str):
+    """
+    Best-fitting candidates for a job role, by weighted share of its
+    skills they have shown evidence of.
+    
+    Query params:
+    - k: number of candidates (default 20)
+    """
+    try:
+        result = rank_candidates_for_role(sector_id, track_id, role_id, request.args.get("k", 20, type=int))
+    except FileNotFoundError:
+        return jsonify({"error": FRAMEWORK_MISSING}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if result is None:
+        return jsonify({"error": "Role not found"}), 404
+    return jsonify(result)
+
+
+@app.route("/api/match/rank", methods=["POST"])
+def match_rank():
+    """
+    Best-fitting candidates for several job roles in one pass.
+    
+    Body: {"roles": ["sector_id/track_id/role_id", ...], "k": 20}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(rank_candidates(data.get("roles"), int(data.get("k", 20))))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({"error": FRAMEWORK_MISSING}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/stats/extraction-cache", methods=["GET"])
+def extraction_cache_stats():
+    """Hit/miss counters of the extraction cache across all workers."""
+    try:
+        return jsonify(get_cache_stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/stats/llm-limiter", methods=["GET"])
+def llm_limiter_stats():
+    """Shared LLM rate limiter: bucket levels, chat reserve and calls in flight."""
+    try:
+        return jsonify(get_limiter_stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/stats/match-engine", methods=["GET"])
+def match_engine_stats():
+    """Match engine matrix size and freshness (this process)."""
+    try:
+        return jsonify(get_match_stats())
+    except FileNotFoundError:
+        return jsonify({"error": FRAMEWORK_MISSING}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/stats/neo4j-pool", methods=["GET"])
+def neo4j_pool_stats():
+    """Neo4j connection pool utilisation and acquisition wait (this process)."""
+    return jsonify(get_pool_stats())
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Per-stage latency histograms and counters (Prometheus text format)."""
+    payload, content_type = metrics_payload()
+    return Response(payload, headers={"Content-Type": content_type})
+
+
 if __name__ == "__main__":
     port = int(os.getenv("API_PORT", 5000))
     debug = os.getenv("FLASK_DEBUG", "false").lower() == "true"
@@ -0,0 +1,296 @@
+# async_chat_service.py
+"""
+Async Chat Service - asyncio variant of the "Hot Path" for the ASGI app.
+Uses redis.asyncio and AsyncOpenAI so an in-flight LLM call no longer pins
+a worker thread; one process can hold hundreds of concurrent interviews.
+Shares keys and message format with chat_service, so sessions are
+interchangeable between the Flask and FastAPI entry points.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Optional
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+import redis.asyncio as aioredis
+
+from backend.session_store import AsyncSessionStore
+from backend.context_window import ContextWindow, build_context_window
+from backend.tracing import message_context, message_trace, use_context
+from backend.llm_limiter import estimate_tokens, llm_limiter
+from backend.task_routing import LIVE
+from backend.metrics import (
+    celery_enqueue,
+    llm_request,
+    record_first_token,
+    record_llm_duration,
+    record_llm_usage,
+    redis_op
+)
+from backend.chat_service import (
+    MAX_HISTORY_LENGTH,
+    CHAT_RETENTION_MESSAGES,
+    SESSION_TTL_SECONDS,
+    LLM_MODEL,
+    LLM_MAX_TOKENS,
+    LLM_TEMPERATURE,
+    FALLBACK_RESPONSE,
+    build_llm_messages,
+    should_extract_to_graph
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Redis DB 0: Chat History (Hot Storage)
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+# Blocking pool: under a burst, callers wait for a free connection instead of
+# failing with "Too many connections" once max_connections is reached.
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 200))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 5))
+redis_pool = aioredis.BlockingConnectionPool(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=0,
+    decode_responses=True,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=REDIS_POOL_TIMEOUT
+)
+redis_client = aioredis.Redis(connection_pool=redis_pool)
+
+# Async OpenAI client
+openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+session_store = AsyncSessionStore(
+    redis_client,
+    max_length=CHAT_RETENTION_MESSAGES,
+    ttl_seconds=SESSION_TTL_SECONDS
+)
+
+
+async def get_chat_history(session_id: str, limit: int = MAX_HISTORY_LENGTH) -> list[dict]:
+    """Retrieve chat history in chronological order (oldest first)."""
+    with redis_op("fetch"):
+        return await session_store.fetch(session_id, limit)
+
+
+async def save_message(session_id: str, role: str, content: str) -> None:
+    """Save a message to Redis chat history (1 round trip)."""
+    with redis_op("append"):
+        await session_store.append(session_id, role, content)
+
+
+async def enqueue_extraction(session_id: str, user_message: str, assessment_id: Optional[str] = None) -> None:
+    """
+    Hand a substantial message off to the Celery cold path.
+    Celery's publish is blocking socket I/O, so it runs in a thread.
+    """
+    from backend.worker import process_interview_segment
+
+    with celery_enqueue("process_interview_segment"):
+        await asyncio.to_thread(process_interview_segment.delay, session_id, user_message, LIVE, assessment_id)
+
+
+async def load_context_window(session_id: str, user_message: str) -> ContextWindow:
+    """Append the user message and assemble the LLM context (1 round trip)."""
+    with redis_op("append_and_fetch_context"):
+        window, total, context = await session_store.append_and_fetch_context(session_id, "user", user_message)
+    return build_context_window(window, total, context)
+
+
+async def request_summary_if_needed(session_id: str, context: ContextWindow) -> None:
+    """Ask the worker to fold turns that left the verbatim window into the summary."""
+    from backend.worker import summarise_session_context
+
+    if context.needs_summary:
+        with celery_enqueue("summarise_session_context"):
+            await asyncio.to_thread(summarise_session_context.delay, session_id)
+
+
+async def handle_user_message(
+    session_id: str,
+    user_message: str,
+    system_prompt: Optional[str] = None,
+    assessment_id: Optional[str] = None
+) -> str:
+    """
+    Handle an incoming user message - async hot path.
+
+    Same steps (and trace) as chat_service.handle_user_message, except the
+    Celery enqueue overlaps with the LLM call instead of preceding it.
+    """
+    with message_trace(session_id):
+        # --- 1. Save User Message and read context window (1 round trip) ---
+        context = await load_context_window(session_id, user_message)
+
+        # --- 2. Handoff to Cold Path (if substantial), concurrently with the LLM ---
+        enqueue = None
+        if should_extract_to_graph(user_message):
+            enqueue = asyncio.create_task(enqueue_extraction(session_id, user_message, assessment_id))
+
+        try:
+            # --- 3. Generate Reply using LLM (queued behind the shared rate limit) ---
+            messages = build_llm_messages(context.messages, system_prompt)
+            permit = await llm_limiter.acquire_async("chat", estimate_tokens(messages, LLM_MAX_TOKENS))
+            completion = None
+            try:
+                with llm_request("chat", LLM_MODEL):
+                    completion = await openai_client.chat.completions.create(
+                        model=LLM_MODEL,
+                        messages=messages,
+                        max_tokens=LLM_MAX_TOKENS,
+                        temperature=LLM_TEMPERATURE
+                    )
+            finally:
+                await permit.close_async(getattr(completion, "usage", None))
+        finally:
+            if enqueue is not None:
+                await enqueue
+
+        record_llm_usage("chat", LLM_MODEL, getattr(completion, "usage", None))
+        bot_response = completion.choices[0].message.content or FALLBACK_RESPONSE
+
+        # --- 4. Save Bot Response to Redis ---
+        await save_message(session_id, "assistant", bot_response)
+        await request_summary_if_needed(session_id, context)
+
+    return bot_response
+
+
+# Strong references to tasks left running by interrupted streams
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _task_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Chat background task failed: %r", task.exception())
+
+
+def _detach(task: asyncio.Task) -> None:
+    """Keep a task referenced until it finishes and retrieve its outcome."""
+    _background_tasks.add(task)
+    task.add_done_callback(_task_done)
+
+
+async def _finish_interrupted_stream(
+    stream, permit, session_id: str, partial_reply: str, context: ContextWindow, enqueue: Optional[asyncio.Task]
+) -> None:
+    """Close the upstream LLM stream and persist what the client already saw."""
+    try:
+        await stream.close()
+        await permit.close_async()
+    finally:
+        if partial_reply:
+            await save_message(session_id, "assistant", partial_reply)
+            await request_summary_if_needed(session_id, context)
+        if enqueue is not None:
+            await enqueue
+
+
+async def stream_user_message(
+    session_id: str,
+    user_message: str,
+    system_prompt: Optional[str] = None,
+    assessment_id: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of handle_user_message - yields reply tokens.
+
+    The assembled reply is persisted once the stream completes. On client
+    disconnect the ASGI server cancels this generator; any further await in
+    the cancelled scope would be cancelled too, so closing the LLM stream,
+    persisting the partial reply and finishing the extraction enqueue are
+    handed to a detached task.
+    """
+    # The trace context is only current around blocks that do not yield;
+    # the enqueue task copies it when created
+    trace_context, root_span = message_context(session_id)
+    enqueue = None
+    try:
+        try:
+            with use_context(trace_context):
+                context = await load_context_window(session_id, user_message)
+
+                if should_extract_to_graph(user_message):
+                    enqueue = asyncio.create_task(enqueue_extraction(session_id, user_message, assessment_id))
+
+                messages = build_llm_messages(context.messages, system_prompt)
+                permit = await llm_limiter.acquire_async("chat_stream", estimate_tokens(messages, LLM_MAX_TOKENS))
+                started = time.perf_counter()
+                try:
+                    stream = await openai_client.chat.completions.create(
+                        model=LLM_MODEL,
+                        messages=messages,
+                        max_tokens=LLM_MAX_TOKENS,
+                        temperature=LLM_TEMPERATURE,
+                        stream=True,
+                        stream_options={"include_usage": True}
+                    )
+                except asyncio.CancelledError:
+                    _detach(asyncio.create_task(permit.close_async()))
+                    raise
+                except Exception:
+                    await permit.close_async()
+                    raise
+        except BaseException:
+            if enqueue is not None:
+                _detach(enqueue)
+            raise
+
+        parts = []
+        usage = None
+        try:
+            async for chunk in stream:
+                # The final chunk has no choices, only the token usage
+                usage = getattr(chunk, "usage", None) or usage
+                record_llm_usage("chat_stream", LLM_MODEL, getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    if not parts:
+                        record_first_token("chat_stream", LLM_MODEL, started)
+                    parts.append(token)
+                    yield token
+
+            if not parts:
+                parts.append(FALLBACK_RESPONSE)
+                yield FALLBACK_RESPONSE
+            record_llm_duration("chat_stream", LLM_MODEL, started)
+        except (asyncio.CancelledError, GeneratorExit):
+            _detach(asyncio.create_task(
+                _finish_interrupted_stream(stream, permit, session_id, "".join(parts), context, enqueue)
+            ))
+            raise
+        except Exception:
+            await permit.close_async(usage)
+            if enqueue is not None:
+                _detach(enqueue)
+            raise
+
+        await permit.close_async(usage)
+
+        with use_context(trace_context):
+            if enqueue is not None:
+                await enqueue
+            await save_message(session_id, "assistant", "".join(parts))
+            await request_summary_if_needed(session_id, context)
+    finally:
+        root_span.end()
+
+
+async def get_session_info(session_id: str) -> dict:
+    """Get information about a chat session."""
+    with redis_op("info"):
+        return await session_store.info(session_id)
+
+
+async def clear_session(session_id: str) -> bool:
+    """Clear a chat session from Redis."""
+    with redis_op("clear"):
+        return await session_store.clear(session_id)
@@ -0,0 +1,222 @@
+# cohort_rollups_bench.py
+"""
+Cohort analytics: precomputed rollups vs scanning the graph per question.
+
+Seeds --candidates candidates spread over --days UTC days and
+--assessments assessments (plus unassigned sessions), --segments
+segments each, writing them to the in-memory Neo4j stand-in and folding
+them into the rollups (fakeredis) as the worker does, --batch-size
+segments per apply. Reported:
+  - rollup maintenance: ms per segment and Redis keys kept,
+  - idempotency: re-applying already applied segments changes nothing,
+  - a 7-day cohort summary (all candidates and one assessment) and a
+    timeseries from the rollups: p50/p99 latency and Redis round trips,
+  - the same summary by scanning the graph (keyset-paged evidence queries
+    for every candidate, --latency-ms per round trip),
+  - the backfill job rebuilding every day into an empty Redis, and whether
+    it matches the live rollups exactly.
+Exits 1 if the re-apply or the backfill changes anything.
+
+Usage:
+    python -m backend.benchmarks.cohort_rollups_bench [--candidates 10000] [--days 28]
+        [--assessments 5] [--segments 3] [--batch-size 8] [--latency-ms 1] [--queries 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from unittest import mock
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import fakeredis
+
+from backend import cohort_rollups, report_service
+from backend.benchmarks.fakes import FakeNeo4jDriver, InMemoryGraph
+from backend.cohort_rollups import CohortRollups, backfill, read_evidence_rows, tally
+from backend.graph_writer import build_segment_rows, save_observations_batch
+from backend.schema_config import ALL_SKILLS, OCEAN_TRAITS
+
+INTENSITIES = ["Low", "Moderate", "High"]
+FIRST_DAY = date(2026, 1, 5)
+
+
+class CountingRedis(fakeredis.FakeRedis):
+    """fakeredis counting round trips (one per command or pipeline execute)."""
+
+    round_trips = 0
+
+    def execute_command(self, *args, **options):
+        CountingRedis.round_trips += 1
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        execute = pipe.execute
+
+        def counted(*args, **kwargs):
+            CountingRedis.round_trips += 1
+            return execute(*args, **kwargs)
+
+        pipe.execute = counted
+        return pipe
+
+
+def make_segments(args, rng: random.Random) -> list[list[dict]]:
+    """Rows of every segment, timestamped on the candidate's interview day."""
+    segments = []
+    for n in range(args.candidates):
+        session_id = f"bench-cohort-{n:06d}"
+        assessment = f"assessment-{rng.randrange(args.assessments)}" if rng.random() < 0.9 else None
+        day = FIRST_DAY + timedelta(days=rng.randrange(args.days))
+        for s in range(args.segments):
+            observations = [
+                {
+                    "skill": rng.choice(ALL_SKILLS) if rng.random() < 0.7 else None,
+                    "trait": rng.choice(OCEAN_TRAITS) if rng.random() < 0.6 else None,
+                    "trait_intensity": rng.choice(INTENSITIES),
+                    "evidence": f"Evidence {n}/{s}/{i}"
+                }
+                for i in range(rng.randint(1, 4))
+            ]
+            rows = build_segment_rows(session_id, "", observations, f"{session_id}-{s}", assessment)
+            at = datetime.combine(day, datetime.min.time(), timezone.utc) + timedelta(minutes=rng.randrange(1440))
+            for row in rows:
+                row["timestamp"] = at
+            segments.append(rows)
+    return segments
+
+
+def timed(fn, repeats: int) -> tuple[dict, int]:
+    """p50/p99 latency of fn() and its Redis round trips per call."""
+    samples = []
+    before = CountingRedis.round_trips
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    round_trips = (CountingRedis.round_trips - before) // repeats
+    return {
+        "p50_ms": round(statistics.median(samples) * 1e3, 3),
+        "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1e3, 3),
+        "redis_round_trips": round_trips
+    }, round_trips
+
+
+def snapshot(rollups: CohortRollups, days: list[date], scopes: list[str]) -> dict:
+    return {scope: rollups.summary(days, scope, top=1000) for scope in scopes}
+
+
+def run(args) -> dict:
+    rng = random.Random(0)
+    graph = InMemoryGraph()
+    driver = FakeNeo4jDriver(handler=graph)
+    live = CohortRollups(CountingRedis(decode_responses=True))
+
+    segments = make_segments(args, rng)
+    apply_s = 0.0
+    for i in range(0, len(segments), args.batch_size):
+        rows = [row for segment in segments[i:i + args.batch_size] for row in segment]
+        save_observations_batch(driver, rows)
+        started = time.perf_counter()
+        live.apply_rows(rows)
+        apply_s += time.perf_counter() - started
+    keys = sum(1 for _ in live.client.scan_iter("rollup*", count=1000))
+
+    all_days = [FIRST_DAY + timedelta(days=n) for n in range(args.days)]
+    scopes = [cohort_rollups.ALL, cohort_rollups.UNASSIGNED] + [f"assessment-{a}" for a in range(args.assessments)]
+    before = snapshot(live, all_days, scopes)
+
+    # Retries and spool replays re-apply segments
+    sample = rng.sample(segments, min(1000, len(segments)))
+    reapplied = live.apply_rows([row for segment in sample for row in segment])
+    idempotent = reapplied == 0 and snapshot(live, all_days, scopes) == before
+
+    # --- Queries ---
+    week = all_days[-7:]
+    summary_all, _ = timed(lambda: live.summary(week, cohort_rollups.ALL), args.queries)
+    summary_one, _ = timed(lambda: live.summary(week, "assessment-0"), args.queries)
+    series, _ = timed(lambda: live.timeseries(week, cohort_rollups.ALL), args.queries)
+
+    # --- The same week by scanning the graph ---
+    driver.latency = args.latency_ms / 1e3
+    driver.reset()
+    lower = datetime.combine(week[0], datetime.min.time(), timezone.utc)
+    upper = datetime.combine(week[-1] + timedelta(days=1), datetime.min.time(), timezone.utc)
+    started = time.perf_counter()
+    with mock.patch.object(report_service, "get_neo4j_driver", lambda: driver):
+        page, scanned = [], []
+        for session_id in report_service.iter_candidate_ids(report_service.validate_export_filter({}), 500):
+            page.append(session_id)
+            if len(page) == 500:
+                scanned += read_evidence_rows(driver, page, lower, upper)
+                page = []
+        scanned += read_evidence_rows(driver, page, lower, upper) if page else []
+        tally(scanned)
+    scan_s = time.perf_counter() - started
+    scan_round_trips = driver.round_trips
+
+    # --- Backfill into an empty Redis ---
+    rebuilt = CohortRollups(fakeredis.FakeRedis(decode_responses=True))
+    driver.reset()
+    with mock.patch.object(report_service, "get_neo4j_driver", lambda: driver):
+        result = backfill(all_days[0], all_days[-1], args.backfill_batch_size, driver=driver, rollups=rebuilt)
+    result["neo4j_round_trips"] = driver.round_trips
+    backfill_matches = snapshot(rebuilt, all_days, scopes) == before and rebuilt.assessments() == live.assessments()
+
+    week_summary = live.summary(week, cohort_rollups.ALL)
+    return {
+        "seeded": {
+            "candidates": args.candidates,
+            "segments": len(segments),
+            "evidence": sum(len(segment) for segment in segments)
+        },
+        "maintenance": {
+            "ms_per_segment": round(apply_s / len(segments) * 1e3, 4),
+            "redis_keys": keys,
+            "reapply_is_noop": idempotent
+        },
+        "week": {
+            "candidates": week_summary["candidates"],
+            "evidence": week_summary["evidence"],
+            "domains": len(week_summary["domains"])
+        },
+        "rollup_summary_all": summary_all,
+        "rollup_summary_one_assessment": summary_one,
+        "rollup_timeseries": series,
+        "graph_scan_summary": {
+            "seconds": round(scan_s, 2),
+            "neo4j_round_trips": scan_round_trips,
+            "evidence_rows": len(scanned)
+        },
+        "speedup": round(scan_s / (summary_all["p50_ms"] / 1e3), 1),
+        "backfill": result,
+        "backfill_matches_live": backfill_matches
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--candidates", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=28)
+    parser.add_argument("--assessments", type=int, default=5)
+    parser.add_argument("--segments", type=int, default=3, help="Segments per candidate")
+    parser.add_argument("--batch-size", type=int, default=8, help="Segments per rollup apply (extraction batch)")
+    parser.add_argument("--backfill-batch-size", type=int, default=cohort_rollups.ROLLUP_BACKFILL_BATCH_SIZE)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Stand-in Neo4j latency per round trip")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    results = run(args)
+    print(json.dumps({"config": vars(args), **results}, indent=2))
+    sys.exit(0 if results["maintenance"]["reapply_is_noop"] and results["backfill_matches_live"] else 1)
+
+
+if __name__ == "__main__":
+    main()
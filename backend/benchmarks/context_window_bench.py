@@ -0,0 +1,155 @@
+# context_window_bench.py
+"""
+Prompt tokens and LLM latency per chat turn: last 20 raw messages vs the
+token-budgeted context window with a rolling summary.
+
+Replays interview transcripts through chat_service.handle_user_message with
+fakeredis and a fake LLM whose latency grows with the prompt. Summary folds
+run between turns, as the worker would, and are reported separately since
+they are off the hot path.
+
+Usage:
+    python -m backend.benchmarks.context_window_bench [--transcript interview.json] [--turns 40]
+        [--budget 1500] [--prompt-token-latency-us 50]
+
+A transcript is a JSON list of {"role", "content"} messages (only the
+candidate's "user" messages are replayed) or a list of strings.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from functools import partial
+from unittest import mock
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Fake LLMs have no quota to share (llm_limiter_bench covers the limiter)
+os.environ.setdefault("LLM_LIMITER_ENABLED", "false")
+
+import fakeredis
+
+from backend import chat_service, context_window, worker
+from backend.benchmarks.fakes import FakeOpenAI
+from backend.session_store import SessionStore
+
+WORDS = (
+    "project team customer deadline data pipeline migration stakeholder budget "
+    "prototype feedback release incident analysis roadmap mentoring sprint "
+    "dashboard vendor compliance automation latency rollout training"
+).split()
+
+# Candidate answer lengths in words: acknowledgements through long stories
+ANSWER_LENGTHS = [6, 45, 120, 260, 30, 180, 12, 90]
+
+SUMMARY = "Candidate described several projects, tools and outcomes; questions on teamwork and delivery covered."
+
+
+def synthetic_transcript(turns: int) -> list[str]:
+    rng = random.Random(0)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(ANSWER_LENGTHS[i % len(ANSWER_LENGTHS)]))
+        for i in range(turns)
+    ]
+
+
+def load_transcript(path: str) -> list[str]:
+    with open(path) as f:
+        messages = json.load(f)
+    return [m if isinstance(m, str) else m["content"] for m in messages if isinstance(m, str) or m["role"] == "user"]
+
+
+def reply_fn(messages: list[dict]) -> str:
+    if messages[0]["content"] == context_window.SUMMARY_INSTRUCTIONS:
+        return SUMMARY
+    return "Thanks. Could you walk me through how you handled the trade-offs and what you would do differently next time?"
+
+
+def replay(transcript: list[str], budgeted: bool, budget: int, prompt_token_latency: float) -> dict:
+    store = SessionStore(fakeredis.FakeRedis(decode_responses=True), max_length=chat_service.CHAT_RETENTION_MESSAGES)
+    llm = FakeOpenAI(reply_fn=reply_fn, prompt_token_latency=prompt_token_latency)
+    summariser = FakeOpenAI(reply_fn=reply_fn)
+    session_id = f"bench-{'budgeted' if budgeted else 'legacy'}"
+
+    prompt_tokens, latencies, fold_requests = [], [], []
+    sent = []
+
+    def recording_create(messages, **kwargs):
+        sent.append(sum(context_window.message_tokens(m) for m in messages))
+        return FakeOpenAI._create(llm, messages, **kwargs)
+
+    llm.chat.completions.create = recording_create
+
+    if budgeted:
+        build = partial(context_window.build_context_window, budget=budget)
+    else:
+        # Previous behaviour: the last 20 raw messages, nothing older
+        build = partial(context_window.build_context_window, budget=10 ** 9, max_messages=20)
+
+    summarise = mock.Mock()
+    summarise.delay = fold_requests.append
+
+    with mock.patch.object(chat_service, "session_store", store), \
+            mock.patch.object(chat_service, "openai_client", llm), \
+            mock.patch.object(chat_service, "build_context_window", build), \
+            mock.patch.object(worker.process_interview_segment, "delay", lambda *a: None), \
+            mock.patch.object(worker, "summarise_session_context", summarise):
+        for message in transcript:
+            start = time.perf_counter()
+            chat_service.handle_user_message(session_id, message)
+            latencies.append(time.perf_counter() - start)
+            prompt_tokens.append(sent[-1])
+
+            # The worker's fold, between turns (only requested when budgeted)
+            if budgeted and fold_requests:
+                fold_requests.clear()
+                context_window.update_rolling_summary(store, summariser, session_id)
+
+    prompt_tokens_sorted = sorted(prompt_tokens)
+    latencies_sorted = sorted(latencies)
+    return {
+        "turns": len(transcript),
+        "prompt_tokens_mean": statistics.mean(prompt_tokens),
+        "prompt_tokens_p95": prompt_tokens_sorted[int(len(prompt_tokens) * 0.95) - 1],
+        "prompt_tokens_max": prompt_tokens_sorted[-1],
+        "latency_ms_mean": statistics.mean(latencies) * 1e3,
+        "latency_ms_p95": latencies_sorted[int(len(latencies) * 0.95) - 1] * 1e3,
+        "summary_folds": summariser.calls,
+        "summary_prompt_tokens": summariser.prompt_tokens,
+        "summarised_messages": int(store.fetch_context(session_id)[2].get("summary_upto") or 0),
+    }
+
+
+def run(transcript: list[str], budget: int, prompt_token_latency: float) -> dict:
+    legacy = replay(transcript, False, budget, prompt_token_latency)
+    budgeted = replay(transcript, True, budget, prompt_token_latency)
+    return {
+        "token_budget": budget,
+        "tokenizer": "tiktoken" if context_window._encoding() else "chars/4 estimate",
+        "last_20_messages": legacy,
+        "budgeted_with_summary": budgeted,
+        "delta": {
+            "prompt_tokens_mean": budgeted["prompt_tokens_mean"] - legacy["prompt_tokens_mean"],
+            "prompt_tokens_p95": budgeted["prompt_tokens_p95"] - legacy["prompt_tokens_p95"],
+            "latency_ms_mean": budgeted["latency_ms_mean"] - legacy["latency_ms_mean"],
+            "latency_ms_p95": budgeted["latency_ms_p95"] - legacy["latency_ms_p95"],
+        }
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--transcript", default=None, help="Recorded transcript (JSON); synthetic if omitted")
+    parser.add_argument("--turns", type=int, default=40, help="Turns of the synthetic transcript")
+    parser.add_argument("--budget", type=int, default=context_window.CONTEXT_TOKEN_BUDGET)
+    parser.add_argument("--prompt-token-latency-us", type=float, default=50.0, help="Fake LLM prefill cost per prompt token")
+    args = parser.parse_args()
+
+    transcript = load_transcript(args.transcript) if args.transcript else synthetic_transcript(args.turns)
+    print(json.dumps(run(transcript, args.budget, args.prompt_token_latency_us / 1e6), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# extraction_batch_bench.py
+"""
+LLM calls and prompt tokens per segment: one extraction request per segment
+vs micro-batched extraction through flush_extraction_batch.
+
+Runs Celery tasks eagerly against fakeredis, a fake OpenAI client and the
+Neo4j stand-in. Prompt tokens are estimated as characters / 4.
+
+Usage:
+    python -m backend.benchmarks.extraction_batch_bench [--segments 200] [--batch-size 8]
+"""
+
+import argparse
+import json
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Fake LLMs have no quota to share (llm_limiter_bench covers the limiter)
+os.environ.setdefault("LLM_LIMITER_ENABLED", "false")
+
+import fakeredis
+
+from backend import cohort_rollups, worker, extraction_batcher, match_engine, report_service, report_store
+from backend.extraction_cache import ExtractionCache
+from backend.report_store import ReportStore
+from backend.segment_checkpoints import SegmentCheckpoints
+from backend.celery_config import celery_app
+from backend.benchmarks.fakes import FakeNeo4jDriver, FakeOpenAI, fake_extraction_reply
+
+SAMPLE_ANSWER = (
+    "In my last role I noticed our deployment failures were rising, so I "
+    "traced them to a flaky integration test, rewrote it and documented the fix for the team."
+)
+
+
+def run(segments: int, batch_size: int, sessions: int = 20) -> dict:
+    celery_app.conf.task_always_eager = True
+    extraction_batcher.redis_client = fakeredis.FakeRedis(decode_responses=True)
+    worker.segment_checkpoints = SegmentCheckpoints(fakeredis.FakeRedis(decode_responses=True))
+    driver = FakeNeo4jDriver()
+    worker.get_neo4j_driver = lambda: driver
+    # Report updates go to fakeredis; their graph reads (rebuilds of new
+    # sessions) to a separate stand-in, so round trips count writes only
+    report_store.report_store = ReportStore(fakeredis.FakeRedis(decode_responses=True))
+    report_driver = FakeNeo4jDriver()
+    report_service.get_neo4j_driver = lambda: report_driver
+    match_engine.redis_client = fakeredis.FakeRedis(decode_responses=True)
+    cohort_rollups.cohort_rollups = cohort_rollups.CohortRollups(fakeredis.FakeRedis(decode_responses=True))
+
+    results = {}
+    for name, size in (("per_segment", 1), ("batched", batch_size)):
+        llm = FakeOpenAI(reply_fn=fake_extraction_reply)
+        worker.openai_client = llm
+        extraction_batcher.EXTRACTION_BATCH_SIZE = size
+        # Fresh cache per run so the second run does not hit the first's entries
+        worker.extraction_cache = ExtractionCache(fakeredis.FakeRedis(decode_responses=True))
+        driver.reset()
+
+        # Eager apply_async ignores countdown, so partial batches flush
+        # immediately; enqueue first and flush in full batches instead.
+        if size > 1:
+            for i in range(segments):
+                extraction_batcher.enqueue_segment(
+                    extraction_batcher.new_segment(f"bench-{i % sessions}", f"{SAMPLE_ANSWER} ({i})")
+                )
+            while pending := extraction_batcher.pending_lists():
+                for partition, lane, _ in pending:
+                    worker.flush_extraction_batch.apply((partition, lane))
+        else:
+            for i in range(segments):
+                worker.process_interview_segment.apply(args=(f"bench-{i % sessions}", f"{SAMPLE_ANSWER} ({i})"))
+
+        results[name] = {
+            "segments": segments,
+            "llm_calls": llm.calls,
+            "llm_calls_per_segment": llm.calls / segments,
+            "prompt_tokens_per_segment": llm.prompt_tokens / segments,
+            "graph_round_trips_per_segment": driver.round_trips / segments,
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--segments", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.segments, args.batch_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+# fakes.py
+"""
+Local stand-ins for external services used by the benchmarks.
+Everything here runs offline: no Redis server, OpenAI key or Neo4j needed.
+"""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import fakeredis
+import redis
+
+
+class RoundTripCounter:
+    """Counts network round trips (packed command sends) on a Redis client."""
+
+    def __init__(self):
+        self.count = 0
+
+    def reset(self) -> None:
+        self.count = 0
+
+
+def counting_redis(counter: RoundTripCounter, url: str | None = None) -> redis.Redis:
+    """
+    Build a Redis client whose connections report every round trip.
+    Uses fakeredis unless a URL for a local redis-server is given.
+    A pipeline counts as one round trip, exactly as on a real server.
+    """
+    base = redis.Connection if url else fakeredis.FakeRedisConnection
+
+    class CountingConnection(base):
+        def send_packed_command(self, *args, **kw):
+            counter.count += 1
+            return super().send_packed_command(*args, **kw)
+
+    if url:
+        client = redis.Redis.from_url(
+            url, decode_responses=True, connection_class=CountingConnection
+        )
+    else:
+        client = fakeredis.FakeRedis(
+            decode_responses=True, connection_class=CountingConnection
+        )
+    client.ping()  # Establish the connection outside of any measurement
+    counter.reset()
+    return client
+
+
+# --- Deterministic OpenAI stand-ins ---
+
+def _completion(content: str, prompt_tokens: int, completion_tokens: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens
+        )
+    )
+
+
+def _chunk(token: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+
+def _prompt_tokens(messages: list[dict]) -> int:
+    return sum(len(m["content"]) for m in messages) // 4
+
+
+def fake_extraction_reply(messages: list[dict]) -> str:
+    """
+    Deterministic JSON answer for the extraction prompts in worker.py.
+    Handles both the single-segment and the batched request format.
+    """
+    user = messages[-1]["content"]
+    if user.startswith("Analyze these candidate responses:"):
+        segments = json.loads(user.split("\n\n", 1)[1])
+        return json.dumps({"segments": [
+            {"id": seg["id"], "observations": _fake_observations(seg["text"])} for seg in segments
+        ]})
+    return json.dumps({"observations": _fake_observations(user)})
+
+
+def _fake_observations(text: str) -> list[dict]:
+    words = len(text.split())
+    return [
+        {"skill": "Problem Solving", "skill_domain": "Thinking Critically", "trait": None,
+         "trait_intensity": None, "evidence": text[:80]},
+        {"skill": None, "skill_domain": None, "trait": "Conscientiousness",
+         "trait_intensity": "High" if words > 20 else "Moderate", "evidence": text[:80]},
+    ]
+
+
+class _SyncStream:
+    def __init__(self, tokens: list[str], token_latency: float):
+        self.tokens = tokens
+        self.token_latency = token_latency
+
+    def __iter__(self):
+        for token in self.tokens:
+            time.sleep(self.token_latency)
+            yield _chunk(token)
+
+    def close(self) -> None:
+        pass
+
+
+class _AsyncStream(_SyncStream):
+    async def __aiter__(self):
+        for token in self.tokens:
+            await asyncio.sleep(self.token_latency)
+            yield _chunk(token)
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeOpenAI:
+    """
+    Drop-in for openai.OpenAI covering chat.completions.create.
+
+    Replies are deterministic: `reply_fn(messages)` (default: a fixed
+    sentence). Latency is `latency` seconds plus `prompt_token_latency` per
+    prompt token (prefill) before the first token, then `token_latency` per
+    streamed token.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        token_latency: float = 0.0,
+        reply_fn=None,
+        prompt_token_latency: float = 0.0
+    ):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.prompt_token_latency = prompt_token_latency
+        self.reply_fn = reply_fn or (lambda messages: "Thanks, could you tell me more about that?")
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _reply(self, messages: list[dict]) -> tuple[str, int]:
+        self.calls += 1
+        prompt_tokens = _prompt_tokens(messages)
+        self.prompt_tokens += prompt_tokens
+        return self.reply_fn(messages), prompt_tokens
+
+    def _create(self, messages: list[dict], stream: bool = False, **kwargs):
+        reply, prompt_tokens = self._reply(messages)
+        time.sleep(self.latency + prompt_tokens * self.prompt_token_latency)
+        if stream:
+            return _SyncStream([t + " " for t in reply.split(" ")], self.token_latency)
+        return _completion(reply, prompt_tokens, len(reply) // 4)
+
+
+class FakeAsyncOpenAI(FakeOpenAI):
+    """Drop-in for openai.AsyncOpenAI; sleeps without blocking the event loop."""
+
+    async def _create(self, messages: list[dict], stream: bool = False, **kwargs):
+        reply, prompt_tokens = self._reply(messages)
+        await asyncio.sleep(self.latency + prompt_tokens * self.prompt_token_latency)
+        if stream:
+            return _AsyncStream([t + " " for t in reply.split(" ")], self.token_latency)
+        return _completion(reply, prompt_tokens, len(reply) // 4)
+
+
+# --- Neo4j stand-in ---
+
+class _Record(dict):
+    def data(self) -> dict:
+        return dict(self)
+
+
+class _Result:
+    def __init__(self, records: list[dict]):
+        self._records = [_Record(r) for r in records]
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def single(self):
+        return self._records[0] if self._records else None
+
+    def data(self) -> list[dict]:
+        return [r.data() for r in self._records]
+
+
+def default_graph_handler(query: str, params: dict) -> list[dict]:
+    """Answer just enough for write paths: generated ids and write counts."""
+    if "AS written" in query:
+        return [{"written": len(params.get("rows", []))}]
+    if "evidence_id" in query:
+        return [{"evidence_id": f"ev-{id(params)}"}]
+    return []
+
+
+class InMemoryGraph:
+    """
+    Minimal in-memory model of the interview graph that answers the Cypher
+    statements issued by graph_writer and report_service (matched by
+    shape, not parsed). Use as FakeNeo4jDriver(handler=InMemoryGraph()).
+    """
+
+    def __init__(self):
+        # session_id -> list of evidence dicts {id, text, timestamp, skill, domain, trait, intensity}
+        self.evidence: dict[str, list[dict]] = {}
+        self.skill_domains: dict[str, str] = {}
+        self.assessments: dict[str, str] = {}
+        self.evidence_ids: set[str] = set()
+        self._next_id = 0
+
+    def add_rows(self, rows: list[dict]) -> int:
+        """MERGE on the row's evidence_id: a row already written adds nothing."""
+        for row in rows:
+            self._next_id += 1
+            if row.get("assessment_id"):
+                self.assessments[row["session_id"]] = row["assessment_id"]
+            evidence_id = row.get("evidence_id") or f"ev-{self._next_id}"
+            if evidence_id in self.evidence_ids:
+                continue
+            self.evidence_ids.add(evidence_id)
+            if row.get("skill"):
+                self.skill_domains.setdefault(row["skill"], row.get("skill_domain"))
+            self.evidence.setdefault(row["session_id"], []).append({
+                "id": evidence_id,
+                "text": row["evidence"],
+                "timestamp": row.get("timestamp"),
+                "skill": row.get("skill"),
+                "trait": row.get("trait"),
+                "intensity": row.get("trait_intensity"),
+            })
+        return len(rows)
+
+    def evidence_count(self) -> int:
+        return sum(len(items) for items in self.evidence.values())
+
+    def skills_for(self, session_id: str) -> list[dict]:
+        grouped: dict[str, list[str]] = {}
+        for ev in self.evidence.get(session_id, []):
+            if ev["skill"]:
+                grouped.setdefault(ev["skill"], []).append(ev["text"])
+        rows = [
+            {"skill": skill, "domain": self.skill_domains.get(skill), "evidence_points": texts}
+            for skill, texts in grouped.items()
+        ]
+        return sorted(rows, key=lambda r: (r["domain"] or "", r["skill"]))
+
+    def traits_for(self, session_id: str) -> list[dict]:
+        grouped: dict[str, list[dict]] = {}
+        for ev in self.evidence.get(session_id, []):
+            if ev["trait"]:
+                grouped.setdefault(ev["trait"], []).append({"text": ev["text"], "intensity": ev["intensity"]})
+        return [{"trait": trait, "evidence_points": grouped[trait]} for trait in sorted(grouped)]
+
+    def report_evidence(self, session_id: str) -> list[dict]:
+        """One row per evidence with its id (report_store rebuilds)."""
+        return [
+            {
+                "evidence_id": ev["id"],
+                "text": ev["text"],
+                "skill": ev["skill"],
+                "domain": self.skill_domains.get(ev["skill"]) if ev["skill"] else None,
+                "trait": ev["trait"],
+                "intensity": ev["intensity"] if ev["trait"] else None
+            }
+            for ev in self.evidence.get(session_id, [])
+        ]
+
+    def candidate_ids(self, after: str, limit: int, prefix: str | None = None, **filters) -> list[dict]:
+        """Keyset page of session ids (creation-time filters are not modelled)."""
+        ids = sorted(sid for sid in self.evidence if sid > after and (prefix is None or sid.startswith(prefix)))
+        return [{"session_id": sid} for sid in ids[:limit]]
+
+    def evidence_rows(self, session_ids: list[str], since, until) -> list[dict]:
+        """Evidence of these candidates with since <= timestamp < until (rollup backfill)."""
+        return [
+            {
+                "session_id": sid,
+                "assessment_id": self.assessments.get(sid),
+                "timestamp": ev["timestamp"],
+                "skill": ev["skill"],
+                "skill_domain": self.skill_domains.get(ev["skill"]) if ev["skill"] else None,
+                "trait": ev["trait"],
+                "trait_intensity": ev["intensity"]
+            }
+            for sid in session_ids
+            for ev in self.evidence.get(sid, [])
+            if since <= ev["timestamp"] < until
+        ]
+
+    def __call__(self, query: str, params: dict) -> list[dict]:
+        if "UNWIND $rows AS row" in query:
+            return [{"written": self.add_rows(params["rows"])}]
+        if "e.timestamp >= $since" in query:
+            return self.evidence_rows(**params)
+        if "UNWIND $session_ids" in query:
+            kind, rows_for = ("skills", self.skills_for) if ":Skill)" in query else ("traits", self.traits_for)
+            results = ((sid, rows_for(sid)) for sid in params["session_ids"])
+            return [{"session_id": sid, kind: rows} for sid, rows in results if rows]
+        if "c.session_id > $after" in query:
+            return self.candidate_ids(**params)
+        if "e.id AS evidence_id" in query:
+            return self.report_evidence(params["session_id"])
+        if ":Skill)" in query and "collect(e.text) as evidence_points" in query:
+            return self.skills_for(params["session_id"])
+        if ":Trait)" in query and "evidence_points" in query:
+            return self.traits_for(params["session_id"])
+        return default_graph_handler(query, params)
+
+
+class _FakeTransaction:
+    def __init__(self, driver: "FakeNeo4jDriver"):
+        self.driver = driver
+
+    def run(self, query: str, parameters: dict | None = None, **params):
+        return self.driver._round_trip(query, {**(parameters or {}), **params})
+
+
+class _FakeSession:
+    def __init__(self, driver: "FakeNeo4jDriver"):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self) -> None:
+        pass
+
+    def run(self, query: str, parameters: dict | None = None, **params):
+        # Auto-commit: BEGIN/RUN/PULL/COMMIT are pipelined into one round trip
+        return self.driver._round_trip(query, {**(parameters or {}), **params})
+
+    def _execute(self, work, *args, **kwargs):
+        # Explicit transaction: statements pipelined with BEGIN, then COMMIT
+        result = work(_FakeTransaction(self.driver), *args, **kwargs)
+        self.driver._round_trip("COMMIT", {})
+        return result
+
+    execute_write = _execute
+    execute_read = _execute
+
+
+class FakeNeo4jDriver:
+    """
+    Drop-in for a neo4j.Driver that counts round trips and adds a fixed
+    network latency to each. Queries are answered by `handler(query, params)`.
+    """
+
+    def __init__(self, latency: float = 0.0, handler=default_graph_handler):
+        self.latency = latency
+        self.handler = handler
+        self.round_trips = 0
+        self.queries: list[str] = []
+
+    def _round_trip(self, query: str, params: dict) -> _Result:
+        self.round_trips += 1
+        self.queries.append(query)
+        if self.latency:
+            time.sleep(self.latency)
+        return _Result(self.handler(query, params))
+
+    def session(self, **kwargs) -> _FakeSession:
+        return _FakeSession(self)
+
+    def verify_connectivity(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def reset(self) -> None:
+        self.round_trips = 0
+        self.queries = []
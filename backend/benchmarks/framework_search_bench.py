@@ -0,0 +1,185 @@
+# framework_search_bench.py
+"""
+Skills framework lookup latency: FrameworkIndex vs a linear scan.
+
+Runs against a framework written by process_excel.py (--framework) or, by
+default, a synthetic sharded one at the scale of the full SkillsFuture
+dataset (38 sectors, ~2,000 job roles, ~6,000 TSC skills, ~30 skills per
+role, descriptions drawn from a Zipf-distributed vocabulary). The scan is
+what the create-assessment page did client-side: a lower-cased substring
+test over every title (and description).
+
+Reports load time, index memory, and p50/p99 latency per query class
+(role/skill prefixes while typing, multi-word, common description
+words, typos, role -> skills).
+
+Usage:
+    python -m backend.benchmarks.framework_search_bench [--framework src/data/framework]
+        [--roles 2000] [--skills 6000] [--queries 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from backend.framework_search import FrameworkIndex, tokenize
+
+ROLE_NOUNS = [
+    "Engineer", "Manager", "Executive", "Analyst", "Specialist", "Technician", "Officer",
+    "Consultant", "Director", "Coordinator", "Associate", "Architect", "Planner", "Supervisor"
+]
+
+
+def _vocabulary(rng: random.Random, words: int) -> list[str]:
+    letters = "abcdefghiklmnoprstuvw"
+    vocab = set()
+    while len(vocab) < words:
+        vocab.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 11))))
+    return sorted(vocab)
+
+
+def write_framework(root: str, sectors: int, roles: int, skills: int, skills_per_role: int) -> None:
+    """Synthetic sharded framework (index.json + sectors/*.json) under `root`."""
+    rng = random.Random(0)
+    vocab = _vocabulary(rng, 4000)
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]
+
+    def words(n: int) -> list[str]:
+        return rng.choices(vocab, weights, k=n)
+
+    codes = [f"{rng.choice(['ACC', 'ENG', 'ICT', 'HRM', 'LOG'])}-{w[:3].upper()}-{i:04d}-1.1" for i, w in enumerate(words(skills))]
+    titles = {code: " ".join(words(rng.randint(2, 4))).title() for code in codes}
+    descriptions = {code: " ".join(words(rng.randint(15, 35))).capitalize() + "." for code in codes}
+
+    os.makedirs(os.path.join(root, "sectors"))
+    index = {"sectors": []}
+    per_sector = max(1, roles // sectors)
+    for s in range(sectors):
+        sector_id = f"sector-{s}"
+        shard = {"id": sector_id, "skills": {}, "roles": {}}
+        tracks = []
+        for t in range(5):
+            track = {"id": f"track-{t}", "label": " ".join(words(2)).title(), "roles": []}
+            for r in range(per_sector // 5):
+                role_id = f"role-{s}-{t}-{r}"
+                chosen = rng.sample(codes, skills_per_role)
+                track["roles"].append({
+                    "id": role_id,
+                    "label": f"{' '.join(words(rng.randint(1, 3))).title()} {rng.choice(ROLE_NOUNS)}",
+                    "skillCount": len(chosen)
+                })
+                shard["roles"][f"{track['id']}/{role_id}"] = [[code, rng.randint(1, 6)] for code in chosen]
+                for code in chosen:
+                    shard["skills"][code] = [titles[code], descriptions[code]]
+            tracks.append(track)
+        index["sectors"].append({"id": sector_id, "label": f"Sector {s}", "shard": f"{sector_id}.json", "tracks": tracks})
+        with open(os.path.join(root, "sectors", f"{sector_id}.json"), "w") as f:
+            json.dump(shard, f)
+    with open(os.path.join(root, "index.json"), "w") as f:
+        json.dump(index, f)
+
+
+def make_queries(index: FrameworkIndex, count: int) -> dict[str, list[str]]:
+    """Query classes drawn from the loaded data, so they match something."""
+    rng = random.Random(1)
+
+    def pick(texts: list[str]) -> list[str]:
+        return tokenize(rng.choice(texts)) or ["x"]
+
+    def typo(word: str) -> str:
+        if len(word) < 5:
+            return word
+        i = rng.randrange(1, len(word))
+        return word[:i] + rng.choice("xyz") + word[i + 1:]
+
+    roles, titles, descriptions = index.role_labels, index.skill_titles, index.skill_descriptions
+    return {
+        "role_prefix": [pick(roles)[0][:rng.randint(1, 4)] for _ in range(count)],
+        "role_words": [" ".join(pick(roles)[:2]) for _ in range(count)],
+        "skill_prefix": [pick(titles)[0][:rng.randint(1, 4)] for _ in range(count)],
+        "skill_words_prefix": [
+            " ".join(words[:-1] + [words[-1][:3]]) for words in (pick(titles)[:3] for _ in range(count))
+        ],
+        "skill_description_word": [rng.choice(pick(descriptions)) for _ in range(count)],
+        "skill_typo": [typo(max(pick(titles), key=len)) for _ in range(count)],
+    }
+
+
+def scan_roles(index: FrameworkIndex, query: str, limit: int = 20) -> list[str]:
+    q = query.lower()
+    return [label for label in index.role_labels if q in label.lower()][:limit]
+
+
+def scan_skills(index: FrameworkIndex, query: str, limit: int = 20) -> list[str]:
+    q = query.lower()
+    return [
+        code for code, title, description in zip(index.skill_codes, index.skill_titles, index.skill_descriptions)
+        if q in title.lower() or q in description.lower()
+    ][:limit]
+
+
+def latency(fn, queries: list[str]) -> dict:
+    times = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        times.append((time.perf_counter() - start) * 1e6)
+    times.sort()
+    return {
+        "p50_us": round(statistics.median(times), 1),
+        "p99_us": round(times[int(len(times) * 0.99) - 1], 1),
+        "max_us": round(times[-1], 1)
+    }
+
+
+def run(framework: str, queries: int) -> dict:
+    tracemalloc.start()
+    index = FrameworkIndex.load(framework)
+    memory_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    classes = make_queries(index, queries)
+    results = {"framework": index.stats(), "index_memory_mb": round(memory_bytes / 1e6, 1), "queries": {}}
+    for name, qs in classes.items():
+        roles = name.startswith("role")
+        search = index.search_roles if roles else index.search_skills
+        scan = scan_roles if roles else scan_skills
+        results["queries"][name] = {
+            "example": qs[0],
+            "index": latency(lambda q: search(q, 0, 20), qs),
+            "scan": latency(lambda q: scan(index, q), qs[:200]),
+        }
+
+    keys = [key.split("/") for key in random.Random(2).choices(list(index.role_keys), k=queries)]
+    results["queries"]["role_skills"] = {
+        "index": latency(lambda key: index.role_skills_of(*key), keys)
+    }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--framework", help="process_excel.py output (default: synthetic)")
+    parser.add_argument("--sectors", type=int, default=38)
+    parser.add_argument("--roles", type=int, default=2000)
+    parser.add_argument("--skills", type=int, default=6000)
+    parser.add_argument("--skills-per-role", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.framework:
+        print(json.dumps(run(args.framework, args.queries), indent=2))
+        return
+    with tempfile.TemporaryDirectory() as scratch:
+        root = os.path.join(scratch, "framework")
+        write_framework(root, args.sectors, args.roles, args.skills, args.skills_per_role)
+        print(json.dumps(run(root, args.queries), indent=2))
+
+
+if __name__ == "__main__":
+    main()
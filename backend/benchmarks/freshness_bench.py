@@ -0,0 +1,83 @@
+# freshness_bench.py
+"""
+Message-to-report freshness lag, traced end to end.
+
+Replays candidate messages through chat_service.handle_user_message with
+the Celery tasks executed eagerly against local fakes (fake LLMs with
+latency, in-memory Neo4j with latency, fakeredis). Spans are collected by
+the in-memory exporter and summarised with tracing.freshness_report:
+per-message lag and the stage that dominated it, for per-segment and for
+micro-batched extraction.
+
+Usage:
+    python -m backend.benchmarks.freshness_bench [--messages 40] [--llm-latency-ms 200]
+        [--neo4j-latency-ms 5] [--message-interval-ms 50] [--batch-size 8]
+"""
+
+import argparse
+import json
+import time
+from unittest import mock
+
+from backend import chat_service, extraction_batcher, tracing, worker
+from backend.benchmarks.suite import SAMPLE_ANSWER, offline_environment
+
+
+def replay(config: dict, batch_size: int) -> dict:
+    tracing.configure_tracing("memory")
+    flushes = []
+
+    with offline_environment(config), \
+            mock.patch.object(extraction_batcher, "EXTRACTION_BATCH_SIZE", batch_size), \
+            mock.patch.object(worker.process_interview_segment, "delay",
+                              lambda *args: worker.process_interview_segment.apply(args)), \
+            mock.patch.object(worker.flush_extraction_batch, "delay", lambda *args: flushes.append(args)), \
+            mock.patch.object(worker.flush_extraction_batch, "apply_async", lambda *args, **kwargs: None):
+        for i in range(config["messages"]):
+            chat_service.handle_user_message(f"bench-fresh-{i % 4}", f"{SAMPLE_ANSWER} (answer {i})")
+            # A full batch is flushed after the turn, as a separate worker task would be
+            while flushes:
+                worker.flush_extraction_batch.apply(flushes.pop())
+            time.sleep(config["message_interval_ms"] / 1e3)
+        # Eager mode cannot honour countdowns: timed flushes are skipped and
+        # whatever is left of the last batch is flushed here
+        while pending := extraction_batcher.pending_lists():
+            for partition, lane, _ in pending:
+                worker.flush_extraction_batch.apply((partition, lane))
+
+    report = tracing.freshness_report(tracing.finished_spans())
+    report.pop("slowest", None)
+    tracing.configure_tracing()
+    return report
+
+
+def run(config: dict) -> dict:
+    return {
+        "config": config,
+        "per_segment": replay(config, 1),
+        "batched": replay(config, config["batch_size"]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--neo4j-latency-ms", type=float, default=5.0)
+    parser.add_argument("--message-interval-ms", type=float, default=50.0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    config = {
+        "messages": args.messages,
+        "llm_latency_ms": args.llm_latency_ms,
+        "neo4j_latency_ms": args.neo4j_latency_ms,
+        "message_interval_ms": args.message_interval_ms,
+        "batch_size": args.batch_size,
+        "redis_url": None,
+    }
+    print(json.dumps(run(config), indent=2))
+
+
+if __name__ == "__main__":
+    main()
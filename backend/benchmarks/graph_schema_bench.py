@@ -0,0 +1,172 @@
+# graph_schema_bench.py
+"""
+MERGE/MATCH latency with and without the graph_schema constraints and
+indexes as the number of Evidence nodes grows (default 10k, 100k, 1M).
+
+Needs a real Neo4j: label scans are what the schema removes, and a stand-in
+driver cannot model them. Use a scratch database. The benchmark loads
+'bench-' Candidate/Evidence nodes, temporarily drops the REQUIRED_SCHEMA
+items for the "without" measurements, restores them and deletes its nodes
+at the end.
+
+Usage:
+    NEO4J_USER=neo4j NEO4J_PASSWORD=... python -m backend.benchmarks.graph_schema_bench \\
+        --neo4j-uri bolt://localhost:7687 [--checkpoints 10000,100000,1000000] [--samples 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from backend.benchmarks.graph_writer_bench import make_observations
+from backend.graph_schema import REQUIRED_SCHEMA, ensure_graph_schema, verify_graph_schema
+from backend.graph_writer import build_segment_rows, save_observations_batch
+from backend.schema_config import ALL_SKILLS, CCS_HIERARCHY
+
+EVIDENCE_PER_CANDIDATE = 50
+LOAD_BATCH_SIZE = 10_000
+
+LOAD_EVIDENCE_QUERY = """
+UNWIND range($start, $end - 1) AS n
+MERGE (c:Candidate {session_id: 'bench-' + toString(n / $per_candidate)})
+CREATE (e:Evidence {id: 'bench-' + toString(n), text: 'Benchmark evidence ' + toString(n), timestamp: datetime()})
+CREATE (c)-[:DEMONSTRATED]->(e)
+"""
+
+# Lookups measured at every checkpoint: name -> (query, parameter factory)
+LOOKUPS = {
+    "merge_candidate": (
+        "MERGE (c:Candidate {session_id: $session_id}) RETURN c.session_id",
+        lambda evidence: {"session_id": f"bench-{random.randrange(evidence // EVIDENCE_PER_CANDIDATE)}"}
+    ),
+    "merge_skill": (
+        "MERGE (s:Skill {name: $name}) RETURN s.name",
+        lambda evidence: {"name": random.choice(ALL_SKILLS)}
+    ),
+    "match_evidence": (
+        "MATCH (e:Evidence {id: $id}) RETURN e.id",
+        lambda evidence: {"id": f"bench-{random.randrange(evidence)}"}
+    ),
+    "skills_by_domain": (
+        "MATCH (s:Skill {domain: $domain}) RETURN count(s)",
+        lambda evidence: {"domain": random.choice(list(CCS_HIERARCHY))}
+    ),
+}
+
+
+def drop_schema(driver) -> None:
+    with driver.session() as session:
+        for item in REQUIRED_SCHEMA:
+            kind = "CONSTRAINT" if item.kind == "UNIQUENESS" else "INDEX"
+            session.run(f"DROP {kind} {item.name} IF EXISTS").consume()
+
+
+def load_evidence(driver, start: int, end: int) -> None:
+    with driver.session() as session:
+        for batch_start in range(start, end, LOAD_BATCH_SIZE):
+            session.run(
+                LOAD_EVIDENCE_QUERY,
+                start=batch_start,
+                end=min(batch_start + LOAD_BATCH_SIZE, end),
+                per_candidate=EVIDENCE_PER_CANDIDATE
+            ).consume()
+
+
+def percentiles(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "p50_ms": statistics.median(samples) * 1e3,
+        "p95_ms": samples[int(len(samples) * 0.95) - 1] * 1e3,
+    }
+
+
+def measure(driver, evidence: int, samples: int) -> dict:
+    results = {}
+    with driver.session() as session:
+        for name, (query, params) in LOOKUPS.items():
+            timings = []
+            for _ in range(samples):
+                start = time.perf_counter()
+                session.run(query, **params(evidence)).consume()
+                timings.append(time.perf_counter() - start)
+            results[name] = percentiles(timings)
+
+    # The worker's real write path: one UNWIND transaction per segment
+    timings = []
+    for segment in range(samples):
+        session_id = f"bench-{random.randrange(evidence // EVIDENCE_PER_CANDIDATE)}"
+        rows = build_segment_rows(session_id, "", make_observations(segment, 5))
+        start = time.perf_counter()
+        save_observations_batch(driver, rows)
+        timings.append(time.perf_counter() - start)
+    results["write_segment"] = percentiles(timings)
+    return results
+
+
+def cleanup(driver) -> None:
+    with driver.session() as session:
+        session.run("""
+            MATCH (c:Candidate)-[:DEMONSTRATED]->(e:Evidence)
+            WHERE c.session_id STARTS WITH 'bench-'
+            CALL { WITH e DETACH DELETE e } IN TRANSACTIONS OF 10000 ROWS
+        """).consume()
+        session.run("""
+            MATCH (c:Candidate) WHERE c.session_id STARTS WITH 'bench-'
+            CALL { WITH c DETACH DELETE c } IN TRANSACTIONS OF 10000 ROWS
+        """).consume()
+
+
+def run(neo4j_uri: str, checkpoints: list[int], samples: int) -> dict:
+    from neo4j import GraphDatabase
+    driver = GraphDatabase.driver(
+        neo4j_uri, auth=(os.getenv("NEO4J_USER", "neo4j"), os.getenv("NEO4J_PASSWORD", "password"))
+    )
+
+    results = []
+    loaded = 0
+    try:
+        for evidence in sorted(checkpoints):
+            # Bulk load with the schema in place; MERGE without it is quadratic
+            ensure_graph_schema(driver)
+            load_evidence(driver, loaded, evidence)
+            loaded = evidence
+
+            drop_schema(driver)
+            without_schema = measure(driver, evidence, samples)
+            without_schema["schema_missing"] = [item.name for item in verify_graph_schema(driver)]
+
+            ensure_graph_schema(driver)
+            with_schema = measure(driver, evidence, samples)
+
+            results.append({
+                "evidence_nodes": evidence,
+                "without_schema": without_schema,
+                "with_schema": with_schema
+            })
+            print(json.dumps(results[-1]), flush=True)
+    finally:
+        ensure_graph_schema(driver)
+        cleanup(driver)
+        driver.close()
+
+    return {"samples": samples, "checkpoints": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--neo4j-uri", required=True, help="Scratch Neo4j instance")
+    parser.add_argument("--checkpoints", default="10000,100000,1000000", help="Evidence node counts")
+    parser.add_argument("--samples", type=int, default=200, help="Timed queries per lookup and checkpoint")
+    args = parser.parse_args()
+
+    checkpoints = [int(n) for n in args.checkpoints.split(",")]
+    print(json.dumps(run(args.neo4j_uri, checkpoints, args.samples), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+# graph_spool_bench.py
+"""
+Neo4j outage: Celery retries alone vs the local graph spool, then bulk replay.
+
+Runs --segments interview segments through process_interview_segment
+(eager Celery; batched flush_extraction_batch with --batch-size > 1) while
+every Neo4j session fails with ServiceUnavailable, then brings Neo4j back.
+"retry_only" is the old behaviour (GRAPH_SPOOL_ENABLED=false): each task
+retries 3 times and is then dropped. "spool" lets the circuit breaker
+divert writes to an on-disk spool in a temporary directory, which is then
+drained with GraphSpool.replay. Reported per mode:
+  - neo4j_attempts_during_outage: sessions opened against the dead server,
+  - outage_ms_per_segment (spool appends fsync) and spool bytes and segment files,
+  - replay: rows, transactions and rows/s,
+  - lost_segments and whether reports match the graph after recovery.
+
+Runs against the in-memory Neo4j stand-in (--latency-ms per round trip) by
+default; pass --neo4j-uri (with NEO4J_USER / NEO4J_PASSWORD) to replay into
+a local Neo4j. Exits 1 if the spool mode loses anything.
+
+Usage:
+    python -m backend.benchmarks.graph_spool_bench [--segments 1000] [--batch-size 1]
+        [--latency-ms 2] [--replay-batch-rows 5000] [--neo4j-uri bolt://localhost:7687]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from unittest import mock
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("LLM_LIMITER_ENABLED", "false")
+
+import fakeredis
+from neo4j.exceptions import ServiceUnavailable
+
+from backend import cohort_rollups, extraction_batcher, match_engine, report_service, report_store, worker
+from backend.benchmarks.fakes import FakeNeo4jDriver, FakeOpenAI, InMemoryGraph, fake_extraction_reply
+from backend.benchmarks.retry_faults_bench import ANSWER, NullCache, run_task
+from backend.celery_config import celery_app
+from backend.graph_spool import GraphCircuitBreaker, GraphSpool
+from backend.report_store import ReportStore
+from backend.segment_checkpoints import SegmentCheckpoints
+
+SESSION_PREFIX = "bench-spool-"
+
+
+class OutageDriver:
+    """Wraps a driver; while `down`, opening a session fails like an unreachable server."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.down = False
+        self.failed_sessions = 0
+
+    def session(self, **kwargs):
+        if self.down:
+            self.failed_sessions += 1
+            raise ServiceUnavailable("Couldn't connect to localhost:7687 (benchmark outage)")
+        return self.driver.session(**kwargs)
+
+
+def count_graph(driver, graph: InMemoryGraph | None) -> dict[str, int]:
+    """Evidence nodes per benchmark session."""
+    if graph is not None:
+        return {sid: len(items) for sid, items in graph.evidence.items()}
+    with driver.session() as session:
+        result = session.run("""
+            MATCH (c:Candidate)-[:DEMONSTRATED]->(e:Evidence)
+            WHERE c.session_id STARTS WITH $prefix
+            RETURN c.session_id AS session_id, count(e) AS evidence
+        """, prefix=SESSION_PREFIX)
+        return {record["session_id"]: record["evidence"] for record in result}
+
+
+def clean_graph(driver) -> None:
+    with driver.session() as session:
+        session.run("""
+            MATCH (c:Candidate) WHERE c.session_id STARTS WITH $prefix
+            OPTIONAL MATCH (c)-[:DEMONSTRATED]->(e:Evidence)
+            DETACH DELETE c, e
+        """, prefix=SESSION_PREFIX)
+
+
+def run(mode: str, args, real_driver=None) -> dict:
+    sessions = [f"{SESSION_PREFIX}{i}" for i in range(args.sessions)]
+    side_redis = fakeredis.FakeRedis(decode_responses=True)
+    store = ReportStore(side_redis)
+    graph = None if real_driver else InMemoryGraph()
+    base = real_driver or FakeNeo4jDriver(latency=args.latency_ms / 1e3, handler=graph)
+    driver = OutageDriver(base)
+    spool_dir = tempfile.TemporaryDirectory(prefix="graph-spool-bench-")
+    spool = GraphSpool(spool_dir.name, segment_bytes=args.segment_kb * 1024)
+    if real_driver:
+        clean_graph(real_driver)
+
+    with ExitStack() as stack:
+        stack.callback(spool_dir.cleanup)
+        patch = lambda target, name, value: stack.enter_context(mock.patch.object(target, name, value))
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        stack.callback(setattr, celery_app.conf, "task_always_eager", eager)
+        patch(worker, "openai_client", FakeOpenAI(reply_fn=fake_extraction_reply))
+        patch(worker, "get_neo4j_driver", lambda: driver)
+        if graph is not None:
+            patch(report_store, "get_report_evidence", graph.report_evidence)
+        else:
+            patch(report_service, "get_neo4j_driver", lambda: real_driver)
+        patch(report_store, "report_store", store)
+        patch(worker, "extraction_cache", NullCache())
+        patch(worker, "segment_checkpoints", SegmentCheckpoints(side_redis))
+        patch(worker, "graph_spool", spool)
+        patch(worker, "graph_breaker", GraphCircuitBreaker())
+        patch(worker, "GRAPH_SPOOL_ENABLED", mode == "spool")
+        patch(extraction_batcher, "redis_client", side_redis)
+        patch(match_engine, "redis_client", side_redis)
+        patch(cohort_rollups, "cohort_rollups", cohort_rollups.CohortRollups(side_redis))
+        patch(extraction_batcher, "EXTRACTION_BATCH_SIZE", args.batch_size)
+        patch(worker.flush_extraction_batch, "delay", lambda *a: None)
+        patch(worker.flush_extraction_batch, "apply_async", lambda *a, **kw: None)
+
+        def drain_pending(max_passes: int) -> None:
+            for _ in range(max_passes):
+                pending = extraction_batcher.pending_lists()
+                if not pending:
+                    return
+                for partition, lane, _ in pending:
+                    run_task(worker.flush_extraction_batch, (partition, lane), None)
+
+        # --- Outage ---
+        driver.down = True
+        started = time.perf_counter()
+        for i in range(args.segments):
+            session_id = sessions[i % len(sessions)]
+            text = f"(#{i}) {ANSWER}"
+            if args.batch_size > 1:
+                extraction_batcher.enqueue_segment(extraction_batcher.new_segment(session_id, text, segment_id=f"seg-{i}"))
+            else:
+                run_task(worker.process_interview_segment, (session_id, text), f"seg-{i}")
+        # Retried batches are handed back; stop once each has had its retries
+        drain_pending(worker.flush_extraction_batch.max_retries + 1)
+        outage_s = time.perf_counter() - started
+        attempts = driver.failed_sessions
+
+        # --- Recovery (the breaker stays open for its cooldown: batches still pending are spooled too) ---
+        driver.down = False
+        drain_pending(args.segments)
+        spool_stats = spool.stats()
+        started = time.perf_counter()
+        replay = spool.replay(worker.replay_spooled_rows, args.replay_batch_rows)
+        replay_s = time.perf_counter() - started
+
+        evidence = count_graph(base, graph)
+        reports_match = all(
+            sum(len(entry["evidence_points"]) for entry in (store.get(sid) or {}).get("skills", {}).values())
+            + sum(len(entry["evidence_points"]) for entry in (store.get(sid) or {}).get("traits", {}).values())
+            == evidence.get(sid, 0)
+            for sid in sessions
+        )
+
+    if real_driver:
+        clean_graph(real_driver)
+    # fake_extraction_reply: one skill and one trait observation per segment
+    expected = 2 * args.segments
+    present = sum(evidence.values())
+    return {
+        "neo4j_attempts_during_outage": attempts,
+        "outage_ms_per_segment": round(outage_s / args.segments * 1e3, 3),
+        "spool": {
+            "bytes": spool_stats["bytes"],
+            "segment_files": spool_stats["segments"],
+            "bytes_per_segment": round(spool_stats["bytes"] / args.segments, 1)
+        },
+        "replay": {
+            "rows": replay["rows"],
+            "transactions": replay["batches"],
+            "rows_per_s": round(replay["rows"] / replay_s) if replay["rows"] else 0
+        },
+        "evidence_nodes": present,
+        "evidence_nodes_expected": expected,
+        "lost_segments": (expected - present) // 2,
+        "reports_match_graph": reports_match
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--segments", type=int, default=1000)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=1, help=">1: batched extraction path")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Stand-in latency per round trip")
+    parser.add_argument("--segment-kb", type=int, default=256, help="Spool segment file size")
+    parser.add_argument("--replay-batch-rows", type=int, default=5000)
+    parser.add_argument("--neo4j-uri", default=None)
+    args = parser.parse_args()
+
+    real_driver = None
+    if args.neo4j_uri:
+        from neo4j import GraphDatabase
+        real_driver = GraphDatabase.driver(
+            args.neo4j_uri, auth=(os.getenv("NEO4J_USER", "neo4j"), os.getenv("NEO4J_PASSWORD", "password"))
+        )
+
+    results = {"config": vars(args)}
+    for mode in ("retry_only", "spool"):
+        results[mode] = run(mode, args, real_driver)
+    if real_driver:
+        real_driver.close()
+    print(json.dumps(results, indent=2))
+
+    spooled = results["spool"]
+    sys.exit(0 if spooled["lost_segments"] == 0 and spooled["reports_match_graph"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# graph_writer_bench.py
+"""
+Neo4j round trips and wall time per segment: per-observation writes vs the
+single-transaction UNWIND batch writer.
+
+Runs against a latency-injecting driver stand-in by default; pass --neo4j-uri
+(with NEO4J_USER / NEO4J_PASSWORD) to measure wall time on a local Neo4j.
+
+Usage:
+    python -m backend.benchmarks.graph_writer_bench [--segments 50] [--observations 5] [--latency-ms 1]
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Optional
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from backend.benchmarks.fakes import FakeNeo4jDriver
+from backend.graph_writer import build_segment_rows, save_observations_batch
+from backend.schema_config import ALL_SKILLS, OCEAN_TRAITS, canonical_skill, canonical_trait, get_skill_domain
+
+
+def make_observations(segment: int, count: int) -> list[dict]:
+    """Deterministic observations mixing skill-only, trait-only and both."""
+    observations = []
+    for i in range(count):
+        n = segment * count + i
+        observations.append({
+            "skill": ALL_SKILLS[n % len(ALL_SKILLS)] if n % 3 != 2 else None,
+            "trait": OCEAN_TRAITS[n % len(OCEAN_TRAITS)] if n % 3 != 0 else None,
+            "trait_intensity": "High",
+            "evidence": f"Benchmark evidence {n}"
+        })
+    return observations
+
+
+def save_observation_to_graph(
+    driver,
+    session_id: str,
+    skill: Optional[str],
+    skill_domain: Optional[str],
+    trait: Optional[str],
+    trait_intensity: Optional[str],
+    evidence: str
+) -> bool:
+    """
+    The per-observation writer the worker used before graph_writer (the
+    baseline only): up to four round trips per observation, and a retried
+    segment CREATEs its Evidence again.
+    """
+    skill = canonical_skill(skill)
+    trait = canonical_trait(trait)
+
+    with driver.session() as session:
+        # Ensure Candidate node exists
+        session.run("""
+            MERGE (c:Candidate {session_id: $session_id})
+            ON CREATE SET c.created_at = datetime()
+        """, session_id=session_id)
+
+        # Create Evidence node
+        evidence_query = """
+            MATCH (c:Candidate {session_id: $session_id})
+            CREATE (e:Evidence {
+                text: $evidence,
+                timestamp: datetime(),
+                id: randomUUID()
+            })
+            CREATE (c)-[:DEMONSTRATED]->(e)
+            RETURN e.id as evidence_id
+        """
+        result = session.run(evidence_query, session_id=session_id, evidence=evidence)
+        evidence_id = result.single()["evidence_id"]
+
+        # Link to Skill if present
+        if skill:
+            session.run("""
+                MATCH (e:Evidence {id: $evidence_id})
+                MERGE (s:Skill {name: $skill})
+                ON CREATE SET s.domain = $domain
+                CREATE (e)-[:INDICATES]->(s)
+            """, evidence_id=evidence_id, skill=skill, domain=skill_domain or get_skill_domain(skill))
+
+        # Link to Trait if present
+        if trait:
+            session.run("""
+                MATCH (e:Evidence {id: $evidence_id})
+                MERGE (t:Trait {name: $trait})
+                CREATE (e)-[r:INDICATES {intensity: $intensity}]->(t)
+            """, evidence_id=evidence_id, trait=trait, intensity=trait_intensity or "Moderate")
+
+    return True
+
+
+def legacy_segment(driver, session_id: str, observations: list[dict]) -> None:
+    for obs in observations:
+        save_observation_to_graph(
+            driver,
+            session_id=session_id,
+            skill=obs["skill"],
+            skill_domain=None,
+            trait=obs["trait"],
+            trait_intensity=obs["trait_intensity"],
+            evidence=obs["evidence"]
+        )
+
+
+def batch_segment(driver, session_id: str, observations: list[dict]) -> None:
+    save_observations_batch(driver, build_segment_rows(session_id, "", observations))
+
+
+def run(segments: int, observations: int, latency: float, neo4j_uri: str | None) -> dict:
+    if neo4j_uri:
+        from neo4j import GraphDatabase
+        driver = GraphDatabase.driver(
+            neo4j_uri, auth=(os.getenv("NEO4J_USER", "neo4j"), os.getenv("NEO4J_PASSWORD", "password"))
+        )
+    else:
+        driver = FakeNeo4jDriver(latency=latency)
+
+    results = {}
+    for name, write in (("per_observation", legacy_segment), ("unwind_batch", batch_segment)):
+        round_trips = 0
+        start = time.perf_counter()
+        for segment in range(segments):
+            if not neo4j_uri:
+                driver.reset()
+            write(driver, f"bench-{name}-{segment % 10}", make_observations(segment, observations))
+            if not neo4j_uri:
+                round_trips += driver.round_trips
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "segments": segments,
+            "observations_per_segment": observations,
+            "round_trips_per_segment": round_trips / segments if not neo4j_uri else None,
+            "ms_per_segment": elapsed / segments * 1e3,
+        }
+
+    if neo4j_uri:
+        with driver.session() as session:
+            session.run("""
+                MATCH (c:Candidate) WHERE c.session_id STARTS WITH 'bench-'
+                OPTIONAL MATCH (c)-[:DEMONSTRATED]->(e:Evidence)
+                DETACH DELETE c, e
+            """)
+        driver.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--segments", type=int, default=50)
+    parser.add_argument("--observations", type=int, default=5, help="Observations per segment")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Stand-in network latency per round trip")
+    parser.add_argument("--neo4j-uri", default=None)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.segments, args.observations, args.latency_ms / 1e3, args.neo4j_uri), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# llm_limiter_bench.py
+"""
+Chat latency under a saturated extraction backlog: uncoordinated OpenAI
+calls vs the shared llm_limiter, with and without the chat reserve.
+
+A simulated provider enforces one request and one token quota
+(continuously refilled buckets, --burst-s deep) across every caller and
+answers 429 when either is empty; calls are charged prompt + max_tokens
+up front and refunded to the actual usage when they finish, as OpenAI
+counts them. Without the limiter, clients retry 429s like the OpenAI SDK
+(2 retries, exponential backoff from 0.5 s) and then fail.
+
+--workers threads run worker.request_observations in a loop (the
+extraction backlog never drains) while chat turns arrive through
+chat_service.handle_user_message at --chat-rps (Poisson). The limiter
+is given --headroom of the provider quota. Reported per mode:
+  - chat latency p50/p95/p99/max (limiter wait + retries + LLM) and errors,
+  - extraction calls completed per second and errors,
+  - 429s the provider returned.
+
+Runs in real time: about 3 x (--warmup-s + --duration-s) seconds.
+
+Usage:
+    python -m backend.benchmarks.llm_limiter_bench [--duration-s 30] [--workers 12]
+        [--chat-rps 1] [--rpm 120] [--tpm 90000] [--reserve 0.3]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from unittest import mock
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import fakeredis
+
+from backend import chat_service, context_window, worker
+from backend.benchmarks.fakes import FakeOpenAI, fake_extraction_reply
+from backend.benchmarks.suite import SAMPLE_ANSWER, offline_environment
+from backend.llm_limiter import LLMLimiter, LLMRateLimited
+
+# OpenAI SDK defaults: max_retries=2, backoff 0.5 s * 2^n (max 8 s), 25% jitter
+SDK_MAX_RETRIES = 2
+SDK_INITIAL_BACKOFF_S = 0.5
+
+
+class RateLimitError(Exception):
+    """Provider 429 after the SDK's retries."""
+
+
+class Provider:
+    """The provider-side quota shared by every caller."""
+
+    def __init__(self, rpm: float, tpm: float, burst_s: float):
+        self.rates = (rpm / 60, tpm / 60)
+        self.capacity = (self.rates[0] * burst_s, self.rates[1] * burst_s)
+        self.levels = list(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.rejected = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed, self.updated = now - self.updated, now
+        self.levels = [min(c, level + elapsed * r) for level, r, c in zip(self.levels, self.rates, self.capacity)]
+
+    def admit(self, tokens: int) -> bool:
+        with self.lock:
+            self._refill()
+            if self.levels[0] >= 1 and self.levels[1] >= tokens:
+                self.levels[0] -= 1
+                self.levels[1] -= tokens
+                return True
+            self.rejected += 1
+            return False
+
+    def refund(self, tokens: int) -> None:
+        with self.lock:
+            self.levels[1] += tokens
+
+
+class QuotaOpenAI(FakeOpenAI):
+    """FakeOpenAI behind the provider quota, retrying 429s like the SDK."""
+
+    def __init__(self, provider: Provider, latency: float, reply_fn=None):
+        super().__init__(latency=latency, reply_fn=reply_fn)
+        self.provider = provider
+
+    def _create(self, messages: list[dict], stream: bool = False, max_tokens: int = 0, **kwargs):
+        charged = sum(len(m["content"]) for m in messages) // 4 + max_tokens
+        for attempt in range(SDK_MAX_RETRIES + 1):
+            if self.provider.admit(charged):
+                break
+            if attempt == SDK_MAX_RETRIES:
+                raise RateLimitError("429 Too Many Requests")
+            time.sleep(min(SDK_INITIAL_BACKOFF_S * 2 ** attempt, 8) * random.uniform(0.75, 1.0))
+        completion = super()._create(messages, stream=stream, **kwargs)
+        self.provider.refund(charged - completion.usage.total_tokens)
+        return completion
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))]
+    return {
+        "p50_ms": round(statistics.median(samples) * 1e3, 1),
+        "p95_ms": round(pick(0.95) * 1e3, 1),
+        "p99_ms": round(pick(0.99) * 1e3, 1),
+        "max_ms": round(samples[-1] * 1e3, 1),
+    }
+
+
+def run(mode: str, args) -> dict:
+    provider = Provider(args.rpm, args.tpm, args.burst_s)
+    limiter = LLMLimiter(
+        fakeredis.FakeRedis(decode_responses=True),
+        requests_per_minute=args.rpm * args.headroom,
+        tokens_per_minute=args.tpm * args.headroom,
+        burst_seconds=args.burst_s,
+        chat_reserve=args.reserve if mode == "limiter" else 0.0,
+        background_max_in_flight=args.max_in_flight,
+        enabled=mode != "no_limiter"
+    )
+    config = {"redis_url": None, "neo4j_latency_ms": 0, "llm_latency_ms": 0}
+    stop = threading.Event()
+    lock = threading.Lock()
+    extraction = {"calls": 0, "errors": 0}
+    chat_latency, chat_errors = [], []
+
+    def extract(n: int) -> None:
+        i = 0
+        while not stop.is_set():
+            try:
+                worker.request_observations(f"{SAMPLE_ANSWER} ({n}-{i})")
+                with lock:
+                    extraction["calls"] += 1
+            except (RateLimitError, LLMRateLimited):
+                with lock:
+                    extraction["errors"] += 1
+            i += 1
+
+    def chat(i: int) -> None:
+        started = time.perf_counter()
+        try:
+            chat_service.handle_user_message(f"bench-limiter-{i % 50}", f"{SAMPLE_ANSWER} (turn {i})")
+            chat_latency.append(time.perf_counter() - started)
+        except (RateLimitError, LLMRateLimited) as e:
+            chat_errors.append(type(e).__name__)
+
+    with offline_environment(config), \
+            mock.patch.object(chat_service, "openai_client", QuotaOpenAI(provider, args.chat_latency_ms / 1e3)), \
+            mock.patch.object(worker, "openai_client", QuotaOpenAI(
+                provider, args.extraction_latency_ms / 1e3, reply_fn=fake_extraction_reply
+            )), \
+            mock.patch.object(chat_service, "llm_limiter", limiter), \
+            mock.patch.object(context_window, "llm_limiter", limiter), \
+            mock.patch.object(worker, "llm_limiter", limiter):
+        extractors = [threading.Thread(target=extract, args=(n,)) for n in range(args.workers)]
+        for thread in extractors:
+            thread.start()
+        time.sleep(args.warmup_s)
+
+        rng = random.Random(0)
+        with lock:
+            extraction["calls"] = 0
+        started = time.monotonic()
+        chats, i = [], 0
+        while time.monotonic() - started < args.duration_s:
+            thread = threading.Thread(target=chat, args=(i,))
+            thread.start()
+            chats.append(thread)
+            i += 1
+            time.sleep(rng.expovariate(args.chat_rps))
+        elapsed = time.monotonic() - started
+        extraction_rate = extraction["calls"] / elapsed
+        for thread in chats:
+            thread.join()
+        stop.set()
+        for thread in extractors:
+            thread.join()
+
+    return {
+        "chat": {"turns": i, "errors": len(chat_errors), **percentiles(chat_latency)},
+        "extraction": {
+            "calls_per_s": round(extraction_rate, 2),
+            "errors": extraction["errors"]
+        },
+        "provider_429s": provider.rejected
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration-s", type=float, default=30.0)
+    parser.add_argument("--warmup-s", type=float, default=5.0, help="Extraction-only lead-in")
+    parser.add_argument("--workers", type=int, default=12, help="Extraction threads")
+    parser.add_argument("--chat-rps", type=float, default=1.0)
+    parser.add_argument("--rpm", type=float, default=120, help="Provider request quota")
+    parser.add_argument("--tpm", type=float, default=90_000, help="Provider token quota")
+    parser.add_argument("--burst-s", type=float, default=2.0)
+    parser.add_argument("--headroom", type=float, default=0.9, help="Limiter share of the provider quota")
+    parser.add_argument("--reserve", type=float, default=0.3, help="Chat reserve")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="Background in-flight cap")
+    parser.add_argument("--chat-latency-ms", type=float, default=600.0)
+    parser.add_argument("--extraction-latency-ms", type=float, default=1000.0)
+    parser.add_argument("--modes", default="no_limiter,limiter_no_reserve,limiter")
+    args = parser.parse_args()
+
+    results = {"config": vars(args)}
+    for mode in args.modes.split(","):
+        results[mode] = run(mode, args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
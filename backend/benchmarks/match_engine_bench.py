@@ -0,0 +1,183 @@
+# match_engine_bench.py
+"""
+Candidate-to-role matching: MatchEngine vs scoring reports one by one.
+
+Builds a synthetic framework (as framework_search_bench: ~2,000 roles,
+~6,000 skills, ~30 skills per role, or --framework) and --candidates
+candidates, each with evidence for part of one role's skills plus a few
+unrelated ones. The naive baseline is what a ranking had to do before:
+walk every candidate's skills and add up the role's weights in Python.
+
+Reported:
+  - engine build (ontology resolution of skill titles) and matrix load
+    time, matrix memory vs a dense candidates x skills float32 matrix,
+  - single-role top-k latency p50/p99 over --queries random roles,
+  - one batched top-k over --batch-roles roles,
+  - incremental refresh: --changes candidates republished via the Redis
+    stream (fakeredis) and re-read,
+  - the naive loop for one role, and whether both agree on scores and top k.
+Exits 1 if they disagree.
+
+Usage:
+    python -m backend.benchmarks.match_engine_bench [--candidates 100000] [--k 20]
+        [--queries 200] [--batch-roles 50] [--changes 100] [--framework src/data/framework]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import fakeredis
+
+from backend.benchmarks.framework_search_bench import write_framework
+from backend.framework_search import FrameworkIndex
+from backend.match_engine import MatchEngine, publish_candidate_changes
+
+
+def make_counts(engine: MatchEngine, candidates: int, rng: random.Random) -> dict[str, dict[str, int]]:
+    """{session_id: {skill: evidence count}}: most of one role's skills, plus noise."""
+    names = list(engine.skill_ids)
+    offsets, skill_ids = engine.role_offsets, engine.role_skill_ids
+    counts = {}
+    for i in range(candidates):
+        role = rng.randrange(len(offsets) - 1)
+        required = skill_ids[offsets[role]:offsets[role + 1]]
+        shown = rng.sample(list(required), rng.randint(1, len(required)) // 2 + 1)
+        shown += [rng.randrange(len(names)) for _ in range(rng.randint(0, 5))]
+        counts[f"bench-match-{i:06d}"] = {names[s]: rng.randint(1, 5) for s in shown}
+    return counts
+
+
+def naive_scores(engine: MatchEngine, counts: dict, role: int) -> dict[str, float]:
+    """Per-candidate Python loop over report skills."""
+    names = list(engine.skill_ids)
+    start, end = engine.role_offsets[role], engine.role_offsets[role + 1]
+    weights = {}
+    for s, w in zip(engine.role_skill_ids[start:end], engine.role_weights[start:end]):
+        weights[names[s]] = weights.get(names[s], 0.0) + float(w)
+    scores = {}
+    for session_id, skills in counts.items():
+        score = 0.0
+        for skill, n in skills.items():
+            if skill in weights:
+                score += weights[skill] * min(n / engine.saturation, 1.0)
+        scores[session_id] = score
+    return scores
+
+
+def percentiles(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1e3, 3),
+        "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1e3, 3)
+    }
+
+
+def run(args, framework: FrameworkIndex) -> dict:
+    rng = random.Random(0)
+    counts: dict[str, dict[str, int]] = {}
+    fetches = []
+
+    def fetch_counts(session_ids: list[str]) -> dict:
+        fetches.append(len(session_ids))
+        return {sid: counts[sid] for sid in session_ids if sid in counts}
+
+    client = fakeredis.FakeRedis(decode_responses=True)
+    started = time.perf_counter()
+    engine = MatchEngine(framework, fetch_counts, client, refresh_seconds=0)
+    build_s = time.perf_counter() - started
+
+    counts.update(make_counts(engine, args.candidates, rng))
+    engine.load(list(counts))
+    load_fetches = len(fetches)
+    stats = engine.stats()
+    n_roles = len(engine.role_offsets) - 1
+
+    single = []
+    for _ in range(args.queries):
+        role = rng.randrange(n_roles)
+        started = time.perf_counter()
+        engine.top_k([role], args.k)
+        single.append(time.perf_counter() - started)
+
+    batch_roles = rng.sample(range(n_roles), min(args.batch_roles, n_roles))
+    started = time.perf_counter()
+    engine.top_k(batch_roles, args.k)
+    batch_s = time.perf_counter() - started
+
+    # --- Incremental: new evidence for some candidates ---
+    changed = rng.sample(list(counts), args.changes)
+    for sid in changed:
+        counts[sid] = {**counts[sid], **make_counts(engine, 1, rng)["bench-match-000000"]}
+    publish_candidate_changes(changed, client)
+    started = time.perf_counter()
+    refreshed = engine.refresh(force=True)
+    refresh_s = time.perf_counter() - started
+
+    # --- Naive loop vs engine, on one role ---
+    role = batch_roles[0]
+    started = time.perf_counter()
+    expected = naive_scores(engine, counts, role)
+    naive_s = time.perf_counter() - started
+    got = engine.scores([role])[:, 0]
+    max_error = max(abs(float(got[engine.rows[sid]]) - score) for sid, score in expected.items())
+    top = engine.top_k([role], args.k)[0]
+    kth = sorted(expected.values(), reverse=True)[len(top) - 1] if top else 0.0
+    top_agrees = all(expected[c["session_id"]] >= kth - 1e-5 for c in top)
+
+    return {
+        "framework": {"roles": n_roles, "skills": stats["framework_skills"]},
+        "engine_build_ms": round(build_s * 1e3, 1),
+        "load": {
+            "ms": stats["load_ms"],
+            "fetches": load_fetches,
+            "skills_per_candidate": stats["skills_per_candidate"],
+            "slots_per_candidate": stats["slots_per_candidate"],
+            "matrix_mb": stats["matrix_mb"],
+            "dense_matrix_mb": round(args.candidates * stats["framework_skills"] * 4 / 1e6, 1)
+        },
+        "top_k_single_role": percentiles(single),
+        "top_k_batch": {
+            "roles": len(batch_roles),
+            "ms": round(batch_s * 1e3, 1),
+            "ms_per_role": round(batch_s * 1e3 / len(batch_roles), 3)
+        },
+        "incremental": {"published": args.changes, "refreshed": refreshed, "ms": round(refresh_s * 1e3, 2)},
+        "naive_single_role_ms": round(naive_s * 1e3, 1),
+        "speedup_single_role": round(naive_s / statistics.median(single), 1),
+        "max_score_error": round(max_error, 6),
+        "top_k_agrees": top_agrees
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--candidates", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-roles", type=int, default=50)
+    parser.add_argument("--changes", type=int, default=100)
+    parser.add_argument("--framework", default=None, help="process_excel.py output (default: synthetic)")
+    args = parser.parse_args()
+
+    if args.framework:
+        framework = FrameworkIndex.load(args.framework)
+    else:
+        with tempfile.TemporaryDirectory() as root:
+            write_framework(os.path.join(root, "framework"), sectors=38, roles=2000, skills=6000, skills_per_role=30)
+            framework = FrameworkIndex.load(os.path.join(root, "framework"))
+
+    results = run(args, framework)
+    print(json.dumps({"config": vars(args), **results}, indent=2))
+    sys.exit(0 if results["max_score_error"] < 1e-4 and results["top_k_agrees"] else 1)
+
+
+if __name__ == "__main__":
+    main()
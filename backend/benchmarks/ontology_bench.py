@@ -0,0 +1,140 @@
+# ontology_bench.py
+"""
+Skill validation cost: list scan + hierarchy walk vs the compiled Ontology,
+with the built-in CCS list and with a synthetic TSC/CCS catalogue of
+thousands of skills (same shape as process_excel.py output).
+
+Also reports how many drifted LLM spellings each approach accepts, and
+checks trait resolution: known variants resolve, opposite traits
+("Introversion") must not. Exits 1 if either check fails.
+
+Usage:
+    python -m backend.benchmarks.ontology_bench [--catalogue-skills 5000] [--lookups 100000]
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+
+from backend.ontology import Ontology, SKILL_SYNONYMS, TRAIT_SYNONYMS
+from backend.schema_config import CCS_HIERARCHY, OCEAN_TRAITS
+
+# Wording drift seen in extraction replies
+DRIFTED_NAMES = [
+    "problem-solving", "Problem solving", "Decision-Making", "COMMUNICATION",
+    "Communication skills", "Colaboration", "teamwork", "Self-management",
+    "Learning agility", "Creative Thinkng", "Customer focus", "Digital literacy",
+]
+
+# Trait variants that must resolve, and antonyms that must not (they are
+# within edit distance of a synonym of the opposite trait)
+TRAIT_VARIANTS = {
+    "openness to experience": "Openness", "Extroverted": "Extraversion",
+    "extraversion": "Extraversion", "Conscientious": "Conscientiousness", "NEUROTIC": "Neuroticism",
+}
+OPPOSITE_TRAITS = ["Introversion", "Introverted", "introvert", "Disagreeable", "Unconscientious", "closed"]
+
+
+def write_catalogue(path: str, skills: int) -> None:
+    """
+    Synthetic sectorsData.ts: 15 skills per role, 20 roles per sector,
+    every skill listed by two roles (descriptions repeat across roles).
+    """
+    rng = random.Random(0)
+    codes = [i % skills for i in range(2 * skills)]
+    rng.shuffle(codes)
+    roles = [
+        {
+            "id": f"role-{r}",
+            "label": f"Role {r}",
+            "skills": [
+                {"id": f"TSC-{i:05d}", "label": f"Synthetic Skill {i}", "description": "", "proficiencyLevel": 3}
+                for i in codes[r * 15:(r + 1) * 15]
+            ]
+        }
+        for r in range((len(codes) + 14) // 15)
+    ]
+    sectors = [
+        {"id": f"sector-{s}", "label": f"Sector {s}", "tracks": [{"id": "track", "label": "Track", "roles": roles[s:s + 20]}]}
+        for s in range(0, len(roles), 20)
+    ]
+    with open(path, "w") as f:
+        f.write("export const sectors = ")
+        json.dump(sectors, f)
+        f.write(";\n")
+
+
+def legacy_lookup(hierarchy: dict, all_skills: list[str], name: str):
+    """schema_config before the Ontology: list membership, then hierarchy walk."""
+    if name not in all_skills:
+        return None
+    for domain, skills in hierarchy.items():
+        if name in skills:
+            return domain
+    return None
+
+
+def time_lookups(lookup, names: list[str], lookups: int) -> float:
+    start = time.perf_counter()
+    for i in range(lookups):
+        lookup(names[i % len(names)])
+    return (time.perf_counter() - start) / lookups * 1e9
+
+
+def run_case(hierarchy: dict, ontology: Ontology, lookups: int) -> dict:
+    all_skills = [skill for skills in hierarchy.values() for skill in skills]
+    # Worst case for the scan: names near the end of the list, plus misses
+    names = all_skills[-50:] + [f"Unknown Skill {i}" for i in range(10)]
+
+    return {
+        "skills": len(all_skills),
+        "legacy_ns_per_lookup": time_lookups(lambda n: legacy_lookup(hierarchy, all_skills, n), names, lookups),
+        "ontology_ns_per_lookup": time_lookups(ontology.skill_domain, names, lookups),
+        "drifted_accepted": {
+            "legacy": sum(legacy_lookup(hierarchy, all_skills, n) is not None for n in DRIFTED_NAMES),
+            "ontology": sum(ontology.skill_domain(n) is not None for n in DRIFTED_NAMES),
+            "of": len(DRIFTED_NAMES)
+        }
+    }
+
+
+def run(catalogue_skills: int, lookups: int) -> dict:
+    results = {"ccs": run_case(CCS_HIERARCHY, Ontology(CCS_HIERARCHY, OCEAN_TRAITS, SKILL_SYNONYMS, TRAIT_SYNONYMS), lookups)}
+
+    with tempfile.NamedTemporaryFile(suffix=".ts") as catalogue:
+        write_catalogue(catalogue.name, catalogue_skills)
+        ontology = Ontology(CCS_HIERARCHY, OCEAN_TRAITS, SKILL_SYNONYMS, TRAIT_SYNONYMS)
+        start = time.perf_counter()
+        ontology.load_catalogue(catalogue.name)
+        load_ms = (time.perf_counter() - start) * 1e3
+
+    hierarchy = {domain: list(skills) for domain, skills in CCS_HIERARCHY.items()}
+    hierarchy["Technical Skills and Competencies"] = [
+        name for name, domain in ontology.skill_domains.items() if domain not in CCS_HIERARCHY
+    ]
+    results["catalogue"] = run_case(hierarchy, ontology, lookups)
+    results["catalogue"]["load_ms"] = load_ms
+
+    results["traits"] = {
+        "variants_resolved": all(ontology.canonical_trait(n) == t for n, t in TRAIT_VARIANTS.items()),
+        "opposites_rejected": all(ontology.canonical_trait(n) is None for n in OPPOSITE_TRAITS)
+    }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--catalogue-skills", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    results = run(args.catalogue_skills, args.lookups)
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if all(results["traits"].values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# report_export_bench.py
+"""
+Bulk report export: one get_candidate_report per candidate vs the
+batched NDJSON export (report_service.export_reports_ndjson).
+
+Seeds --candidates candidates with --observations observations each, then
+exports all of them three ways:
+  - per_candidate: the /api/report/<id>?source=live loop, two queries each,
+  - ndjson_ids: export of the id list, two UNWIND queries per chunk,
+  - ndjson_filter: export by session id prefix (keyset-paged id queries).
+Reported per way: Neo4j round trips, wall time, NDJSON bytes and, from a
+second run under tracemalloc, the Python heap peak while streaming to a
+null sink. "materialised" builds the whole export in memory first, as a
+non-streaming endpoint would, for comparison.
+
+Runs against the in-memory Neo4j stand-in (--latency-ms per round trip) by
+default; pass --neo4j-uri (with NEO4J_USER / NEO4J_PASSWORD) to seed and
+export a local Neo4j (round trips are not counted there).
+
+Usage:
+    python -m backend.benchmarks.report_export_bench [--candidates 10000] [--observations 6]
+        [--chunk-size 500] [--latency-ms 0.5] [--neo4j-uri bolt://localhost:7687]
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from unittest import mock
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from backend import report_service
+from backend.benchmarks.fakes import FakeNeo4jDriver, InMemoryGraph
+from backend.benchmarks.graph_writer_bench import make_observations
+from backend.graph_writer import build_segment_rows, save_observations_batch
+
+SESSION_PREFIX = "bench-export-"
+
+
+def seed(driver, candidates: int, observations: int) -> list[str]:
+    session_ids = [f"{SESSION_PREFIX}{i:06d}" for i in range(candidates)]
+    rows = []
+    for n, session_id in enumerate(session_ids):
+        rows.extend(build_segment_rows(session_id, "", make_observations(n, observations)))
+        if len(rows) >= 5000:
+            save_observations_batch(driver, rows)
+            rows = []
+    save_observations_batch(driver, rows)
+    return session_ids
+
+
+def clean(driver) -> None:
+    with driver.session() as session:
+        session.run("""
+            MATCH (c:Candidate) WHERE c.session_id STARTS WITH $prefix
+            OPTIONAL MATCH (c)-[:DEMONSTRATED]->(e:Evidence)
+            DETACH DELETE c, e
+        """, prefix=SESSION_PREFIX)
+
+
+def drain(lines) -> tuple[int, int]:
+    """Consume NDJSON lines as a streaming response would: (lines, bytes)."""
+    count = size = 0
+    for line in lines:
+        count += 1
+        size += len(line)
+    return count, size
+
+
+def measure(driver, make_lines) -> dict:
+    """Time one export, then repeat it under tracemalloc for the heap peak."""
+    counted = isinstance(driver, FakeNeo4jDriver)
+    if counted:
+        driver.reset()
+    started = time.perf_counter()
+    count, size = drain(make_lines())
+    elapsed = time.perf_counter() - started
+    round_trips = driver.round_trips if counted else None
+
+    tracemalloc.start()
+    drain(make_lines())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "lines": count,
+        "round_trips": round_trips,
+        "seconds": round(elapsed, 2),
+        "mb": round(size / 1e6, 1),
+        "peak_heap_mb": round(peak / 1e6, 1)
+    }
+
+
+def run(args) -> dict:
+    if args.neo4j_uri:
+        from neo4j import GraphDatabase
+        driver = GraphDatabase.driver(
+            args.neo4j_uri, auth=(os.getenv("NEO4J_USER", "neo4j"), os.getenv("NEO4J_PASSWORD", "password"))
+        )
+        clean(driver)
+    else:
+        driver = FakeNeo4jDriver(handler=InMemoryGraph())
+
+    session_ids = seed(driver, args.candidates, args.observations)
+    if not args.neo4j_uri:
+        driver.latency = args.latency_ms / 1e3
+
+    results = {}
+    with mock.patch.object(report_service, "get_neo4j_driver", lambda: driver):
+        results["per_candidate"] = measure(driver, lambda: (
+            json.dumps(report_service.get_candidate_report(sid)) + "\n" for sid in session_ids
+        ))
+        results["ndjson_ids"] = measure(driver, lambda: report_service.export_reports_ndjson(
+            session_ids, chunk_size=args.chunk_size
+        ))
+        results["ndjson_filter"] = measure(driver, lambda: report_service.export_reports_ndjson(
+            filters={"prefix": SESSION_PREFIX}, chunk_size=args.chunk_size
+        ))
+        # The same export collected into one document before sending
+        results["materialised"] = measure(driver, lambda: (
+            json.dumps(list(report_service.iter_candidate_reports(session_ids, args.chunk_size))) for _ in [0]
+        ))
+
+    if args.neo4j_uri:
+        clean(driver)
+        driver.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--candidates", type=int, default=10_000)
+    parser.add_argument("--observations", type=int, default=6, help="Observations per candidate")
+    parser.add_argument("--chunk-size", type=int, default=report_service.REPORT_EXPORT_CHUNK_SIZE)
+    parser.add_argument("--latency-ms", type=float, default=0.5, help="Stand-in network latency per round trip")
+    parser.add_argument("--neo4j-uri", default=None)
+    args = parser.parse_args()
+
+    print(json.dumps({"config": vars(args), **run(args)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
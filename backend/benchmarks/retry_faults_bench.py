@@ -0,0 +1,238 @@
+# retry_faults_bench.py
+"""
+Fault injection: duplicate LLM calls and Evidence nodes when extraction tasks retry.
+
+Runs process_interview_segment (and, with --batch-size > 1, batched
+flush_extraction_batch) eagerly against fakeredis, the in-memory Neo4j
+stand-in and a fake OpenAI client, injecting one fault into the first
+attempt of most segments:
+    llm_error        the LLM request fails (no reply)
+    neo4j_error      the graph write fails before committing
+    neo4j_lost_ack   the graph write commits, then the connection drops
+    checkpoint_lost  the write commits, then recording it in Redis fails
+    report_crash     the report is updated, then the worker dies
+Celery retries the task (eagerly, at once) after each fault.
+
+"baseline" replays the pre-checkpoint behaviour: no stage checkpoints,
+a fresh Evidence id per attempt (CREATE) and no report de-duplication.
+"checkpointed" is the current code. The extraction cache is disabled in
+both so it cannot hide repeated LLM calls. Reported per mode:
+  - llm_replies_per_segment (1.0 = no paid call repeated),
+  - evidence_nodes vs expected, and report evidence points vs the graph.
+Exits 1 if the checkpointed run has any duplicate.
+
+Usage:
+    python -m backend.benchmarks.retry_faults_bench [--segments 100] [--batch-size 1]
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from contextlib import ExitStack
+from unittest import mock
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("LLM_LIMITER_ENABLED", "false")
+
+import fakeredis
+
+from backend import cohort_rollups, extraction_batcher, graph_writer, match_engine, report_store, worker
+from backend.benchmarks.fakes import FakeNeo4jDriver, FakeOpenAI, InMemoryGraph, fake_extraction_reply
+from backend.celery_config import celery_app
+from backend.report_store import ReportStore
+from backend.segment_checkpoints import REPORTED, WRITTEN, SegmentCheckpoints
+
+FAULTS = ("none", "llm_error", "neo4j_error", "neo4j_lost_ack", "checkpoint_lost", "report_crash")
+
+ANSWER = (
+    "I led the migration of our billing service, split the work across three "
+    "teams and kept stakeholders updated every week until we shipped on time."
+)
+
+
+class InjectedFault(Exception):
+    pass
+
+
+class Faults:
+    """Fault per segment id, each fired on the first attempt only."""
+
+    def __init__(self, plan: dict[str, str]):
+        self.plan = plan
+        self.fired: set[str] = set()
+
+    def fire(self, segment_ids, kind: str) -> None:
+        for segment_id in segment_ids:
+            if self.plan.get(segment_id) == kind and segment_id not in self.fired:
+                self.fired.add(segment_id)
+                raise InjectedFault(f"{kind} ({segment_id})")
+
+
+class FaultyOpenAI(FakeOpenAI):
+    """Counts completed replies per segment; fails the first request of llm_error segments."""
+
+    def __init__(self, faults: Faults, segment_of_text: dict[str, str]):
+        super().__init__(reply_fn=fake_extraction_reply)
+        self.faults = faults
+        self.segment_of_text = segment_of_text
+        self.replies = Counter()
+
+    def _create(self, messages: list[dict], **kwargs):
+        user = messages[-1]["content"]
+        segment_ids = [sid for text, sid in self.segment_of_text.items() if text in user]
+        self.faults.fire(segment_ids, "llm_error")
+        reply = super()._create(messages, **kwargs)
+        self.replies.update(segment_ids)
+        return reply
+
+
+class FaultyGraph(InMemoryGraph):
+    def __init__(self, faults: Faults):
+        super().__init__()
+        self.faults = faults
+
+    def __call__(self, query: str, params: dict) -> list[dict]:
+        if "UNWIND $rows AS row" in query:
+            segment_ids = [row.get("segment_id") for row in params["rows"]]
+            self.faults.fire(segment_ids, "neo4j_error")
+            result = super().__call__(query, params)
+            self.faults.fire(segment_ids, "neo4j_lost_ack")
+            return result
+        return super().__call__(query, params)
+
+
+class FaultyCheckpoints(SegmentCheckpoints):
+    def __init__(self, client, faults: Faults):
+        super().__init__(client)
+        self.faults = faults
+
+    def mark(self, segment_ids, stage: str) -> None:
+        segment_ids = list(segment_ids)
+        if stage == WRITTEN:
+            self.faults.fire(segment_ids, "checkpoint_lost")
+        super().mark(segment_ids, stage)
+        if stage == REPORTED:
+            self.faults.fire(segment_ids, "report_crash")
+
+
+class NullCheckpoints(FaultyCheckpoints):
+    """Baseline: nothing is remembered between attempts (faults still fire)."""
+
+    def load(self, segment_id):
+        return {}
+
+    def load_many(self, segment_ids):
+        return {}
+
+    def save_observations(self, observations_by_id):
+        pass
+
+
+class NullCache:
+    def get(self, text):
+        return None
+
+    def get_many(self, texts):
+        return {}
+
+    def put(self, text, observations):
+        pass
+
+    def put_many(self, results):
+        pass
+
+
+def run(mode: str, segments: int, batch_size: int, sessions: int = 10) -> dict:
+    ids = [f"seg-{i}" for i in range(segments)]
+    texts = {sid: f"(#{i}) {ANSWER}" for i, sid in enumerate(ids)}
+    faults = Faults({sid: FAULTS[i % len(FAULTS)] for i, sid in enumerate(ids)})
+    side_redis = fakeredis.FakeRedis(decode_responses=True)
+    llm = FaultyOpenAI(faults, {text: sid for sid, text in texts.items()})
+    graph = FaultyGraph(faults)
+    driver = FakeNeo4jDriver(handler=graph)
+    store = ReportStore(side_redis)
+    checkpoints = FaultyCheckpoints(side_redis, faults)
+
+    with ExitStack() as stack:
+        patch = lambda target, name, value: stack.enter_context(mock.patch.object(target, name, value))
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        stack.callback(setattr, celery_app.conf, "task_always_eager", eager)
+        patch(worker, "openai_client", llm)
+        patch(worker, "get_neo4j_driver", lambda: driver)
+        patch(report_store, "get_report_evidence", graph.report_evidence)
+        patch(report_store, "report_store", store)
+        patch(worker, "extraction_cache", NullCache())
+        patch(worker, "segment_checkpoints", checkpoints)
+        patch(extraction_batcher, "redis_client", side_redis)
+        patch(match_engine, "redis_client", side_redis)
+        patch(cohort_rollups, "cohort_rollups", cohort_rollups.CohortRollups(side_redis))
+        patch(extraction_batcher, "EXTRACTION_BATCH_SIZE", batch_size)
+        # Flushes are driven below, not scheduled by the tasks
+        patch(worker.flush_extraction_batch, "delay", lambda *args: None)
+        patch(worker.flush_extraction_batch, "apply_async", lambda *args, **kwargs: None)
+        if mode == "baseline":
+            patch(worker, "segment_checkpoints", NullCheckpoints(side_redis, faults))
+            patch(worker, "build_segment_rows", lambda sid, text, obs, segment_id=None, assessment_id=None: [
+                {**row, "evidence_id": None}
+                for row in graph_writer.build_segment_rows(sid, text, obs, segment_id, assessment_id)
+            ])
+
+        for i, sid in enumerate(ids):
+            session_id = f"bench-retry-{i % sessions}"
+            if batch_size > 1:
+                extraction_batcher.enqueue_segment(extraction_batcher.new_segment(session_id, texts[sid], segment_id=sid))
+            else:
+                run_task(worker.process_interview_segment, (session_id, texts[sid]), sid)
+        while pending := extraction_batcher.pending_lists():
+            for partition, lane, _ in pending:
+                run_task(worker.flush_extraction_batch, (partition, lane), None)
+
+        report_points = sum(
+            len(entry["evidence_points"])
+            for session in {f"bench-retry-{i % sessions}" for i in range(segments)}
+            for doc in [store.get(session) or {}]
+            for entry in (doc.get("skills") or {}).values()
+        )
+
+    # fake_extraction_reply: one skill and one trait observation per segment
+    graph_skill_points = sum(len(s["evidence_points"]) for sess in graph.evidence for s in graph.skills_for(sess))
+    return {
+        "faults_fired": dict(Counter(faults.plan[sid] for sid in faults.fired)),
+        "llm_replies_per_segment": sum(llm.replies.values()) / segments,
+        "segments_with_repeated_llm_replies": sum(1 for n in llm.replies.values() if n > 1),
+        "evidence_nodes": graph.evidence_count(),
+        "evidence_nodes_expected": 2 * segments,
+        "report_skill_points": report_points,
+        "graph_skill_points": graph_skill_points,
+        "expected_skill_points": segments,
+    }
+
+
+def run_task(task, args: tuple, task_id) -> None:
+    # Eager apply() re-runs a retried task at once, under the same task id
+    task.apply(args, task_id=task_id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--segments", type=int, default=120)
+    parser.add_argument("--batch-size", type=int, default=1, help=">1: batched extraction path")
+    args = parser.parse_args()
+
+    results = {mode: run(mode, args.segments, args.batch_size) for mode in ("baseline", "checkpointed")}
+    print(json.dumps(results, indent=2))
+
+    checked = results["checkpointed"]
+    duplicates = (
+        checked["segments_with_repeated_llm_replies"]
+        or checked["evidence_nodes"] != checked["evidence_nodes_expected"]
+        or checked["report_skill_points"] != checked["expected_skill_points"]
+    )
+    sys.exit(1 if duplicates else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# routing_bench.py
+"""
+Session ordering and fairness with real Celery workers: one shared queue
+vs session-affine partitions (task_routing).
+
+Starts a broker (a fakeredis TCP server, or --redis-url), spawns --workers
+single-process Celery workers and replays a mixed load through
+process_interview_segment:
+  - one session bursting --burst segments at once,
+  - --light sessions sending a few segments each right after the burst,
+  - --backfill reprocessing segments sent before everything else.
+Extraction is replaced by a fake that sleeps --task-ms and logs when each
+segment started and finished.
+
+"shared" is the old layout: every worker on one queue, no priorities.
+"partitioned" gives worker n the extract.<n> queue. Reported per layout:
+  - order_violations: segments that started before an earlier segment of
+    the same session finished (overlap) or before it (reordering),
+  - wait_ms (send -> start) for the light sessions, split by whether they
+    share the bursting session's partition, the burst itself and backfill.
+
+The fake broker adds roughly 100 ms of overhead per task; absolute waits
+are only meaningful with --redis-url.
+
+Usage:
+    python -m backend.benchmarks.routing_bench [--workers 4] [--burst 120] [--light 16]
+        [--task-ms 100] [--backfill 40] [--redis-url redis://localhost:6379/15]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+LOG_KEY = "routing_bench:log"
+SEGMENTS_PER_LIGHT_SESSION = 4
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_broker() -> tuple[str, object]:
+    from fakeredis import TcpFakeServer
+    port = free_port()
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}", server
+
+
+def configure_env(redis_url: str, partitions: int) -> None:
+    """Must run before backend modules are imported (they read it at import)."""
+    os.environ["CELERY_BROKER_URL"] = redis_url
+    os.environ["EXTRACTION_PARTITIONS"] = str(partitions)
+    os.environ["EXTRACTION_BATCH_SIZE"] = "1"
+
+
+# --- Worker process ---
+
+def run_worker(name: str, queues: str, redis_url: str, partitions: int, task_ms: float, fake_broker: bool) -> None:
+    configure_env(redis_url, partitions)
+    import redis
+    from backend import worker
+    from backend.celery_config import celery_app
+    from backend.segment_checkpoints import SegmentCheckpoints
+
+    log = redis.Redis.from_url(redis_url, decode_responses=True)
+
+    def fake_extract(text: str) -> list:
+        session_id, seq, sent_at, lane = text.split("|")
+        started = time.time()
+        time.sleep(task_ms / 1e3)
+        log.rpush(LOG_KEY, json.dumps({
+            "session_id": session_id, "seq": int(seq), "lane": lane, "worker": name,
+            "sent_at": float(sent_at), "started": started, "finished": time.time()
+        }))
+        return []
+
+    worker.extract_observations = fake_extract
+    worker.segment_checkpoints = SegmentCheckpoints(log)
+    celery_app.conf.update(worker_enable_remote_control=False, task_ignore_result=True)
+    if fake_broker:
+        # The fake server answers a blocking BRPOP only when it times out
+        celery_app.conf.broker_transport_options = {
+            **celery_app.conf.broker_transport_options, "brpop_timeout": 0.01
+        }
+    celery_app.worker_main([
+        "worker", "-n", f"{name}@bench", "-Q", queues, "-P", "solo", "-c", "1",
+        "--without-heartbeat", "--without-mingle", "--without-gossip", "-l", "warning"
+    ])
+
+
+# --- Driver ---
+
+def replay(layout: str, redis_url: str, args) -> dict:
+    import redis
+    from backend import task_routing
+    from backend.worker import process_interview_segment
+
+    log = redis.Redis.from_url(redis_url, decode_responses=True)
+    log.delete(LOG_KEY)
+
+    workers = []
+    for n in range(args.workers):
+        queues = task_routing.queue_name(n) if layout == "partitioned" else task_routing.DEFAULT_QUEUE
+        workers.append(subprocess.Popen([
+            sys.executable, "-m", "backend.benchmarks.routing_bench", "--run-worker", f"w{n}",
+            "--queues", queues, "--redis-url", redis_url,
+            "--workers", str(args.workers), "--task-ms", str(args.task_ms),
+            *(["--fake-broker"] if args.fake_broker else [])
+        ]))
+    time.sleep(args.startup_s)
+
+    def send(session_id: str, seq: int, lane: str) -> None:
+        text = f"{session_id}|{seq}|{time.time()}|{lane}"
+        if layout == "partitioned":
+            process_interview_segment.delay(session_id, text, lane)
+        else:
+            process_interview_segment.apply_async((session_id, text, lane), queue=task_routing.DEFAULT_QUEUE, priority=0)
+
+    burst = "burst-session"
+    light = [f"light-{i}" for i in range(args.light)]
+    for i in range(args.backfill):
+        send(f"backfill-{i % 8}", i // 8, task_routing.BACKFILL)
+    for seq in range(args.burst):
+        send(burst, seq, task_routing.LIVE)
+    for seq in range(SEGMENTS_PER_LIGHT_SESSION):
+        for session_id in light:
+            send(session_id, seq, task_routing.LIVE)
+
+    expected = args.backfill + args.burst + len(light) * SEGMENTS_PER_LIGHT_SESSION
+    deadline = time.time() + args.timeout_s
+    while log.llen(LOG_KEY) < expected and time.time() < deadline:
+        time.sleep(0.1)
+    for process in workers:
+        process.terminate()
+    for process in workers:
+        process.wait()
+
+    entries = [json.loads(e) for e in log.lrange(LOG_KEY, 0, -1)]
+    return summarise(entries, expected, burst, layout)
+
+
+def summarise(entries: list[dict], expected: int, burst: str, layout: str) -> dict:
+    from backend.task_routing import partition_for
+
+    by_session: dict[str, list[dict]] = {}
+    for e in entries:
+        by_session.setdefault(e["session_id"], []).append(e)
+
+    violations = 0
+    for segments in by_session.values():
+        segments.sort(key=lambda e: e["seq"])
+        for previous, current in zip(segments, segments[1:]):
+            if current["started"] < previous["finished"]:
+                violations += 1
+
+    def wait_ms(group: list[dict]) -> dict:
+        waits = sorted((e["started"] - e["sent_at"]) * 1e3 for e in group)
+        if not waits:
+            return {}
+        return {
+            "segments": len(waits),
+            "p50": round(statistics.median(waits), 1),
+            "p95": round(waits[max(0, int(len(waits) * 0.95) - 1)], 1),
+            "max": round(waits[-1], 1)
+        }
+
+    burst_partition = partition_for(burst)
+    light = [e for e in entries if e["session_id"].startswith("light-")]
+    shares = [e for e in light if partition_for(e["session_id"]) == burst_partition]
+    return {
+        "completed": f"{len(entries)}/{expected}",
+        "order_violations": violations,
+        "wait_ms": {
+            "light_sessions": wait_ms(light),
+            "light_other_partitions": wait_ms([e for e in light if e not in shares]) if layout == "partitioned" else None,
+            "light_burst_partition": wait_ms(shares) if layout == "partitioned" else None,
+            "burst_session": wait_ms([e for e in entries if e["session_id"] == burst]),
+            "backfill": wait_ms([e for e in entries if e["lane"] == "backfill"]),
+        },
+        "segments_per_worker": {
+            w: sum(e["worker"] == w for e in entries) for w in sorted({e["worker"] for e in entries})
+        }
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4, help="Workers = partitions")
+    parser.add_argument("--burst", type=int, default=120)
+    parser.add_argument("--light", type=int, default=16)
+    parser.add_argument("--backfill", type=int, default=40)
+    parser.add_argument("--task-ms", type=float, default=100.0)
+    parser.add_argument("--redis-url", default=None, help="Use a local redis-server instead of fakeredis")
+    parser.add_argument("--startup-s", type=float, default=4.0)
+    parser.add_argument("--timeout-s", type=float, default=120.0)
+    parser.add_argument("--run-worker", help=argparse.SUPPRESS)
+    parser.add_argument("--queues", help=argparse.SUPPRESS)
+    parser.add_argument("--fake-broker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_worker:
+        run_worker(args.run_worker, args.queues, args.redis_url, args.workers, args.task_ms, args.fake_broker)
+        return
+
+    server = None
+    redis_url = args.redis_url
+    if redis_url is None:
+        redis_url, server = start_fake_broker()
+        args.fake_broker = True
+    configure_env(redis_url, args.workers)
+
+    results = {"config": {k: v for k, v in vars(args).items() if k not in ("run_worker", "queues", "fake_broker")}}
+    for layout in ("shared", "partitioned"):
+        results[layout] = replay(layout, redis_url, args)
+    print(json.dumps(results, indent=2))
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
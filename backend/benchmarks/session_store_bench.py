@@ -0,0 +1,76 @@
+# session_store_bench.py
+"""
+Round trips and wall time per chat turn: legacy command sequence vs SessionStore.
+
+Usage:
+    python -m backend.benchmarks.session_store_bench [--turns 500] [--redis-url redis://localhost:6379/15]
+"""
+
+import argparse
+import json
+import time
+
+from backend.benchmarks.fakes import RoundTripCounter, counting_redis
+from backend.session_store import SessionStore, encode_message
+
+MAX_HISTORY_LENGTH = 20
+TTL_SECONDS = 60 * 60 * 24
+
+
+def legacy_turn(client, key: str, user_message: str, reply: str) -> list[dict]:
+    """The pre-SessionStore hot path: 3 + 1 + 3 sequential commands."""
+    client.lpush(key, encode_message("user", user_message))
+    client.ltrim(key, 0, MAX_HISTORY_LENGTH - 1)
+    client.expire(key, TTL_SECONDS)
+
+    history = [json.loads(m) for m in reversed(client.lrange(key, 0, MAX_HISTORY_LENGTH - 1))]
+
+    client.lpush(key, encode_message("assistant", reply))
+    client.ltrim(key, 0, MAX_HISTORY_LENGTH - 1)
+    client.expire(key, TTL_SECONDS)
+    return history
+
+
+def store_turn(store: SessionStore, session_id: str, user_message: str, reply: str) -> list[dict]:
+    """The SessionStore hot path: append-and-read, then batched reply write."""
+    history = store.append_and_fetch(session_id, "user", user_message)
+    store.append(session_id, "assistant", reply)
+    return history
+
+
+def run(turns: int, redis_url: str | None) -> dict:
+    counter = RoundTripCounter()
+    client = counting_redis(counter, redis_url)
+    store = SessionStore(client, max_length=MAX_HISTORY_LENGTH, ttl_seconds=TTL_SECONDS)
+
+    results = {}
+    for name, turn in (
+        ("legacy", lambda i: legacy_turn(client, "chat:bench-legacy", f"message {i}", f"reply {i}")),
+        ("session_store", lambda i: store_turn(store, "bench-store", f"message {i}", f"reply {i}")),
+    ):
+        counter.reset()
+        start = time.perf_counter()
+        for i in range(turns):
+            turn(i)
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "turns": turns,
+            "round_trips_per_turn": counter.count / turns,
+            "us_per_turn": elapsed / turns * 1e6,
+        }
+
+    client.delete("chat:bench-legacy", store.key("bench-store"))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--redis-url", default=None, help="Use a local redis-server instead of fakeredis")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.turns, args.redis_url), indent=2))
+
+
+if __name__ == "__main__":
+    main()
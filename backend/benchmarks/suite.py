@@ -0,0 +1,360 @@
+# suite.py
+"""
+Offline benchmark suite for the backend hot paths.
+
+Runs every stage against local fakes (fakeredis, a deterministic fake
+OpenAI client, the in-memory Neo4j stand-in) and writes machine-readable
+JSON, so results can be compared between commits:
+
+    python -m backend.benchmarks.suite --output bench-new.json
+    python -m backend.benchmarks.suite --compare bench-old.json bench-new.json
+
+Benchmarks:
+    chat_history        save_message / get_chat_history
+    handle_user_message one full chat turn (Redis + fake LLM + enqueue)
+    process_segment     process_interview_segment throughput, per-segment and batched
+    candidate_report    get_candidate_report / materialised report at growing evidence counts
+
+Pass --redis-url to run the Redis parts against a local redis-server, and
+--llm-latency-ms / --neo4j-latency-ms to add simulated network latency.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from unittest import mock
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import fakeredis
+
+from backend import (
+    chat_service, cohort_rollups, context_window, extraction_batcher, match_engine, report_service, report_store, worker
+)
+from backend.benchmarks.fakes import (
+    FakeNeo4jDriver,
+    FakeOpenAI,
+    InMemoryGraph,
+    RoundTripCounter,
+    counting_redis,
+    fake_extraction_reply
+)
+from backend.celery_config import celery_app
+from backend.extraction_cache import ExtractionCache
+from backend.graph_writer import build_segment_rows
+from backend.llm_limiter import LLMLimiter
+from backend.report_store import ReportStore
+from backend.segment_checkpoints import SegmentCheckpoints
+from backend.session_store import SessionStore
+
+SCHEMA_VERSION = 1
+
+SAMPLE_ANSWER = (
+    "In my last role I noticed our deployment failures were rising, so I "
+    "traced them to a flaky integration test, rewrote it and documented the fix for the team."
+)
+
+# Metric name suffix -> whether higher is better (used by --compare)
+METRIC_DIRECTIONS = {
+    "_us": False,
+    "_ms": False,
+    "_per_s": True,
+    "round_trips_per_op": False,
+    "round_trips_per_turn": False,
+    "round_trips_per_segment": False,
+    "llm_calls_per_segment": False,
+}
+
+
+def timed(op, iterations: int, warmup: int = 10) -> dict:
+    """Call `op(i)` `iterations` times; per-call latency stats in microseconds."""
+    for i in range(min(warmup, iterations)):
+        op(i)
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        op(i)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    total = sum(samples)
+    return {
+        "iterations": iterations,
+        "mean_us": total / iterations * 1e6,
+        "p50_us": statistics.median(samples) * 1e6,
+        "p95_us": samples[max(0, int(iterations * 0.95) - 1)] * 1e6,
+        "ops_per_s": iterations / total if total else None,
+    }
+
+
+@contextmanager
+def offline_environment(config: dict):
+    """
+    Point every backend module at local fakes for the duration of a benchmark.
+    Yields the objects benchmarks need to inspect (counters, graph, clients).
+    """
+    counter = RoundTripCounter()
+    redis_client = counting_redis(counter, config["redis_url"])
+    graph = InMemoryGraph()
+    driver = FakeNeo4jDriver(latency=config["neo4j_latency_ms"] / 1e3, handler=graph)
+    chat_llm = FakeOpenAI(latency=config["llm_latency_ms"] / 1e3)
+    extraction_llm = FakeOpenAI(latency=config["llm_latency_ms"] / 1e3, reply_fn=fake_extraction_reply)
+    side_redis = fakeredis.FakeRedis(decode_responses=True)
+    store = SessionStore(
+        redis_client,
+        max_length=chat_service.CHAT_RETENTION_MESSAGES,
+        ttl_seconds=chat_service.SESSION_TTL_SECONDS
+    )
+
+    with ExitStack() as stack:
+        patch = lambda target, name, value: stack.enter_context(mock.patch.object(target, name, value))
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        stack.callback(setattr, celery_app.conf, "task_always_eager", eager)
+        patch(chat_service, "session_store", store)
+        patch(chat_service, "openai_client", chat_llm)
+        patch(worker, "openai_client", extraction_llm)
+        patch(worker, "get_neo4j_driver", lambda: driver)
+        patch(report_service, "get_neo4j_driver", lambda: driver)
+        patch(worker, "extraction_cache", ExtractionCache(side_redis))
+        patch(extraction_batcher, "redis_client", side_redis)
+        patch(match_engine, "redis_client", side_redis)
+        patch(cohort_rollups, "cohort_rollups", cohort_rollups.CohortRollups(side_redis))
+        patch(report_store, "report_store", ReportStore(side_redis))
+        patch(worker, "segment_checkpoints", SegmentCheckpoints(side_redis))
+        # The limiter's round trips are part of a turn; its limits are out of reach
+        limiter = LLMLimiter(side_redis, requests_per_minute=1e9, tokens_per_minute=1e12, enabled=True)
+        for module in (chat_service, context_window, worker):
+            patch(module, "llm_limiter", limiter)
+        # Celery handoffs from the hot path are measured as publishes, not executed
+        patch(worker.process_interview_segment, "delay", lambda *args: None)
+        patch(worker.summarise_session_context, "delay", lambda *args: None)
+        yield {
+            "counter": counter,
+            "redis": redis_client,
+            "graph": graph,
+            "driver": driver,
+            "chat_llm": chat_llm,
+            "extraction_llm": extraction_llm,
+            "side_redis": side_redis,
+        }
+        # Only this suite's keys: --redis-url may point at a shared server
+        for pattern in ("chat:bench-*", "chat_context:bench-*"):
+            keys = list(redis_client.scan_iter(match=pattern, count=1000))
+            if keys:
+                redis_client.delete(*keys)
+
+
+# --- Benchmarks ---
+
+def bench_chat_history(config: dict) -> dict:
+    n = config["iterations"]
+    with offline_environment(config) as env:
+        counter = env["counter"]
+
+        counter.reset()
+        save = timed(lambda i: chat_service.save_message(f"bench-{i % 50}", "user", f"message {i}"), n)
+        save["round_trips_per_op"] = counter.count / (n + min(10, n))
+
+        counter.reset()
+        fetch = timed(lambda i: chat_service.get_chat_history(f"bench-{i % 50}"), n)
+        fetch["round_trips_per_op"] = counter.count / (n + min(10, n))
+
+    return {"save_message": save, "get_chat_history": fetch}
+
+
+def bench_handle_user_message(config: dict) -> dict:
+    n = config["iterations"]
+    with offline_environment(config) as env:
+        env["counter"].reset()
+        turn = timed(lambda i: chat_service.handle_user_message(f"bench-{i % 50}", f"{SAMPLE_ANSWER} ({i})"), n)
+        turn["round_trips_per_turn"] = env["counter"].count / (n + min(10, n))
+        turn["llm_latency_ms"] = config["llm_latency_ms"]
+    return {"turn": turn}
+
+
+def bench_process_segment(config: dict) -> dict:
+    segments = config["segments"]
+    results = {}
+    for name, batch_size in (("per_segment", 1), ("batched", extraction_batcher.EXTRACTION_BATCH_SIZE)):
+        with offline_environment(config) as env, \
+                mock.patch.object(extraction_batcher, "EXTRACTION_BATCH_SIZE", batch_size):
+            start = time.perf_counter()
+            if batch_size > 1:
+                # Eager mode ignores countdowns: enqueue, then flush full batches
+                for i in range(segments):
+                    extraction_batcher.enqueue_segment(
+                        extraction_batcher.new_segment(f"bench-{i % 20}", f"{SAMPLE_ANSWER} ({i})")
+                    )
+                while pending := extraction_batcher.pending_lists():
+                    for partition, lane, _ in pending:
+                        worker.flush_extraction_batch.apply((partition, lane))
+            else:
+                for i in range(segments):
+                    worker.process_interview_segment.run(f"bench-{i % 20}", f"{SAMPLE_ANSWER} ({i})")
+            elapsed = time.perf_counter() - start
+
+            results[name] = {
+                "segments": segments,
+                "segments_per_s": segments / elapsed,
+                "mean_us": elapsed / segments * 1e6,
+                "llm_calls_per_segment": env["extraction_llm"].calls / segments,
+                "graph_round_trips_per_segment": env["driver"].round_trips / segments,
+                "evidence_written": env["graph"].evidence_count(),
+            }
+    return results
+
+
+def bench_candidate_report(config: dict) -> dict:
+    results = {}
+    observations = [
+        {"skill": "Problem Solving", "skill_domain": "Thinking Critically", "trait": "Conscientiousness",
+         "trait_intensity": "High", "evidence": "Traced deployment failures to a flaky test"},
+        {"skill": "Communication", "skill_domain": "Interacting with Others", "trait": None,
+         "trait_intensity": None, "evidence": "Documented the fix for the team"},
+        {"skill": None, "skill_domain": None, "trait": "Openness",
+         "trait_intensity": "Moderate", "evidence": "Tried a new test framework"},
+    ]
+    for evidence in config["evidence_counts"]:
+        with offline_environment(config) as env:
+            session_id = f"bench-report-{evidence}"
+            rows = []
+            while len(rows) < evidence:
+                rows.extend(build_segment_rows(session_id, SAMPLE_ANSWER, observations))
+            env["graph"].add_rows(rows[:evidence])
+            iterations = max(5, min(config["iterations"], 200_000 // evidence))
+
+            live = timed(lambda i: report_service.get_candidate_report(session_id), iterations)
+            report_store.rebuild_report(session_id)
+            materialised = timed(lambda i: report_store.get_materialised_report(session_id), iterations)
+
+        results[str(evidence)] = {"live": live, "materialised": materialised}
+    return results
+
+
+BENCHMARKS = {
+    "chat_history": bench_chat_history,
+    "handle_user_message": bench_handle_user_message,
+    "process_segment": bench_process_segment,
+    "candidate_report": bench_candidate_report,
+}
+
+
+# --- Results ---
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def run(config: dict, selected: list[str]) -> dict:
+    results = {}
+    for name in selected:
+        start = time.perf_counter()
+        results[name] = BENCHMARKS[name](config)
+        print(f"{name}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+
+
+def flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def higher_is_better(metric: str):
+    for suffix, direction in METRIC_DIRECTIONS.items():
+        if metric.endswith(suffix):
+            return direction
+    return None
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> dict:
+    """
+    Relative change of every directional metric present in both runs.
+    A regression is a change in the bad direction larger than `threshold`.
+    """
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    changes, regressions = {}, []
+    for metric in sorted(old.keys() & new.keys()):
+        direction = higher_is_better(metric)
+        if direction is None or not old[metric]:
+            continue
+        change = (new[metric] - old[metric]) / old[metric]
+        changes[metric] = {"baseline": old[metric], "current": new[metric], "change": change}
+        if (change < -threshold) if direction else (change > threshold):
+            regressions.append(metric)
+    return {
+        "baseline": baseline.get("git"),
+        "current": current.get("git"),
+        "threshold": threshold,
+        "regressions": regressions,
+        "changes": changes,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmark suite for the backend hot paths.")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--output", default=None, help="Write JSON results here (default: stdout)")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--segments", type=int, default=400)
+    parser.add_argument("--evidence-counts", default="100,1000,10000")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--neo4j-latency-ms", type=float, default=0.0)
+    parser.add_argument("--redis-url", default=None, help="Use a local redis-server instead of fakeredis")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        report = compare(baseline, current, args.threshold)
+        print(json.dumps(report, indent=2))
+        sys.exit(1 if report["regressions"] else 0)
+
+    config = {
+        "iterations": args.iterations,
+        "segments": args.segments,
+        "evidence_counts": [int(n) for n in args.evidence_counts.split(",")],
+        "llm_latency_ms": args.llm_latency_ms,
+        "neo4j_latency_ms": args.neo4j_latency_ms,
+        "redis_url": args.redis_url,
+    }
+    results = json.dumps(run(config, args.only), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(results + "\n")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
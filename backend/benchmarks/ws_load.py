@@ -0,0 +1,185 @@
+# ws_load.py
+"""
+WebSocket load test for /ws/{client_id}: N concurrent sockets, streamed replies.
+
+Runs the FastAPI app under uvicorn in a child process with fakeredis and a
+fake streaming LLM, and samples the server event loop's scheduling lag while
+the clients run. Lag near the sampling interval means nothing on the loop is
+blocking on I/O; a synchronous Redis or LLM call would show up as spikes.
+Run on a machine with spare cores: when the load generator and the server
+share a single core, descheduling of the server process also shows as lag
+(compare server_cpu_s with server_wall_s).
+
+Usage:
+    python -m backend.benchmarks.ws_load [--sockets 1000] [--messages 3]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Fake LLMs have no quota to share (llm_limiter_bench covers the limiter)
+os.environ.setdefault("LLM_LIMITER_ENABLED", "false")
+
+import fakeredis
+import redis.asyncio as aioredis
+import uvicorn
+from websockets.asyncio.client import connect
+
+from backend import main, async_chat_service
+from backend.benchmarks.fakes import FakeAsyncOpenAI
+
+LAG_SAMPLE_INTERVAL = 0.005
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes a sleeping coroutine."""
+
+    def __init__(self, interval: float = LAG_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples: list[float] = []
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples) or [0.0]
+        return {
+            "samples": len(self.samples),
+            "p50_ms": ordered[len(ordered) // 2] * 1e3,
+            "p99_ms": ordered[int(len(ordered) * 0.99)] * 1e3,
+            "max_ms": ordered[-1] * 1e3,
+        }
+
+
+def serve(port: int, llm_latency: float, token_latency: float) -> None:
+    """Child process: run the app and print loop lag as JSON on shutdown."""
+    # Same pool discipline as production, backed by an in-process fake server
+    pool = aioredis.BlockingConnectionPool(
+        connection_class=fakeredis.FakeAsyncRedisConnection,
+        server=fakeredis.FakeServer(),
+        decode_responses=True,
+        max_connections=async_chat_service.REDIS_MAX_CONNECTIONS,
+        timeout=async_chat_service.REDIS_POOL_TIMEOUT
+    )
+    async_chat_service.session_store.client = aioredis.Redis(connection_pool=pool)
+    async_chat_service.openai_client = FakeAsyncOpenAI(latency=llm_latency, token_latency=token_latency)
+
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+    server = uvicorn.Server(config)
+    monitor = LoopLagMonitor()
+
+    async def run_server():
+        lag_task = asyncio.create_task(monitor.run())
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        await server.serve()
+        lag_task.cancel()
+        summary = monitor.summary()
+        summary["server_wall_s"] = time.perf_counter() - wall_start
+        summary["server_cpu_s"] = time.process_time() - cpu_start
+        print(json.dumps(summary), flush=True)
+
+    try:
+        asyncio.run(run_server())
+    except KeyboardInterrupt:
+        pass  # uvicorn re-raises the shutdown signal after serving
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"server did not start on port {port}")
+
+
+async def client(port: int, client_id: str, messages: int, ttft: list, turn: list, errors: list,
+                 delay: float) -> None:
+    await asyncio.sleep(delay)
+    async with connect(f"ws://127.0.0.1:{port}/ws/{client_id}", open_timeout=60) as ws:
+        for i in range(messages):
+            start = time.perf_counter()
+            await ws.send(json.dumps({"text": f"Answer {i}"}))
+            first = None
+            while True:
+                frame = json.loads(await ws.recv())
+                if first is None:
+                    first = time.perf_counter() - start
+                if frame["type"] != "token":
+                    break
+            if frame["type"] == "error":
+                errors.append(frame["text"])
+                continue
+            ttft.append(first)
+            turn.append(time.perf_counter() - start)
+
+
+async def run_clients(port: int, sockets: int, messages: int, ramp: float) -> dict:
+    ttft, turn, errors = [], [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, f"load-{i}", messages, ttft, turn, errors, ramp * i / sockets)
+                           for i in range(sockets)))
+    elapsed = time.perf_counter() - start
+    return {
+        "sockets": sockets,
+        "turns": len(turn),
+        "errors": len(errors),
+        "elapsed_s": elapsed,
+        "turns_per_s": len(turn) / elapsed,
+        "ttft_p50_ms": statistics.median(ttft) * 1e3,
+        "turn_p50_ms": statistics.median(turn) * 1e3,
+        "turn_max_ms": max(turn) * 1e3,
+    }
+
+
+def run(sockets: int, messages: int, llm_latency: float, token_latency: float, port: int,
+        ramp: float = 2.0) -> dict:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "backend.benchmarks.ws_load", "--serve",
+         "--port", str(port), "--llm-latency", str(llm_latency), "--token-latency", str(token_latency)],
+        stdout=subprocess.PIPE, text=True
+    )
+    try:
+        wait_for_port(port)
+        clients = asyncio.run(run_clients(port, sockets, messages, ramp))
+    finally:
+        server.send_signal(signal.SIGINT)  # uvicorn shuts down gracefully on SIGINT
+        output, _ = server.communicate(timeout=30)
+    return {"clients": clients, "server_loop_lag": json.loads(output.strip().splitlines()[-1])}
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sockets", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=3, help="Chat turns per socket")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which sockets connect")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.llm_latency, args.token_latency)
+        return
+    print(json.dumps(run(args.sockets, args.messages, args.llm_latency, args.token_latency, args.port,
+                         args.ramp), indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
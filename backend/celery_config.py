@@ -2,14 +2,23 @@
 """
 Celery configuration for background task processing.
 Uses Redis DB 1 as the message broker.
+
+Extraction tasks are routed per session partition, live and backfill on
+separate priorities (see task_routing); everything else uses the default queue.
 """
 
+import os
 from celery import Celery
+from dotenv import load_dotenv
+
+from backend.task_routing import DEFAULT_QUEUE, route_task
+
+load_dotenv()
 
 # Redis DB 0: Chat History (Hot Storage)
 # Redis DB 1: Celery Broker (Task Queue)
-REDIS_BROKER_URL = "redis://localhost:6379/1"
-REDIS_RESULT_BACKEND = "redis://localhost:6379/1"
+REDIS_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/1")
+REDIS_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_BROKER_URL)
 
 # Create Celery app
 celery_app = Celery(
@@ -30,4 +39,9 @@ celery_app.conf.update(
     task_time_limit=30,  # 30 second timeout per task
     worker_prefetch_multiplier=1,  # Process one task at a time
     task_acks_late=True,  # Acknowledge after task completion
+    task_default_queue=DEFAULT_QUEUE,
+    task_routes=(route_task,),
+    # Redis keeps one list per priority step and pops 0 (live) before 9
+    # (backfill); partition workers alternate between their queues
+    broker_transport_options={"priority_steps": [0, 3, 6, 9], "queue_order_strategy": "round_robin"},
 )
@@ -5,12 +5,26 @@ Manages short-term memory using Redis Lists for immediate LLM context.
 """
 
 import redis
-import json
 import os
-from typing import Optional
+import time
+from typing import Iterator, Optional
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from backend.session_store import SessionStore, CHAT_PREFIX
+from backend.context_window import ContextWindow, build_context_window
+from backend.tracing import message_context, message_trace, use_context
+from backend.llm_limiter import estimate_tokens, llm_limiter
+from backend.task_routing import LIVE
+from backend.metrics import (
+    celery_enqueue,
+    llm_request,
+    record_first_token,
+    record_llm_duration,
+    record_llm_usage,
+    redis_op
+)
+
 load_dotenv()
 
 # Redis DB 0: Chat History (Hot Storage)
@@ -22,14 +36,28 @@ redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_respon
 openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # Constants
-CHAT_PREFIX = "chat:"
-MAX_HISTORY_LENGTH = 20  # Keep last 20 messages (10 turns)
+MAX_HISTORY_LENGTH = 20  # Default page size of the history endpoint
+# Raw messages kept in Redis: the verbatim window (token budgeted, see
+# context_window) plus headroom for turns waiting to be folded into the summary
+CHAT_RETENTION_MESSAGES = int(os.getenv("CHAT_RETENTION_MESSAGES", 60))
 MIN_WORDS_FOR_EXTRACTION = 10  # Only extract from substantial responses
+SESSION_TTL_SECONDS = 60 * 60 * 24  # 24 hours
+LLM_MODEL = "gpt-4o"
+LLM_MAX_TOKENS = 500
+LLM_TEMPERATURE = 0.7
+FALLBACK_RESPONSE = "I'm sorry, I couldn't generate a response."
+
+# Session store: one pipelined round trip per append/read
+session_store = SessionStore(
+    redis_client,
+    max_length=CHAT_RETENTION_MESSAGES,
+    ttl_seconds=SESSION_TTL_SECONDS
+)
 
 
 def get_redis_key(session_id: str) -> str:
     """Generate Redis key for chat history."""
-    return f"{CHAT_PREFIX}{session_id}"
+    return session_store.key(session_id)
 
 
 def get_chat_history(session_id: str, limit: int = MAX_HISTORY_LENGTH) -> list[dict]:
@@ -37,29 +65,18 @@ def get_chat_history(session_id: str, limit: int = MAX_HISTORY_LENGTH) -> list[d
     Retrieve chat history from Redis.
     Returns messages in chronological order (oldest first).
     """
-    key = get_redis_key(session_id)
-    # LRANGE returns newest first (since we LPUSH), so reverse
-    messages = redis_client.lrange(key, 0, limit - 1)
-    parsed = [json.loads(msg) for msg in messages]
-    return list(reversed(parsed))  # Chronological order
+    with redis_op("fetch"):
+        return session_store.fetch(session_id, limit)
 
 
 def save_message(session_id: str, role: str, content: str) -> None:
     """
     Save a message to Redis chat history.
-    Automatically trims to keep only recent messages.
+    Automatically trims to keep only recent messages and refreshes the
+    24 hour expiry, all in a single round trip.
     """
-    key = get_redis_key(session_id)
-    message = json.dumps({"role": role, "content": content})
-    
-    # LPUSH adds to the front (newest first)
-    redis_client.lpush(key, message)
-    
-    # Keep only the last MAX_HISTORY_LENGTH messages
-    redis_client.ltrim(key, 0, MAX_HISTORY_LENGTH - 1)
-    
-    # Set expiry (24 hours)
-    redis_client.expire(key, 60 * 60 * 24)
+    with redis_op("append"):
+        session_store.append(session_id, role, content)
 
 
 def should_extract_to_graph(text: str) -> bool:
@@ -71,70 +88,184 @@ def should_extract_to_graph(text: str) -> bool:
     return word_count >= MIN_WORDS_FOR_EXTRACTION
 
 
+def build_llm_messages(history: list[dict], system_prompt: Optional[str] = None) -> list[dict]:
+    """Build the OpenAI message list from the context window (summary + recent turns)."""
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.extend(history)
+    return messages
+
+
+def load_context_window(session_id: str, user_message: str) -> ContextWindow:
+    """Append the user message and assemble the LLM context (1 round trip)."""
+    with redis_op("append_and_fetch_context"):
+        window, total, context = session_store.append_and_fetch_context(session_id, "user", user_message)
+    return build_context_window(window, total, context)
+
+
+def enqueue_extraction(session_id: str, user_message: str, assessment_id: Optional[str] = None) -> None:
+    """
+    Hand a substantial message off to the Celery cold path. The assessment
+    the session belongs to (if any) travels with it into the graph and the
+    cohort rollups.
+    """
+    from backend.worker import process_interview_segment
+    
+    with celery_enqueue("process_interview_segment"):
+        process_interview_segment.delay(session_id, user_message, LIVE, assessment_id)
+
+
+def request_summary_if_needed(session_id: str, context: ContextWindow) -> None:
+    """Ask the worker to fold turns that left the verbatim window into the summary."""
+    from backend.worker import summarise_session_context
+    
+    if context.needs_summary:
+        with celery_enqueue("summarise_session_context"):
+            summarise_session_context.delay(session_id)
+
+
 def handle_user_message(
     session_id: str, 
     user_message: str,
-    system_prompt: Optional[str] = None
+    system_prompt: Optional[str] = None,
+    assessment_id: Optional[str] = None
 ) -> str:
     """
     Handle an incoming user message - the main hot path.
     
-    1. Save user message to Redis
+    1. Save user message to Redis and read back the context window
     2. Trigger async extraction if message is substantial
-    3. Generate LLM response using recent context
+    3. Generate LLM response using the token-budgeted context
     4. Save assistant response to Redis
     5. Return response
-    """
-    # Import here to avoid circular imports
-    from backend.worker import process_interview_segment
-    
-    # --- 1. Save User Message to Redis ---
-    save_message(session_id, "user", user_message)
     
-    # --- 2. Handoff to Cold Path (if substantial) ---
-    if should_extract_to_graph(user_message):
-        # .delay() offloads this to Celery background worker
-        process_interview_segment.delay(session_id, user_message)
-    
-    # --- 3. Generate Reply using LLM ---
-    history = get_chat_history(session_id)
-    
-    # Build messages for OpenAI
-    messages = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    messages.extend(history)
+    The turn runs in a new trace (chat.message) that the extraction task
+    continues, so the message's freshness lag can be followed to the report.
     
-    completion = openai_client.chat.completions.create(
-        model="gpt-4o",
-        messages=messages,
-        max_tokens=500,
-        temperature=0.7
-    )
+    Redis cost is two round trips per turn: one for append-and-read of the
+    user message (history and rolling summary) and one for the assistant
+    write. Folding old turns into the summary happens in the worker. The
+    shared LLM rate limiter adds one round trip before the LLM call and
+    one after it (see llm_limiter).
+    """
+    with message_trace(session_id):
+        # --- 1. Save User Message and read context window (1 round trip) ---
+        context = load_context_window(session_id, user_message)
+        
+        # --- 2. Handoff to Cold Path (if substantial) ---
+        if should_extract_to_graph(user_message):
+            # .delay() offloads this to Celery background worker
+            enqueue_extraction(session_id, user_message, assessment_id)
+        
+        # --- 3. Generate Reply using LLM (queued behind the shared rate limit) ---
+        messages = build_llm_messages(context.messages, system_prompt)
+        permit = llm_limiter.acquire("chat", estimate_tokens(messages, LLM_MAX_TOKENS))
+        completion = None
+        try:
+            with llm_request("chat", LLM_MODEL):
+                completion = openai_client.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=messages,
+                    max_tokens=LLM_MAX_TOKENS,
+                    temperature=LLM_TEMPERATURE
+                )
+        finally:
+            permit.close(getattr(completion, "usage", None))
+        record_llm_usage("chat", LLM_MODEL, getattr(completion, "usage", None))
+        
+        bot_response = completion.choices[0].message.content or FALLBACK_RESPONSE
+        
+        # --- 4. Save Bot Response to Redis ---
+        save_message(session_id, "assistant", bot_response)
+        request_summary_if_needed(session_id, context)
     
-    bot_response = completion.choices[0].message.content or "I'm sorry, I couldn't generate a response."
+    return bot_response
+
+
+def stream_user_message(
+    session_id: str,
+    user_message: str,
+    system_prompt: Optional[str] = None,
+    assessment_id: Optional[str] = None
+) -> Iterator[str]:
+    """
+    Streaming variant of handle_user_message.
     
-    # --- 4. Save Bot Response to Redis ---
-    save_message(session_id, "assistant", bot_response)
+    Yields reply tokens as the LLM produces them. Once the stream completes
+    the assembled reply is persisted through save_message. If the consumer
+    goes away mid-stream (the generator is closed), the upstream LLM stream
+    is closed so we stop paying for tokens, and the partial reply the
+    candidate already saw is persisted so history stays turn-aligned.
+    """
+    # The trace context is only current around blocks that do not yield
+    trace_context, root_span = message_context(session_id)
+    try:
+        with use_context(trace_context):
+            context = load_context_window(session_id, user_message)
+            
+            if should_extract_to_graph(user_message):
+                enqueue_extraction(session_id, user_message, assessment_id)
+            
+            messages = build_llm_messages(context.messages, system_prompt)
+            permit = llm_limiter.acquire("chat_stream", estimate_tokens(messages, LLM_MAX_TOKENS))
+            started = time.perf_counter()
+            try:
+                stream = openai_client.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=messages,
+                    max_tokens=LLM_MAX_TOKENS,
+                    temperature=LLM_TEMPERATURE,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+            except Exception:
+                permit.close()
+                raise
+    except Exception:
+        root_span.end()
+        raise
     
-    return bot_response
+    parts = []
+    completed = False
+    usage = None
+    try:
+        for chunk in stream:
+            # The final chunk has no choices, only the token usage
+            usage = getattr(chunk, "usage", None) or usage
+            record_llm_usage("chat_stream", LLM_MODEL, getattr(chunk, "usage", None))
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                if not parts:
+                    record_first_token("chat_stream", LLM_MODEL, started)
+                parts.append(token)
+                yield token
+        
+        if not parts:
+            parts.append(FALLBACK_RESPONSE)
+            yield FALLBACK_RESPONSE
+        completed = True
+        record_llm_duration("chat_stream", LLM_MODEL, started)
+    finally:
+        if not completed:
+            stream.close()
+        permit.close(usage)
+        if parts:
+            with use_context(trace_context):
+                save_message(session_id, "assistant", "".join(parts))
+                request_summary_if_needed(session_id, context)
+        root_span.end()
 
 
 def get_session_info(session_id: str) -> dict:
     """Get information about a chat session."""
-    key = get_redis_key(session_id)
-    message_count = redis_client.llen(key)
-    ttl = redis_client.ttl(key)
-    
-    return {
-        "session_id": session_id,
-        "message_count": message_count,
-        "ttl_seconds": ttl if ttl > 0 else None,
-        "exists": message_count > 0
-    }
+    with redis_op("info"):
+        return session_store.info(session_id)
 
 
 def clear_session(session_id: str) -> bool:
     """Clear a chat session from Redis."""
-    key = get_redis_key(session_id)
-    return redis_client.delete(key) > 0
+    with redis_op("clear"):
+        return session_store.clear(session_id)
@@ -0,0 +1,534 @@
+# cohort_rollups.py
+"""
+Cohort Rollups - precomputed evidence counts across all candidates.
+
+report_service answers per-session questions; aggregate ones (domain
+coverage across this week's interviews, trait intensity distributions by
+assessment) would scan the whole graph. Instead the worker folds every
+batch of rows it writes into rollups keyed by UTC day and assessment:
+
+    rollup:{day}:{scope}                  hash of counters:
+        evidence, skill_evidence, trait_evidence,
+        domain:{domain}, skill:{skill}, trait:{trait}:{intensity}
+    rollup:{day}:{scope}:candidates       HyperLogLog of session ids
+    rollup:{day}:{scope}:domain:{domain}  HyperLogLog of session ids with
+                                          evidence in the domain
+    rollup:{day}:assessments              assessments seen that day
+    rollup:{day}:keys                     every rollup key of the day
+    rollup:assessments                    assessment -> last day seen
+
+{scope} is the assessment id, "_none" for sessions without one, and
+"_all" for every candidate. A query reads one hash and a few HyperLogLogs
+per day of its range, whatever the number of candidates (distinct
+candidate counts are HyperLogLog estimates, ~0.8% error).
+
+Applying a segment's rows is one Lua script that first sets a per-segment
+marker, so a retried or replayed segment is counted once. The backfill
+job (`python -m backend.cohort_rollups backfill`) rebuilds whole days
+from the graph in batches of candidates and swaps them in atomically.
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional
+import redis
+from dotenv import load_dotenv
+
+from backend.graph_driver import get_neo4j_driver
+from backend.metrics import neo4j_query
+from backend.report_service import iter_candidate_ids, validate_export_filter
+
+load_dotenv()
+
+# Redis DB 0 (same instance as chat history)
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
+
+# Days a day's rollups are kept after it ends
+ROLLUP_RETENTION_DAYS = int(os.getenv("ROLLUP_RETENTION_DAYS", 400))
+# Longest range one analytics query may cover
+ROLLUP_MAX_RANGE_DAYS = int(os.getenv("ROLLUP_MAX_RANGE_DAYS", 92))
+# Segment markers only need to outlive retries and spool replays
+ROLLUP_SEGMENT_TTL_SECONDS = int(os.getenv("ROLLUP_SEGMENT_TTL_SECONDS", 60 * 60 * 24 * 7))
+ROLLUP_BACKFILL_BATCH_SIZE = int(os.getenv("ROLLUP_BACKFILL_BATCH_SIZE", 500))
+
+ALL = "_all"
+UNASSIGNED = "_none"
+ASSESSMENTS_KEY = "rollup:assessments"
+INTENSITIES = ("Low", "Moderate", "High")
+ASSESSMENT_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.:-]{0,63}$")
+
+# Applies one segment's rollup commands unless its marker (KEYS[1]) exists.
+# ARGV[2]: [[command, key index, args...]] (HINCRBY / PFADD / SADD),
+# ARGV[3]: [[key index, expire-at]], ARGV[4]: [assessment, day number]
+# raising rollup:assessments to the latest day (KEYS[2]).
+APPLY_SEGMENT_SCRIPT = """
+if not redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[1]) then
+    return 0
+end
+for _, op in ipairs(cjson.decode(ARGV[2])) do
+    redis.call(op[1], KEYS[op[2]], unpack(op, 3))
+end
+for _, expiry in ipairs(cjson.decode(ARGV[3])) do
+    redis.call('EXPIREAT', KEYS[expiry[1]], expiry[2])
+end
+for _, seen in ipairs(cjson.decode(ARGV[4])) do
+    local last = redis.call('ZSCORE', KEYS[2], seen[1])
+    if not last or tonumber(last) < seen[2] then
+        redis.call('ZADD', KEYS[2], seen[2], seen[1])
+    end
+end
+return 1
+"""
+
+# Evidence of a page of candidates within [since, until), one row per
+# Evidence -> Skill / Trait link (an Evidence node without links is skipped)
+BACKFILL_EVIDENCE_QUERY = """
+UNWIND $session_ids AS session_id
+MATCH (c:Candidate {session_id: session_id})-[:DEMONSTRATED]->(e:Evidence)
+WHERE e.timestamp >= $since AND e.timestamp < $until
+OPTIONAL MATCH (e)-[:INDICATES]->(s:Skill)
+OPTIONAL MATCH (e)-[r:INDICATES]->(t:Trait)
+RETURN session_id, c.assessment_id AS assessment_id, e.timestamp AS timestamp,
+       s.name AS skill, s.domain AS skill_domain, t.name AS trait, r.intensity AS trait_intensity
+"""
+
+
+def validate_assessment_id(assessment_id) -> Optional[str]:
+    """An assessment id from a request, or None. Raises ValueError if malformed."""
+    if assessment_id is None or assessment_id == "":
+        return None
+    if not isinstance(assessment_id, str) or not ASSESSMENT_ID_PATTERN.match(assessment_id):
+        raise ValueError("assessment_id must be 1-64 letters, digits or _.:- (not starting with _ . : -)")
+    return assessment_id
+
+
+def day_of(timestamp) -> date:
+    """UTC day bucket of a row timestamp (datetime, Neo4j DateTime or ISO string)."""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    elif hasattr(timestamp, "to_native"):
+        timestamp = timestamp.to_native()
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc).date()
+
+
+def rollup_key(day: date, scope: str) -> str:
+    return f"rollup:{day.isoformat()}:{scope}"
+
+
+def candidates_key(day: date, scope: str) -> str:
+    return f"{rollup_key(day, scope)}:candidates"
+
+
+def domain_candidates_key(day: date, scope: str, domain: str) -> str:
+    return f"{rollup_key(day, scope)}:domain:{domain}"
+
+
+def day_assessments_key(day: date) -> str:
+    return f"rollup:{day.isoformat()}:assessments"
+
+
+def day_keys_key(day: date) -> str:
+    return f"rollup:{day.isoformat()}:keys"
+
+
+def expire_at(day: date) -> int:
+    end = datetime.combine(day + timedelta(days=1), datetime.min.time(), timezone.utc)
+    return int(end.timestamp()) + ROLLUP_RETENTION_DAYS * 86400
+
+
+def day_number(day: date) -> int:
+    return int(day.strftime("%Y%m%d"))
+
+
+def tally(rows: Iterable[dict]) -> dict[tuple[date, str], dict]:
+    """
+    Rows -> {(day, assessment scope): {"counters": Counter, "candidates":
+    set, "domains": {domain: set}}}, each row counted under its assessment
+    and under _all.
+    """
+    buckets: dict[tuple[date, str], dict] = {}
+    for row in rows:
+        if not (row.get("skill") or row.get("trait")):
+            continue
+        day = day_of(row["timestamp"])
+        for scope in (ALL, row.get("assessment_id") or UNASSIGNED):
+            bucket = buckets.setdefault((day, scope), {"counters": Counter(), "candidates": set(), "domains": defaultdict(set)})
+            counters = bucket["counters"]
+            counters["evidence"] += 1
+            bucket["candidates"].add(row["session_id"])
+            if row.get("skill"):
+                counters["skill_evidence"] += 1
+                counters[f"skill:{row['skill']}"] += 1
+                if row.get("skill_domain"):
+                    counters[f"domain:{row['skill_domain']}"] += 1
+                    bucket["domains"][row["skill_domain"]].add(row["session_id"])
+            if row.get("trait"):
+                counters["trait_evidence"] += 1
+                counters[f"trait:{row['trait']}:{row.get('trait_intensity') or 'Moderate'}"] += 1
+    return buckets
+
+
+class CohortRollups:
+    """Rollup writes (worker), backfill swaps and range queries (API)."""
+
+    def __init__(self, client: redis.Redis, segment_ttl_seconds: int = ROLLUP_SEGMENT_TTL_SECONDS):
+        self.client = client
+        self.segment_ttl_seconds = segment_ttl_seconds
+        self._apply_segment = client.register_script(APPLY_SEGMENT_SCRIPT)
+
+    # --- Worker ---
+
+    def _segment_commands(self, buckets: dict) -> tuple[list[str], list, list, list]:
+        """KEYS (from index 3 on), commands, expiries and last-seen days for the script."""
+        keys: list[str] = []
+        index: dict[str, int] = {}
+
+        def key_index(key: str) -> int:
+            if key not in index:
+                keys.append(key)
+                index[key] = len(keys) + 2  # After the marker and rollup:assessments
+            return index[key]
+
+        ops, expiries, seen = [], {}, {}
+        for (day, scope), bucket in buckets.items():
+            created = [rollup_key(day, scope), candidates_key(day, scope)]
+            created += [domain_candidates_key(day, scope, domain) for domain in bucket["domains"]]
+            hash_index = key_index(created[0])
+            ops += [["HINCRBY", hash_index, field, n] for field, n in bucket["counters"].items()]
+            ops.append(["PFADD", key_index(created[1]), *bucket["candidates"]])
+            for domain, members in bucket["domains"].items():
+                ops.append(["PFADD", key_index(domain_candidates_key(day, scope, domain)), *members])
+            registry = key_index(day_keys_key(day))
+            ops.append(["SADD", registry, *created])
+            if scope != ALL:
+                ops.append(["SADD", key_index(day_assessments_key(day)), scope])
+                seen[scope] = max(seen.get(scope, 0), day_number(day))
+            for key in (*created, day_keys_key(day), day_assessments_key(day)):
+                if key in index:
+                    expiries[index[key]] = expire_at(day)
+        return keys, ops, [[i, at] for i, at in expiries.items()], [[a, d] for a, d in seen.items()]
+
+    def apply_rows(self, rows: Iterable[dict]) -> int:
+        """
+        Fold graph_writer rows (any number of segments) into the rollups,
+        one script call per segment in a single pipeline. Segments already
+        applied are skipped. Returns the number of segments applied.
+        """
+        by_segment: dict[str, list[dict]] = {}
+        for row in rows:
+            by_segment.setdefault(row.get("segment_id") or row.get("evidence_id") or uuid.uuid4().hex, []).append(row)
+
+        pipe = self.client.pipeline(transaction=False)
+        calls = 0
+        for segment_id, segment_rows in by_segment.items():
+            buckets = tally(segment_rows)
+            if not buckets:
+                continue
+            keys, ops, expiries, seen = self._segment_commands(buckets)
+            self._apply_segment(
+                keys=[f"rollup:segment:{segment_id}", ASSESSMENTS_KEY, *keys],
+                args=[self.segment_ttl_seconds, json.dumps(ops), json.dumps(expiries), json.dumps(seen)],
+                client=pipe
+            )
+            calls += 1
+        return sum(pipe.execute()) if calls else 0
+
+    # --- Backfill ---
+
+    def replace_days(self, buckets: dict[tuple[date, str], dict], days: list[date]) -> None:
+        """
+        Make `buckets` the complete rollups of `days`: written under
+        temporary keys, then swapped in (and the days' old keys dropped)
+        in one MULTI per day.
+        """
+        run = uuid.uuid4().hex[:8]
+        by_day: dict[date, list[tuple[str, dict]]] = defaultdict(list)
+        for (day, scope), bucket in buckets.items():
+            by_day[day].append((scope, bucket))
+
+        for day in days:
+            staged = {}  # final key -> temporary key
+            pipe = self.client.pipeline(transaction=False)
+            for scope, bucket in by_day.get(day, []):
+                key = rollup_key(day, scope)
+                staged[key] = f"rollup-backfill:{run}:{key}"
+                pipe.hset(staged[key], mapping=dict(bucket["counters"]))
+                key = candidates_key(day, scope)
+                staged[key] = f"rollup-backfill:{run}:{key}"
+                pipe.pfadd(staged[key], *bucket["candidates"])
+                for domain, members in bucket["domains"].items():
+                    key = domain_candidates_key(day, scope, domain)
+                    staged[key] = f"rollup-backfill:{run}:{key}"
+                    pipe.pfadd(staged[key], *members)
+            pipe.execute()
+
+            old_keys = self.client.smembers(day_keys_key(day))
+            scopes = [scope for scope, _ in by_day.get(day, []) if scope != ALL]
+            at = expire_at(day)
+            tx = self.client.pipeline(transaction=True)
+            tx.delete(*old_keys, day_keys_key(day), day_assessments_key(day))
+            for key, temporary in staged.items():
+                tx.rename(temporary, key)
+                tx.expireat(key, at)
+            if staged:
+                tx.sadd(day_keys_key(day), *staged)
+                tx.expireat(day_keys_key(day), at)
+            if scopes:
+                tx.sadd(day_assessments_key(day), *scopes)
+                tx.expireat(day_assessments_key(day), at)
+            tx.execute()
+            for scope in scopes:
+                last = self.client.zscore(ASSESSMENTS_KEY, scope)
+                if last is None or last < day_number(day):
+                    self.client.zadd(ASSESSMENTS_KEY, {scope: day_number(day)})
+
+    # --- Queries ---
+
+    def summary(self, days: list[date], scope: str, top: int = 20) -> dict:
+        """Counters, candidates and domain coverage over `days` (two round trips)."""
+        pipe = self.client.pipeline(transaction=False)
+        for day in days:
+            pipe.hgetall(rollup_key(day, scope))
+        pipe.pfcount(*[candidates_key(day, scope) for day in days])
+        *hashes, candidates = pipe.execute()
+
+        counters = Counter()
+        for raw in hashes:
+            counters.update({field: int(n) for field, n in raw.items()})
+
+        domains = sorted(
+            (field.split(":", 1)[1] for field in counters if field.startswith("domain:")),
+            key=lambda d: -counters[f"domain:{d}"]
+        )
+        pipe = self.client.pipeline(transaction=False)
+        for domain in domains:
+            pipe.pfcount(*[domain_candidates_key(day, scope, domain) for day in days])
+        domain_candidates = pipe.execute() if domains else []
+
+        skills = sorted(
+            ((field.split(":", 1)[1], n) for field, n in counters.items() if field.startswith("skill:")),
+            key=lambda item: (-item[1], item[0])
+        )
+        traits: dict[str, dict] = {}
+        for field, n in counters.items():
+            if field.startswith("trait:"):
+                trait, intensity = field[len("trait:"):].rsplit(":", 1)
+                histogram = traits.setdefault(trait, {**dict.fromkeys(INTENSITIES, 0), "total": 0})
+                histogram[intensity] = histogram.get(intensity, 0) + n
+                histogram["total"] += n
+
+        return {
+            "candidates": candidates,
+            "evidence": counters["evidence"],
+            "skill_evidence": counters["skill_evidence"],
+            "trait_evidence": counters["trait_evidence"],
+            "domains": [
+                {
+                    "domain": domain,
+                    "evidence": counters[f"domain:{domain}"],
+                    "candidates": n,
+                    "coverage": round(min(n / candidates, 1.0), 4) if candidates else 0.0
+                }
+                for domain, n in zip(domains, domain_candidates)
+            ],
+            "skills": [{"skill": skill, "evidence": n} for skill, n in skills[:top]],
+            "skills_total": len(skills),
+            "traits": dict(sorted(traits.items()))
+        }
+
+    def timeseries(self, days: list[date], scope: str) -> list[dict]:
+        """Per-day evidence counters and distinct candidates (one round trip)."""
+        pipe = self.client.pipeline(transaction=False)
+        for day in days:
+            pipe.hmget(rollup_key(day, scope), "evidence", "skill_evidence", "trait_evidence")
+            pipe.pfcount(candidates_key(day, scope))
+        results = pipe.execute()
+        return [
+            {
+                "day": day.isoformat(),
+                "candidates": candidates,
+                "evidence": int(evidence or 0),
+                "skill_evidence": int(skill_evidence or 0),
+                "trait_evidence": int(trait_evidence or 0)
+            }
+            for day, (evidence, skill_evidence, trait_evidence), candidates
+            in zip(days, results[::2], results[1::2])
+        ]
+
+    def assessments(self) -> list[dict]:
+        """Assessments with rollups, most recently active first."""
+        return [
+            {"assessment_id": assessment, "last_day": datetime.strptime(str(int(last)), "%Y%m%d").date().isoformat()}
+            for assessment, last in self.client.zrevrange(ASSESSMENTS_KEY, 0, -1, withscores=True)
+        ]
+
+
+cohort_rollups = CohortRollups(redis_client)
+
+
+def apply_rollup_rows(rows: list[dict]) -> int:
+    """Worker hook: fold freshly written rows into the cohort rollups."""
+    return cohort_rollups.apply_rows(rows)
+
+
+# --- Analytics (API) ---
+
+def parse_range(since: Optional[str], until: Optional[str]) -> list[date]:
+    """
+    Days from `since` to `until` inclusive (ISO dates; default the last 7
+    days up to today, UTC). Raises ValueError for bad dates or a range over
+    ROLLUP_MAX_RANGE_DAYS.
+    """
+    last = date.fromisoformat(until) if until else datetime.now(timezone.utc).date()
+    first = date.fromisoformat(since) if since else last - timedelta(days=6)
+    if first > last:
+        raise ValueError("since must not be after until")
+    days = (last - first).days + 1
+    if days > ROLLUP_MAX_RANGE_DAYS:
+        raise ValueError(f"Range is {days} days; at most {ROLLUP_MAX_RANGE_DAYS}")
+    return [first + timedelta(days=n) for n in range(days)]
+
+
+def _scope(assessment_id: Optional[str]) -> str:
+    return validate_assessment_id(assessment_id) or ALL
+
+
+def get_cohort_summary(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    assessment_id: Optional[str] = None,
+    top: int = 20
+) -> dict:
+    """Evidence, domain coverage, top skills and trait intensity histograms over a day range."""
+    days = parse_range(since, until)
+    start = time.perf_counter()
+    summary = cohort_rollups.summary(days, _scope(assessment_id), max(1, min(top, 200)))
+    return {
+        "since": days[0].isoformat(),
+        "until": days[-1].isoformat(),
+        "assessment_id": assessment_id or None,
+        **summary,
+        "took_ms": round((time.perf_counter() - start) * 1e3, 3)
+    }
+
+
+def get_cohort_timeseries(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    assessment_id: Optional[str] = None
+) -> dict:
+    days = parse_range(since, until)
+    return {
+        "since": days[0].isoformat(),
+        "until": days[-1].isoformat(),
+        "assessment_id": assessment_id or None,
+        "days": cohort_rollups.timeseries(days, _scope(assessment_id))
+    }
+
+
+def get_assessments() -> dict:
+    return {"assessments": cohort_rollups.assessments()}
+
+
+# --- Backfill ---
+
+def read_evidence_rows(driver, session_ids: list[str], since: datetime, until: datetime) -> list[dict]:
+    """Evidence rows (graph_writer row shape) of a page of candidates."""
+    with neo4j_query("rollup_backfill"), driver.session() as session:
+        return [
+            dict(record)
+            for record in session.run(BACKFILL_EVIDENCE_QUERY, session_ids=session_ids, since=since, until=until)
+        ]
+
+
+def backfill(
+    since: date,
+    until: date,
+    batch_size: int = ROLLUP_BACKFILL_BATCH_SIZE,
+    driver=None,
+    rollups: Optional[CohortRollups] = None
+) -> dict:
+    """
+    Rebuild the rollups of days `since`..`until` (inclusive) from the
+    graph: candidates are read in keyset-paged batches of `batch_size`
+    (one evidence query each), tallied in memory (counters and candidate
+    sets per day and assessment), and each day is swapped in whole.
+    Rows the worker applies to those days while this runs are replaced by
+    the rebuilt totals, so run it for past days or with the workers paused.
+    """
+    driver = driver or get_neo4j_driver()
+    rollups = rollups or cohort_rollups
+    start = time.perf_counter()
+    lower = datetime.combine(since, datetime.min.time(), timezone.utc)
+    upper = datetime.combine(until + timedelta(days=1), datetime.min.time(), timezone.utc)
+
+    buckets: dict[tuple[date, str], dict] = {}
+    candidates = rows = batches = 0
+    page = []
+
+    def flush():
+        nonlocal rows, batches
+        batch_rows = read_evidence_rows(driver, page, lower, upper)
+        for key, bucket in tally(batch_rows).items():
+            merged = buckets.setdefault(key, {"counters": Counter(), "candidates": set(), "domains": defaultdict(set)})
+            merged["counters"].update(bucket["counters"])
+            merged["candidates"] |= bucket["candidates"]
+            for domain, members in bucket["domains"].items():
+                merged["domains"][domain] |= members
+        rows += len(batch_rows)
+        batches += 1
+        page.clear()
+
+    # Candidates created after the range cannot have evidence in it
+    for session_id in iter_candidate_ids(validate_export_filter({"until": upper.isoformat()}), batch_size):
+        page.append(session_id)
+        candidates += 1
+        if len(page) == batch_size:
+            flush()
+    if page:
+        flush()
+
+    days = [since + timedelta(days=n) for n in range((until - since).days + 1)]
+    rollups.replace_days(buckets, days)
+    return {
+        "days": len(days),
+        "candidates": candidates,
+        "evidence_rows": rows,
+        "batches": batches,
+        "buckets": len(buckets),
+        "seconds": round(time.perf_counter() - start, 2)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cohort rollups: rebuild from the graph, or query")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("backfill", help="Rebuild the rollups of a day range from Neo4j")
+    rebuild.add_argument("--since", required=True, help="First day (YYYY-MM-DD)")
+    rebuild.add_argument("--until", default=None, help="Last day (default: yesterday, UTC)")
+    rebuild.add_argument("--batch-size", type=int, default=ROLLUP_BACKFILL_BATCH_SIZE)
+    show = sub.add_parser("summary", help="Print the summary of a day range")
+    show.add_argument("--since", default=None)
+    show.add_argument("--until", default=None)
+    show.add_argument("--assessment-id", default=None)
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        until = date.fromisoformat(args.until) if args.until else datetime.now(timezone.utc).date() - timedelta(days=1)
+        print(json.dumps(backfill(date.fromisoformat(args.since), until, args.batch_size), indent=2))
+    else:
+        print(json.dumps(get_cohort_summary(args.since, args.until, args.assessment_id), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# context_window.py
+"""
+Context Window - token-budgeted LLM context with a rolling summary.
+Recent turns are sent to the LLM verbatim up to CONTEXT_TOKEN_BUDGET;
+turns that fall out of that window are folded into a compact running
+summary stored next to the session in Redis. Folding runs in the Celery
+worker, so the hot path only reads the summary, in the same round trip
+as the history.
+"""
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from dotenv import load_dotenv
+
+from backend.metrics import llm_request, record_llm_usage
+from backend.llm_limiter import estimate_tokens, llm_limiter
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a characters/4 estimate
+    tiktoken = None
+
+load_dotenv()
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
+CONTEXT_MAX_MESSAGES = int(os.getenv("CONTEXT_MAX_MESSAGES", 20))
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", 300))
+# Fold once this many unsummarised messages have left the verbatim window
+CONTEXT_SUMMARY_MIN_MESSAGES = int(os.getenv("CONTEXT_SUMMARY_MIN_MESSAGES", 4))
+CONTEXT_SUMMARY_MODEL = os.getenv("CONTEXT_SUMMARY_MODEL", "gpt-4o-mini")
+TOKENIZER_MODEL = "gpt-4o"
+
+# Chat-format framing per message (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "Summary of the earlier part of this interview:\n"
+
+SUMMARY_INSTRUCTIONS = """
+You maintain a running summary of a job interview for the interviewer.
+Merge the new messages into the current summary. Keep every concrete fact
+the candidate stated (roles, projects, tools, numbers, motivations) and the
+questions already asked, so they are not repeated. Drop pleasantries.
+Write compact third-person notes, at most 200 words. Return only the summary.
+"""
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(TOKENIZER_MODEL)
+    except Exception:  # Unknown model or BPE file not downloadable
+        return None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Tokens in `text` for the chat model (cached: history repeats every turn)."""
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text))
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def summary_message(summary: str) -> dict:
+    return {"role": "system", "content": SUMMARY_PREFIX + summary}
+
+
+@dataclass
+class ContextWindow:
+    """What the LLM sees for one turn, and what is waiting to be summarised."""
+    messages: list[dict]   # summary (if any) + verbatim turns, chronological
+    prompt_tokens: int     # tokens of `messages` (system prompt excluded)
+    verbatim_start: int    # sequence number of the oldest verbatim message
+    summarised_upto: int   # messages with a lower sequence number are in the summary
+    pending_fold: int      # unsummarised messages that fell out of the window
+
+    @property
+    def needs_summary(self) -> bool:
+        return self.pending_fold >= CONTEXT_SUMMARY_MIN_MESSAGES
+
+
+def build_context_window(
+    window: list[dict],
+    total: int,
+    context: dict,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    max_messages: int = CONTEXT_MAX_MESSAGES
+) -> ContextWindow:
+    """
+    Pick the newest messages that fit the token budget (the latest one is
+    always kept) and prepend the rolling summary.
+
+    `window` is the stored history (chronological), `total` the number of
+    messages ever appended to the session, so window[i] has sequence number
+    total - len(window) + i. `context` is SessionStore context metadata.
+    """
+    summary = context.get("summary") or ""
+    summarised_upto = int(context.get("summary_upto") or 0)
+    summary_msg = summary_message(summary) if summary else None
+    used = message_tokens(summary_msg) if summary_msg else 0
+
+    kept = []
+    for message in reversed(window):
+        cost = message_tokens(message)
+        if kept and (len(kept) >= max_messages or used + cost > budget):
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+
+    first_seq = total - len(window)
+    verbatim_start = total - len(kept)
+    # Messages trimmed from Redis before being folded can no longer be summarised
+    pending_fold = max(0, verbatim_start - max(summarised_upto, first_seq))
+
+    return ContextWindow(
+        messages=([summary_msg] if summary_msg else []) + kept,
+        prompt_tokens=used,
+        verbatim_start=verbatim_start,
+        summarised_upto=summarised_upto,
+        pending_fold=pending_fold
+    )
+
+
+def fold_messages(openai_client, summary: str, messages: list[dict]) -> str:
+    """Merge `messages` into `summary` with one small LLM call."""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    prompt = [
+        {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+        {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"}
+    ]
+    completion = None
+    permit = llm_limiter.acquire("summary", estimate_tokens(prompt, CONTEXT_SUMMARY_MAX_TOKENS))
+    try:
+        with llm_request("summary", CONTEXT_SUMMARY_MODEL):
+            completion = openai_client.chat.completions.create(
+                model=CONTEXT_SUMMARY_MODEL,
+                messages=prompt,
+                max_tokens=CONTEXT_SUMMARY_MAX_TOKENS,
+                temperature=0
+            )
+    finally:
+        permit.close(getattr(completion, "usage", None))
+    record_llm_usage("summary", CONTEXT_SUMMARY_MODEL, getattr(completion, "usage", None))
+    return (completion.choices[0].message.content or summary).strip()
+
+
+def update_rolling_summary(session_store, openai_client, session_id: str) -> dict:
+    """
+    Worker side: fold every unsummarised message outside the current
+    verbatim window into the session summary. The write only lands if the
+    stored summary covers fewer messages, so concurrent folds are safe.
+    """
+    window, total, context = session_store.fetch_context(session_id)
+    current = build_context_window(window, total, context)
+    if not current.pending_fold:
+        return {"session_id": session_id, "folded": 0, "summary_upto": current.summarised_upto}
+
+    first_seq = total - len(window)
+    start = max(current.summarised_upto, first_seq)
+    to_fold = window[start - first_seq:current.verbatim_start - first_seq]
+
+    summary = fold_messages(openai_client, context.get("summary") or "", to_fold)
+    saved = session_store.save_summary(session_id, summary, current.verbatim_start)
+
+    return {
+        "session_id": session_id,
+        "folded": len(to_fold) if saved else 0,
+        "summary_upto": current.verbatim_start if saved else current.summarised_upto,
+        "summary_tokens": count_tokens(summary)
+    }
+
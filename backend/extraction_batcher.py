@@ -0,0 +1,178 @@
+# extraction_batcher.py
+"""
+Extraction Batcher - coalesces queued interview segments for the worker.
+Segments are buffered in one Redis list per session partition and lane
+(see task_routing); a flush of that partition drains up to
+EXTRACTION_BATCH_SIZE of them so they can be extracted in one LLM request,
+paying the GRAPH_INSTRUCTIONS system prompt once per batch. A partition's
+flushes run on its own worker, so a session's segments stay in order.
+
+A flush does not pop segments outright: pop_batch moves them to the
+partition's processing list in the same script, and ack_batch drops them
+once they are written (or spooled). A flush killed in between (time limit,
+crash, restart) leaves them there, and the partition's next flush takes
+that stranded batch before any new segments.
+"""
+
+import json
+import os
+import time
+import uuid
+from typing import Optional
+import redis
+from dotenv import load_dotenv
+
+from backend.task_routing import EXTRACTION_PARTITIONS, LANES, LIVE, partition_for
+from backend.tracing import current_carrier
+
+load_dotenv()
+
+# Redis DB 0 (same instance as chat history)
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
+
+# Batching knobs: a batch is flushed when it is full or has waited long enough.
+# EXTRACTION_BATCH_SIZE=1 disables batching (one LLM call per segment).
+EXTRACTION_BATCH_SIZE = int(os.getenv("EXTRACTION_BATCH_SIZE", 8))
+EXTRACTION_BATCH_MAX_WAIT_MS = int(os.getenv("EXTRACTION_BATCH_MAX_WAIT_MS", 500))
+
+PENDING_KEY_PREFIX = "extract:pending"
+PROCESSING_KEY_PREFIX = "extract:processing"
+
+# Moves up to ARGV[1] segments from the pending list (KEYS[1]) to the
+# processing list (KEYS[2]) and returns them; a batch stranded in the
+# processing list by a flush that never finished is returned instead.
+POP_BATCH_SCRIPT = """
+local stranded = redis.call('LRANGE', KEYS[2], 0, -1)
+if #stranded > 0 then
+    return stranded
+end
+local batch = redis.call('LPOP', KEYS[1], ARGV[1])
+if not batch then
+    return {}
+end
+redis.call('RPUSH', KEYS[2], unpack(batch))
+return batch
+"""
+
+# Moves the processing list (KEYS[2]) back to the head of the pending list
+# (KEYS[1]), preserving order.
+REQUEUE_BATCH_SCRIPT = """
+local batch = redis.call('LRANGE', KEYS[2], 0, -1)
+for i = #batch, 1, -1 do
+    redis.call('LPUSH', KEYS[1], batch[i])
+end
+redis.call('DEL', KEYS[2])
+return #batch
+"""
+
+
+def batching_enabled() -> bool:
+    return EXTRACTION_BATCH_SIZE > 1
+
+
+def pending_key(partition: int, lane: str = LIVE) -> str:
+    return f"{PENDING_KEY_PREFIX}:{lane}:{partition}"
+
+
+def processing_key(partition: int, lane: str = LIVE) -> str:
+    """LIST of the segments of the partition's batch in flight."""
+    return f"{PROCESSING_KEY_PREFIX}:{lane}:{partition}"
+
+
+def new_segment(
+    session_id: str,
+    user_text: str,
+    lane: str = LIVE,
+    segment_id: Optional[str] = None,
+    assessment_id: Optional[str] = None
+) -> dict:
+    """
+    Build a pending segment record. It keeps the message's trace context
+    (and arrival time baggage) so the flush can report its freshness lag.
+    The id keys the segment's checkpoints and Evidence ids; pass the
+    enqueuing task's id so a redelivered task maps to the same segment.
+    """
+    return {
+        "id": segment_id or uuid.uuid4().hex,
+        "session_id": session_id,
+        "partition": partition_for(session_id),
+        "lane": lane,
+        "text": user_text,
+        "assessment_id": assessment_id,
+        "enqueued_at": time.time(),
+        "trace": current_carrier()
+    }
+
+
+def _segment_key(segment: dict) -> str:
+    return pending_key(segment["partition"], segment.get("lane", LIVE))
+
+
+def enqueue_segment(segment: dict) -> int:
+    """Append a segment to its partition's pending list. Returns the new list length."""
+    return redis_client.rpush(_segment_key(segment), json.dumps(segment))
+
+
+def pop_batch(partition: int = 0, lane: str = LIVE, batch_size: int = EXTRACTION_BATCH_SIZE) -> list[dict]:
+    """
+    Take up to batch_size of the partition's oldest pending segments,
+    moving them to its processing list in one script. If a previous flush
+    left a batch there, that batch is returned again instead. Relies on the
+    partition's flushes running one at a time (task_routing); a batch taken
+    twice anyway is not written twice (segment checkpoints, MERGE writes).
+    """
+    pop = redis_client.register_script(POP_BATCH_SCRIPT)
+    raw = pop(keys=[pending_key(partition, lane), processing_key(partition, lane)], args=[batch_size])
+    return [json.loads(item) for item in raw]
+
+
+def ack_batch(partition: int = 0, lane: str = LIVE) -> None:
+    """Drop the partition's batch in flight once it is written (or spooled)."""
+    redis_client.delete(processing_key(partition, lane))
+
+
+def requeue_batch(partition: int = 0, lane: str = LIVE) -> int:
+    """Put a failed batch back at the head of its pending list, preserving order."""
+    requeue = redis_client.register_script(REQUEUE_BATCH_SCRIPT)
+    return requeue(keys=[pending_key(partition, lane), processing_key(partition, lane)])
+
+
+def stranded_batches() -> list[tuple[int, str]]:
+    """(partition, lane) of every non-empty processing list, in one round trip."""
+    lists = [(p, lane) for lane in LANES for p in range(EXTRACTION_PARTITIONS)]
+    pipe = redis_client.pipeline(transaction=False)
+    for partition, lane in lists:
+        pipe.exists(processing_key(partition, lane))
+    return [(p, lane) for (p, lane), n in zip(lists, pipe.execute()) if n]
+
+
+def pending_count(partition: int | None = None, lane: str = LIVE) -> int:
+    """Pending segments of one partition and lane, or of every list when partition is None."""
+    if partition is not None:
+        return redis_client.llen(pending_key(partition, lane))
+    return sum(n for _, _, n in pending_lists())
+
+
+def pending_lists() -> list[tuple[int, str, int]]:
+    """(partition, lane, length) of every non-empty pending list, in one round trip."""
+    lists = [(p, lane) for lane in LANES for p in range(EXTRACTION_PARTITIONS)]
+    pipe = redis_client.pipeline(transaction=False)
+    for partition, lane in lists:
+        pipe.llen(pending_key(partition, lane))
+    return [(p, lane, n) for (p, lane), n in zip(lists, pipe.execute()) if n]
+
+
+def flush_delay(pending: int) -> float | None:
+    """
+    Decide when the next flush should run after the list reached `pending`.
+    Returns 0 for "now", a countdown in seconds for "after max wait", or
+    None when a flush is already scheduled for this batch.
+    """
+    if pending % EXTRACTION_BATCH_SIZE == 0:
+        return 0
+    if pending == 1:
+        # First segment of a new batch: flush when the wait window closes
+        return EXTRACTION_BATCH_MAX_WAIT_MS / 1000
+    return None
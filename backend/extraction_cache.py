@@ -0,0 +1,206 @@
+# extraction_cache.py
+"""
+Extraction Cache - content-addressed cache for extract_observations results.
+Keys are a hash of the normalised segment text plus GRAPH_INSTRUCTIONS_VERSION,
+so Celery retries and boilerplate answers pasted by many candidates skip
+the LLM entirely. An in-process LRU sits in front of a size-bounded,
+TTL'd Redis tier shared by all workers.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+import redis
+from dotenv import load_dotenv
+
+from backend.schema_config import GRAPH_INSTRUCTIONS_VERSION
+
+load_dotenv()
+
+# Redis DB 0 (same instance as chat history)
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
+
+EXTRACTION_CACHE_LOCAL_SIZE = int(os.getenv("EXTRACTION_CACHE_LOCAL_SIZE", 1024))
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", 100_000))
+EXTRACTION_CACHE_TTL_SECONDS = int(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", 60 * 60 * 24 * 7))
+
+CACHE_PREFIX = "extract_cache:"
+INDEX_KEY = f"{CACHE_PREFIX}index"  # ZSET of entry keys scored by write time
+STATS_KEY = f"{CACHE_PREFIX}stats"  # HASH of hit/miss counters across workers
+
+
+def normalise_text(text: str) -> str:
+    """
+    Canonical form used for hashing: Unicode NFKC, trimmed, whitespace
+    collapsed. Case is preserved because cached evidence quotes the text.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(text: str, version: str = GRAPH_INSTRUCTIONS_VERSION) -> str:
+    digest = hashlib.sha256(normalise_text(text).encode()).hexdigest()
+    return f"{CACHE_PREFIX}{version}:{digest}"
+
+
+class ExtractionCache:
+    """
+    Two-tier cache of observation lists.
+
+    Local LRU hits cost nothing; Redis is read with one MGET per lookup
+    batch and written with one pipeline per store batch. Hit/miss counters
+    are kept locally and folded into those same round trips.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        local_size: int = EXTRACTION_CACHE_LOCAL_SIZE,
+        max_entries: int = EXTRACTION_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = EXTRACTION_CACHE_TTL_SECONDS,
+    ):
+        self.client = client
+        self.local_size = local_size
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local: OrderedDict[str, list[dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+        self._unflushed = dict.fromkeys(self.stats, 0)
+
+    # --- local tier ---
+
+    def _local_get(self, key: str) -> Optional[list[dict]]:
+        with self._lock:
+            value = self._local.get(key)
+            if value is not None:
+                self._local.move_to_end(key)
+            return value
+
+    def _local_put(self, key: str, value: list[dict]) -> None:
+        with self._lock:
+            self._local[key] = value
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _count(self, stat: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[stat] += n
+            self._unflushed[stat] += n
+
+    def _queue_stats(self, pipe) -> None:
+        with self._lock:
+            pending = {k: v for k, v in self._unflushed.items() if v}
+            self._unflushed = dict.fromkeys(self.stats, 0)
+        for stat, n in pending.items():
+            pipe.hincrby(STATS_KEY, stat, n)
+
+    # --- public API ---
+
+    def get_many(self, texts: list[str]) -> dict[str, list[dict]]:
+        """
+        Look up several segment texts. Returns {text: observations} for hits;
+        texts missing from the result are misses.
+        """
+        found, missing = {}, {}
+        for text in texts:
+            key = cache_key(text)
+            value = self._local_get(key)
+            if value is not None:
+                found[text] = value
+                self._count("local_hits")
+            else:
+                missing.setdefault(key, []).append(text)
+
+        if not missing:
+            return found
+
+        keys = list(missing)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.mget(keys)
+        self._queue_stats(pipe)
+        values = pipe.execute()[0]
+
+        for key, raw in zip(keys, values):
+            if raw is None:
+                self._count("misses", len(missing[key]))
+                continue
+            observations = json.loads(raw)
+            self._local_put(key, observations)
+            for text in missing[key]:
+                found[text] = observations
+            self._count("redis_hits", len(missing[key]))
+
+        return found
+
+    def get(self, text: str) -> Optional[list[dict]]:
+        return self.get_many([text]).get(text)
+
+    def put_many(self, results: dict[str, list[dict]]) -> None:
+        """Store {text: observations} in both tiers and enforce the size bound."""
+        if not results:
+            return
+
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        for text, observations in results.items():
+            key = cache_key(text)
+            self._local_put(key, observations)
+            pipe.set(key, json.dumps(observations), ex=self.ttl_seconds)
+            pipe.zadd(INDEX_KEY, {key: now})
+        # Forget index entries whose keys have expired, then check the bound
+        pipe.zremrangebyscore(INDEX_KEY, "-inf", now - self.ttl_seconds)
+        pipe.zcard(INDEX_KEY)
+        self._queue_stats(pipe)
+        size = pipe.execute()[2 * len(results) + 1]
+
+        if size > self.max_entries:
+            self._evict(size - self.max_entries)
+
+    def put(self, text: str, observations: list[dict]) -> None:
+        self.put_many({text: observations})
+
+    def _evict(self, count: int) -> None:
+        """Drop the `count` oldest entries."""
+        evicted = [key for key, _ in self.client.zpopmin(INDEX_KEY, count)]
+        if evicted:
+            self.client.delete(*evicted)
+
+    def flush_stats(self) -> None:
+        """Push locally accumulated counters to Redis."""
+        pipe = self.client.pipeline(transaction=False)
+        self._queue_stats(pipe)
+        pipe.execute()
+
+    def get_stats(self) -> dict:
+        """Cluster-wide counters (all workers) plus the current Redis size."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(STATS_KEY)
+        pipe.zcard(INDEX_KEY)
+        counters, entries = pipe.execute()
+
+        stats = {stat: int(counters.get(stat, 0)) for stat in self.stats}
+        lookups = sum(stats.values())
+        hits = stats["local_hits"] + stats["redis_hits"]
+        stats.update({
+            "lookups": lookups,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "version": GRAPH_INSTRUCTIONS_VERSION
+        })
+        return stats
+
+
+extraction_cache = ExtractionCache(redis_client)
+
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters for the API."""
+    return extraction_cache.get_stats()
@@ -0,0 +1,475 @@
+# framework_search.py
+"""
+Framework Search - in-memory lookup over the skills framework written by
+process_excel.py (src/data/framework, or the single-file sectorsData.ts).
+
+The framework is loaded once per process into compact structures: every
+string is interned (titles and descriptions shared by many roles and
+sectors are stored once), records are parallel lists/arrays indexed by
+position, and role -> skills is a CSR pair of arrays (offsets + skill
+positions). Three token indexes are built over role titles, skill titles
+and skill descriptions, with bitset postings over records in rank order,
+precomputed postings for one- and two-letter prefixes, and a one-edit
+typo fallback for titles.
+
+Search is AND over query tokens, the last token matched as a prefix.
+Lookups take tens of microseconds (p99 well under a millisecond) at the
+size of the full SkillsFuture framework; see
+backend/benchmarks/framework_search_bench.py.
+"""
+
+import bisect
+import json
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from dotenv import load_dotenv
+
+from backend.ontology import edit_distance, max_edit_distance
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Directory (sharded layout) or sectorsData.ts/.json (single file)
+FRAMEWORK_PATH = os.getenv(
+    "FRAMEWORK_PATH",
+    str(Path(__file__).resolve().parent.parent / "src" / "data" / "framework")
+)
+# Largest page a search request may ask for
+SEARCH_MAX_LIMIT = int(os.getenv("FRAMEWORK_SEARCH_MAX_LIMIT", 100))
+
+# Prefixes up to this length have precomputed postings; longer ones bisect
+PREFIX_INDEX_LENGTH = 2
+# Query tokens resolved by edit distance, memoised before the memo is reset
+FUZZY_CACHE_SIZE = 10_000
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased word tokens (NFKC, casefolded; punctuation splits words)."""
+    return _TOKEN.findall(unicodedata.normalize("NFKC", text).casefold())
+
+
+def _deletions(token: str) -> set[str]:
+    """`token` and every string one deletion away from it."""
+    return {token} | {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def _bitset(ranks: list[int], size: int) -> int:
+    bits = bytearray((size + 7) // 8)
+    for rank in ranks:
+        bits[rank >> 3] |= 1 << (rank & 7)
+    return int.from_bytes(bits, "little")
+
+
+def lowest_ranks(bits: int, offset: int, limit: int) -> list[int]:
+    """Positions of the set bits of `bits`, lowest first, paged."""
+    ranks = []
+    while bits and len(ranks) < limit:
+        low = bits & -bits
+        if offset:
+            offset -= 1
+        else:
+            ranks.append(low.bit_length() - 1)
+        bits ^= low
+    return ranks
+
+
+class TokenIndex:
+    """
+    Inverted index for one field: token -> postings, each a bitset (a
+    Python int) over record ranks. AND/OR of postings are single big-int
+    operations and the best-ranked matches are the lowest set bits, so a
+    lookup never materialises a match list.
+
+    Prefixes of up to PREFIX_INDEX_LENGTH characters have precomputed
+    postings; longer ones OR the tokens in their range of the sorted
+    vocabulary. With `fuzzy`, a token that matches nothing is retried as
+    the indexed tokens one edit away, found through a one-deletion
+    neighbourhood table rather than by scanning the vocabulary.
+    """
+
+    def __init__(self, fuzzy: bool = True):
+        self.postings: dict[str, int] = {}
+        self.prefixes: dict[str, int] = {}
+        self.vocabulary: list[str] = []
+        self._fuzzy_enabled = fuzzy
+        # deletion variant -> indexed tokens it was derived from
+        self._neighbours: dict[str, list[str]] = {}
+        self._fuzzy: dict[str, int] = {}
+
+    def build(self, fields: Iterable[str]) -> "TokenIndex":
+        """Index `fields` in rank order (the first field is rank 0)."""
+        ranks: dict[str, list[int]] = {}
+        size = 0
+        for rank, text in enumerate(fields):
+            size = rank + 1
+            for token in set(tokenize(text)):
+                ranks.setdefault(sys.intern(token), []).append(rank)
+
+        self.postings = {token: _bitset(positions, size) for token, positions in ranks.items()}
+        self.vocabulary = sorted(self.postings)
+        for token in self.vocabulary:
+            bits = self.postings[token]
+            for n in range(1, min(PREFIX_INDEX_LENGTH, len(token)) + 1):
+                self.prefixes[token[:n]] = self.prefixes.get(token[:n], 0) | bits
+            if self._fuzzy_enabled and max_edit_distance(token):
+                for variant in _deletions(token):
+                    self._neighbours.setdefault(variant, []).append(token)
+        return self
+
+    def exact(self, token: str) -> int:
+        return self.postings.get(token, 0)
+
+    def prefix(self, prefix: str) -> int:
+        """Records with a token starting with `prefix`."""
+        if len(prefix) <= PREFIX_INDEX_LENGTH:
+            return self.prefixes.get(prefix, 0)
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\U0010ffff", start)
+        bits = 0
+        for token in self.vocabulary[start:end]:
+            bits |= self.postings[token]
+        return bits
+
+    def fuzzy(self, token: str) -> int:
+        """Records with a token one edit (OSA distance) away from `token`."""
+        bits = self._fuzzy.get(token)
+        if bits is not None:
+            return bits
+
+        bits = 0
+        if self._fuzzy_enabled and max_edit_distance(token):
+            seen = set()
+            for variant in _deletions(token):
+                for candidate in self._neighbours.get(variant, ()):
+                    if candidate not in seen:
+                        seen.add(candidate)
+                        if edit_distance(token, candidate, 1) <= 1:
+                            bits |= self.postings[candidate]
+
+        if len(self._fuzzy) >= FUZZY_CACHE_SIZE:
+            self._fuzzy.clear()
+        self._fuzzy[token] = bits
+        return bits
+
+    def match(self, token: str, as_prefix: bool) -> int:
+        """Exact matches, or prefix matches for the last query token."""
+        return self.prefix(token) if as_prefix else self.exact(token)
+
+    def lookup(self, token: str, as_prefix: bool) -> int:
+        """`match`, falling back to typos when nothing matched."""
+        return self.match(token, as_prefix) or self.fuzzy(token)
+
+
+class FrameworkIndex:
+    """
+    The whole framework as array-backed records plus token indexes.
+
+    Sectors, tracks, roles and skills are addressed by position (load
+    order). Skills are deduplicated by TSC code across roles and sectors
+    (first title and description seen win, as in the sharded output).
+
+    The token indexes address records by rank instead: roles ordered by
+    title length then title, skills by how many roles use them, then
+    title length and title. `role_by_rank` / `skill_by_rank` map back to
+    positions, so the first set bits of a match are its best results.
+    """
+
+    def __init__(self):
+        self.sector_ids: list[str] = []
+        self.sector_labels: list[str] = []
+        self.track_ids: list[str] = []
+        self.track_labels: list[str] = []
+        self.track_sector = array("I")
+        self.role_ids: list[str] = []
+        self.role_labels: list[str] = []
+        self.role_track = array("I")
+        # role r's skills are role_skills[role_offsets[r]:role_offsets[r + 1]]
+        self.role_offsets = array("I", [0])
+        self.role_skills = array("I")
+        self.role_levels = array("d")  # NaN when the sheet had no level
+        self.skill_codes: list[str] = []
+        self.skill_titles: list[str] = []
+        self.skill_descriptions: list[str] = []
+        self.skill_role_counts = array("I")
+
+        self.role_by_rank = array("I")
+        self.skill_by_rank = array("I")
+
+        self.role_keys: dict[str, int] = {}
+        self.skill_positions: dict[str, int] = {}
+        self.role_title_index = TokenIndex()
+        self.skill_title_index = TokenIndex()
+        self.skill_description_index = TokenIndex(fuzzy=False)
+        self.load_ms = 0.0
+
+    # --- Loading ---
+
+    @classmethod
+    def load(cls, path: str | Path = FRAMEWORK_PATH) -> "FrameworkIndex":
+        start = time.perf_counter()
+        index = cls()
+        for sector, track, role, skills in read_framework(path):
+            index._add_role(sector, track, role, skills)
+        index._build_indexes()
+        index.load_ms = (time.perf_counter() - start) * 1e3
+        return index
+
+    def _add_role(self, sector: tuple, track: tuple, role: tuple, skills: Iterable[tuple]) -> None:
+        intern = sys.intern
+        if not self.sector_ids or self.sector_ids[-1] != sector[0]:
+            self.sector_ids.append(intern(sector[0]))
+            self.sector_labels.append(intern(sector[1]))
+        if not self.track_ids or self.track_ids[-1] != track[0] or self.track_sector[-1] != len(self.sector_ids) - 1:
+            self.track_ids.append(intern(track[0]))
+            self.track_labels.append(intern(track[1]))
+            self.track_sector.append(len(self.sector_ids) - 1)
+
+        self.role_keys[f"{sector[0]}/{track[0]}/{role[0]}"] = len(self.role_ids)
+        self.role_ids.append(intern(role[0]))
+        self.role_labels.append(intern(role[1]))
+        self.role_track.append(len(self.track_ids) - 1)
+
+        for code, title, description, level in skills:
+            position = self.skill_positions.get(code)
+            if position is None:
+                position = self.skill_positions[intern(code)] = len(self.skill_codes)
+                self.skill_codes.append(intern(code))
+                self.skill_titles.append(intern(title or ""))
+                self.skill_descriptions.append(intern(description or ""))
+                self.skill_role_counts.append(0)
+            self.skill_role_counts[position] += 1
+            self.role_skills.append(position)
+            self.role_levels.append(math.nan if level is None else float(level))
+        self.role_offsets.append(len(self.role_skills))
+
+    def _build_indexes(self) -> None:
+        labels, titles, counts = self.role_labels, self.skill_titles, self.skill_role_counts
+        self.role_by_rank = array("I", sorted(range(len(labels)), key=lambda r: (len(labels[r]), labels[r])))
+        self.skill_by_rank = array("I", sorted(
+            range(len(titles)), key=lambda k: (-counts[k], len(titles[k]), titles[k])
+        ))
+        self.role_title_index.build(labels[r] for r in self.role_by_rank)
+        self.skill_title_index.build(titles[k] for k in self.skill_by_rank)
+        self.skill_description_index.build(self.skill_descriptions[k] for k in self.skill_by_rank)
+
+    # --- Records ---
+
+    def role_record(self, r: int) -> dict:
+        t = self.role_track[r]
+        s = self.track_sector[t]
+        return {
+            "sector_id": self.sector_ids[s],
+            "sector": self.sector_labels[s],
+            "track_id": self.track_ids[t],
+            "track": self.track_labels[t],
+            "role_id": self.role_ids[r],
+            "label": self.role_labels[r],
+            "skill_count": self.role_offsets[r + 1] - self.role_offsets[r]
+        }
+
+    def skill_record(self, k: int) -> dict:
+        return {
+            "code": self.skill_codes[k],
+            "title": self.skill_titles[k],
+            "description": self.skill_descriptions[k],
+            "role_count": self.skill_role_counts[k]
+        }
+
+    def role_skills_of(self, sector_id: str, track_id: str, role_id: str) -> Optional[dict]:
+        """A role and its skills (in framework order), or None if there is no such role."""
+        r = self.role_keys.get(f"{sector_id}/{track_id}/{role_id}")
+        if r is None:
+            return None
+        skills = []
+        for i in range(self.role_offsets[r], self.role_offsets[r + 1]):
+            k = self.role_skills[i]
+            level = self.role_levels[i]
+            skills.append({
+                "code": self.skill_codes[k],
+                "title": self.skill_titles[k],
+                "description": self.skill_descriptions[k],
+                "proficiency_level": None if math.isnan(level) else (int(level) if level.is_integer() else level)
+            })
+        return {**self.role_record(r), "skills": skills}
+
+    # --- Search ---
+
+    def search_roles(self, query: str, offset: int = 0, limit: int = 20) -> tuple[int, list[dict]]:
+        """(total matches, page of role records), best ranked first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return 0, []
+        matches = -1
+        for i, token in enumerate(tokens):
+            matches &= self.role_title_index.lookup(token, as_prefix=i == len(tokens) - 1)
+            if not matches:
+                return 0, []
+
+        page = lowest_ranks(matches, offset, limit)
+        return matches.bit_count(), [self.role_record(self.role_by_rank[rank]) for rank in page]
+
+    def search_skills(self, query: str, offset: int = 0, limit: int = 20) -> tuple[int, list[dict]]:
+        """
+        (total matches, page of skill records). Every query token must be
+        in the title or the description; skills with every token in the
+        title come first, then those with some, each tier in rank order.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return 0, []
+        titles, descriptions = self.skill_title_index, self.skill_description_index
+        matches, all_title, any_title = -1, -1, 0
+        for i, token in enumerate(tokens):
+            as_prefix = i == len(tokens) - 1
+            in_title = titles.match(token, as_prefix)
+            in_description = descriptions.match(token, as_prefix)
+            if not (in_title or in_description):
+                in_title = titles.fuzzy(token)
+            matches &= in_title | in_description
+            if not matches:
+                return 0, []
+            all_title &= in_title
+            any_title |= in_title
+
+        tiers = (all_title & matches, any_title & matches & ~all_title, matches & ~any_title)
+        page = []
+        for tier in tiers:
+            size = tier.bit_count()
+            if offset >= size:
+                offset -= size
+                continue
+            page += lowest_ranks(tier, offset, limit - len(page))
+            offset = 0
+            if len(page) == limit:
+                break
+        return matches.bit_count(), [self.skill_record(self.skill_by_rank[rank]) for rank in page]
+
+    def stats(self) -> dict:
+        return {
+            "sectors": len(self.sector_ids),
+            "tracks": len(self.track_ids),
+            "roles": len(self.role_ids),
+            "skills": len(self.skill_codes),
+            "role_skills": len(self.role_skills),
+            "tokens": {
+                "role_titles": len(self.role_title_index.vocabulary),
+                "skill_titles": len(self.skill_title_index.vocabulary),
+                "skill_descriptions": len(self.skill_description_index.vocabulary)
+            },
+            "load_ms": round(self.load_ms, 1)
+        }
+
+
+def read_framework(path: str | Path) -> Iterator[tuple]:
+    """
+    Yield (sector, track, role, skills) from a process_excel.py output:
+    sector/track/role are (id, label) pairs, skills are (code, title,
+    description, proficiency level) tuples. Accepts the sharded directory,
+    its index.json, or the single-file sectorsData.ts (or that as JSON).
+    """
+    path = Path(path)
+    if path.is_dir():
+        path = path / "index.json"
+    raw = path.read_text(encoding="utf-8").strip()
+
+    if raw.startswith("{"):
+        for sector in json.loads(raw)["sectors"]:
+            shard = json.loads((path.parent / "sectors" / sector["shard"]).read_text(encoding="utf-8"))
+            table = shard["skills"]
+            for track in sector["tracks"]:
+                for role in track["roles"]:
+                    pairs = shard["roles"].get(f"{track['id']}/{role['id']}", [])
+                    yield (
+                        (sector["id"], sector["label"]),
+                        (track["id"], track["label"]),
+                        (role["id"], role["label"]),
+                        ((code, *table.get(code, (code, "")), level) for code, level in pairs)
+                    )
+        return
+
+    if not raw.startswith("["):
+        raw = raw[raw.index("=") + 1:].strip().rstrip(";")
+    for sector in json.loads(raw):
+        for track in sector.get("tracks", []):
+            for role in track.get("roles", []):
+                yield (
+                    (sector["id"], sector["label"]),
+                    (track["id"], track["label"]),
+                    (role["id"], role["label"]),
+                    (
+                        (s["id"], s.get("label"), s.get("description"), s.get("proficiencyLevel"))
+                        for s in role.get("skills", [])
+                    )
+                )
+
+
+# --- Process-wide index ---
+
+_index: Optional[FrameworkIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_framework_index() -> FrameworkIndex:
+    """The loaded framework (loaded on first use; raises FileNotFoundError without one)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FrameworkIndex.load(FRAMEWORK_PATH)
+    return _index
+
+
+def load_framework_in_background() -> None:
+    """Build the index off the request path at startup, if the framework has been generated."""
+    if not os.path.exists(FRAMEWORK_PATH):
+        return
+
+    def load():
+        try:
+            get_framework_index()
+        except Exception as e:
+            logger.warning("Framework index not loaded: %s", e)
+
+    threading.Thread(target=load, name="framework-index", daemon=True).start()
+
+
+def search_framework(query: str, kind: str = "skills", offset: int = 0, limit: int = 20) -> dict:
+    """
+    Paged search of role titles (kind="roles") or skill titles and
+    descriptions (kind="skills"). Raises ValueError for a bad kind.
+    """
+    if kind not in ("roles", "skills"):
+        raise ValueError("type must be 'roles' or 'skills'")
+    offset = max(0, offset)
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+    index = get_framework_index()
+    start = time.perf_counter()
+    search = index.search_roles if kind == "roles" else index.search_skills
+    total, results = search(query, offset, limit)
+    return {
+        "query": query,
+        "type": kind,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "results": results,
+        "took_ms": round((time.perf_counter() - start) * 1e3, 3)
+    }
+
+
+def get_role_skills(sector_id: str, track_id: str, role_id: str) -> Optional[dict]:
+    return get_framework_index().role_skills_of(sector_id, track_id, role_id)
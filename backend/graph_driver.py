@@ -0,0 +1,231 @@
+# graph_driver.py
+"""
+Graph Driver - the one shared Neo4j driver per process.
+Pool size, acquisition timeout and connection lifetime come from the
+environment. The driver is recreated after fork, so prefork Celery
+children and gunicorn workers never share sockets with their parent.
+Connections can be pre-warmed at startup, and pool utilisation and
+acquisition wait times are tracked for /api/stats/neo4j-pool.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
+
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", 50))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", 30))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", 3600))
+# Connections idle longer than this are pinged before reuse
+NEO4J_LIVENESS_CHECK_TIMEOUT = float(os.getenv("NEO4J_LIVENESS_CHECK_TIMEOUT", 30))
+NEO4J_WARMUP_CONNECTIONS = int(os.getenv("NEO4J_WARMUP_CONNECTIONS", 4))
+
+
+class PoolStats:
+    """
+    Counters fed by hooks around the driver's pool acquire/release.
+    Acquisition wait is the time a query spends waiting for a connection
+    (opening one included), which is where an undersized pool shows up.
+    """
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.in_use = 0
+            self.peak_in_use = 0
+            self.acquisitions = 0
+            self.acquisition_failures = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def acquired(self, wait: float) -> None:
+        with self._lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.acquisitions += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def failed(self, wait: float) -> None:
+        with self._lock:
+            self.acquisition_failures += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def released(self, count: int) -> None:
+        with self._lock:
+            self.in_use = max(0, self.in_use - count)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.acquisitions + self.acquisition_failures
+            return {
+                "max_pool_size": self.max_pool_size,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "utilisation": self.in_use / self.max_pool_size,
+                "peak_utilisation": self.peak_in_use / self.max_pool_size,
+                "acquisitions": self.acquisitions,
+                "acquisition_failures": self.acquisition_failures,
+                "acquisition_wait_ms": {
+                    "mean": self.wait_total / attempts * 1e3 if attempts else 0.0,
+                    "max": self.wait_max * 1e3
+                }
+            }
+
+
+def instrument_pool(driver, stats: PoolStats) -> bool:
+    """
+    Wrap the driver's pool acquire/release to feed `stats`.
+    The pool is not public API; returns False (and leaves the driver
+    untouched) if its shape is not the expected one.
+    """
+    pool = getattr(driver, "_pool", None)
+    if pool is None or not all(hasattr(pool, name) for name in ("acquire", "release", "kill_and_release")):
+        return False
+
+    acquire, release, kill_and_release = pool.acquire, pool.release, pool.kill_and_release
+
+    def timed_acquire(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            connection = acquire(*args, **kwargs)
+        except Exception:
+            stats.failed(time.perf_counter() - start)
+            raise
+        stats.acquired(time.perf_counter() - start)
+        return connection
+
+    def counted_release(*connections):
+        stats.released(len(connections))
+        return release(*connections)
+
+    def counted_kill_and_release(*connections):
+        stats.released(len(connections))
+        return kill_and_release(*connections)
+
+    pool.acquire = timed_acquire
+    pool.release = counted_release
+    pool.kill_and_release = counted_kill_and_release
+    return True
+
+
+_lock = threading.Lock()
+_driver = None
+_driver_pid: Optional[int] = None
+_instrumented = False
+pool_stats = PoolStats(NEO4J_MAX_POOL_SIZE)
+
+
+def create_driver():
+    from neo4j import GraphDatabase
+    return GraphDatabase.driver(
+        NEO4J_URI,
+        auth=(NEO4J_USER, NEO4J_PASSWORD),
+        max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+        connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+        max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+        liveness_check_timeout=NEO4J_LIVENESS_CHECK_TIMEOUT
+    )
+
+
+def get_neo4j_driver():
+    """
+    The process-wide driver, created on first use. A driver inherited
+    across fork is abandoned (not closed: its sockets belong to the
+    parent) and a fresh one is created for this process.
+    """
+    global _driver, _driver_pid, _instrumented
+    if _driver is not None and _driver_pid == os.getpid():
+        return _driver
+
+    with _lock:
+        if _driver is None or _driver_pid != os.getpid():
+            _driver = create_driver()
+            _driver_pid = os.getpid()
+            pool_stats.reset()
+            _instrumented = instrument_pool(_driver, pool_stats)
+        return _driver
+
+
+def _forget_driver_after_fork() -> None:
+    global _driver, _driver_pid, _lock
+    _driver, _driver_pid = None, None
+    _lock = threading.Lock()  # May have been held by another thread at fork time
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_driver_after_fork)
+
+
+def close_neo4j_driver() -> None:
+    """Close this process's driver (shutdown hooks)."""
+    global _driver, _driver_pid
+    with _lock:
+        if _driver is not None and _driver_pid == os.getpid():
+            _driver.close()
+        _driver, _driver_pid = None, None
+
+
+def warm_up_pool(connections: int = NEO4J_WARMUP_CONNECTIONS) -> int:
+    """
+    Open `connections` pooled connections up front so the first requests
+    do not pay for TCP + Bolt handshakes. Each connection is held by an
+    open transaction so they are all distinct, then returned to the pool.
+    Returns the number opened.
+    """
+    driver = get_neo4j_driver()
+    driver.verify_connectivity()
+
+    sessions, opened = [], 0
+    try:
+        for _ in range(min(connections, NEO4J_MAX_POOL_SIZE)):
+            session = driver.session()
+            sessions.append(session)
+            tx = session.begin_transaction()
+            tx.run("RETURN 1").consume()
+            opened += 1
+    finally:
+        for session in sessions:
+            session.close()
+    return opened
+
+
+def warm_up_pool_in_background() -> threading.Thread:
+    """Startup hook: warm_up_pool without delaying startup; failures are logged."""
+    def warm_up():
+        try:
+            logger.info("Neo4j pool: warmed %d connections", warm_up_pool())
+        except Exception as e:
+            logger.warning("Neo4j pool warm-up skipped: %s", e)
+
+    thread = threading.Thread(target=warm_up, name="neo4j-pool-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_pool_stats() -> dict:
+    """Pool utilisation and acquisition wait for this process."""
+    stats = pool_stats.snapshot()
+    stats.update({
+        "pid": os.getpid(),
+        "driver_created": _driver is not None and _driver_pid == os.getpid(),
+        "instrumented": _instrumented,
+        "acquisition_timeout_s": NEO4J_ACQUISITION_TIMEOUT,
+        "max_connection_lifetime_s": NEO4J_MAX_CONNECTION_LIFETIME
+    })
+    return stats
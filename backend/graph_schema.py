@@ -0,0 +1,176 @@
+# graph_schema.py
+"""
+Graph Schema - idempotent bootstrap of Neo4j constraints and indexes.
+Every MERGE/MATCH key used by the worker and every filter used by
+report_service is backed by a uniqueness constraint or an index, so those
+lookups stay index seeks instead of label scans as the graph grows.
+
+Usage:
+    python -m backend.graph_schema           # create missing items, then verify
+    python -m backend.graph_schema --check   # verify only; exit 1 if anything is missing
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Set to "false" to skip the startup bootstrap (e.g. read-only credentials)
+GRAPH_SCHEMA_BOOTSTRAP = os.getenv("GRAPH_SCHEMA_BOOTSTRAP", "true").lower() == "true"
+
+
+@dataclass(frozen=True)
+class SchemaItem:
+    name: str
+    kind: str  # "UNIQUENESS" constraint or "INDEX"
+    label: str
+    prop: str
+
+    @property
+    def create_statement(self) -> str:
+        if self.kind == "UNIQUENESS":
+            return (
+                f"CREATE CONSTRAINT {self.name} IF NOT EXISTS "
+                f"FOR (n:{self.label}) REQUIRE n.{self.prop} IS UNIQUE"
+            )
+        return f"CREATE INDEX {self.name} IF NOT EXISTS FOR (n:{self.label}) ON (n.{self.prop})"
+
+    def __str__(self) -> str:
+        return f"{self.kind.lower()} {self.name} on :{self.label}({self.prop})"
+
+
+REQUIRED_SCHEMA = [
+    # worker: MERGE (c:Candidate {session_id}) / report_service: MATCH by session_id
+    SchemaItem("candidate_session_id", "UNIQUENESS", "Candidate", "session_id"),
+    # worker: MERGE (s:Skill {name})
+    SchemaItem("skill_name", "UNIQUENESS", "Skill", "name"),
+    # worker: MERGE (t:Trait {name})
+    SchemaItem("trait_name", "UNIQUENESS", "Trait", "name"),
+    # Evidence identity used for lookups by id
+    SchemaItem("evidence_id", "UNIQUENESS", "Evidence", "id"),
+    # report_service: (s:Skill {domain: $domain})
+    SchemaItem("skill_domain", "INDEX", "Skill", "domain"),
+    # report_service: bulk export filter on creation time
+    SchemaItem("candidate_created_at", "INDEX", "Candidate", "created_at"),
+]
+
+
+def _existing_schema(session) -> tuple[set, set]:
+    """(label, property) pairs covered by uniqueness constraints / online indexes."""
+    constraints = set()
+    for record in session.run(
+        "SHOW CONSTRAINTS YIELD labelsOrTypes, properties, type "
+        "WHERE type IN ['UNIQUENESS', 'NODE_KEY']"
+    ):
+        if len(record["labelsOrTypes"]) == 1 and len(record["properties"]) == 1:
+            constraints.add((record["labelsOrTypes"][0], record["properties"][0]))
+
+    indexes = set()
+    for record in session.run(
+        "SHOW INDEXES YIELD labelsOrTypes, properties, state, type "
+        "WHERE type = 'RANGE' AND state = 'ONLINE'"
+    ):
+        if record["labelsOrTypes"] and len(record["labelsOrTypes"]) == 1 and len(record["properties"]) == 1:
+            indexes.add((record["labelsOrTypes"][0], record["properties"][0]))
+
+    return constraints, indexes
+
+
+def verify_graph_schema(driver) -> list[SchemaItem]:
+    """Return the required constraints/indexes that are missing (or not online)."""
+    with driver.session() as session:
+        constraints, indexes = _existing_schema(session)
+
+    missing = []
+    for item in REQUIRED_SCHEMA:
+        key = (item.label, item.prop)
+        # A uniqueness constraint is backed by an index, so it also satisfies INDEX items
+        if key in constraints or (item.kind == "INDEX" and key in indexes):
+            continue
+        missing.append(item)
+    return missing
+
+
+def ensure_graph_schema(driver) -> dict:
+    """
+    Create every missing constraint/index (IF NOT EXISTS, so safe to run
+    concurrently and repeatedly), wait for indexes to come online, then
+    verify. Returns {"created": [...], "errors": {...}, "missing": [...]}.
+    """
+    created, errors = [], {}
+    with driver.session() as session:
+        for item in verify_graph_schema(driver):
+            try:
+                session.run(item.create_statement).consume()
+                created.append(item.name)
+            except Exception as e:
+                # Typically existing duplicates blocking a uniqueness constraint
+                errors[item.name] = str(e)
+        if created:
+            session.run("CALL db.awaitIndexes(300)").consume()
+
+    missing = verify_graph_schema(driver)
+    return {
+        "created": created,
+        "errors": errors,
+        "missing": [item.name for item in missing]
+    }
+
+
+def bootstrap_graph_schema(get_driver) -> None:
+    """
+    Startup hook: ensure the schema and log the outcome. Never raises, so a
+    Neo4j outage does not keep the API or worker from starting.
+    """
+    try:
+        result = ensure_graph_schema(get_driver())
+    except Exception as e:
+        logger.warning("Neo4j schema bootstrap skipped: %s", e)
+        return
+
+    if result["created"]:
+        logger.info("Neo4j schema: created %s", ", ".join(result["created"]))
+    for name, error in result["errors"].items():
+        logger.error("Neo4j schema: could not create %s: %s", name, error)
+    if result["missing"]:
+        logger.warning("Neo4j schema: missing %s", ", ".join(result["missing"]))
+
+
+def bootstrap_graph_schema_in_background(get_driver) -> threading.Thread:
+    """Run bootstrap_graph_schema without delaying application startup."""
+    thread = threading.Thread(
+        target=bootstrap_graph_schema, args=(get_driver,), name="graph-schema-bootstrap", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def main() -> None:
+    from backend.graph_driver import get_neo4j_driver
+
+    parser = argparse.ArgumentParser(description="Create and verify the Neo4j constraints and indexes.")
+    parser.add_argument("--check", action="store_true", help="Only verify; do not create anything")
+    args = parser.parse_args()
+
+    driver = get_neo4j_driver()
+    if args.check:
+        missing = verify_graph_schema(driver)
+    else:
+        result = ensure_graph_schema(driver)
+        for name in result["created"]:
+            print(f"created  {name}")
+        for name, error in result["errors"].items():
+            print(f"error    {name}: {error}")
+        missing = [item for item in REQUIRED_SCHEMA if item.name in result["missing"]]
+
+    for item in REQUIRED_SCHEMA:
+        print(f"{'MISSING' if item in missing else 'ok':8} {item}")
+    sys.exit(1 if missing else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+# graph_spool.py
+"""
+Graph Spool - durable on-disk fallback for Neo4j writes.
+
+When the graph is down or slow, GraphCircuitBreaker opens and the worker
+appends each segment's observation rows to a local write-ahead log instead
+of retrying the task: nothing is lost when Celery runs out of retries, and
+the broker and the LLM are left alone while Neo4j recovers.
+
+The log is a directory of numbered segment files (000000000001.wal, ...),
+appended under an exclusive file lock so every worker process on the host
+can share it. Each record is one line, "<crc32> <json>\n", and is fsynced
+before the append returns. A torn or corrupt line (a crash mid-append) is
+skipped on replay.
+
+GraphSpool.replay seals the active segment and drains the sealed ones,
+oldest first, in large batches (one UNWIND transaction per
+GRAPH_SPOOL_REPLAY_BATCH_ROWS rows); a segment file is deleted once all of
+its records are written. Replay is at-least-once: a crash re-replays the
+current segment, which is harmless because graph and report writes are
+idempotent on Evidence ids (see graph_writer).
+
+Usage:
+    python -m backend.graph_spool status    # segments and bytes waiting
+    python -m backend.graph_spool replay    # drain into Neo4j now
+"""
+
+import argparse
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+from dotenv import load_dotenv
+
+from backend.metrics import record_breaker_state, record_spool_rows
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+GRAPH_SPOOL_ENABLED = os.getenv("GRAPH_SPOOL_ENABLED", "true").lower() == "true"
+# Local disk of the worker host, shared by its worker processes
+GRAPH_SPOOL_DIR = os.getenv("GRAPH_SPOOL_DIR", ".spool/graph")
+GRAPH_SPOOL_SEGMENT_BYTES = int(os.getenv("GRAPH_SPOOL_SEGMENT_BYTES", 16 * 1024 * 1024))
+# Beyond this the spool refuses appends and tasks fall back to Celery retries
+GRAPH_SPOOL_MAX_BYTES = int(os.getenv("GRAPH_SPOOL_MAX_BYTES", 1024 * 1024 * 1024))
+GRAPH_SPOOL_FSYNC = os.getenv("GRAPH_SPOOL_FSYNC", "true").lower() == "true"
+GRAPH_SPOOL_REPLAY_BATCH_ROWS = int(os.getenv("GRAPH_SPOOL_REPLAY_BATCH_ROWS", 5000))
+GRAPH_SPOOL_REPLAY_INTERVAL_SECONDS = float(os.getenv("GRAPH_SPOOL_REPLAY_INTERVAL_SECONDS", 5))
+
+# Consecutive failed (or slow) writes that open the breaker, and how long
+# it stays open before one write is let through as a probe
+GRAPH_BREAKER_FAILURES = int(os.getenv("GRAPH_BREAKER_FAILURES", 3))
+GRAPH_BREAKER_COOLDOWN_SECONDS = float(os.getenv("GRAPH_BREAKER_COOLDOWN_SECONDS", 30))
+GRAPH_BREAKER_SLOW_SECONDS = float(os.getenv("GRAPH_BREAKER_SLOW_SECONDS", 5))
+
+SEGMENT_SUFFIX = ".wal"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class SpoolFull(Exception):
+    """The spool reached GRAPH_SPOOL_MAX_BYTES."""
+
+
+def graph_unavailable(exc: BaseException) -> bool:
+    """
+    Whether a write failed because of Neo4j's health (connection loss,
+    pool or routing timeouts, transient server errors) rather than the
+    query itself.
+    """
+    from neo4j.exceptions import DriverError, Neo4jError
+    if isinstance(exc, (DriverError, Neo4jError)):
+        return exc.is_retryable()
+    return isinstance(exc, OSError)
+
+
+class GraphCircuitBreaker:
+    """
+    Per-process breaker over Neo4j writes.
+    Closed: writes go to Neo4j. GRAPH_BREAKER_FAILURES consecutive
+    failures (a write slower than slow_seconds counts as one) open it.
+    Open: writes are spooled without trying Neo4j. After cooldown_seconds
+    it is half open: one write is let through, and its outcome closes or
+    reopens the breaker.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = GRAPH_BREAKER_FAILURES,
+        cooldown_seconds: float = GRAPH_BREAKER_COOLDOWN_SECONDS,
+        slow_seconds: float = GRAPH_BREAKER_SLOW_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.slow_seconds = slow_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether the next write should try Neo4j."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened_at >= self.cooldown_seconds:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self, elapsed: float = 0.0) -> None:
+        if elapsed > self.slow_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = self.clock()
+                self._set_state(OPEN)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        record_breaker_state(state)
+        logger.log(logging.WARNING if state == OPEN else logging.INFO, "Neo4j circuit breaker %s", state)
+
+
+def encode_record(rows: list[dict], segment_ids: list[str]) -> bytes:
+    payload = json.dumps(
+        {"segment_ids": segment_ids, "rows": rows},
+        default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value),
+        separators=(",", ":")
+    ).encode()
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def decode_record(line: bytes) -> Optional[dict]:
+    """The record on `line`, or None if it is torn or corrupt."""
+    if not line.endswith(b"\n") or len(line) < 10:
+        return None
+    checksum, payload = line[:8], line[9:-1]
+    try:
+        if int(checksum, 16) != zlib.crc32(payload):
+            return None
+        record = json.loads(payload)
+    except ValueError:
+        return None
+    for row in record["rows"]:
+        if row.get("timestamp"):
+            row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return record
+
+
+def torn_tail(path: Path) -> bool:
+    """Whether the file's last record is incomplete (no trailing newline)."""
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+class GraphSpool:
+    """Segmented append-only log of observation rows awaiting Neo4j."""
+
+    def __init__(
+        self,
+        directory: str = GRAPH_SPOOL_DIR,
+        segment_bytes: int = GRAPH_SPOOL_SEGMENT_BYTES,
+        max_bytes: int = GRAPH_SPOOL_MAX_BYTES,
+        fsync: bool = GRAPH_SPOOL_FSYNC
+    ):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+
+    @contextmanager
+    def _locked(self, name: str = "spool.lock", blocking: bool = True) -> Iterator[bool]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / name, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def segments(self) -> list[Path]:
+        """Segment files, oldest first (the last one is the active segment)."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"{number:012d}{SEGMENT_SUFFIX}"
+
+    def append(self, rows: list[dict], segment_ids: list[str]) -> int:
+        """
+        Durably append one record. Returns its size in bytes; raises
+        SpoolFull (appending nothing) when the spool is at max_bytes.
+        """
+        record = encode_record(rows, segment_ids)
+        with self._locked():
+            segments = self.segments()
+            sizes = [path.stat().st_size for path in segments]
+            if sum(sizes) + len(record) > self.max_bytes:
+                raise SpoolFull(f"graph spool is full ({sum(sizes)} bytes in {self.directory})")
+
+            if not segments:
+                path = self._segment_path(1)
+            elif sizes[-1] and (sizes[-1] + len(record) > self.segment_bytes or torn_tail(segments[-1])):
+                # A torn last record (crash mid-append) must not swallow this one
+                path = self._segment_path(int(segments[-1].stem) + 1)
+            else:
+                path = segments[-1]
+
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, record)
+                if self.fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+        record_spool_rows("spooled", len(rows))
+        return len(record)
+
+    def seal(self) -> list[Path]:
+        """
+        Start a new active segment if the current one has records, so the
+        returned (sealed) segments receive no more appends.
+        """
+        with self._locked():
+            segments = self.segments()
+            if segments and segments[-1].stat().st_size:
+                self._segment_path(int(segments[-1].stem) + 1).touch()
+                return segments
+            return segments[:-1]
+
+    def read(self, path: Path) -> Iterator[dict]:
+        """Records of one segment file; torn or corrupt lines are skipped."""
+        with open(path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                record = decode_record(line)
+                if record is None:
+                    logger.error("Graph spool: skipping corrupt record %s:%d", path.name, number)
+                    continue
+                yield record
+
+    def replay(
+        self,
+        write_batch: Callable[[list[dict], list[str]], None],
+        batch_rows: int = GRAPH_SPOOL_REPLAY_BATCH_ROWS
+    ) -> dict:
+        """
+        Drain the sealed segments through `write_batch(rows, segment_ids)`,
+        called with up to `batch_rows` rows at a time (one record is never
+        split). An exception from `write_batch` stops the replay and is
+        raised; everything not yet written stays spooled. Only one replay
+        runs at a time per spool directory.
+        """
+        with self._locked("replay.lock", blocking=False) as acquired:
+            if not acquired:
+                return {"status": "busy"}
+
+            stats = {"status": "drained", "rows": 0, "batches": 0, "segments": 0}
+            rows, segment_ids, consumed = [], [], []
+
+            def flush() -> None:
+                if rows:
+                    write_batch(rows, segment_ids)
+                    record_spool_rows("replayed", len(rows))
+                    stats["rows"] += len(rows)
+                    stats["batches"] += 1
+                    rows.clear()
+                    segment_ids.clear()
+                # Every record of these files is now in Neo4j
+                for path in consumed:
+                    path.unlink()
+                stats["segments"] += len(consumed)
+                consumed.clear()
+
+            for path in self.seal():
+                for record in self.read(path):
+                    if rows and len(rows) + len(record["rows"]) > batch_rows:
+                        flush()
+                    rows.extend(record["rows"])
+                    segment_ids.extend(record["segment_ids"])
+                consumed.append(path)
+            flush()
+            return stats
+
+    def pending(self) -> bool:
+        return any(path.stat().st_size for path in self.segments())
+
+    def stats(self) -> dict:
+        segments = self.segments()
+        return {
+            "directory": str(self.directory),
+            "segments": sum(1 for path in segments if path.stat().st_size),
+            "bytes": sum(path.stat().st_size for path in segments),
+            "max_bytes": self.max_bytes
+        }
+
+
+graph_spool = GraphSpool()
+graph_breaker = GraphCircuitBreaker()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect or drain the local Neo4j write spool.")
+    parser.add_argument("command", choices=("status", "replay"))
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        from backend.worker import replay_spooled_rows
+        print(json.dumps(graph_spool.replay(replay_spooled_rows)))
+    print(json.dumps(graph_spool.stats()))
+
+
+if __name__ == "__main__":
+    main()
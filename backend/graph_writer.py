@@ -0,0 +1,137 @@
+# graph_writer.py
+"""
+Graph Writer - batched Neo4j writes for extracted observations.
+Writes the observations of one or many interview segments in a single
+transaction with one parameterised UNWIND query.
+
+Every statement is a MERGE: an Evidence node's id is its segment id plus
+a hash of the observation, so writing the same segment again (a Celery
+retry after a commit whose acknowledgement was lost) changes nothing.
+"""
+
+import hashlib
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from backend.schema_config import (
+    canonical_skill,
+    canonical_trait,
+    get_skill_domain
+)
+
+# One statement per batch: Candidate and Evidence MERGE (Evidence on its
+# unique id) and the optional Skill / Trait links. FOREACH over a
+# 0/1-element list is the conditional.
+SAVE_OBSERVATIONS_QUERY = """
+UNWIND $rows AS row
+MERGE (c:Candidate {session_id: row.session_id})
+ON CREATE SET c.created_at = datetime()
+SET c.assessment_id = coalesce(row.assessment_id, c.assessment_id)
+MERGE (e:Evidence {id: row.evidence_id})
+ON CREATE SET e.text = row.evidence, e.timestamp = row.timestamp, e.segment_id = row.segment_id
+MERGE (c)-[:DEMONSTRATED]->(e)
+FOREACH (_ IN CASE WHEN row.skill IS NULL THEN [] ELSE [1] END |
+    MERGE (s:Skill {name: row.skill})
+    ON CREATE SET s.domain = row.skill_domain
+    MERGE (e)-[:INDICATES]->(s)
+)
+FOREACH (_ IN CASE WHEN row.trait IS NULL THEN [] ELSE [1] END |
+    MERGE (t:Trait {name: row.trait})
+    MERGE (e)-[:INDICATES {intensity: row.trait_intensity}]->(t)
+)
+RETURN count(e) AS written
+"""
+
+
+def evidence_id(segment_id: str, row: dict) -> str:
+    """Deterministic Evidence id: segment id + hash of the validated observation."""
+    content = json.dumps([row["skill"], row["trait"], row["trait_intensity"], row["evidence"]])
+    return f"{segment_id}:{hashlib.sha256(content.encode()).hexdigest()[:16]}"
+
+
+def build_observation_row(
+    session_id: str,
+    skill: Optional[str],
+    skill_domain: Optional[str],
+    trait: Optional[str],
+    trait_intensity: Optional[str],
+    evidence: str
+) -> dict:
+    """
+    Validate one observation into an UNWIND row.
+    Applies the rules of the per-observation writer it replaced: names are
+    mapped to their canonical ontology form, unknown skills/traits are not
+    linked and the intensity defaults to Moderate.
+    The skill domain comes from the ontology; the LLM's guess is only a
+    fallback, so materialised reports and the graph agree on domains.
+    """
+    valid_skill = canonical_skill(skill)
+    valid_trait = canonical_trait(trait)
+
+    return {
+        "session_id": session_id,
+        "evidence": evidence,
+        "timestamp": datetime.now(timezone.utc),
+        "skill": valid_skill,
+        "skill_domain": (get_skill_domain(valid_skill) or skill_domain) if valid_skill else None,
+        "trait": valid_trait,
+        "trait_intensity": (trait_intensity or "Moderate") if valid_trait else None
+    }
+
+
+def build_segment_rows(
+    session_id: str,
+    user_text: str,
+    observations: list[dict],
+    segment_id: Optional[str] = None,
+    assessment_id: Optional[str] = None
+) -> list[dict]:
+    """
+    Turn the LLM observations of one segment into UNWIND rows.
+    Only observations naming a skill or trait are kept; identical
+    observations within the segment collapse into one Evidence node.
+    Without a `segment_id` the rows get a fresh one (never deduplicated).
+    `assessment_id` tags the candidate (and the cohort rollups).
+    """
+    segment_id = segment_id or uuid.uuid4().hex
+    rows = []
+    seen = set()
+    for obs in observations:
+        skill = obs.get("skill")
+        trait = obs.get("trait")
+        if not (skill or trait):
+            continue
+        row = build_observation_row(
+            session_id=session_id,
+            skill=skill,
+            skill_domain=obs.get("skill_domain"),
+            trait=trait,
+            trait_intensity=obs.get("trait_intensity"),
+            evidence=obs.get("evidence", user_text[:200])
+        )
+        row["segment_id"] = segment_id
+        row["assessment_id"] = assessment_id
+        row["evidence_id"] = evidence_id(segment_id, row)
+        if row["evidence_id"] not in seen:
+            seen.add(row["evidence_id"])
+            rows.append(row)
+    return rows
+
+
+def save_observations_batch(driver, rows: Iterable[dict]) -> int:
+    """
+    Write observation rows (from any number of segments/sessions) in one
+    transaction. Returns the number of rows written (Evidence nodes that
+    already existed included).
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    def write(tx):
+        return tx.run(SAVE_OBSERVATIONS_QUERY, rows=rows).single()["written"]
+
+    with driver.session() as session:
+        return session.execute_write(write)
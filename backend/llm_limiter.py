@@ -0,0 +1,338 @@
+# llm_limiter.py
+"""
+LLM Limiter - shared OpenAI rate limiter for the chat hot path and the
+extraction workers.
+
+Every process (API workers, Celery workers) draws from the same Redis
+token bucket, one for requests and one for tokens, refilled continuously
+at LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE (set both a little
+under the provider's limits). The bottom LLM_CHAT_RESERVE of each bucket
+is reserved for interactive chat: background calls (extraction, context
+summaries) only take what lies above it, so a saturated extraction backlog
+leaves chat that headroom instead of a queue of 429s.
+
+A caller that does not fit waits, sleeping until the bucket will have
+refilled enough, up to its class's deadline; only then does it get
+LLMRateLimited. Token cost is estimated up front (prompt characters / 4
+plus max_tokens) and corrected with the reply's usage afterwards.
+
+Background calls also hold a lease while in flight, capped at
+LLM_BACKGROUND_MAX_IN_FLIGHT across all workers (0: no cap), so a large
+backlog cannot occupy every provider connection at once. Leases expire
+after LLM_LEASE_SECONDS in case a worker dies mid-call.
+
+If Redis is unreachable the limiter fails open: calls proceed unlimited.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+import uuid
+from typing import Optional
+import redis
+from dotenv import load_dotenv
+
+from backend.metrics import record_limiter_timeout, record_limiter_wait
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Redis DB 0 (same instance as chat history), shared by every process
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
+
+LLM_LIMITER_ENABLED = os.getenv("LLM_LIMITER_ENABLED", "true").lower() == "true"
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 450))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 25_000))
+# Bucket size in seconds of refill: the largest burst allowed after idling
+LLM_BURST_SECONDS = float(os.getenv("LLM_BURST_SECONDS", 10))
+# Fraction of both buckets only chat may use
+LLM_CHAT_RESERVE = float(os.getenv("LLM_CHAT_RESERVE", 0.3))
+LLM_CHAT_DEADLINE_SECONDS = float(os.getenv("LLM_CHAT_DEADLINE_SECONDS", 15))
+LLM_BACKGROUND_DEADLINE_SECONDS = float(os.getenv("LLM_BACKGROUND_DEADLINE_SECONDS", 120))
+# Timeout of one background (worker) completion; the worker's LLM task time
+# limits cover the background deadline plus this
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", 60))
+LLM_BACKGROUND_MAX_IN_FLIGHT = int(os.getenv("LLM_BACKGROUND_MAX_IN_FLIGHT", 8))
+# Outlives any call that has not timed out
+LLM_LEASE_SECONDS = float(os.getenv("LLM_LEASE_SECONDS", LLM_CALL_TIMEOUT_SECONDS + 10))
+
+CHAT = "chat"
+BACKGROUND = "background"
+# metrics `purpose` label -> priority class
+PURPOSE_CLASS = {
+    "chat": CHAT,
+    "chat_stream": CHAT,
+    "extraction": BACKGROUND,
+    "extraction_batch": BACKGROUND,
+    "summary": BACKGROUND,
+}
+
+LIMITER_PREFIX = "llm_limit:"
+BUCKET_KEY = f"{LIMITER_PREFIX}bucket"  # HASH: req, tok, ts
+IN_FLIGHT_PREFIX = f"{LIMITER_PREFIX}in_flight:"  # ZSET per class: lease id -> expiry
+
+# Polling interval while the in-flight cap is full (no refill time to wait for)
+IN_FLIGHT_POLL_SECONDS = 0.05
+CHARS_PER_TOKEN = 4
+
+# Refill, then take `cost` from both buckets if that leaves at least the
+# class's floor in each. Returns {1, 0, tokens taken} when taken, else
+# {0, wait in ms, 0} (Redis would truncate a number reply, hence the string).
+# Redis' own clock keeps every process on one time base.
+ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local req_rate, req_cap = tonumber(ARGV[1]), tonumber(ARGV[2])
+local tok_rate, tok_cap = tonumber(ARGV[3]), tonumber(ARGV[4])
+local floor = tonumber(ARGV[5])
+local req_cost, tok_cost = tonumber(ARGV[6]), tonumber(ARGV[7])
+local max_in_flight = tonumber(ARGV[8])
+
+if max_in_flight > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+    if redis.call('ZCARD', KEYS[2]) >= max_in_flight then
+        return {0, -1, 0}
+    end
+end
+
+local state = redis.call('HMGET', KEYS[1], 'req', 'tok', 'ts')
+local req = tonumber(state[1]) or req_cap
+local tok = tonumber(state[2]) or tok_cap
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+req = math.min(req_cap, req + elapsed * req_rate)
+tok = math.min(tok_cap, tok + elapsed * tok_rate)
+
+local req_floor, tok_floor = req_cap * floor, tok_cap * floor
+-- A call bigger than the class's share still runs once that share is full
+tok_cost = math.min(tok_cost, tok_cap - tok_floor)
+
+local taken = 0
+local wait = 0
+local charged = 0
+if req - req_cost >= req_floor and tok - tok_cost >= tok_floor then
+    req = req - req_cost
+    tok = tok - tok_cost
+    taken = 1
+    charged = tok_cost
+    if max_in_flight > 0 then
+        redis.call('ZADD', KEYS[2], now + tonumber(ARGV[10]), ARGV[9])
+    end
+else
+    wait = math.max((req_floor + req_cost - req) / req_rate, (tok_floor + tok_cost - tok) / tok_rate)
+end
+redis.call('HSET', KEYS[1], 'req', req, 'tok', tok, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(math.max(req_cap / req_rate, tok_cap / tok_rate)) + 60)
+return {taken, math.ceil(wait * 1000), tostring(charged)}
+"""
+
+# Add `delta` tokens (negative: charge) to the bucket, never above capacity,
+# and drop the call's lease. A missing bucket is already full.
+SETTLE_SCRIPT = """
+local delta, tok_cap = tonumber(ARGV[1]), tonumber(ARGV[2])
+if delta ~= 0 then
+    local tok = tonumber(redis.call('HGET', KEYS[1], 'tok'))
+    if tok then
+        redis.call('HSET', KEYS[1], 'tok', math.min(tok_cap, tok + delta))
+    end
+end
+if ARGV[3] ~= '' then
+    redis.call('ZREM', KEYS[2], ARGV[3])
+end
+return 0
+"""
+
+
+class LLMRateLimited(Exception):
+    """The call did not get capacity before its deadline."""
+
+    def __init__(self, purpose: str, waited: float, retry_after: float):
+        super().__init__(f"LLM capacity busy: {purpose} waited {waited:.1f}s, retry in {retry_after:.1f}s")
+        self.purpose = purpose
+        self.waited = waited
+        self.retry_after = retry_after
+
+
+def estimate_tokens(messages: list[dict], max_tokens: int) -> int:
+    """Upper-bound cost of a completion: prompt characters / 4 plus max_tokens."""
+    return sum(len(m.get("content") or "") for m in messages) // CHARS_PER_TOKEN + max_tokens
+
+
+class Permit:
+    """
+    Capacity taken for one call; `close()` it with the reply's usage.
+    `charged` is what the bucket actually gave, which is less than the
+    estimate `tokens` for a call bigger than its class's share.
+    """
+
+    __slots__ = ("limiter", "purpose", "tokens", "charged", "lease", "closed")
+
+    def __init__(
+        self, limiter: Optional["LLMLimiter"], purpose: str, tokens: int, lease: Optional[str], charged: float = 0
+    ):
+        self.limiter = limiter
+        self.purpose = purpose
+        self.tokens = tokens
+        self.charged = charged
+        self.lease = lease
+        self.closed = False
+
+    def close(self, usage=None) -> None:
+        """Release the in-flight lease and refund (or charge) the estimate's error."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.limiter is not None:
+            self.limiter.settle(self, usage)
+
+    async def close_async(self, usage=None) -> None:
+        await asyncio.to_thread(self.close, usage)
+
+
+class LLMLimiter:
+    """
+    Distributed request + token bucket with a chat reserve (see module docstring).
+    One Lua call per acquisition attempt and at most one to settle.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+        burst_seconds: float = LLM_BURST_SECONDS,
+        chat_reserve: float = LLM_CHAT_RESERVE,
+        background_max_in_flight: int = LLM_BACKGROUND_MAX_IN_FLIGHT,
+        enabled: bool = LLM_LIMITER_ENABLED,
+        prefix: str = LIMITER_PREFIX
+    ):
+        self.client = client
+        self.request_rate = requests_per_minute / 60
+        self.token_rate = tokens_per_minute / 60
+        self.request_capacity = self.request_rate * burst_seconds
+        self.token_capacity = self.token_rate * burst_seconds
+        self.chat_reserve = chat_reserve
+        self.max_in_flight = {CHAT: 0, BACKGROUND: background_max_in_flight}
+        self.deadlines = {CHAT: LLM_CHAT_DEADLINE_SECONDS, BACKGROUND: LLM_BACKGROUND_DEADLINE_SECONDS}
+        self.enabled = enabled
+        self.bucket_key = f"{prefix}bucket"
+        self.in_flight_prefix = f"{prefix}in_flight:"
+        self._acquire = client.register_script(ACQUIRE_SCRIPT)
+        self._settle = client.register_script(SETTLE_SCRIPT)
+
+    def in_flight_key(self, kind: str) -> str:
+        return f"{self.in_flight_prefix}{kind}"
+
+    def try_acquire(self, purpose: str, tokens: int) -> tuple[Optional[Permit], float]:
+        """One attempt: (permit, 0) or (None, seconds until it could fit)."""
+        kind = PURPOSE_CLASS.get(purpose, BACKGROUND)
+        lease = uuid.uuid4().hex if self.max_in_flight[kind] else None
+        try:
+            taken, wait_ms, charged = self._acquire(
+                keys=[self.bucket_key, self.in_flight_key(kind)],
+                args=[
+                    self.request_rate, self.request_capacity,
+                    self.token_rate, self.token_capacity,
+                    self.chat_reserve if kind == BACKGROUND else 0,
+                    1, tokens, self.max_in_flight[kind], lease or "", LLM_LEASE_SECONDS
+                ]
+            )
+        except redis.RedisError as e:
+            logger.warning("LLM limiter unavailable, not limiting: %s", e)
+            return Permit(None, purpose, tokens, None), 0.0
+        if taken:
+            return Permit(self, purpose, tokens, lease, float(charged)), 0.0
+        return None, IN_FLIGHT_POLL_SECONDS if wait_ms < 0 else wait_ms / 1000
+
+    def acquire(self, purpose: str, tokens: int, deadline: Optional[float] = None) -> Permit:
+        """
+        Block until `tokens` (and one request) are available for `purpose`.
+        Raises LLMRateLimited after `deadline` seconds (default: per class).
+        """
+        if not self.enabled:
+            return Permit(None, purpose, tokens, None)
+        if deadline is None:
+            deadline = self.deadlines[PURPOSE_CLASS.get(purpose, BACKGROUND)]
+        started = time.monotonic()
+        while True:
+            permit, wait = self.try_acquire(purpose, tokens)
+            waited = time.monotonic() - started
+            if permit is not None:
+                record_limiter_wait(purpose, waited)
+                return permit
+            if waited + wait > deadline:
+                record_limiter_timeout(purpose)
+                raise LLMRateLimited(purpose, waited, wait)
+            time.sleep(_jittered(wait))
+
+    async def acquire_async(self, purpose: str, tokens: int, deadline: Optional[float] = None) -> Permit:
+        """acquire() for the event loop: Redis calls run in a thread, waits are asyncio sleeps."""
+        if not self.enabled:
+            return Permit(None, purpose, tokens, None)
+        if deadline is None:
+            deadline = self.deadlines[PURPOSE_CLASS.get(purpose, BACKGROUND)]
+        started = time.monotonic()
+        while True:
+            permit, wait = await asyncio.to_thread(self.try_acquire, purpose, tokens)
+            waited = time.monotonic() - started
+            if permit is not None:
+                record_limiter_wait(purpose, waited)
+                return permit
+            if waited + wait > deadline:
+                record_limiter_timeout(purpose)
+                raise LLMRateLimited(purpose, waited, wait)
+            await asyncio.sleep(_jittered(wait))
+
+    def settle(self, permit: Permit, usage=None) -> None:
+        """
+        One Lua call: drop the lease and correct what the permit was charged
+        to the actual usage, capped at the bucket's capacity.
+        """
+        used = getattr(usage, "total_tokens", None) if usage is not None else None
+        refund = permit.charged - used if used is not None else 0
+        if not refund and permit.lease is None:
+            return
+        try:
+            self._settle(
+                keys=[self.bucket_key, self.in_flight_key(PURPOSE_CLASS.get(permit.purpose, BACKGROUND))],
+                args=[refund, self.token_capacity, permit.lease or ""]
+            )
+        except redis.RedisError as e:
+            logger.warning("LLM limiter settle failed: %s", e)
+
+    def stats(self) -> dict:
+        """Current bucket levels (as of the last acquisition) and leases in flight."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(self.bucket_key)
+        for kind in (CHAT, BACKGROUND):
+            pipe.zcard(self.in_flight_key(kind))
+        bucket, *in_flight = pipe.execute()
+        return {
+            "enabled": self.enabled,
+            "requests_per_minute": self.request_rate * 60,
+            "tokens_per_minute": self.token_rate * 60,
+            "chat_reserve": self.chat_reserve,
+            "requests_available": float(bucket.get("req", self.request_capacity)),
+            "requests_capacity": self.request_capacity,
+            "tokens_available": float(bucket.get("tok", self.token_capacity)),
+            "tokens_capacity": self.token_capacity,
+            "in_flight": dict(zip((CHAT, BACKGROUND), in_flight)),
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+def _jittered(wait: float) -> float:
+    """Spread waiters that were told the same refill time."""
+    return wait * random.uniform(1.0, 1.2) + 0.001
+
+
+# Module-level limiter used by chat_service, async_chat_service and the worker
+llm_limiter = LLMLimiter(redis_client)
+
+
+def get_limiter_stats() -> dict:
+    return llm_limiter.stats()
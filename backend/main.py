@@ -1,10 +1,60 @@
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-import redis
-import json
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from typing import Optional
+from contextlib import aclosing, asynccontextmanager
+from datetime import datetime, timezone
 import asyncio
+import math
+import os
+
+from backend import async_chat_service
+from backend.sse import SSE_HEADERS, async_sse_from_tokens
+from backend.extraction_cache import get_cache_stats
+from backend.cohort_rollups import get_assessments, get_cohort_summary, get_cohort_timeseries, validate_assessment_id
+from backend.llm_limiter import LLMRateLimited, get_limiter_stats
+from backend.framework_search import get_role_skills, load_framework_in_background, search_framework
+from backend.graph_driver import (
+    close_neo4j_driver,
+    get_neo4j_driver,
+    get_pool_stats,
+    warm_up_pool_in_background
+)
+from backend.graph_schema import GRAPH_SCHEMA_BOOTSTRAP, bootstrap_graph_schema_in_background
+from backend.match_engine import (
+    get_match_stats,
+    load_match_engine_in_background,
+    rank_candidates,
+    rank_candidates_for_role
+)
+from backend.metrics import metrics_payload
+from backend.report_store import get_materialised_report, rebuild_report, verify_report
+from backend.report_service import (
+    EXPORT_HEADERS,
+    NDJSON_MEDIA_TYPE,
+    export_reports_ndjson,
+    get_candidate_report,
+    parse_export_request,
+    get_skills_with_evidence,
+    get_traits_with_evidence,
+    get_domain_deep_dive
+)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Both run in background threads so a slow or unreachable Neo4j does not delay startup
+    warm_up_pool_in_background()
+    if GRAPH_SCHEMA_BOOTSTRAP:
+        bootstrap_graph_schema_in_background(get_neo4j_driver)
+    load_framework_in_background()
+    load_match_engine_in_background()
+    yield
+    close_neo4j_driver()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow CORS for Next.js (Port 3000)
 app.add_middleware(
@@ -15,42 +65,376 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Redis Connection (Hot Path)
-# Note: host is 'localhost' because we run this script outside Docker for now
-redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+FRAMEWORK_MISSING = "Skills framework not generated (run process_excel.py)"
+
+# Max chat messages buffered per WebSocket before we stop reading from it
+WS_MAX_PENDING_MESSAGES = int(os.getenv("WS_MAX_PENDING_MESSAGES", 4))
+
+
+class ChatRequest(BaseModel):
+    session_id: Optional[str] = None
+    message: Optional[str] = None
+    system_prompt: Optional[str] = None
+    assessment_id: Optional[str] = None
+
+
+class MatchRankRequest(BaseModel):
+    roles: Optional[list] = None
+    k: int = 20
+
+
+def error_response(message: str, status_code: int) -> JSONResponse:
+    """Error body shared with the Flask API: {"error": "..."}."""
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+async def send_ws_frame(websocket: WebSocket, frame_type: str, text: str, **extra) -> None:
+    await websocket.send_json({"type": frame_type, "sender": "System", "text": text, **extra})
+
 
 @app.get("/")
 def health_check():
     return {"status": "UbeU Backend is running"}
 
+
+@app.get("/health")
+def health():
+    return {"status": "healthy", "service": "interview-memory-backend"}
+
+
+# --- Chat (async hot path) ---
+
+@app.post("/api/chat")
+async def chat(body: ChatRequest):
+    if not body.session_id or not body.message:
+        return error_response("session_id and message are required", 400)
+    try:
+        assessment_id = validate_assessment_id(body.assessment_id)
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    try:
+        response = await async_chat_service.handle_user_message(
+            body.session_id, body.message, body.system_prompt, assessment_id
+        )
+        return {"response": response, "session_id": body.session_id}
+    except LLMRateLimited as e:
+        # Queued for the LLM past the chat deadline
+        response = error_response(str(e), 429)
+        response.headers["Retry-After"] = str(math.ceil(e.retry_after))
+        return response
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(body: ChatRequest):
+    """Stream the reply as Server-Sent Events (token / done / error)."""
+    if not body.session_id or not body.message:
+        return error_response("session_id and message are required", 400)
+    try:
+        assessment_id = validate_assessment_id(body.assessment_id)
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    tokens = async_chat_service.stream_user_message(
+        body.session_id, body.message, body.system_prompt, assessment_id
+    )
+    return StreamingResponse(
+        async_sse_from_tokens(tokens, body.session_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@app.get("/api/session/{session_id}/history")
+async def get_history(session_id: str, limit: int = 20):
+    try:
+        history = await async_chat_service.get_chat_history(session_id, limit)
+        info = await async_chat_service.get_session_info(session_id)
+        return {"session_id": session_id, "messages": history, "info": info}
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.delete("/api/session/{session_id}")
+async def delete_session(session_id: str):
+    try:
+        cleared = await async_chat_service.clear_session(session_id)
+        return {"session_id": session_id, "cleared": cleared}
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+# --- Reports ---
+# report_service uses the blocking Neo4j driver, so these are plain `def`
+# routes which FastAPI runs in its threadpool, off the event loop.
+
+@app.get("/api/report/{session_id}")
+def get_report(session_id: str, source: Optional[str] = None):
+    try:
+        if source == "live":
+            return get_candidate_report(session_id)
+        return get_materialised_report(session_id)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.get("/api/report/{session_id}/verify")
+def verify_materialised_report(session_id: str):
+    try:
+        return verify_report(session_id)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.post("/api/report/{session_id}/rebuild")
+def rebuild_materialised_report(session_id: str):
+    try:
+        rebuild_report(session_id)
+        return get_materialised_report(session_id)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.get("/api/report/{session_id}/skills")
+def get_skills(session_id: str):
+    try:
+        return {"session_id": session_id, "skills": get_skills_with_evidence(session_id)}
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.get("/api/report/{session_id}/traits")
+def get_traits(session_id: str):
+    try:
+        return {"session_id": session_id, "traits": get_traits_with_evidence(session_id)}
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.get("/api/report/{session_id}/domain/{domain}")
+def get_domain(session_id: str, domain: str):
+    try:
+        return get_domain_deep_dive(session_id, domain)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.post("/api/reports/export")
+def export_reports(body: Optional[dict] = None):
+    """Bulk export of live reports as NDJSON: {"session_ids": [...]} or {"filter": {prefix, since, until}}."""
+    try:
+        session_ids, filters = parse_export_request(body)
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    # A plain iterator: Starlette pulls each chunk in its threadpool
+    return StreamingResponse(
+        export_reports_ndjson(session_ids, filters),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers=EXPORT_HEADERS
+    )
+
+
+@app.get("/api/analytics/cohort")
+def analytics_cohort(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    assessment_id: Optional[str] = None,
+    top: int = 20
+):
+    """Cohort summary from the rollups: evidence, domain coverage, top skills, trait intensity histograms."""
+    try:
+        return get_cohort_summary(since, until, assessment_id, top)
+    except ValueError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.get("/api/analytics/timeseries")
+def analytics_timeseries(since: Optional[str] = None, until: Optional[str] = None, assessment_id: Optional[str] = None):
+    """Per-day evidence counts and distinct candidates."""
+    try:
+        return get_cohort_timeseries(since, until, assessment_id)
+    except ValueError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.get("/api/analytics/assessments")
+def analytics_assessments():
+    """Assessments with rollups, most recently active first."""
+    try:
+        return get_assessments()
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.get("/api/framework/search")
+def framework_search(q: str = "", kind: str = Query("skills", alias="type"), offset: int = 0, limit: int = 20):
+    """Paged search of skill titles/descriptions (type=skills) or role titles (type=roles)."""
+    try:
+        return search_framework(q, kind, offset, limit)
+    except ValueError as e:
+        return error_response(str(e), 400)
+    except FileNotFoundError:
+        return error_response(FRAMEWORK_MISSING, 503)
+
+
+@app.get("/api/framework/roles/{sector_id}/{track_id}/{role_id}/skills")
+def framework_role_skills(sector_id: str, track_id: str, role_id: str):
+    try:
+        role = get_role_skills(sector_id, track_id, role_id)
+    except FileNotFoundError:
+        return error_response(FRAMEWORK_MISSING, 503)
+    if role is None:
+        return error_response("Role not found", 404)
+    return role
+
+
+@app.get("/api/match/roles/{sector_id}/{track_id}/{role_id}/candidates")
+def match_role_candidates(sector_id: str, track_id: str, role_id: str, k: int = 20):
+    """Best-fitting candidates for a job role, by weighted share of its skills they have shown."""
+    try:
+        result = rank_candidates_for_role(sector_id, track_id, role_id, k)
+    except FileNotFoundError:
+        return error_response(FRAMEWORK_MISSING, 503)
+    except Exception as e:
+        return error_response(str(e), 500)
+    if result is None:
+        return error_response("Role not found", 404)
+    return result
+
+
+@app.post("/api/match/rank")
+def match_rank(request: MatchRankRequest):
+    """Best-fitting candidates for several roles ("sector_id/track_id/role_id") in one pass."""
+    try:
+        return rank_candidates(request.roles, request.k)
+    except ValueError as e:
+        return error_response(str(e), 400)
+    except FileNotFoundError:
+        return error_response(FRAMEWORK_MISSING, 503)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.get("/api/stats/extraction-cache")
+def extraction_cache_stats():
+    try:
+        return get_cache_stats()
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.get("/api/stats/llm-limiter")
+def llm_limiter_stats():
+    """Shared LLM rate limiter: bucket levels, chat reserve and calls in flight."""
+    try:
+        return get_limiter_stats()
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.get("/api/stats/match-engine")
+def match_engine_stats():
+    """Match engine matrix size and freshness (this worker process)."""
+    try:
+        return get_match_stats()
+    except FileNotFoundError:
+        return error_response(FRAMEWORK_MISSING, 503)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@app.get("/api/stats/neo4j-pool")
+def neo4j_pool_stats():
+    """Neo4j connection pool utilisation and acquisition wait (this worker process)."""
+    return get_pool_stats()
+
+
+@app.get("/metrics")
+def metrics():
+    """Per-stage latency histograms and counters (Prometheus text format)."""
+    payload, content_type = metrics_payload()
+    return Response(content=payload, media_type=content_type)
+
+
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
+    """
+    Streaming chat over a WebSocket; client_id is the chat session id.
+
+    Incoming frames: {"text": "...", "system_prompt": "optional", "assessment_id": "optional"}
+    Outgoing frames:
+        {"type": "token", "sender": "System", "text": "..."}   per LLM delta
+        {"type": "message", "sender": "System", "text": "full reply", "timestamp": "..."}
+        {"type": "error", "sender": "System", "text": "..."}
+
+    Messages are processed one at a time per connection. The receiver
+    hands them over through a bounded queue: when it is full the receiver
+    stops reading, so a flooding client is throttled by TCP flow control
+    instead of growing server memory.
+    """
     await websocket.accept()
-    print(f"Client {client_id} connected.")
+    pending: asyncio.Queue = asyncio.Queue(maxsize=WS_MAX_PENDING_MESSAGES)
 
-    try:
-        while True:
-            # 1. Receive JSON from Frontend
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
+    async def receive_messages():
+        try:
+            while True:
+                try:
+                    message_data = await websocket.receive_json()
+                except ValueError:
+                    message_data = {}  # Not JSON: answered with an error frame
+                await pending.put(message_data)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            # Wake the processor; the client is gone, so queued turns may be dropped
+            while True:
+                try:
+                    pending.put_nowait(None)
+                    break
+                except asyncio.QueueFull:
+                    pending.get_nowait()
 
-            # 2. Store in Redis (The "Memory")
-            # We push to a list so we have history
-            redis_key = f"chat:{client_id}"
-            redis_client.rpush(redis_key, json.dumps(message_data))
+    receiver = asyncio.create_task(receive_messages())
 
-            # 3. Echo Logic (Simulating the 'Orchestrator' for now)
-            # In the future, this is where the LLM / Orchestrator logic goes.
-            response = {
-                "sender": "System",
-                "text": f"Echo: You said '{message_data['text']}'. (Saved to Redis)",
-                "timestamp": "now"
-            }
+    try:
+        while (message_data := await pending.get()) is not None:
+            text = message_data.get("text") if isinstance(message_data, dict) else None
+            if not text:
+                await send_ws_frame(websocket, "error", "text is required")
+                continue
+            try:
+                assessment_id = validate_assessment_id(message_data.get("assessment_id"))
+            except ValueError as e:
+                await send_ws_frame(websocket, "error", str(e))
+                continue
 
-            # 4. Send back to Frontend
-            await websocket.send_text(json.dumps(response))
+            parts = []
+            tokens = async_chat_service.stream_user_message(
+                client_id, text, message_data.get("system_prompt"), assessment_id
+            )
+            try:
+                async with aclosing(tokens):
+                    async for token in tokens:
+                        parts.append(token)
+                        await send_ws_frame(websocket, "token", token)
+            except WebSocketDisconnect:
+                break
+            except Exception as e:
+                await send_ws_frame(websocket, "error", str(e))
+                continue
 
-    except Exception as e:
-        print(f"Error: {e}")
+            await send_ws_frame(
+                websocket, "message", "".join(parts),
+                timestamp=datetime.now(timezone.utc).isoformat()
+            )
+    except WebSocketDisconnect:
+        pass
     finally:
-        await websocket.close()
+        receiver.cancel()
@@ -0,0 +1,449 @@
+# match_engine.py
+"""
+Match Engine - vectorised candidate-to-job-role fit scores and rankings.
+
+Joins the evidence graph with the role requirements of the skills
+framework (process_excel.py output, see framework_search):
+  - a candidate x skill strength matrix, one row per candidate. Strength
+    is min(evidence count / saturation, 1). Candidates show a few dozen of
+    the framework's thousands of skills, so rows are stored padded-sparse
+    (ELL): fixed-width arrays of skill ids and strengths, unused slots
+    pointing at a sentinel skill. 100k candidates take tens of MB where a
+    dense matrix would take GBs.
+  - a role x skill requirement matrix, built per request from the
+    framework's CSR role -> skills arrays. A role's weights are its
+    proficiency levels (1 where the sheet has none), summing to 1.
+A role's fit score is the weighted share of its required skills the
+candidate has shown, in [0, 1]. Scoring reads the matrix skill-major: a
+CSC copy of the rows lists, per skill, the candidates showing it, so
+scoring any number of roles is one weighted bincount over the postings of
+their skills (a sparse product), then a per-role argpartition for the top
+k. Rows updated since the CSC copy was built are rescored from the rows;
+the copy is rebuilt once enough have changed.
+
+Skills are matched by their ontology name, as written to the graph: a
+framework skill's title is resolved with canonical_skill (with
+SKILLS_CATALOGUE_PATH set, every title is a known skill), falling back to
+the title itself.
+
+The matrix is loaded from Neo4j on first use and kept current
+incrementally: the worker appends the session ids whose evidence it wrote
+to a Redis stream (publish_candidate_changes), and the engine re-reads
+just those candidates' skill counts, at most every MATCH_REFRESH_SECONDS.
+Counts are absolute, so replaying a change is harmless.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional
+import numpy as np
+import redis
+from dotenv import load_dotenv
+
+from backend.framework_search import FRAMEWORK_PATH, FrameworkIndex, get_framework_index
+from backend.report_service import get_skill_counts_batch, iter_candidate_ids, validate_export_filter
+from backend.schema_config import canonical_skill
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Redis DB 0 (same instance as chat history)
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
+
+# Evidence points at which a skill counts as fully shown
+MATCH_EVIDENCE_SATURATION = float(os.getenv("MATCH_EVIDENCE_SATURATION", 3))
+# Most often the engine looks for candidates whose evidence changed
+MATCH_REFRESH_SECONDS = float(os.getenv("MATCH_REFRESH_SECONDS", 2))
+MATCH_STREAM_MAXLEN = int(os.getenv("MATCH_STREAM_MAXLEN", 1_000_000))
+MATCH_MAX_K = int(os.getenv("MATCH_MAX_K", 100))
+MATCH_MAX_ROLES = int(os.getenv("MATCH_MAX_ROLES", 100))
+# Candidates per skill-count query when loading or refreshing
+MATCH_LOAD_CHUNK_SIZE = int(os.getenv("MATCH_LOAD_CHUNK_SIZE", 2000))
+
+CHANGES_STREAM = "match:changed"
+# Rebuild the skill postings once this many rows changed since the last build
+REINDEX_MIN_ROWS = 1000
+REINDEX_STALE_FRACTION = 0.02
+
+
+def publish_candidate_changes(session_ids: Iterable[str], client: redis.Redis = None) -> None:
+    """Worker hook: these candidates have new evidence in the graph."""
+    session_ids = set(session_ids)
+    if not session_ids:
+        return
+    pipe = (client or redis_client).pipeline(transaction=False)
+    for session_id in session_ids:
+        pipe.xadd(CHANGES_STREAM, {"session_id": session_id}, maxlen=MATCH_STREAM_MAXLEN, approximate=True)
+    pipe.execute()
+
+
+def _chunks(items: Iterable[str], size: int) -> Iterator[list[str]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class MatchEngine:
+    """
+    Candidate strength matrix and role requirements over one framework.
+
+    Row r of the matrix is candidate session_ids[r]: its skills are
+    slot_skills[r] (skill ids, `sentinel` in unused slots) with strengths
+    slot_strengths[r]. Skill k's postings are posting_rows /
+    posting_strengths[posting_offsets[k]:posting_offsets[k + 1]].
+    `fetch_counts(session_ids)` returns {session_id: {skill: evidence
+    count}} (report_service.get_skill_counts_batch). Scoring and updates
+    hold one lock.
+    """
+
+    def __init__(
+        self,
+        framework: FrameworkIndex,
+        fetch_counts: Callable[[list[str]], dict],
+        client: Optional[redis.Redis] = None,
+        saturation: float = MATCH_EVIDENCE_SATURATION,
+        refresh_seconds: float = MATCH_REFRESH_SECONDS
+    ):
+        self.framework = framework
+        self.fetch_counts = fetch_counts
+        self.client = client
+        self.saturation = saturation
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+
+        # Framework skill positions -> skill ids (several codes may share a name)
+        self.skill_ids: dict[str, int] = {}
+        skill_of_position = np.array([
+            self.skill_ids.setdefault(canonical_skill(title) or title, len(self.skill_ids))
+            for title in framework.skill_titles
+        ], dtype=np.int32)
+        self.sentinel = len(self.skill_ids)
+
+        # Role r requires role_skill_ids[role_offsets[r]:role_offsets[r + 1]]
+        self.role_offsets = np.asarray(framework.role_offsets, dtype=np.int64)
+        self.role_skill_ids = skill_of_position[np.asarray(framework.role_skills, dtype=np.int64)]
+        levels = np.asarray(framework.role_levels, dtype=np.float64)
+        weights = np.where(np.isnan(levels), 1.0, levels)
+        role_of_entry = np.repeat(np.arange(len(self.role_offsets) - 1), np.diff(self.role_offsets))
+        totals = np.bincount(role_of_entry, weights, minlength=len(self.role_offsets) - 1)
+        self.role_weights = (weights / totals[role_of_entry]).astype(np.float32)
+
+        # Padded rows, grown by doubling (rows and slots)
+        self.slot_skills = np.full((1024, 8), self.sentinel, dtype=np.int32)
+        self.slot_strengths = np.zeros((1024, 8), dtype=np.float32)
+        self.session_ids: list[str] = []
+        self.rows: dict[str, int] = {}
+        self._build_postings()
+
+        self.last_change_id = "0-0"
+        self.last_refresh = 0.0
+        self.load_ms = 0.0
+        self.updates = 0
+
+    # --- Matrix updates ---
+
+    def _grow(self, rows: int, slots: int) -> None:
+        old_rows, old_slots = self.slot_skills.shape
+        if rows <= old_rows and slots <= old_slots:
+            return
+        shape = (
+            max(rows, 2 * old_rows) if rows > old_rows else old_rows,
+            max(slots, 2 * old_slots) if slots > old_slots else old_slots
+        )
+        skills = np.full(shape, self.sentinel, dtype=np.int32)
+        strengths = np.zeros(shape, dtype=np.float32)
+        skills[:old_rows, :old_slots] = self.slot_skills
+        strengths[:old_rows, :old_slots] = self.slot_strengths
+        self.slot_skills, self.slot_strengths = skills, strengths
+
+    def set_counts(self, counts_by_session: dict[str, dict[str, int]]) -> None:
+        """Replace these candidates' rows with their current evidence counts."""
+        with self._lock:
+            for session_id, counts in counts_by_session.items():
+                # Skills no role requires cannot score
+                required = [(self.skill_ids[skill], n) for skill, n in counts.items() if skill in self.skill_ids and n > 0]
+                row = self.rows.get(session_id)
+                if row is None:
+                    row = self.rows[session_id] = len(self.session_ids)
+                    self.session_ids.append(session_id)
+                elif row < self.indexed_rows:
+                    self.stale_rows.add(row)
+                self._grow(row + 1, len(required))
+                self.slot_skills[row] = self.sentinel
+                self.slot_strengths[row] = 0
+                if required:
+                    skill_ids, values = zip(*required)
+                    self.slot_skills[row, :len(required)] = skill_ids
+                    self.slot_strengths[row, :len(required)] = np.minimum(np.asarray(values, dtype=np.float32) / self.saturation, 1.0)
+            self.updates += len(counts_by_session)
+
+    def load(self, session_ids: Iterable[str], chunk_size: int = MATCH_LOAD_CHUNK_SIZE) -> None:
+        """Initial load; changes published from now on are applied by refresh()."""
+        start = time.perf_counter()
+        self.last_change_id = self._latest_change_id()
+        for chunk in _chunks(session_ids, chunk_size):
+            counts = self.fetch_counts(chunk)
+            self.set_counts({session_id: counts.get(session_id, {}) for session_id in chunk})
+        with self._lock:
+            self._build_postings()
+        self.last_refresh = time.monotonic()
+        self.load_ms = (time.perf_counter() - start) * 1e3
+
+    def _latest_change_id(self) -> str:
+        if self.client is None:
+            return "0-0"
+        try:
+            latest = self.client.xrevrange(CHANGES_STREAM, count=1)
+        except redis.RedisError as e:
+            logger.warning("Match engine: change stream unavailable: %s", e)
+            return "0-0"
+        return latest[0][0] if latest else "0-0"
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Re-read the candidates published since the last refresh. Returns
+        how many were updated. Fails open: with Redis down the current
+        scores are served.
+        """
+        if self.client is None or (not force and time.monotonic() - self.last_refresh < self.refresh_seconds):
+            return 0
+        with self._lock:
+            self.last_refresh = time.monotonic()
+            changed = set()
+            try:
+                while True:
+                    batch = self.client.xread({CHANGES_STREAM: self.last_change_id}, count=10_000)
+                    if not batch:
+                        break
+                    entries = batch[0][1]
+                    changed.update(fields["session_id"] for _, fields in entries)
+                    self.last_change_id = entries[-1][0]
+            except redis.RedisError as e:
+                logger.warning("Match engine: change stream unavailable: %s", e)
+            for chunk in _chunks(changed, MATCH_LOAD_CHUNK_SIZE):
+                counts = self.fetch_counts(chunk)
+                self.set_counts({session_id: counts.get(session_id, {}) for session_id in chunk})
+            return len(changed)
+
+    # --- Scoring ---
+
+    def role_position(self, sector_id: str, track_id: str, role_id: str) -> Optional[int]:
+        return self.framework.role_keys.get(f"{sector_id}/{track_id}/{role_id}")
+
+    def _role_entries(self, roles: list[int]) -> tuple[np.ndarray, np.ndarray]:
+        """Indexes into role_skill_ids / role_weights of each role's skills, and their role (0..len(roles))."""
+        roles = np.asarray(roles, dtype=np.int64)
+        starts = self.role_offsets[roles]
+        lengths = self.role_offsets[roles + 1] - starts
+        entries = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return entries, np.repeat(np.arange(len(roles)), lengths)
+
+    def requirement_matrix(self, roles: list[int]) -> np.ndarray:
+        """Dense (skills + sentinel) x roles requirement weights; the sentinel row is 0."""
+        entries, role_of_entry = self._role_entries(roles)
+        weights = np.zeros((self.sentinel + 1, len(roles)), dtype=np.float32)
+        np.add.at(weights, (self.role_skill_ids[entries], role_of_entry), self.role_weights[entries])
+        return weights
+
+    def _build_postings(self) -> None:
+        """Skill-major (CSC) copy of the rows: which candidates show each skill, how strongly."""
+        n = len(self.session_ids)
+        skills = self.slot_skills[:n]
+        used = skills != self.sentinel
+        rows = np.nonzero(used)[0].astype(np.int32)
+        skills = skills[used]
+        order = np.argsort(skills, kind="stable")
+        self.posting_rows = rows[order]
+        self.posting_strengths = self.slot_strengths[:n][used][order]
+        self.posting_offsets = np.zeros(self.sentinel + 1, dtype=np.int64)
+        np.cumsum(np.bincount(skills, minlength=self.sentinel), out=self.posting_offsets[1:])
+        self.indexed_rows = n
+        self.stale_rows = set()
+
+    def _scores(self, roles: list[int]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (roles x candidates) scores and the dense requirement matrix. One
+        bincount over the postings of every (role, skill) pair; rows
+        updated since the postings were built are rescored from the rows.
+        """
+        n = len(self.session_ids)
+        stale = len(self.stale_rows) + n - self.indexed_rows
+        if stale > max(REINDEX_MIN_ROWS, n * REINDEX_STALE_FRACTION):
+            self._build_postings()
+
+        entries, role_of_entry = self._role_entries(roles)
+        skills = self.role_skill_ids[entries]
+        starts = self.posting_offsets[skills]
+        lengths = self.posting_offsets[skills + 1] - starts
+        postings = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        cells = np.repeat(role_of_entry * n, lengths) + self.posting_rows[postings]
+        values = self.posting_strengths[postings] * np.repeat(self.role_weights[entries], lengths)
+        scores = np.bincount(cells, values, minlength=len(roles) * n).astype(np.float32).reshape(len(roles), n)
+
+        weights = self.requirement_matrix(roles)
+        changed = np.fromiter(self.stale_rows, dtype=np.int64, count=len(self.stale_rows))
+        changed = np.concatenate([changed, np.arange(self.indexed_rows, n)])
+        if len(changed):
+            # (rows, slots) strengths . (rows, slots, roles) weights of the slot skills
+            scores[:, changed] = np.einsum(
+                "cs,csr->rc", self.slot_strengths[changed], weights[self.slot_skills[changed]]
+            )
+        return scores, weights
+
+    def scores(self, roles: list[int]) -> np.ndarray:
+        """(candidates x roles) fit scores."""
+        with self._lock:
+            return self._scores(roles)[0].T
+
+    def top_k(self, roles: list[int], k: int) -> list[list[dict]]:
+        """Best `k` candidates (score > 0) per role, best first."""
+        with self._lock:
+            scores, weights = self._scores(roles)
+            k = min(k, scores.shape[1])
+            if k == 0:
+                return [[] for _ in roles]
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            order = np.argsort(-best_scores, axis=1, kind="stable")
+            best = np.take_along_axis(best, order, axis=1)
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+
+            results = []
+            for j in range(len(roles)):
+                rows = best[j, best_scores[j] > 0]
+                shown = (weights[self.slot_skills[rows], j] > 0).sum(axis=1)
+                results.append([
+                    {
+                        "session_id": self.session_ids[row],
+                        "score": round(float(scores[j, row]), 4),
+                        "skills_evidenced": int(count)
+                    }
+                    for row, count in zip(rows, shown)
+                ])
+            return results
+
+    def rank(self, roles: list[int], k: int = 20) -> dict:
+        """Top-k candidates for each role position, with the role records."""
+        self.refresh()
+        k = max(1, min(k, MATCH_MAX_K))
+        start = time.perf_counter()
+        ranked = self.top_k(roles, k)
+        return {
+            "k": k,
+            "candidates_scored": len(self.session_ids),
+            "results": [
+                {"role": self.framework.role_record(r), "candidates": candidates}
+                for r, candidates in zip(roles, ranked)
+            ],
+            "took_ms": round((time.perf_counter() - start) * 1e3, 3)
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = len(self.session_ids)
+            return {
+                "candidates": n,
+                "framework_skills": self.sentinel,
+                "roles": len(self.role_offsets) - 1,
+                "slots_per_candidate": self.slot_skills.shape[1],
+                "skills_per_candidate": round(float((self.slot_skills[:n] != self.sentinel).sum()) / n, 1) if n else 0.0,
+                "matrix_mb": round((
+                    self.slot_skills.nbytes + self.slot_strengths.nbytes
+                    + self.posting_rows.nbytes + self.posting_strengths.nbytes + self.posting_offsets.nbytes
+                ) / 1e6, 1),
+                "rows_pending_reindex": len(self.stale_rows) + n - self.indexed_rows,
+                "updates": self.updates,
+                "last_change_id": self.last_change_id,
+                "load_ms": round(self.load_ms, 1)
+            }
+
+
+# --- Process-wide engine ---
+
+_engine: Optional[MatchEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_match_engine() -> MatchEngine:
+    """
+    The engine, loaded from Neo4j on first use (raises FileNotFoundError
+    without a generated framework).
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = MatchEngine(get_framework_index(), get_skill_counts_batch, redis_client)
+                engine.load(iter_candidate_ids(validate_export_filter({}), MATCH_LOAD_CHUNK_SIZE))
+                _engine = engine
+    return _engine
+
+
+def load_match_engine_in_background() -> None:
+    """Load the matrix off the request path at startup, if the framework has been generated."""
+    if not os.path.exists(FRAMEWORK_PATH):
+        return
+
+    def load():
+        try:
+            get_match_engine()
+        except Exception as e:
+            logger.warning("Match engine not loaded: %s", e)
+
+    threading.Thread(target=load, name="match-engine", daemon=True).start()
+
+
+def resolve_roles(roles: list) -> list[int]:
+    """
+    Role positions for "sector_id/track_id/role_id" keys or
+    {"sector_id", "track_id", "role_id"} objects. Raises ValueError.
+    """
+    if not isinstance(roles, list) or not roles:
+        raise ValueError("roles must be a non-empty list")
+    if len(roles) > MATCH_MAX_ROLES:
+        raise ValueError(f"At most {MATCH_MAX_ROLES} roles per request")
+    engine = get_match_engine()
+    positions, unknown = [], []
+    for role in roles:
+        if isinstance(role, dict):
+            key = "/".join(str(role.get(part, "")) for part in ("sector_id", "track_id", "role_id"))
+        else:
+            key = str(role)
+        position = engine.framework.role_keys.get(key)
+        if position is None:
+            unknown.append(str(role))
+        else:
+            positions.append(position)
+    if unknown:
+        raise ValueError(f"Unknown role: {', '.join(unknown)}")
+    return positions
+
+
+def rank_candidates(roles: list, k: int = 20) -> dict:
+    """Top-k candidates for each of `roles` (see resolve_roles)."""
+    return get_match_engine().rank(resolve_roles(roles), k)
+
+
+def rank_candidates_for_role(sector_id: str, track_id: str, role_id: str, k: int = 20) -> Optional[dict]:
+    """Top-k candidates for one role, or None if there is no such role."""
+    engine = get_match_engine()
+    position = engine.role_position(sector_id, track_id, role_id)
+    if position is None:
+        return None
+    result = engine.rank([position], k)
+    ranked = result.pop("results")[0]
+    return {**ranked, **result}
+
+
+def get_match_stats() -> dict:
+    return get_match_engine().stats()
@@ -0,0 +1,263 @@
+# metrics.py
+"""
+Metrics - per-stage latency histograms and counters for Prometheus.
+Each stage of a chat turn and of the cold path is timed separately
+(Redis, Celery enqueue, LLM, Neo4j, Celery task run and queue wait), so a
+slow /api/chat can be attributed to one of them. Served as text from
+/metrics on both the Flask and the FastAPI app.
+
+Recording is a perf_counter pair plus one histogram observe (about 4 us
+per stage, against milliseconds of I/O), cheap enough to leave on in production; METRICS_ENABLED=false
+turns every timer into a no-op.
+
+With several processes per host (gunicorn/uvicorn workers, the Celery
+prefork pool) set PROMETHEUS_MULTIPROC_DIR to an empty shared directory:
+every process then writes its samples there and /metrics on any of them
+serves the aggregate, worker task timings included.
+"""
+
+import os
+import time
+from datetime import datetime
+from typing import Optional
+from dotenv import load_dotenv
+from celery.signals import task_postrun, task_prerun
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server
+)
+
+from backend.tracing import ENQUEUED_AT_HEADER, start_stage_span
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Sub-millisecond Redis round trips up to multi-second LLM calls
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+REDIS_SECONDS = Histogram(
+    "ubeu_redis_op_seconds", "Chat history Redis operations (one round trip each)",
+    ["op"], buckets=LATENCY_BUCKETS
+)
+CELERY_ENQUEUE_SECONDS = Histogram(
+    "ubeu_celery_enqueue_seconds", "Time to publish a task to the Celery broker",
+    ["task"], buckets=LATENCY_BUCKETS
+)
+LLM_SECONDS = Histogram(
+    "ubeu_llm_request_seconds", "OpenAI chat completion latency (full reply)",
+    ["purpose", "model"], buckets=LATENCY_BUCKETS
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "ubeu_llm_first_token_seconds", "Time to the first streamed token",
+    ["purpose", "model"], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "ubeu_llm_tokens", "OpenAI tokens used",
+    ["purpose", "model", "kind"]
+)
+NEO4J_SECONDS = Histogram(
+    "ubeu_neo4j_query_seconds", "Neo4j query/transaction latency including result consumption",
+    ["query"], buckets=LATENCY_BUCKETS
+)
+TASK_SECONDS = Histogram(
+    "ubeu_celery_task_seconds", "Celery task run time",
+    ["task", "state"], buckets=LATENCY_BUCKETS
+)
+TASK_QUEUE_WAIT_SECONDS = Histogram(
+    "ubeu_celery_queue_wait_seconds", "Time from publish (or ETA) until a worker starts the task",
+    ["task"], buckets=LATENCY_BUCKETS
+)
+EVIDENCE_FRESHNESS_SECONDS = Histogram(
+    "ubeu_evidence_freshness_seconds", "Candidate message received until its evidence is in the report",
+    ["path"], buckets=LATENCY_BUCKETS + (60.0, 120.0, 300.0)
+)
+LLM_LIMITER_WAIT_SECONDS = Histogram(
+    "ubeu_llm_limiter_wait_seconds", "Time an LLM call waited for rate limiter capacity",
+    ["purpose"], buckets=(0.0,) + LATENCY_BUCKETS + (60.0, 120.0)
+)
+LLM_LIMITER_TIMEOUTS = Counter(
+    "ubeu_llm_limiter_timeouts", "LLM calls that reached their deadline without capacity",
+    ["purpose"]
+)
+GRAPH_SPOOL_ROWS = Counter(
+    "ubeu_graph_spool_rows", "Observation rows spooled to disk while Neo4j was unhealthy, and replayed",
+    ["event"]
+)
+GRAPH_BREAKER_TRANSITIONS = Counter(
+    "ubeu_graph_breaker_transitions", "Neo4j write circuit breaker state changes",
+    ["state"]
+)
+STAGE_ERRORS = Counter(
+    "ubeu_stage_errors", "Exceptions raised inside a timed stage",
+    ["stage"]
+)
+
+# (histogram, stage, *label values) -> (histogram child, error counter child)
+_children: dict[tuple, tuple] = {}
+
+# task_id -> perf_counter at task_prerun (one entry per task in flight)
+_task_started: dict[str, float] = {}
+
+
+class StageTimer:
+    """
+    Time a block into `histogram` with `labels`; an exception escaping the
+    block is also counted in STAGE_ERRORS under `stage`. Label children
+    are resolved once per label set and reused. With tracing enabled the
+    block is also a span named "<stage>.<label values>".
+    """
+
+    __slots__ = ("child", "errors", "name", "span", "start")
+
+    def __init__(self, histogram: Histogram, stage: str, **labels):
+        key = (histogram, stage, *labels.values())
+        children = _children.get(key)
+        if children is None:
+            children = _children[key] = (
+                histogram.labels(**labels),
+                STAGE_ERRORS.labels(stage=stage),
+                ".".join((stage, *labels.values()))
+            )
+        self.child, self.errors, self.name = children
+
+    def __enter__(self):
+        self.span = start_stage_span(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if METRICS_ENABLED:
+            self.child.observe(time.perf_counter() - self.start)
+            if exc_type is not None and issubclass(exc_type, Exception):
+                self.errors.inc()
+        if self.span is not None:
+            self.span.end(exc)
+        return False
+
+
+def redis_op(op: str):
+    return StageTimer(REDIS_SECONDS, "redis", op=op)
+
+
+def celery_enqueue(task: str):
+    return StageTimer(CELERY_ENQUEUE_SECONDS, "celery_enqueue", task=task)
+
+
+def llm_request(purpose: str, model: str):
+    return StageTimer(LLM_SECONDS, "llm", purpose=purpose, model=model)
+
+
+def neo4j_query(query: str):
+    return StageTimer(NEO4J_SECONDS, "neo4j", query=query)
+
+
+def record_llm_usage(purpose: str, model: str, usage) -> None:
+    """Count prompt/completion tokens from an OpenAI `usage` object (if any)."""
+    if not METRICS_ENABLED or usage is None:
+        return
+    LLM_TOKENS.labels(purpose=purpose, model=model, kind="prompt").inc(usage.prompt_tokens or 0)
+    LLM_TOKENS.labels(purpose=purpose, model=model, kind="completion").inc(usage.completion_tokens or 0)
+
+
+def record_llm_duration(purpose: str, model: str, started: float) -> None:
+    """Full duration of a streamed reply; `started` is the perf_counter before the request."""
+    if METRICS_ENABLED:
+        LLM_SECONDS.labels(purpose=purpose, model=model).observe(time.perf_counter() - started)
+
+
+def record_freshness(path: str, lag: Optional[float]) -> None:
+    """Message-to-report lag of one segment (see tracing.record_evidence_visible)."""
+    if METRICS_ENABLED and lag is not None:
+        EVIDENCE_FRESHNESS_SECONDS.labels(path=path).observe(lag)
+
+
+def record_limiter_wait(purpose: str, waited: float) -> None:
+    """Seconds an LLM call queued in llm_limiter before it got capacity."""
+    if METRICS_ENABLED:
+        LLM_LIMITER_WAIT_SECONDS.labels(purpose=purpose).observe(waited)
+
+
+def record_limiter_timeout(purpose: str) -> None:
+    if METRICS_ENABLED:
+        LLM_LIMITER_TIMEOUTS.labels(purpose=purpose).inc()
+
+
+def record_spool_rows(event: str, rows: int) -> None:
+    """`event` is "spooled" or "replayed"."""
+    if METRICS_ENABLED:
+        GRAPH_SPOOL_ROWS.labels(event=event).inc(rows)
+
+
+def record_breaker_state(state: str) -> None:
+    if METRICS_ENABLED:
+        GRAPH_BREAKER_TRANSITIONS.labels(state=state).inc()
+
+
+def record_first_token(purpose: str, model: str, started: float) -> None:
+    """`started` is the perf_counter taken before the streaming request."""
+    if METRICS_ENABLED:
+        LLM_FIRST_TOKEN_SECONDS.labels(purpose=purpose, model=model).observe(time.perf_counter() - started)
+
+
+# --- Celery task timing (the publish time header is stamped in tracing) ---
+
+@task_prerun.connect
+def start_task_timer(task_id: str = None, task=None, **kwargs):
+    """Worker: record queue wait (publish, or ETA for countdown tasks, to start)."""
+    if not METRICS_ENABLED or task is None:
+        return
+    _task_started[task_id] = time.perf_counter()
+
+    enqueued_at = getattr(task.request, ENQUEUED_AT_HEADER, None)
+    if enqueued_at is None:  # Eager execution or a publisher without metrics
+        return
+    ready_at = float(enqueued_at)
+    eta = task.request.eta
+    if eta:
+        ready_at = max(ready_at, datetime.fromisoformat(eta).timestamp())
+    TASK_QUEUE_WAIT_SECONDS.labels(task=task.name).observe(max(0.0, time.time() - ready_at))
+
+
+@task_postrun.connect
+def stop_task_timer(task_id: str = None, task=None, state: Optional[str] = None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is None or task is None:
+        return
+    TASK_SECONDS.labels(task=task.name, state=state or "UNKNOWN").observe(time.perf_counter() - started)
+
+
+# --- Exposition ---
+
+def _registry() -> CollectorRegistry:
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_payload() -> tuple[bytes, str]:
+    """Body and content type for a /metrics response."""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int) -> None:
+    """Serve /metrics on `port` from a background thread (Celery worker)."""
+    start_http_server(port, registry=_registry())
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a finished process's live samples from the multiprocess directory."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,285 @@
+# ontology.py
+"""
+Ontology - precompiled skill/trait index for validating LLM output.
+Maps whatever name the extraction produced ("problem-solving",
+"Openness to Experience", "Colaboration") to the canonical name used as
+the graph key, in O(1) for exact/normalised/synonym matches. Only names
+that survive all of that fall back to a bounded edit-distance search, and
+every resolution (hit or miss) is memoised.
+
+Can be extended with the TSC/CCS catalogue written by process_excel.py,
+so validation stays constant time with thousands of skills.
+"""
+
+import json
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Iterable, Optional
+
+# Domain given to catalogue skills that are not Critical Core Skills
+TSC_DOMAIN = "Technical Skills and Competencies"
+
+# Memoised raw-name resolutions kept per index before the memo is reset
+RESOLVED_CACHE_SIZE = 10_000
+
+# Word-level rewrites applied during normalisation
+_PUNCTUATION = re.compile(r"[^\w\s]|_")
+_WORD_REWRITES = {"&": " and ", "+": " and "}
+# Trailing words the LLM tacks on ("Communication skills")
+_NOISE_SUFFIXES = ("skills", "skill", "ability", "abilities", "trait")
+
+# Normalised variant -> canonical name. Only unambiguous wording drift;
+# anything else should fail validation rather than guess.
+SKILL_SYNONYMS = {
+    "creativity": "Creative Thinking",
+    "creative problem solving": "Creative Thinking",
+    "decisiveness": "Decision Making",
+    "problem solver": "Problem Solving",
+    "sensemaking": "Sense Making",
+    "interdisciplinary thinking": "Transdisciplinary Thinking",
+    "inclusivity": "Building Inclusivity",
+    "inclusion": "Building Inclusivity",
+    "teamwork": "Collaboration",
+    "team work": "Collaboration",
+    "collaborating": "Collaboration",
+    "communicating": "Communication",
+    "customer focus": "Customer Orientation",
+    "customer service": "Customer Orientation",
+    "customer centricity": "Customer Orientation",
+    "mentoring": "Developing People",
+    "coaching": "Developing People",
+    "people development": "Developing People",
+    "influencing": "Influence",
+    "persuasion": "Influence",
+    "adaptable": "Adaptability",
+    "flexibility": "Adaptability",
+    "digital literacy": "Digital Fluency",
+    "global mindset": "Global Perspective",
+    "global awareness": "Global Perspective",
+    "learning agile": "Learning Agility",
+    "self management": "Self Management",
+    "self discipline": "Self Management",
+}
+
+TRAIT_SYNONYMS = {
+    "openness to experience": "Openness",
+    "open": "Openness",
+    "conscientious": "Conscientiousness",
+    "extroversion": "Extraversion",
+    "extraverted": "Extraversion",
+    "extroverted": "Extraversion",
+    "agreeable": "Agreeableness",
+    "neurotic": "Neuroticism",
+}
+
+
+def normalise_name(name: str) -> str:
+    """
+    Canonical lookup form: NFKC, casefolded, '&'/'+' spelled out,
+    punctuation and underscores treated as spaces, whitespace collapsed,
+    trailing noise words ("skills") dropped.
+    """
+    text = unicodedata.normalize("NFKC", name).casefold()
+    for symbol, word in _WORD_REWRITES.items():
+        text = text.replace(symbol, word)
+    words = _PUNCTUATION.sub(" ", text).split()
+    while len(words) > 1 and words[-1] in _NOISE_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def max_edit_distance(key: str) -> int:
+    """Typos tolerated for a normalised key of this length."""
+    if len(key) < 5:
+        return 0
+    return 1 if len(key) < 10 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal-string-alignment distance (adjacent transpositions count 1),
+    abandoning early once every cell in a row exceeds `limit`.
+    Returns limit + 1 for anything further apart than `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class NameIndex:
+    """
+    Normalised-key index for one kind of name (skills or traits).
+
+    Exact and normalised keys resolve with one dict lookup. Misses go
+    through a length-bucketed edit-distance scan that only accepts a
+    single unambiguous closest key. Results are memoised per raw name.
+    """
+
+    def __init__(self):
+        self.canonical: dict[str, str] = {}     # normalised key -> canonical name
+        self._by_length: dict[int, list[str]] = {}
+        self._resolved: dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, canonical: str, fuzzy: bool = True) -> None:
+        """Register a normalised key. Existing keys keep their first mapping."""
+        if not key or key in self.canonical:
+            return
+        self.canonical[key] = canonical
+        if fuzzy:
+            self._by_length.setdefault(len(key), []).append(key)
+        with self._lock:
+            self._resolved.clear()
+
+    def _closest(self, key: str) -> Optional[str]:
+        limit = max_edit_distance(key)
+        if not limit:
+            return None
+        best, best_distance, ambiguous = None, limit + 1, False
+        for length in range(len(key) - limit, len(key) + limit + 1):
+            for candidate in self._by_length.get(length, ()):
+                distance = edit_distance(key, candidate, limit)
+                if distance < best_distance:
+                    best, best_distance, ambiguous = candidate, distance, False
+                elif distance == best_distance and self.canonical[candidate] != self.canonical.get(best):
+                    ambiguous = True
+        if best is None or ambiguous:
+            return None
+        return self.canonical[best]
+
+    def resolve(self, name: str) -> Optional[str]:
+        cached = self._resolved.get(name, self)
+        if cached is not self:
+            return cached
+
+        canonical = self.canonical.get(name)
+        if canonical is None:
+            key = normalise_name(name)
+            canonical = self.canonical.get(key) or self._closest(key)
+
+        with self._lock:
+            if len(self._resolved) >= RESOLVED_CACHE_SIZE:
+                self._resolved.clear()
+            self._resolved[name] = canonical
+        return canonical
+
+    def __len__(self) -> int:
+        return len(self.canonical)
+
+
+class Ontology:
+    """
+    Compiled skill and trait ontology.
+
+    Canonical skill names are the graph keys (Skill.name). Lookups accept
+    the canonical name itself, any normalised variant, a registered
+    synonym or code, or a close misspelling.
+    """
+
+    def __init__(
+        self,
+        hierarchy: dict[str, list[str]],
+        traits: list[str],
+        skill_synonyms: Optional[dict[str, str]] = None,
+        trait_synonyms: Optional[dict[str, str]] = None
+    ):
+        self.skill_domains: dict[str, str] = {}
+        self.traits: frozenset[str] = frozenset(traits)
+        self.skills = NameIndex()
+        self.trait_index = NameIndex()
+
+        for domain, skills in hierarchy.items():
+            for skill in skills:
+                self.add_skill(skill, domain)
+        for variant, skill in (skill_synonyms or {}).items():
+            self.skills.add(normalise_name(variant), skill)
+
+        # Traits are exact-or-synonym only: antonyms sit within edit distance
+        # of each other ("introversion" vs "extroversion"), and a fuzzy hit
+        # would record the intensity against the opposite trait
+        for trait in traits:
+            self.trait_index.add(trait, trait, fuzzy=False)
+            self.trait_index.add(normalise_name(trait), trait, fuzzy=False)
+        for variant, trait in (trait_synonyms or {}).items():
+            self.trait_index.add(normalise_name(variant), trait, fuzzy=False)
+
+    def add_skill(self, name: str, domain: str, aliases: Iterable[str] = ()) -> str:
+        """
+        Register a skill (and optional aliases such as a TSC code).
+        A name that already normalises to a known skill is folded into it.
+        Returns the canonical name.
+        """
+        canonical = self.skills.canonical.get(normalise_name(name), name)
+        if canonical == name and name not in self.skill_domains:
+            self.skill_domains[name] = domain
+            self.skills.add(name, name, fuzzy=False)
+            self.skills.add(normalise_name(name), name)
+        for alias in aliases:
+            self.skills.add(alias, canonical, fuzzy=False)
+        return canonical
+
+    def canonical_skill(self, name: Optional[str]) -> Optional[str]:
+        return self.skills.resolve(name) if name else None
+
+    def canonical_trait(self, name: Optional[str]) -> Optional[str]:
+        return self.trait_index.resolve(name) if name else None
+
+    def skill_domain(self, name: Optional[str]) -> Optional[str]:
+        canonical = self.canonical_skill(name)
+        return self.skill_domains.get(canonical) if canonical else None
+
+    def load_catalogue(self, path: str | Path) -> int:
+        """
+        Add every skill of a process_excel.py catalogue: the sharded layout
+        (the framework directory or its index.json), the generated
+        `export const sectors = [...]` TypeScript module, or that structure
+        as JSON. TSC codes become aliases; titles matching a Critical Core
+        Skill are folded into it. Returns the number of distinct skill
+        codes read.
+        """
+        path = Path(path)
+        if path.is_dir():
+            path = path / "index.json"
+
+        codes = {}
+        raw = path.read_text(encoding="utf-8").strip()
+        if raw.startswith("{"):
+            # Sharded: the index names one shard per sector, each holding a
+            # code -> [title, description] table
+            for sector in json.loads(raw)["sectors"]:
+                shard = json.loads((path.parent / "sectors" / sector["shard"]).read_text(encoding="utf-8"))
+                for code, (title, _) in shard["skills"].items():
+                    codes.setdefault(code, title)
+        else:
+            if not raw.startswith("["):
+                raw = raw[raw.index("=") + 1:].strip().rstrip(";")
+            for sector in json.loads(raw):
+                for track in sector.get("tracks", []):
+                    for role in track.get("roles", []):
+                        for skill in role.get("skills", []):
+                            codes.setdefault(skill["id"], skill["label"])
+
+        for code, title in codes.items():
+            self.add_skill(title, TSC_DOMAIN, aliases=[code])
+        return len(codes)
+
+    def stats(self) -> dict:
+        return {
+            "skills": len(self.skill_domains),
+            "skill_keys": len(self.skills),
+            "traits": len(self.traits),
+            "trait_keys": len(self.trait_index)
+        }
@@ -4,26 +4,74 @@ Report Service - Query structured data from Neo4j knowledge graph.
 Generates assessment reports from extracted skills and traits.
 """
 
+import json
 import os
-from typing import Optional
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
 from collections import defaultdict
 from dotenv import load_dotenv
 
+from backend.graph_driver import get_neo4j_driver
+from backend.metrics import neo4j_query
+
 load_dotenv()
 
-# Neo4j connection (lazy loaded)
-_neo4j_driver = None
+# Candidates per pair of batched export queries (bounds export memory)
+REPORT_EXPORT_CHUNK_SIZE = int(os.getenv("REPORT_EXPORT_CHUNK_SIZE", 500))
+
+# Same rows as get_skills_with_evidence / get_traits_with_evidence, for
+# many candidates at once, one row per candidate that has any
+SKILLS_BATCH_QUERY = """
+UNWIND $session_ids AS session_id
+MATCH (c:Candidate {session_id: session_id})-[:DEMONSTRATED]->(e:Evidence)-[:INDICATES]->(s:Skill)
+WITH session_id, s.name AS skill, s.domain AS domain, collect(e.text) AS evidence_points
+ORDER BY domain, skill
+RETURN session_id, collect({skill: skill, domain: domain, evidence_points: evidence_points}) AS skills
+"""
+
+TRAITS_BATCH_QUERY = """
+UNWIND $session_ids AS session_id
+MATCH (c:Candidate {session_id: session_id})-[:DEMONSTRATED]->(e:Evidence)-[r:INDICATES]->(t:Trait)
+WITH session_id, t.name AS trait, collect({text: e.text, intensity: r.intensity}) AS evidence_points
+ORDER BY trait
+RETURN session_id, collect({trait: trait, evidence_points: evidence_points}) AS traits
+"""
+
+# Evidence count per (candidate, skill), for match_engine
+SKILL_COUNTS_BATCH_QUERY = """
+UNWIND $session_ids AS session_id
+MATCH (c:Candidate {session_id: session_id})-[:DEMONSTRATED]->(e:Evidence)-[:INDICATES]->(s:Skill)
+RETURN session_id, s.name AS skill, count(e) AS evidence
+"""
+
+# One row per Evidence node with its id, for report_store rebuilds: the
+# document and the evidence ids it covers come from the same read
+REPORT_EVIDENCE_QUERY = """
+MATCH (c:Candidate {session_id: $session_id})-[:DEMONSTRATED]->(e:Evidence)
+OPTIONAL MATCH (e)-[:INDICATES]->(s:Skill)
+OPTIONAL MATCH (e)-[r:INDICATES]->(t:Trait)
+RETURN e.id AS evidence_id, e.text AS text, s.name AS skill, s.domain AS domain,
+       t.name AS trait, r.intensity AS intensity
+"""
+
+# Keyset paging over the session_id uniqueness index
+CANDIDATE_IDS_QUERY = """
+MATCH (c:Candidate)
+WHERE c.session_id > $after
+  AND ($prefix IS NULL OR c.session_id STARTS WITH $prefix)
+  AND ($since IS NULL OR c.created_at >= datetime($since))
+  AND ($until IS NULL OR c.created_at < datetime($until))
+RETURN c.session_id AS session_id
+ORDER BY c.session_id
+LIMIT $limit
+"""
 
-def get_neo4j_driver():
-    """Lazy load Neo4j driver."""
-    global _neo4j_driver
-    if _neo4j_driver is None:
-        from neo4j import GraphDatabase
-        uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-        user = os.getenv("NEO4J_USER", "neo4j")
-        password = os.getenv("NEO4J_PASSWORD", "password")
-        _neo4j_driver = GraphDatabase.driver(uri, auth=(user, password))
-    return _neo4j_driver
+EXPORT_FILTERS = ("prefix", "since", "until")
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+EXPORT_HEADERS = {
+    "Content-Disposition": 'attachment; filename="reports.ndjson"',
+    "X-Accel-Buffering": "no",  # Stream through nginx instead of buffering
+}
 
 
 def get_skills_with_evidence(session_id: str) -> list[dict]:
@@ -40,7 +88,7 @@ def get_skills_with_evidence(session_id: str) -> list[dict]:
     ORDER BY domain, skill
     """
     
-    with driver.session() as session:
+    with neo4j_query("skills_with_evidence"), driver.session() as session:
         result = session.run(query, session_id=session_id)
         return [record.data() for record in result]
 
@@ -60,11 +108,23 @@ def get_traits_with_evidence(session_id: str) -> list[dict]:
     ORDER BY trait
     """
     
-    with driver.session() as session:
+    with neo4j_query("traits_with_evidence"), driver.session() as session:
         result = session.run(query, session_id=session_id)
         return [record.data() for record in result]
 
 
+def get_report_evidence(session_id: str) -> list[dict]:
+    """
+    Every Evidence node of the candidate with its id, skill (and domain) and
+    trait (and intensity), in one query.
+    """
+    driver = get_neo4j_driver()
+
+    with neo4j_query("report_evidence"), driver.session() as session:
+        result = session.run(REPORT_EVIDENCE_QUERY, session_id=session_id)
+        return [record.data() for record in result]
+
+
 def get_candidate_report(session_id: str) -> dict:
     """
     Generate a complete assessment report for a candidate.
@@ -76,7 +136,14 @@ def get_candidate_report(session_id: str) -> dict:
     """
     skills_data = get_skills_with_evidence(session_id)
     traits_data = get_traits_with_evidence(session_id)
-    
+    return build_candidate_report(session_id, skills_data, traits_data)
+
+
+def build_candidate_report(session_id: str, skills_data: list[dict], traits_data: list[dict]) -> dict:
+    """
+    Assemble the report from skill and trait rows shaped like the results of
+    get_skills_with_evidence / get_traits_with_evidence.
+    """
     # Group skills by domain
     skills_by_domain = defaultdict(list)
     total_skill_evidence = 0
@@ -144,7 +211,7 @@ def get_domain_deep_dive(session_id: str, domain: str) -> dict:
     ORDER BY s.name, e.timestamp
     """
     
-    with driver.session() as session:
+    with neo4j_query("domain_deep_dive"), driver.session() as session:
         result = session.run(query, session_id=session_id, domain=domain)
         records = [record.data() for record in result]
     
@@ -160,3 +227,126 @@ def get_domain_deep_dive(session_id: str, domain: str) -> dict:
         "domain": domain,
         "skills": dict(skills)
     }
+
+
+def get_reports_data_batch(session_ids: list[str]) -> tuple[dict, dict]:
+    """
+    Skill and trait rows for many candidates in two UNWIND queries:
+    ({session_id: skills rows}, {session_id: traits rows}).
+    """
+    driver = get_neo4j_driver()
+    with driver.session() as session:
+        with neo4j_query("skills_with_evidence_batch"):
+            skills = {
+                record["session_id"]: record["skills"]
+                for record in session.run(SKILLS_BATCH_QUERY, session_ids=session_ids)
+            }
+        with neo4j_query("traits_with_evidence_batch"):
+            traits = {
+                record["session_id"]: record["traits"]
+                for record in session.run(TRAITS_BATCH_QUERY, session_ids=session_ids)
+            }
+    return skills, traits
+
+
+def get_skill_counts_batch(session_ids: list[str]) -> dict[str, dict[str, int]]:
+    """{session_id: {skill: evidence count}} for many candidates in one query."""
+    driver = get_neo4j_driver()
+    counts = defaultdict(dict)
+    with neo4j_query("skill_counts_batch"), driver.session() as session:
+        for record in session.run(SKILL_COUNTS_BATCH_QUERY, session_ids=session_ids):
+            counts[record["session_id"]][record["skill"]] = record["evidence"]
+    return dict(counts)
+
+
+def validate_export_filter(filters: dict) -> dict:
+    """
+    Normalise an export filter: `prefix` (session id prefix) and
+    `since` / `until` (ISO 8601 bounds on the candidate's creation time).
+    Raises ValueError on unknown keys or unparseable dates.
+    """
+    unknown = set(filters) - set(EXPORT_FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown filter: {', '.join(sorted(unknown))} (expected {', '.join(EXPORT_FILTERS)})")
+    for key in ("since", "until"):
+        if filters.get(key) is not None:
+            datetime.fromisoformat(str(filters[key]))
+    return {key: filters.get(key) for key in EXPORT_FILTERS}
+
+
+def parse_export_request(body: Optional[dict]) -> tuple[Optional[list[str]], Optional[dict]]:
+    """
+    (session_ids, filters) from a bulk export request body: either
+    {"session_ids": [...]} or {"filter": {"prefix", "since", "until"}}
+    ({"filter": {}} exports every candidate). Raises ValueError.
+    """
+    body = body or {}
+    session_ids = body.get("session_ids")
+    if session_ids is not None:
+        if not isinstance(session_ids, list) or not all(isinstance(sid, str) for sid in session_ids):
+            raise ValueError("session_ids must be a list of strings")
+        return session_ids, None
+    if isinstance(body.get("filter"), dict):
+        return None, validate_export_filter(body["filter"])
+    raise ValueError("session_ids or filter is required")
+
+
+def iter_candidate_ids(filters: dict, page_size: int = REPORT_EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Session ids of the candidates matching `filters`, in id order, a page at a time."""
+    driver = get_neo4j_driver()
+    after = ""
+    while True:
+        with neo4j_query("export_candidate_ids"), driver.session() as session:
+            page = [
+                record["session_id"]
+                for record in session.run(CANDIDATE_IDS_QUERY, after=after, limit=page_size, **filters)
+            ]
+        yield from page
+        if len(page) < page_size:
+            return
+        after = page[-1]
+
+
+def iter_candidate_reports(
+    session_ids: Iterable[str],
+    chunk_size: int = REPORT_EXPORT_CHUNK_SIZE
+) -> Iterator[dict]:
+    """
+    Reports (as get_candidate_report) for `session_ids`, in order, fetched
+    `chunk_size` candidates at a time; only one chunk is held in memory.
+    """
+    chunk = []
+    for session_id in session_ids:
+        chunk.append(session_id)
+        if len(chunk) == chunk_size:
+            yield from _chunk_reports(chunk)
+            chunk = []
+    if chunk:
+        yield from _chunk_reports(chunk)
+
+
+def _chunk_reports(session_ids: list[str]) -> Iterator[dict]:
+    skills, traits = get_reports_data_batch(session_ids)
+    for session_id in session_ids:
+        yield build_candidate_report(session_id, skills.get(session_id, []), traits.get(session_id, []))
+
+
+def export_reports_ndjson(
+    session_ids: Optional[list[str]] = None,
+    filters: Optional[dict] = None,
+    chunk_size: int = REPORT_EXPORT_CHUNK_SIZE
+) -> Iterator[str]:
+    """
+    Bulk export as NDJSON: one report per line, for `session_ids` (in the
+    given order, duplicates dropped) or every candidate matching `filters`.
+    An error mid-export ends the stream with an {"error": "..."} line.
+    """
+    if session_ids is not None:
+        ids = iter(dict.fromkeys(session_ids))
+    else:
+        ids = iter_candidate_ids(validate_export_filter(filters or {}), chunk_size)
+    try:
+        for report in iter_candidate_reports(ids, chunk_size):
+            yield json.dumps(report) + "\n"
+    except Exception as e:
+        yield json.dumps({"error": str(e)}) + "\n"
@@ -0,0 +1,304 @@
+# report_store.py
+"""
+Report Store - materialised, incrementally maintained candidate reports.
+The worker folds every batch of observations it writes to Neo4j into a
+per-session document in Redis, so serving /api/report is a single key
+lookup instead of two Cypher queries and a Python rebuild.
+"""
+
+import json
+import os
+import time
+from collections import Counter
+from typing import Iterable, Optional
+import redis
+from dotenv import load_dotenv
+
+from backend.report_service import build_candidate_report, get_report_evidence
+
+load_dotenv()
+
+# Redis DB 0 (same instance as chat history)
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
+
+REPORT_PREFIX = "report:"
+REPORT_TTL_SECONDS = int(os.getenv("REPORT_TTL_SECONDS", 60 * 60 * 24 * 30))
+
+# Folds observation rows into a materialised document atomically.
+# Returns 0 (without creating anything) when the document is missing, so a
+# partial document is never started; the caller rebuilds from the graph.
+# Rows whose evidence id is already in the session's applied set (KEYS[2])
+# are skipped, so a retried segment (or a replayed spool) is not counted
+# twice.
+#
+# Document: {"session_id", "updated_at",
+#            "skills": {name: {"domain", "evidence_points": [text]}},
+#            "traits": {name: {"intensities": {level: n},
+#                              "evidence_points": [{"text", "intensity"}]}}}
+APPLY_ROWS_SCRIPT = """
+local raw = redis.call('GET', KEYS[1])
+if not raw then
+    -- The rebuild reads these rows from the graph: mark them applied
+    for _, row in ipairs(cjson.decode(ARGV[1])) do
+        if row.evidence_id and row.evidence_id ~= cjson.null then
+            redis.call('SADD', KEYS[2], row.evidence_id)
+        end
+    end
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+    return 0
+end
+local doc = cjson.decode(raw)
+if type(doc.skills) ~= 'table' or next(doc.skills) == nil then doc.skills = {} end
+if type(doc.traits) ~= 'table' or next(doc.traits) == nil then doc.traits = {} end
+
+for _, row in ipairs(cjson.decode(ARGV[1])) do
+    local new_row = row.evidence_id == nil or row.evidence_id == cjson.null
+        or redis.call('SADD', KEYS[2], row.evidence_id) == 1
+    if new_row and row.skill and row.skill ~= cjson.null then
+        local skill = doc.skills[row.skill]
+        if not skill then
+            skill = {domain = row.skill_domain, evidence_points = {}}
+            doc.skills[row.skill] = skill
+        end
+        table.insert(skill.evidence_points, row.evidence)
+    end
+    if new_row and row.trait and row.trait ~= cjson.null then
+        local trait = doc.traits[row.trait]
+        if not trait then
+            trait = {intensities = {}, evidence_points = {}}
+            doc.traits[row.trait] = trait
+        end
+        trait.intensities[row.trait_intensity] = (trait.intensities[row.trait_intensity] or 0) + 1
+        table.insert(trait.evidence_points, {text = row.evidence, intensity = row.trait_intensity})
+    end
+end
+
+doc.updated_at = tonumber(ARGV[2])
+redis.call('SET', KEYS[1], cjson.encode(doc), 'EX', ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return 1
+"""
+
+# Replaces the document with a rebuild from the graph and resets the
+# applied set to the evidence ids that rebuild read (ARGV[2]), atomically.
+# Compare-and-set: if the applied set holds an id the rebuild did not read,
+# rows were folded in (or marked for a pending rebuild) after its graph
+# read, so the rebuild is stale and is dropped (returns 0).
+REPLACE_DOCUMENT_SCRIPT = """
+local ids = cjson.decode(ARGV[2])
+local read = {}
+for _, id in ipairs(ids) do read[id] = true end
+for _, id in ipairs(redis.call('SMEMBERS', KEYS[2])) do
+    if not read[id] then return 0 end
+end
+
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('DEL', KEYS[2])
+for i = 1, #ids, 1000 do
+    redis.call('SADD', KEYS[2], unpack(ids, i, math.min(i + 999, #ids)))
+end
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return 1
+"""
+
+
+def report_key(session_id: str) -> str:
+    return f"{REPORT_PREFIX}{session_id}"
+
+
+def applied_key(session_id: str) -> str:
+    """SET of Evidence ids already folded into the session's document."""
+    return f"{REPORT_PREFIX}{session_id}:applied"
+
+
+class ReportStore:
+    """Materialised per-session report documents in Redis."""
+
+    def __init__(self, client: redis.Redis, ttl_seconds: int = REPORT_TTL_SECONDS):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self._apply_rows = client.register_script(APPLY_ROWS_SCRIPT)
+        self._replace = client.register_script(REPLACE_DOCUMENT_SCRIPT)
+
+    def apply_rows(self, rows: Iterable[dict]) -> list[str]:
+        """
+        Fold graph_writer rows (any number of sessions) into their documents,
+        one script call per session in a single pipeline.
+        Returns the session ids that have no document yet.
+        """
+        by_session: dict[str, list[dict]] = {}
+        for row in rows:
+            by_session.setdefault(row["session_id"], []).append({
+                "skill": row["skill"],
+                "skill_domain": row["skill_domain"],
+                "trait": row["trait"],
+                "trait_intensity": row["trait_intensity"],
+                "evidence": row["evidence"],
+                "evidence_id": row.get("evidence_id")
+            })
+        if not by_session:
+            return []
+
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        for session_id, session_rows in by_session.items():
+            self._apply_rows(
+                keys=[report_key(session_id), applied_key(session_id)],
+                args=[json.dumps(session_rows), now, self.ttl_seconds],
+                client=pipe
+            )
+        applied = pipe.execute()
+
+        return [sid for sid, ok in zip(by_session, applied) if not ok]
+
+    def get(self, session_id: str) -> Optional[dict]:
+        """Raw materialised document, or None."""
+        raw = self.client.get(report_key(session_id))
+        return json.loads(raw) if raw else None
+
+    def replace(self, doc: dict, evidence_ids: list[str]) -> bool:
+        """
+        Store a document rebuilt from the graph, with the evidence ids that
+        graph read covered as the applied set (one script call). Returns
+        False, storing nothing, if rows newer than the read were applied.
+        """
+        session_id = doc["session_id"]
+        return bool(self._replace(
+            keys=[report_key(session_id), applied_key(session_id)],
+            args=[json.dumps(doc), json.dumps(evidence_ids), self.ttl_seconds]
+        ))
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(report_key(session_id), applied_key(session_id))
+
+
+report_store = ReportStore(redis_client)
+
+
+# --- Document <-> report conversion ---
+
+def document_from_graph(session_id: str, evidence: list[dict]) -> tuple[dict, list[str]]:
+    """
+    Build a materialised document from get_report_evidence rows.
+    Returns (document, ids of the Evidence nodes it covers).
+    """
+    skills: dict[str, dict] = {}
+    traits: dict[str, dict] = {}
+    evidence_ids = set()
+    for row in evidence:
+        if row.get("evidence_id"):
+            evidence_ids.add(row["evidence_id"])
+        if row.get("skill"):
+            skill = skills.setdefault(row["skill"], {"domain": row.get("domain"), "evidence_points": []})
+            skill["evidence_points"].append(row["text"])
+        if row.get("trait"):
+            intensity = row.get("intensity") or "Moderate"
+            trait = traits.setdefault(row["trait"], {"intensities": Counter(), "evidence_points": []})
+            trait["intensities"][intensity] += 1
+            trait["evidence_points"].append({"text": row["text"], "intensity": intensity})
+
+    for trait in traits.values():
+        trait["intensities"] = dict(trait["intensities"])
+    doc = {"session_id": session_id, "updated_at": time.time(), "skills": skills, "traits": traits}
+    return doc, sorted(evidence_ids)
+
+
+def report_rows_from_document(doc: dict) -> tuple[list[dict], list[dict]]:
+    """
+    Convert a document back into the row shapes of the live queries,
+    ordered the same way (domain, skill / trait).
+    """
+    skills = doc.get("skills") or {}
+    traits = doc.get("traits") or {}
+
+    skills_data = sorted(
+        (
+            {"skill": name, "domain": skill["domain"], "evidence_points": skill["evidence_points"]}
+            for name, skill in skills.items()
+        ),
+        key=lambda item: (item["domain"] or "", item["skill"])
+    )
+
+    traits_data = [
+        {"trait": name, "evidence_points": traits[name]["evidence_points"]}
+        for name in sorted(traits)
+    ]
+
+    return skills_data, traits_data
+
+
+# --- Public API ---
+
+def rebuild_report(session_id: str) -> dict:
+    """
+    Full rebuild of the materialised document from the live graph.
+    If rows were applied while the graph was read, the stored (newer)
+    document wins and is returned when there is one.
+    """
+    doc, evidence_ids = document_from_graph(session_id, get_report_evidence(session_id))
+    if report_store.replace(doc, evidence_ids):
+        return doc
+    return report_store.get(session_id) or doc
+
+
+def get_materialised_report(session_id: str) -> dict:
+    """
+    Serve the report from the materialised document (one GET), rebuilding
+    it from the graph if it does not exist yet.
+    """
+    doc = report_store.get(session_id) or rebuild_report(session_id)
+    return build_candidate_report(session_id, *report_rows_from_document(doc))
+
+
+def apply_observation_rows(rows: list[dict]) -> None:
+    """
+    Worker hook: fold freshly written rows into the materialised reports.
+    Sessions without a document yet are rebuilt from the graph, which
+    already contains these rows. When several rebuilds race, only one whose
+    graph read covers every applied row is stored.
+    """
+    for session_id in report_store.apply_rows(rows):
+        rebuild_report(session_id)
+
+
+def evidence_multiset(entry: dict) -> Counter:
+    """Evidence texts of a skill/trait entry, ignoring order."""
+    return Counter(
+        ep["text"] if isinstance(ep, dict) else ep
+        for ep in entry["evidence_points"]
+    )
+
+
+def verify_report(session_id: str) -> dict:
+    """
+    Consistency check of the materialised document against the live graph.
+    Compares evidence multisets per skill and trait, skill domains and
+    trait intensity tallies. Returns {"consistent": bool, "differences": [...]}.
+    """
+    doc = report_store.get(session_id)
+    if doc is None:
+        return {"session_id": session_id, "consistent": False, "differences": ["not materialised"]}
+
+    live, _ = document_from_graph(session_id, get_report_evidence(session_id))
+
+    differences = []
+    for kind in ("skills", "traits"):
+        stored, actual = doc.get(kind) or {}, live[kind]
+        for name in sorted(set(stored) | set(actual)):
+            if name not in actual:
+                differences.append(f"{kind[:-1]} '{name}' not in graph")
+            elif name not in stored:
+                differences.append(f"{kind[:-1]} '{name}' missing from materialised report")
+            elif evidence_multiset(stored[name]) != evidence_multiset(actual[name]):
+                differences.append(
+                    f"{kind[:-1]} '{name}' evidence differs "
+                    f"({len(stored[name]['evidence_points'])} stored vs {len(actual[name]['evidence_points'])} live)"
+                )
+            elif kind == "skills" and stored[name]["domain"] != actual[name]["domain"]:
+                differences.append(f"skill '{name}' domain differs")
+            elif kind == "traits" and {k: v for k, v in (stored[name].get("intensities") or {}).items() if v} != actual[name]["intensities"]:
+                differences.append(f"trait '{name}' intensity tallies differ")
+
+    return {"session_id": session_id, "consistent": not differences, "differences": differences}
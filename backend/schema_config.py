@@ -4,7 +4,11 @@ Strict ontology for interview skill and personality trait extraction.
 Defines CCS (Critical Core Skills) hierarchy and OCEAN traits.
 """
 
+import hashlib
 import json
+import os
+
+from backend.ontology import Ontology, SKILL_SYNONYMS, TRAIT_SYNONYMS
 
 # 1. Critical Core Skills (CCS) Hierarchy
 # Based on SkillsFuture Singapore framework
@@ -68,17 +72,43 @@ For each observation, return a JSON object with:
 - evidence: The exact quote supporting this classification
 """
 
+# Cache/version key for anything derived from the extraction prompt
+GRAPH_INSTRUCTIONS_VERSION = hashlib.sha256(GRAPH_INSTRUCTIONS.encode()).hexdigest()[:12]
+
+# Compiled once at import: O(1) validation and normalisation of LLM output.
+# SKILLS_CATALOGUE_PATH optionally adds the full TSC/CCS catalogue written by
+# process_excel.py (src/data/framework, or the single-file sectorsData.ts).
+ONTOLOGY = Ontology(CCS_HIERARCHY, OCEAN_TRAITS, SKILL_SYNONYMS, TRAIT_SYNONYMS)
+if os.getenv("SKILLS_CATALOGUE_PATH"):
+    ONTOLOGY.load_catalogue(os.getenv("SKILLS_CATALOGUE_PATH"))
+
 def get_skill_domain(skill_name: str) -> str | None:
     """Get the parent domain for a given skill."""
-    for domain, skills in CCS_HIERARCHY.items():
-        if skill_name in skills:
-            return domain
-    return None
+    return ONTOLOGY.skill_domain(skill_name)
+
+def canonical_skill(skill_name: str | None) -> str | None:
+    """Canonical ontology name for an LLM-produced skill name, or None."""
+    return ONTOLOGY.canonical_skill(skill_name)
+
+def canonical_trait(trait_name: str | None) -> str | None:
+    """Canonical OCEAN trait for an LLM-produced trait name, or None."""
+    return ONTOLOGY.canonical_trait(trait_name)
 
 def is_valid_skill(skill_name: str) -> bool:
     """Check if a skill name is in our ontology."""
-    return skill_name in ALL_SKILLS
+    return canonical_skill(skill_name) is not None
 
 def is_valid_trait(trait_name: str) -> bool:
     """Check if a trait name is valid."""
-    return trait_name in OCEAN_TRAITS
+    return canonical_trait(trait_name) is not None
+
+
+# 5. Batched extraction: several candidate responses in one request
+BATCH_GRAPH_INSTRUCTIONS = GRAPH_INSTRUCTIONS + """
+BATCH MODE:
+You will receive a JSON array of candidate responses, each with an "id" and "text".
+Analyze each response independently, applying all rules above to that response only.
+Return a JSON object of the form:
+{"segments": [{"id": "<id of the response>", "observations": [<observation objects>]}]}
+Include every id exactly once; use an empty observations list when nothing applies.
+"""
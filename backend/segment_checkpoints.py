@@ -0,0 +1,106 @@
+# segment_checkpoints.py
+"""
+Segment Checkpoints - per-segment progress of the extraction pipeline.
+
+A segment (one candidate message) passes three stages:
+    extracted  observations returned by the LLM are stored here
+    (spooled)  its rows are in the local graph spool, waiting for Neo4j
+    written    its Evidence rows are committed to Neo4j
+    reported   they are folded into the materialised report
+Each stage is recorded in a Redis hash keyed by the segment id (the Celery
+task id for a per-segment task, the pending record's id for batched
+extraction), so a retry resumes after the last completed stage: the LLM
+is never asked twice for the same segment, and the graph and report
+writes, which are idempotent on their own (Evidence ids derive from the
+segment id), are skipped once done.
+"""
+
+import json
+import os
+from typing import Iterable
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Redis DB 0 (same instance as chat history)
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
+
+# Long enough to outlive every retry (and a worker restart in between)
+SEGMENT_CHECKPOINT_TTL_SECONDS = int(os.getenv("SEGMENT_CHECKPOINT_TTL_SECONDS", 60 * 60 * 24 * 2))
+
+CHECKPOINT_PREFIX = "segment:"
+
+EXTRACTED = "extracted"
+SPOOLED = "spooled"
+WRITTEN = "written"
+REPORTED = "reported"
+STAGES = (EXTRACTED, SPOOLED, WRITTEN, REPORTED)
+
+
+def checkpoint_key(segment_id: str) -> str:
+    return f"{CHECKPOINT_PREFIX}{segment_id}"
+
+
+def reached(checkpoint: dict, stage: str) -> bool:
+    """Whether `checkpoint` has completed `stage` (or a later one)."""
+    current = checkpoint.get("stage")
+    return current in STAGES and STAGES.index(current) >= STAGES.index(stage)
+
+
+class SegmentCheckpoints:
+    """
+    Checkpoint hashes {"stage", "observations"}. Reads and writes for a
+    whole batch of segments are one pipelined round trip each.
+    """
+
+    def __init__(self, client: redis.Redis, ttl_seconds: int = SEGMENT_CHECKPOINT_TTL_SECONDS):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+
+    def load_many(self, segment_ids: Iterable[str]) -> dict[str, dict]:
+        """{segment id: {"stage", "observations"}} for segments that have a checkpoint."""
+        segment_ids = list(segment_ids)
+        if not segment_ids:
+            return {}
+        pipe = self.client.pipeline(transaction=False)
+        for segment_id in segment_ids:
+            pipe.hgetall(checkpoint_key(segment_id))
+
+        checkpoints = {}
+        for segment_id, raw in zip(segment_ids, pipe.execute()):
+            if raw:
+                checkpoints[segment_id] = {
+                    "stage": raw.get("stage"),
+                    "observations": json.loads(raw.get("observations") or "[]")
+                }
+        return checkpoints
+
+    def load(self, segment_id: str) -> dict:
+        return self.load_many([segment_id]).get(segment_id, {})
+
+    def save_observations(self, observations_by_id: dict[str, list[dict]]) -> None:
+        """Record the extracted stage with each segment's observations."""
+        if not observations_by_id:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for segment_id, observations in observations_by_id.items():
+            key = checkpoint_key(segment_id)
+            pipe.hset(key, mapping={"stage": EXTRACTED, "observations": json.dumps(observations)})
+            pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def mark(self, segment_ids: Iterable[str], stage: str) -> None:
+        """Record that `segment_ids` completed `stage`."""
+        pipe = self.client.pipeline(transaction=False)
+        for segment_id in segment_ids:
+            key = checkpoint_key(segment_id)
+            pipe.hset(key, "stage", stage)
+            pipe.expire(key, self.ttl_seconds)
+        if len(pipe):
+            pipe.execute()
+
+
+segment_checkpoints = SegmentCheckpoints(redis_client)
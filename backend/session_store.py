@@ -0,0 +1,289 @@
+# session_store.py
+"""
+Session Store - Redis-backed short-term memory for chat sessions.
+Collapses the append/trim/expire/read sequence of the hot path into a
+single pipelined MULTI/EXEC round trip per operation.
+"""
+
+import json
+from typing import Iterable
+
+import redis
+
+# Constants
+CHAT_PREFIX = "chat:"
+CONTEXT_PREFIX = "chat_context:"  # HASH: message count + rolling summary
+DEFAULT_MAX_LENGTH = 20  # Keep last 20 messages (10 turns)
+DEFAULT_TTL_SECONDS = 60 * 60 * 24  # 24 hours
+
+# Stores a folded summary only if it covers more messages than the current
+# one, and never recreates the context of a cleared/expired session.
+SAVE_SUMMARY_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local upto = tonumber(redis.call('HGET', KEYS[1], 'summary_upto') or '0')
+if tonumber(ARGV[2]) <= upto then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'summary', ARGV[1], 'summary_upto', ARGV[2])
+return 1
+"""
+
+
+def encode_message(role: str, content: str) -> str:
+    """Serialise a chat message for storage in a Redis list."""
+    return json.dumps({"role": role, "content": content})
+
+
+def decode_window(raw_messages: list[str]) -> list[dict]:
+    """
+    Decode a newest-first LRANGE result.
+    Returns messages in chronological order (oldest first).
+    """
+    return [json.loads(msg) for msg in reversed(raw_messages)]
+
+
+class SessionStore:
+    """
+    Chat history store keeping the newest messages first in a Redis List.
+
+    Every public operation is issued as one MULTI/EXEC pipeline, so a write
+    plus the trimmed context window costs a single network round trip and
+    is applied atomically with respect to other clients.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        max_length: int = DEFAULT_MAX_LENGTH,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        prefix: str = CHAT_PREFIX,
+    ):
+        self.client = client
+        self.max_length = max_length
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def key(self, session_id: str) -> str:
+        """Generate Redis key for chat history."""
+        return f"{self.prefix}{session_id}"
+
+    def context_key(self, session_id: str) -> str:
+        """Redis key of the session's message count and rolling summary."""
+        return f"{CONTEXT_PREFIX}{session_id}"
+
+    def _queue_append(self, pipe, session_id: str, encoded: list[str]) -> None:
+        # LPUSH with several values pushes them left-to-right, so the last
+        # value ends up at the head (newest first), matching repeated LPUSHes.
+        key = self.key(session_id)
+        pipe.lpush(key, *encoded)
+        pipe.ltrim(key, 0, self.max_length - 1)
+        pipe.expire(key, self.ttl_seconds)
+        # Total messages ever appended: gives list entries stable sequence numbers
+        pipe.hincrby(self.context_key(session_id), "count", len(encoded))
+        pipe.expire(self.context_key(session_id), self.ttl_seconds)
+
+    def _window(self, limit: int | None) -> tuple[int, int]:
+        """
+        LRANGE bounds of the newest `limit` messages: None means max_length,
+        0 (or less) means none (start > stop yields an empty range, whereas
+        0..-1 would be the whole list).
+        """
+        limit = self.max_length if limit is None else limit
+        return (0, limit - 1) if limit > 0 else (1, 0)
+
+    def _queue_context(self, pipe, session_id: str, limit: int | None) -> None:
+        pipe.lrange(self.key(session_id), *self._window(limit))
+        pipe.hgetall(self.context_key(session_id))
+
+    @staticmethod
+    def _decode_context(window: list[str], context: dict) -> tuple[list[dict], int, dict]:
+        messages = decode_window(window)
+        # Sessions stored before the count existed hold more messages than counted
+        return messages, max(int(context.get("count") or 0), len(messages)), context
+
+    def append_and_fetch(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """
+        Append a message, trim, refresh TTL and return the context window.
+
+        LPUSH + LTRIM + EXPIRE + LRANGE in one transaction (1 round trip).
+        Returns messages in chronological order (oldest first).
+        """
+        key = self.key(session_id)
+
+        pipe = self.client.pipeline(transaction=True)
+        self._queue_append(pipe, session_id, [encode_message(role, content)])
+        pipe.lrange(key, *self._window(limit))
+        *_, window = pipe.execute()
+
+        return decode_window(window)
+
+    def append_and_fetch_context(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        limit: int | None = None,
+    ) -> tuple[list[dict], int, dict]:
+        """
+        append_and_fetch plus the session context (still 1 round trip).
+        Returns (messages oldest first, total messages ever appended,
+        context hash with the rolling summary).
+        """
+        pipe = self.client.pipeline(transaction=True)
+        self._queue_append(pipe, session_id, [encode_message(role, content)])
+        self._queue_context(pipe, session_id, limit)
+        *_, window, context = pipe.execute()
+
+        return self._decode_context(window, context)
+
+    def fetch_context(self, session_id: str, limit: int | None = None) -> tuple[list[dict], int, dict]:
+        """Stored history, message total and context hash (1 round trip)."""
+        pipe = self.client.pipeline(transaction=True)
+        self._queue_context(pipe, session_id, limit)
+        window, context = pipe.execute()
+
+        return self._decode_context(window, context)
+
+    def save_summary(self, session_id: str, summary: str, upto: int) -> bool:
+        """Store a rolling summary covering messages [0, upto)."""
+        return bool(self.client.eval(SAVE_SUMMARY_SCRIPT, 1, self.context_key(session_id), summary, upto))
+
+    def append_messages(self, session_id: str, messages: Iterable[dict]) -> None:
+        """
+        Batched write path: append several messages in one round trip.
+        Messages are given in chronological order.
+        """
+        encoded = [encode_message(m["role"], m["content"]) for m in messages]
+        if not encoded:
+            return
+
+        pipe = self.client.pipeline(transaction=True)
+        self._queue_append(pipe, session_id, encoded)
+        pipe.execute()
+
+    def append(self, session_id: str, role: str, content: str) -> None:
+        """Append a single message (1 round trip)."""
+        self.append_messages(session_id, [{"role": role, "content": content}])
+
+    def fetch(self, session_id: str, limit: int | None = None) -> list[dict]:
+        """
+        Retrieve chat history.
+        Returns messages in chronological order (oldest first).
+        """
+        return decode_window(self.client.lrange(self.key(session_id), *self._window(limit)))
+
+    def info(self, session_id: str) -> dict:
+        """Get message count and TTL for a session (1 round trip)."""
+        key = self.key(session_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.llen(key)
+        pipe.ttl(key)
+        message_count, ttl = pipe.execute()
+
+        return {
+            "session_id": session_id,
+            "message_count": message_count,
+            "ttl_seconds": ttl if ttl > 0 else None,
+            "exists": message_count > 0
+        }
+
+    def clear(self, session_id: str) -> bool:
+        """Clear a chat session (history and rolling summary)."""
+        return self.client.delete(self.key(session_id), self.context_key(session_id)) > 0
+
+
+class AsyncSessionStore(SessionStore):
+    """
+    asyncio variant of SessionStore for redis.asyncio clients.
+    Same keys, ordering and single-round-trip guarantees as the sync store,
+    so both can serve the same sessions side by side.
+    """
+
+    async def append_and_fetch(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """Append a message and return the context window (1 round trip)."""
+        key = self.key(session_id)
+
+        pipe = self.client.pipeline(transaction=True)
+        self._queue_append(pipe, session_id, [encode_message(role, content)])
+        pipe.lrange(key, *self._window(limit))
+        *_, window = await pipe.execute()
+
+        return decode_window(window)
+
+    async def append_and_fetch_context(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        limit: int | None = None,
+    ) -> tuple[list[dict], int, dict]:
+        """Append a message; return window, message total and context (1 round trip)."""
+        pipe = self.client.pipeline(transaction=True)
+        self._queue_append(pipe, session_id, [encode_message(role, content)])
+        self._queue_context(pipe, session_id, limit)
+        *_, window, context = await pipe.execute()
+
+        return self._decode_context(window, context)
+
+    async def fetch_context(self, session_id: str, limit: int | None = None) -> tuple[list[dict], int, dict]:
+        """Stored history, message total and context hash (1 round trip)."""
+        pipe = self.client.pipeline(transaction=True)
+        self._queue_context(pipe, session_id, limit)
+        window, context = await pipe.execute()
+
+        return self._decode_context(window, context)
+
+    async def save_summary(self, session_id: str, summary: str, upto: int) -> bool:
+        """Store a rolling summary covering messages [0, upto)."""
+        return bool(await self.client.eval(SAVE_SUMMARY_SCRIPT, 1, self.context_key(session_id), summary, upto))
+
+    async def append_messages(self, session_id: str, messages: Iterable[dict]) -> None:
+        """Append several messages (chronological order) in one round trip."""
+        encoded = [encode_message(m["role"], m["content"]) for m in messages]
+        if not encoded:
+            return
+
+        pipe = self.client.pipeline(transaction=True)
+        self._queue_append(pipe, session_id, encoded)
+        await pipe.execute()
+
+    async def append(self, session_id: str, role: str, content: str) -> None:
+        """Append a single message (1 round trip)."""
+        await self.append_messages(session_id, [{"role": role, "content": content}])
+
+    async def fetch(self, session_id: str, limit: int | None = None) -> list[dict]:
+        """Retrieve chat history in chronological order."""
+        return decode_window(await self.client.lrange(self.key(session_id), *self._window(limit)))
+
+    async def info(self, session_id: str) -> dict:
+        """Get message count and TTL for a session (1 round trip)."""
+        key = self.key(session_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.llen(key)
+        pipe.ttl(key)
+        message_count, ttl = await pipe.execute()
+
+        return {
+            "session_id": session_id,
+            "message_count": message_count,
+            "ttl_seconds": ttl if ttl > 0 else None,
+            "exists": message_count > 0
+        }
+
+    async def clear(self, session_id: str) -> bool:
+        """Clear a chat session (history and rolling summary)."""
+        return await self.client.delete(self.key(session_id), self.context_key(session_id)) > 0
@@ -0,0 +1,59 @@
+# sse.py
+"""
+Server-Sent Events framing for streamed chat replies.
+
+Event stream contract (shared by the Flask and FastAPI apps):
+    event: token   data: {"token": "..."}         one per LLM delta
+    event: done    data: {"response": "...", "session_id": "..."}
+    event: error   data: {"error": "..."}
+"""
+
+import json
+from typing import AsyncIterator, Iterator
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx)
+}
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Encode one SSE frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_from_tokens(tokens: Iterator[str], session_id: str) -> Iterator[str]:
+    """
+    Wrap a token iterator into SSE frames.
+    Closing this generator (client disconnect) closes the token source.
+    """
+    parts = []
+    try:
+        for token in tokens:
+            parts.append(token)
+            yield format_sse("token", {"token": token})
+    except Exception as e:
+        yield format_sse("error", {"error": str(e)})
+        return
+    finally:
+        tokens.close()
+    yield format_sse("done", {"response": "".join(parts), "session_id": session_id})
+
+
+async def async_sse_from_tokens(tokens: AsyncIterator[str], session_id: str) -> AsyncIterator[str]:
+    """
+    Wrap an async token iterator into SSE frames.
+    Closing this generator closes the token source; StreamingResponse does
+    not close its body on client disconnect, so this is not left to GC.
+    """
+    parts = []
+    try:
+        async for token in tokens:
+            parts.append(token)
+            yield format_sse("token", {"token": token})
+    except Exception as e:
+        yield format_sse("error", {"error": str(e)})
+        return
+    finally:
+        await tokens.aclose()
+    yield format_sse("done", {"response": "".join(parts), "session_id": session_id})
@@ -0,0 +1,119 @@
+# task_routing.py
+"""
+Task Routing - session-affine Celery queues for extraction.
+
+Each session is assigned a partition, crc32(session_id) % EXTRACTION_PARTITIONS,
+and its segment tasks (and the batch flushes for that partition) go to the
+partition's queue, extract.<n>, only. A partition is consumed by exactly
+one single-process worker with prefetch 1, so a session's segments run one
+at a time in the order they were sent, and its pending batch holds only
+sessions of that partition. A burst from one session only backs up its
+own partition; the other partitions (and the sessions on them) keep moving.
+
+Ordering holds for first attempts only. An unbatched segment that fails is
+retried by Celery with a countdown, i.e. re-published with an ETA, and the
+partition worker runs the session's later segments in the meantime. (A
+failed batch is put back at the head of its pending list, so batched
+segments keep their order.) Segments diverted to the graph spool during a
+Neo4j outage are likewise written after later ones. Nothing downstream
+relies on the order: graph writes are MERGEs keyed per segment, report and
+rollup tallies commute, and only the order of evidence points in a report
+can differ.
+
+Live interviews and backfill / reprocessing share the partition (so a
+session stays ordered either way) but not the priority: with the Redis
+broker every priority has its own list and a worker always pops priority 0
+(live) before priority 9 (backfill), so backfill never delays live work.
+
+Every other task (context summaries) stays on the default queue, served by
+an ordinary worker of any concurrency.
+
+    # queues for the worker that owns partition 2
+    python -m backend.task_routing queues --partitions 2
+    # one line per partition worker
+    python -m backend.task_routing plan
+"""
+
+import argparse
+import os
+import zlib
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Number of extraction partitions = extraction workers (one process each)
+EXTRACTION_PARTITIONS = int(os.getenv("EXTRACTION_PARTITIONS", 4))
+
+LIVE = "live"
+BACKFILL = "backfill"
+LANES = (LIVE, BACKFILL)
+# Redis broker priorities: 0 is served first
+LANE_PRIORITY = {LIVE: 0, BACKFILL: 9}
+
+DEFAULT_QUEUE = "celery"
+
+SEGMENT_TASK = "backend.worker.process_interview_segment"
+FLUSH_TASK = "backend.worker.flush_extraction_batch"
+
+
+def partition_for(session_id: str) -> int:
+    """Stable across processes and restarts (unlike hash())."""
+    return zlib.crc32(session_id.encode("utf-8")) % EXTRACTION_PARTITIONS
+
+
+def queue_name(partition: int) -> str:
+    return f"extract.{partition}"
+
+
+def lane_options(partition: int, lane: str) -> dict:
+    if lane not in LANE_PRIORITY:
+        raise ValueError(f"Unknown lane: {lane}")
+    return {"queue": queue_name(partition), "priority": LANE_PRIORITY[lane]}
+
+
+def worker_queues(partitions: list[int]) -> list[str]:
+    return [queue_name(p) for p in partitions]
+
+
+def _arg(args, kwargs, position: int, name: str, default=None):
+    if args and len(args) > position:
+        return args[position]
+    return (kwargs or {}).get(name, default)
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """
+    Celery router (task_routes). process_interview_segment(session_id, text,
+    lane) goes to its session's partition; flush_extraction_batch(partition,
+    lane) to that partition, each with its lane's priority. Explicit
+    apply_async options still win.
+    """
+    if name == SEGMENT_TASK:
+        session_id = _arg(args, kwargs, 0, "session_id")
+        return lane_options(partition_for(session_id), _arg(args, kwargs, 2, "lane", LIVE))
+    if name == FLUSH_TASK:
+        return lane_options(_arg(args, kwargs, 0, "partition", 0), _arg(args, kwargs, 1, "lane", LIVE))
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Celery queues of the extraction partitions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    queues = sub.add_parser("queues", help="Comma-separated -Q value for one partition worker")
+    queues.add_argument("--partitions", required=True, help="e.g. 0 or 0,1")
+    sub.add_parser("plan", help="One worker command per partition")
+    args = parser.parse_args()
+
+    if args.command == "queues":
+        print(",".join(worker_queues([int(p) for p in args.partitions.split(",")])))
+        return
+    for partition in range(EXTRACTION_PARTITIONS):
+        print(
+            f"celery -A backend.celery_config worker -n extract{partition}@%h --concurrency 1 "
+            f"-Q {','.join(worker_queues([partition]))}"
+        )
+    print(f"celery -A backend.celery_config worker -n default@%h -Q {DEFAULT_QUEUE}")
+
+
+if __name__ == "__main__":
+    main()
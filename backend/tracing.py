@@ -0,0 +1,433 @@
+# tracing.py
+"""
+Tracing - end-to-end spans from a candidate message to its evidence being
+visible in the report.
+
+A trace starts in the chat hot path (chat.message) and follows the
+message through the Celery headers (W3C traceparent + baggage) into the
+extraction task, the LLM call, the Neo4j write and the materialised
+report update. The time the message arrived travels as baggage, so the
+worker can measure the freshness lag when the evidence becomes visible
+(an evidence.visible span carrying freshness_lag_s). Batched extraction
+runs in its own trace per flush, linked from every segment it carried.
+
+Spans go to a local exporter: TRACE_EXPORTER=file appends JSON lines to
+TRACE_FILE, =memory keeps them in process (benchmarks), =none (default)
+records nothing; the freshness lag is still measured. Summarise a trace
+file with:
+
+    python -m backend.tracing report [--file traces.jsonl]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional, Sequence
+from dotenv import load_dotenv
+from celery.signals import before_task_publish, task_postrun, task_prerun
+from opentelemetry import baggage, context as otel_context, trace
+from opentelemetry.propagators.composite import CompositePropagator
+from opentelemetry.baggage.propagation import W3CBaggagePropagator
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult
+)
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+load_dotenv()
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", 1.0))
+SERVICE_NAME = "ubeu-backend"
+
+# Baggage key holding the message arrival time (unix seconds)
+RECEIVED_AT_KEY = "ubeu.received_at"
+# Message header carrying the publish time to the worker
+ENQUEUED_AT_HEADER = "enqueued_at"
+# Celery message headers used by the propagators
+TRACE_HEADERS = ("traceparent", "tracestate", "baggage")
+
+# Freshness stages, by span name prefix (first match wins)
+STAGE_PREFIXES = (
+    ("celery_enqueue.", "enqueue"),
+    ("celery.queue_wait", "queue_wait"),
+    ("extraction.batch_wait", "batch_wait"),
+    ("llm.extraction", "extraction_llm"),
+    ("neo4j.", "graph_write"),
+    ("report.apply", "report_update"),
+)
+
+_propagator = CompositePropagator([TraceContextTextMapPropagator(), W3CBaggagePropagator()])
+_tracer = trace.NoOpTracer()
+_memory_exporter: Optional[InMemorySpanExporter] = None
+_provider: Optional[TracerProvider] = None
+tracing_enabled = False
+
+# task_id -> (task span, context token) for tasks in flight
+_task_spans: dict[str, tuple] = {}
+
+
+def span_to_dict(span: ReadableSpan) -> dict:
+    """Flat JSON form of a finished span (the trace file format)."""
+    parent = span.parent
+    return {
+        "trace_id": format(span.context.trace_id, "032x"),
+        "span_id": format(span.context.span_id, "016x"),
+        "parent_id": format(parent.span_id, "016x") if parent else None,
+        "name": span.name,
+        "start": span.start_time / 1e9,
+        "end": span.end_time / 1e9,
+        "status": span.status.status_code.name,
+        "attributes": dict(span.attributes or {}),
+        "links": [
+            {"trace_id": format(link.context.trace_id, "032x"), "span_id": format(link.context.span_id, "016x")}
+            for link in span.links
+        ],
+    }
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Appends finished spans to a local file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(json.dumps(span_to_dict(span), default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def configure_tracing(exporter: str = TRACE_EXPORTER, path: str = TRACE_FILE) -> Optional[InMemorySpanExporter]:
+    """
+    (Re)configure the span exporter: "file", "memory" or "none".
+    Returns the in-memory exporter when exporter == "memory".
+    """
+    global _tracer, _provider, _memory_exporter, tracing_enabled
+
+    if _provider is not None:
+        _provider.shutdown()
+    _provider, _memory_exporter = None, None
+    _tracer, tracing_enabled = trace.NoOpTracer(), False
+
+    if exporter == "none":
+        return None
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME, "process.pid": os.getpid()}),
+        sampler=ParentBased(TraceIdRatioBased(TRACE_SAMPLE_RATIO))
+    )
+    if exporter == "memory":
+        _memory_exporter = InMemorySpanExporter()
+        provider.add_span_processor(SimpleSpanProcessor(_memory_exporter))
+    elif exporter == "file":
+        provider.add_span_processor(BatchSpanProcessor(JsonLinesSpanExporter(path)))
+    else:
+        raise ValueError(f"Unknown TRACE_EXPORTER: {exporter}")
+
+    _provider = provider
+    _tracer = provider.get_tracer(__name__)
+    tracing_enabled = True
+    return _memory_exporter
+
+
+def finished_spans() -> list[dict]:
+    """Spans collected by the in-memory exporter, as dicts."""
+    if _memory_exporter is None:
+        return []
+    return [span_to_dict(span) for span in _memory_exporter.get_finished_spans()]
+
+
+def flush_spans() -> None:
+    if _provider is not None:
+        _provider.force_flush()
+
+
+# --- Spans ---
+
+@contextmanager
+def span(name: str, **attributes):
+    """A child span of the current context, made current for the block."""
+    if not tracing_enabled:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+class StageSpan:
+    """Span around one timed stage (see metrics.StageTimer); current while open."""
+
+    __slots__ = ("span", "token")
+
+    def __init__(self, name: str):
+        self.span = _tracer.start_span(name)
+        self.token = otel_context.attach(trace.set_span_in_context(self.span))
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        otel_context.detach(self.token)
+        if error is not None:
+            self.span.record_exception(error)
+            self.span.set_status(trace.StatusCode.ERROR)
+        self.span.end()
+
+
+def start_stage_span(name: str) -> Optional[StageSpan]:
+    return StageSpan(name) if tracing_enabled else None
+
+
+def message_context(session_id: str) -> tuple[otel_context.Context, object]:
+    """
+    Start the root span of one candidate message. Returns the context to
+    run (and propagate) the turn in, plus the span to end after the reply.
+    The arrival time rides along as baggage for the freshness measurement.
+    """
+    ctx = baggage.set_baggage(RECEIVED_AT_KEY, repr(time.time()), context=otel_context.Context())
+    root = _tracer.start_span("chat.message", context=ctx, attributes={"session_id": session_id})
+    return trace.set_span_in_context(root, ctx), root
+
+
+@contextmanager
+def use_context(ctx: otel_context.Context):
+    """Make `ctx` current for a block that does not yield to a caller."""
+    token = otel_context.attach(ctx)
+    try:
+        yield
+    finally:
+        otel_context.detach(token)
+
+
+@contextmanager
+def message_trace(session_id: str):
+    """Root span of one candidate message, current for the block."""
+    ctx, root = message_context(session_id)
+    try:
+        with use_context(ctx):
+            yield root
+    finally:
+        root.end()
+
+
+@contextmanager
+def detached():
+    """Run the block outside any trace (e.g. publishing a shared batch flush)."""
+    with use_context(otel_context.Context()):
+        yield
+
+
+def current_carrier() -> dict:
+    """The current trace context and baggage as W3C headers (for storage)."""
+    carrier = {}
+    _propagator.inject(carrier)
+    return carrier
+
+
+def context_from_carrier(carrier: Optional[dict]) -> otel_context.Context:
+    return _propagator.extract(carrier or {}, context=otel_context.Context())
+
+
+def received_at(ctx: Optional[otel_context.Context] = None) -> Optional[float]:
+    value = baggage.get_baggage(RECEIVED_AT_KEY, context=ctx)
+    return float(value) if value else None
+
+
+def record_evidence_visible(
+    ctx: Optional[otel_context.Context] = None,
+    links: Iterable[trace.Link] = (),
+    **attributes
+) -> Optional[float]:
+    """
+    Mark the evidence of one message as visible in the report. Returns the
+    freshness lag in seconds (None if the message arrival time is unknown)
+    and records it on a zero-length evidence.visible span in its trace.
+    """
+    arrived = received_at(ctx)
+    lag = time.time() - arrived if arrived is not None else None
+    if tracing_enabled:
+        if lag is not None:
+            attributes["freshness_lag_s"] = lag
+        _tracer.start_span("evidence.visible", context=ctx, links=list(links), attributes=attributes).end()
+    return lag
+
+
+def current_link() -> list[trace.Link]:
+    """A link to the current span (for fan-in from other traces)."""
+    span_context = trace.get_current_span().get_span_context()
+    return [trace.Link(span_context)] if span_context.is_valid else []
+
+
+def record_interval(name: str, start: float, end: float, ctx: Optional[otel_context.Context] = None, **attributes) -> None:
+    """A span for an interval observed after the fact (unix seconds), e.g. a queue wait."""
+    if tracing_enabled and end > start:
+        _tracer.start_span(name, context=ctx, start_time=int(start * 1e9), attributes=attributes).end(end_time=int(end * 1e9))
+
+
+# --- Celery propagation ---
+
+@before_task_publish.connect
+def inject_trace_headers(headers: Optional[dict] = None, **kwargs):
+    """Publisher: stamp the publish time and the current trace context into the message headers."""
+    if headers is None:
+        return
+    headers.setdefault(ENQUEUED_AT_HEADER, time.time())
+    _propagator.inject(headers)
+
+
+@task_prerun.connect
+def start_task_span(task_id: str = None, task=None, **kwargs):
+    """Worker: continue the publisher's trace (eager tasks keep the caller's context)."""
+    if task is None:
+        return
+    carrier = {header: getattr(task.request, header, None) for header in TRACE_HEADERS}
+    carrier = {header: value for header, value in carrier.items() if value}
+    ctx = context_from_carrier(carrier) if carrier else otel_context.get_current()
+
+    enqueued_at = getattr(task.request, ENQUEUED_AT_HEADER, None)
+    if enqueued_at is not None:
+        record_interval("celery.queue_wait", float(enqueued_at), time.time(), ctx, task=task.name)
+
+    task_span = _tracer.start_span(f"celery.task.{task.name}", context=ctx, kind=trace.SpanKind.CONSUMER)
+    token = otel_context.attach(trace.set_span_in_context(task_span, ctx))
+    _task_spans[task_id] = (task_span, token)
+
+
+@task_postrun.connect
+def end_task_span(task_id: str = None, state: Optional[str] = None, **kwargs):
+    entry = _task_spans.pop(task_id, None)
+    if entry is None:
+        return
+    task_span, token = entry
+    otel_context.detach(token)
+    task_span.set_attribute("celery.state", state or "UNKNOWN")
+    task_span.end()
+
+
+# --- Freshness report ---
+
+def load_spans(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def stage_of(name: str) -> Optional[str]:
+    for prefix, stage in STAGE_PREFIXES:
+        if name.startswith(prefix):
+            return stage
+    return None
+
+
+def stage_times(spans: list[dict]) -> dict[str, float]:
+    """
+    Seconds per freshness stage, exclusive: a stage span's time minus the
+    stage spans nested in it (eager tasks run inside their enqueue).
+    """
+    children: dict[str, list[dict]] = {}
+    for s in spans:
+        children.setdefault(s["parent_id"], []).append(s)
+
+    def nested_stage_time(span_id: str) -> float:
+        total = 0.0
+        for child in children.get(span_id, ()):
+            if stage_of(child["name"]):
+                total += child["end"] - child["start"]
+            else:
+                total += nested_stage_time(child["span_id"])
+        return total
+
+    stages: dict[str, float] = {}
+    for s in spans:
+        stage = stage_of(s["name"])
+        if stage:
+            own = s["end"] - s["start"] - nested_stage_time(s["span_id"])
+            stages[stage] = stages.get(stage, 0.0) + max(0.0, own)
+    return stages
+
+
+def freshness_report(spans: list[dict]) -> dict:
+    """
+    Per-message freshness lag and the stage that dominated it.
+
+    A message's stages are the spans of its own trace plus those of any
+    trace its evidence.visible span links to (the shared batch flush).
+    Time not covered by a stage (hot path before the enqueue, task
+    overhead) is reported as "other".
+    """
+    by_trace: dict[str, list[dict]] = {}
+    for s in spans:
+        by_trace.setdefault(s["trace_id"], []).append(s)
+
+    messages = []
+    for trace_id, trace_spans in by_trace.items():
+        for visible in (s for s in trace_spans if s["name"] == "evidence.visible"):
+            lag = visible["attributes"].get("freshness_lag_s")
+            if lag is None:
+                continue
+            related = list(trace_spans)
+            for link in visible["links"]:
+                if link["trace_id"] != trace_id:
+                    related.extend(by_trace.get(link["trace_id"], []))
+
+            stages = stage_times(related)
+            stages["other"] = max(0.0, lag - sum(stages.values()))
+            messages.append({
+                "trace_id": trace_id,
+                "session_id": next((s["attributes"].get("session_id") for s in trace_spans if s["name"] == "chat.message"), None),
+                "freshness_lag_s": lag,
+                "dominant_stage": max(stages, key=stages.get),
+                "stages_s": stages,
+            })
+
+    if not messages:
+        return {"messages": 0}
+
+    lags = sorted(m["freshness_lag_s"] for m in messages)
+    stage_names = sorted({stage for m in messages for stage in m["stages_s"]})
+    dominant: dict[str, int] = {}
+    for m in messages:
+        dominant[m["dominant_stage"]] = dominant.get(m["dominant_stage"], 0) + 1
+    return {
+        "messages": len(messages),
+        "freshness_lag_s": {
+            "mean": statistics.mean(lags),
+            "p50": statistics.median(lags),
+            "p95": lags[max(0, int(len(lags) * 0.95) - 1)],
+            "max": lags[-1],
+        },
+        "mean_stage_s": {
+            stage: statistics.mean(m["stages_s"].get(stage, 0.0) for m in messages) for stage in stage_names
+        },
+        "dominant_stage_counts": dominant,
+        "slowest": sorted(messages, key=lambda m: m["freshness_lag_s"], reverse=True)[:5],
+    }
+
+
+configure_tracing()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Freshness lag per message from a trace file")
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("--file", default=TRACE_FILE)
+    args = parser.parse_args()
+
+    print(json.dumps(freshness_report(load_spans(args.file)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,160 +6,581 @@ Extracts skills and personality traits from interview responses using LLM.
 
 import json
 import os
+import threading
+import time
+import uuid
 from datetime import datetime
 from typing import Optional
 from dotenv import load_dotenv
 from openai import OpenAI
+from celery.signals import worker_process_init, worker_process_shutdown, worker_ready
+from celery.utils.log import get_task_logger
 
 from backend.celery_config import celery_app
-from backend.schema_config import (
-    GRAPH_INSTRUCTIONS,
-    is_valid_skill,
-    is_valid_trait,
-    get_skill_domain
+from backend.context_window import update_rolling_summary
+from backend.graph_driver import close_neo4j_driver, get_neo4j_driver, warm_up_pool
+from backend.graph_writer import build_segment_rows, save_observations_batch
+from backend.graph_spool import (
+    GRAPH_BREAKER_COOLDOWN_SECONDS,
+    GRAPH_SPOOL_ENABLED,
+    GRAPH_SPOOL_REPLAY_INTERVAL_SECONDS,
+    graph_breaker,
+    graph_spool,
+    graph_unavailable
 )
+from backend.graph_schema import GRAPH_SCHEMA_BOOTSTRAP, bootstrap_graph_schema
+from backend.metrics import (
+    llm_request,
+    mark_process_dead,
+    neo4j_query,
+    record_freshness,
+    record_llm_usage,
+    start_metrics_server
+)
+from backend.tracing import (
+    context_from_carrier,
+    current_link,
+    detached,
+    record_evidence_visible,
+    record_interval,
+    span
+)
+from backend import extraction_batcher
+from backend.task_routing import LIVE
+from backend.extraction_cache import extraction_cache
+from backend.segment_checkpoints import (
+    EXTRACTED,
+    REPORTED,
+    SPOOLED,
+    WRITTEN,
+    reached,
+    segment_checkpoints
+)
+from backend.llm_limiter import (
+    LLM_BACKGROUND_DEADLINE_SECONDS,
+    LLM_CALL_TIMEOUT_SECONDS,
+    estimate_tokens,
+    llm_limiter
+)
+from backend.match_engine import publish_candidate_changes
+from backend.report_store import apply_observation_rows
+from backend.cohort_rollups import apply_rollup_rows
+from backend.schema_config import GRAPH_INSTRUCTIONS, BATCH_GRAPH_INSTRUCTIONS
 
 load_dotenv()
 
-# OpenAI client for extraction
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = get_task_logger(__name__)
+
+# OpenAI client for extraction. A failed call retries through the task,
+# which waits for the rate limiter again, rather than inside the client.
+openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=LLM_CALL_TIMEOUT_SECONDS, max_retries=0)
+EXTRACTION_MODEL = "gpt-4o"
+
+# Tasks calling the LLM may wait up to the limiter's background deadline for
+# capacity before the call, far past the default task_time_limit, so they
+# get their own limits: the wait, one call and the writes after it. The soft
+# limit raises inside the task, which hands its work back and retries.
+LLM_TASK_SOFT_TIME_LIMIT = int(LLM_BACKGROUND_DEADLINE_SECONDS + LLM_CALL_TIMEOUT_SECONDS) + 30
+LLM_TASK_TIME_LIMIT = LLM_TASK_SOFT_TIME_LIMIT + 15
+
+# Port for the worker's own /metrics endpoint (unset: not served; with
+# PROMETHEUS_MULTIPROC_DIR the API's /metrics already includes the worker)
+METRICS_WORKER_PORT = os.getenv("METRICS_WORKER_PORT")
+
 
-# Neo4j connection (lazy loaded)
-_neo4j_driver = None
+@worker_ready.connect
+def ensure_graph_schema_on_startup(**kwargs):
+    """Create any missing Neo4j constraints/indexes once per worker start."""
+    if GRAPH_SCHEMA_BOOTSTRAP:
+        bootstrap_graph_schema(get_neo4j_driver)
 
-def get_neo4j_driver():
-    """Lazy load Neo4j driver."""
-    global _neo4j_driver
-    if _neo4j_driver is None:
-        from neo4j import GraphDatabase
-        uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-        user = os.getenv("NEO4J_USER", "neo4j")
-        password = os.getenv("NEO4J_PASSWORD", "password")
-        _neo4j_driver = GraphDatabase.driver(uri, auth=(user, password))
-    return _neo4j_driver
+
+@worker_ready.connect
+def serve_worker_metrics(**kwargs):
+    """Expose task timings from the worker's main process if a port is set."""
+    if METRICS_WORKER_PORT:
+        start_metrics_server(int(METRICS_WORKER_PORT))
+
+
+@worker_ready.connect
+def start_graph_spool_replayer(**kwargs):
+    """Drain this host's graph spool into Neo4j from the worker's main process."""
+    if GRAPH_SPOOL_ENABLED:
+        threading.Thread(target=replay_graph_spool_forever, name="graph-spool-replay", daemon=True).start()
+
+
+@worker_ready.connect
+def flush_stranded_batches(**kwargs):
+    """
+    Schedule a flush for every partition with a batch left in flight by a
+    flush that never finished (killed worker, restart). The flush is routed
+    to the partition's own worker, which takes the stranded batch first.
+    """
+    try:
+        for partition, lane in extraction_batcher.stranded_batches():
+            flush_extraction_batch.delay(partition, lane)
+    except Exception as e:
+        logger.warning("Stranded extraction batches not checked: %s", e)
+
+
+@worker_process_init.connect
+def warm_up_neo4j_pool(**kwargs):
+    """Open this pool process's own Neo4j connections before its first task."""
+    try:
+        logger.info("Neo4j pool: warmed %d connections", warm_up_pool())
+    except Exception as e:
+        logger.warning("Neo4j pool warm-up skipped: %s", e)
+
+
+@worker_process_shutdown.connect
+def close_neo4j_pool(**kwargs):
+    close_neo4j_driver()
+    mark_process_dead(os.getpid())
 
 
 def extract_observations(text: str) -> list[dict]:
     """
     Use LLM to extract skills and traits from candidate text.
     Returns a list of structured observations.
+    
+    Results are served from the content-addressed extraction cache when the
+    same text (e.g. a Celery retry or a pasted boilerplate answer) has been
+    extracted before under the current GRAPH_INSTRUCTIONS.
     """
-    response = openai_client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": GRAPH_INSTRUCTIONS},
-            {"role": "user", "content": f"Analyze this candidate response:\n\n\"{text}\""}
-        ],
-        response_format={"type": "json_object"},
-        max_tokens=1000
-    )
+    cached = extraction_cache.get(text)
+    if cached is not None:
+        return cached
+    
+    observations = request_observations(text)
+    if observations is None:
+        return []
+    extraction_cache.put(text, observations)
+    return observations
+
+
+def request_observations(text: str) -> Optional[list[dict]]:
+    """Single-segment LLM extraction. Returns None if the reply is unparseable."""
+    messages = [
+        {"role": "system", "content": GRAPH_INSTRUCTIONS},
+        {"role": "user", "content": f"Analyze this candidate response:\n\n\"{text}\""}
+    ]
+    response = None
+    # Background class: waits for capacity left over by chat
+    permit = llm_limiter.acquire("extraction", estimate_tokens(messages, 1000))
+    try:
+        with llm_request("extraction", EXTRACTION_MODEL):
+            response = openai_client.chat.completions.create(
+                model=EXTRACTION_MODEL,
+                messages=messages,
+                response_format={"type": "json_object"},
+                max_tokens=1000
+            )
+    finally:
+        permit.close(getattr(response, "usage", None))
+    record_llm_usage("extraction", EXTRACTION_MODEL, getattr(response, "usage", None))
     
     try:
         result = json.loads(response.choices[0].message.content)
-        # Handle both single observation and array
-        observations = result.get("observations", [result])
-        if not isinstance(observations, list):
-            observations = [observations]
-        return observations
+        return parse_observations(result)
     except (json.JSONDecodeError, KeyError):
-        return []
+        return None
+
 
+def parse_observations(result: dict) -> list[dict]:
+    """Normalise an extraction result to a list of observations."""
+    # Handle both single observation and array
+    observations = result.get("observations", [result])
+    if not isinstance(observations, list):
+        observations = [observations]
+    return observations
 
-def save_observation_to_graph(
-    session_id: str,
-    skill: Optional[str],
-    skill_domain: Optional[str],
-    trait: Optional[str],
-    trait_intensity: Optional[str],
-    evidence: str
-) -> bool:
+
+def extract_observations_batch(segments: list[dict]) -> dict[str, list[dict]]:
     """
-    Save an extracted observation to Neo4j graph.
-    Creates nodes and relationships as per schema.
+    Extract observations for several segments in one LLM request.
+    Returns {segment id: observations}.
+    
+    Cached texts are answered from the extraction cache and duplicate texts
+    within the batch are sent once. Falls back to per-segment extraction if
+    the batched response cannot be parsed.
     """
-    driver = get_neo4j_driver()
+    by_text = extraction_cache.get_many([seg["text"] for seg in segments])
     
-    with driver.session() as session:
-        # Ensure Candidate node exists
-        session.run("""
-            MERGE (c:Candidate {session_id: $session_id})
-            ON CREATE SET c.created_at = datetime()
-        """, session_id=session_id)
-        
-        # Create Evidence node
-        evidence_query = """
-            MATCH (c:Candidate {session_id: $session_id})
-            CREATE (e:Evidence {
-                text: $evidence,
-                timestamp: datetime(),
-                id: randomUUID()
-            })
-            CREATE (c)-[:DEMONSTRATED]->(e)
-            RETURN e.id as evidence_id
-        """
-        result = session.run(evidence_query, session_id=session_id, evidence=evidence)
-        evidence_id = result.single()["evidence_id"]
-        
-        # Link to Skill if present
-        if skill and is_valid_skill(skill):
-            session.run("""
-                MATCH (e:Evidence {id: $evidence_id})
-                MERGE (s:Skill {name: $skill})
-                ON CREATE SET s.domain = $domain
-                CREATE (e)-[:INDICATES]->(s)
-            """, evidence_id=evidence_id, skill=skill, domain=skill_domain or get_skill_domain(skill))
-        
-        # Link to Trait if present
-        if trait and is_valid_trait(trait):
-            session.run("""
-                MATCH (e:Evidence {id: $evidence_id})
-                MERGE (t:Trait {name: $trait})
-                CREATE (e)-[r:INDICATES {intensity: $intensity}]->(t)
-            """, evidence_id=evidence_id, trait=trait, intensity=trait_intensity or "Moderate")
+    # One request item per distinct uncached text
+    pending = {}
+    for seg in segments:
+        if seg["text"] not in by_text:
+            pending.setdefault(seg["text"], seg["id"])
+    
+    if len(pending) == 1:
+        by_text.update({text: extract_observations(text) for text in pending})
+    elif pending:
+        by_text.update(request_observations_batch(pending))
+    
+    return {seg["id"]: by_text.get(seg["text"], []) for seg in segments}
+
+
+def request_observations_batch(pending: dict[str, str]) -> dict[str, list[dict]]:
+    """Batched LLM extraction for {text: request id}. Caches what it parses."""
+    payload = [{"id": request_id, "text": text} for text, request_id in pending.items()]
+    messages = [
+        {"role": "system", "content": BATCH_GRAPH_INSTRUCTIONS},
+        {"role": "user", "content": f"Analyze these candidate responses:\n\n{json.dumps(payload)}"}
+    ]
+    max_tokens = min(1000 * len(payload), 8000)
+    response = None
+    permit = llm_limiter.acquire("extraction_batch", estimate_tokens(messages, max_tokens))
+    try:
+        with llm_request("extraction_batch", EXTRACTION_MODEL):
+            response = openai_client.chat.completions.create(
+                model=EXTRACTION_MODEL,
+                messages=messages,
+                response_format={"type": "json_object"},
+                max_tokens=max_tokens
+            )
+    finally:
+        permit.close(getattr(response, "usage", None))
+    record_llm_usage("extraction_batch", EXTRACTION_MODEL, getattr(response, "usage", None))
+    
+    try:
+        result = json.loads(response.choices[0].message.content)
+        by_id = {
+            item["id"]: parse_observations(item)
+            for item in result["segments"]
+            if isinstance(item, dict) and "id" in item
+        }
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return {text: extract_observations(text) for text in pending}
     
-    return True
+    results = {text: by_id[request_id] for text, request_id in pending.items() if request_id in by_id}
+    extraction_cache.put_many(results)
+    # Segments the model skipped count as empty but are not cached
+    return {text: results.get(text, []) for text in pending}
 
 
-@celery_app.task(bind=True, max_retries=3)
-def process_interview_segment(self, session_id: str, user_text: str):
+@celery_app.task(
+    bind=True, max_retries=3, soft_time_limit=LLM_TASK_SOFT_TIME_LIMIT, time_limit=LLM_TASK_TIME_LIMIT
+)
+def process_interview_segment(self, session_id: str, user_text: str, lane: str = LIVE, assessment_id: Optional[str] = None):
     """
     Celery task to process interview text and extract to knowledge graph.
     
     This runs asynchronously - user doesn't wait for this to complete.
+    It is routed to the session's partition (task_routing), so a session's
+    segments run in order on their first attempt (a retry runs after the
+    session's later segments); lane="backfill" runs it behind all live work.
+    With batching enabled the segment is queued for flush_extraction_batch,
+    which extracts many segments of the partition in one LLM request.
+    
+    The segment id is the task id, which Celery keeps across retries. Each
+    stage (extract, graph write, report) is checkpointed under it, so a
+    retry resumes after the last completed stage: a Neo4j failure does not
+    call the LLM again, and a write whose commit was lost is a no-op MERGE.
+    While Neo4j is unhealthy the rows are spooled to local disk instead
+    (write_rows); the spool replayer writes and reports them later.
+    `assessment_id` (the session's assessment, if any) tags the candidate
+    and keys the cohort rollups.
     """
+    segment_id = self.request.id or uuid.uuid4().hex
+    if extraction_batcher.batching_enabled():
+        segment = extraction_batcher.new_segment(session_id, user_text, lane, segment_id, assessment_id)
+        pending = extraction_batcher.enqueue_segment(segment)
+        schedule_flush(pending, segment["partition"], lane)
+        return {"status": "queued", "session_id": session_id, "segment_id": segment["id"]}
+    
     try:
-        # Extract observations using LLM
-        observations = extract_observations(user_text)
+        checkpoint = segment_checkpoints.load(segment_id)
+        
+        # --- 1. Extract observations using LLM (once per segment) ---
+        if reached(checkpoint, EXTRACTED):
+            observations = checkpoint["observations"]
+        else:
+            observations = extract_observations(user_text)
+            segment_checkpoints.save_observations({segment_id: observations})
         
         if not observations:
             return {"status": "no_observations", "session_id": session_id}
         
-        saved_count = 0
-        for obs in observations:
-            skill = obs.get("skill")
-            skill_domain = obs.get("skill_domain")
-            trait = obs.get("trait")
-            trait_intensity = obs.get("trait_intensity")
-            evidence = obs.get("evidence", user_text[:200])
-            
-            # Only save if we found something meaningful
-            if skill or trait:
-                save_observation_to_graph(
-                    session_id=session_id,
-                    skill=skill,
-                    skill_domain=skill_domain,
-                    trait=trait,
-                    trait_intensity=trait_intensity,
-                    evidence=evidence
-                )
-                saved_count += 1
+        # --- 2. Write all observations of the segment in one transaction ---
+        rows = build_segment_rows(session_id, user_text, observations, segment_id, assessment_id)
+        stage = checkpoint.get("stage")
+        if not reached(checkpoint, SPOOLED):
+            stage = write_rows(rows, [segment_id])
+            segment_checkpoints.mark([segment_id], stage)
+        if stage == SPOOLED:
+            return {"status": "spooled", "session_id": session_id, "segment_id": segment_id}
+        
+        # --- 3. Fold into the materialised report ---
+        if not reached(checkpoint, REPORTED) and update_materialised_reports(rows):
+            segment_checkpoints.mark([segment_id], REPORTED)
+        update_cohort_rollups(rows)
+        publish_match_changes(rows)
+        if rows and not reached(checkpoint, WRITTEN):
+            record_freshness("single", record_evidence_visible())
         
         return {
             "status": "success",
             "session_id": session_id,
-            "observations_saved": saved_count
+            "segment_id": segment_id,
+            "observations_saved": len(rows)
         }
         
     except Exception as e:
-        # Retry on failure
+        # Retry on failure (from the last checkpoint); re-published with an
+        # ETA, so the partition runs the session's later segments first
         raise self.retry(exc=e, countdown=5)
+
+
+def write_rows(rows: list[dict], segment_ids: list[str]) -> str:
+    """
+    Write rows to Neo4j in one transaction, or append them to the local
+    graph spool while the graph is unhealthy: graph_breaker is open, or
+    this write failed on a connection or transient error. Returns WRITTEN
+    or SPOOLED. Other errors (and a full spool) are raised, so the task
+    retries as before.
+    """
+    if not rows:
+        return WRITTEN
+    if not GRAPH_SPOOL_ENABLED:
+        with neo4j_query("save_observations_batch"):
+            save_observations_batch(get_neo4j_driver(), rows)
+        return WRITTEN
+    
+    if graph_breaker.allow():
+        started = time.perf_counter()
+        try:
+            with neo4j_query("save_observations_batch"):
+                save_observations_batch(get_neo4j_driver(), rows)
+        except Exception as e:
+            if not graph_unavailable(e):
+                # Neo4j answered; the write itself failed
+                graph_breaker.record_success()
+                raise
+            graph_breaker.record_failure()
+            logger.warning("Neo4j write failed, spooling %d rows: %s", len(rows), e)
+        else:
+            graph_breaker.record_success(time.perf_counter() - started)
+            return WRITTEN
+    
+    graph_spool.append(rows, segment_ids)
+    return SPOOLED
+
+
+def replay_spooled_rows(rows: list[dict], segment_ids: list[str]) -> None:
+    """
+    Write one replay batch from the graph spool, then finish the segments'
+    remaining stages: checkpoints and the materialised report.
+    """
+    with neo4j_query("replay_graph_spool"):
+        save_observations_batch(get_neo4j_driver(), rows)
+    segment_checkpoints.mark(segment_ids, WRITTEN)
+    if update_materialised_reports(rows):
+        segment_checkpoints.mark(segment_ids, REPORTED)
+    update_cohort_rollups(rows)
+    publish_match_changes(rows)
+
+
+def replay_graph_spool_forever(interval: float = GRAPH_SPOOL_REPLAY_INTERVAL_SECONDS) -> None:
+    """
+    Replayer loop: drain the spool whenever it has records. A failed
+    replay (Neo4j still down) backs off up to the breaker cooldown.
+    """
+    delay = interval
+    while True:
+        time.sleep(delay)
+        try:
+            if not graph_spool.pending():
+                continue
+            result = graph_spool.replay(replay_spooled_rows)
+        except Exception as e:
+            delay = min(delay * 2, max(interval, GRAPH_BREAKER_COOLDOWN_SECONDS))
+            logger.warning("Graph spool replay failed, retrying in %.0fs: %s", delay, e)
+            continue
+        delay = interval
+        if result.get("rows"):
+            logger.info("Graph spool: replayed %d rows in %d batches", result["rows"], result["batches"])
+
+
+def update_materialised_reports(rows: list[dict]) -> bool:
+    """
+    Fold written rows into the materialised reports.
+    Best effort: the graph write has already committed, so a failure here
+    must not retry the task. It leaves the report stale until a rebuild
+    (see report_store.verify_report / rebuild_report). Returns whether the
+    rows were applied.
+    """
+    try:
+        with span("report.apply", rows=len(rows)):
+            apply_observation_rows(rows)
+        return True
+    except Exception:
+        logger.exception("Failed to update materialised reports")
+        return False
+
+
+def update_cohort_rollups(rows: list[dict]) -> None:
+    """
+    Fold written rows into the cohort rollups. Best effort, like the report
+    update; a segment already folded in (a retry) is skipped by the rollups
+    themselves. Gaps are repaired by the rollup backfill.
+    """
+    try:
+        with span("rollups.apply", rows=len(rows)):
+            apply_rollup_rows(rows)
+    except Exception:
+        logger.exception("Failed to update cohort rollups")
+
+
+def publish_match_changes(rows: list[dict]) -> None:
+    """
+    Tell the match engine which candidates have new evidence. Best effort,
+    like the report update: a lost notice leaves their match scores stale
+    until the engine's next full load.
+    """
+    try:
+        publish_candidate_changes(row["session_id"] for row in rows)
+    except Exception:
+        logger.exception("Failed to publish match engine changes")
+
+
+def schedule_flush(pending: int, partition: int, lane: str = LIVE) -> None:
+    """
+    Schedule a flush of a partition's pending list that just reached
+    `pending`. A flush carries segments of many messages, so it starts its
+    own trace; each segment links to it (see flush_extraction_batch).
+    """
+    delay = extraction_batcher.flush_delay(pending)
+    with detached():
+        if delay == 0:
+            flush_extraction_batch.delay(partition, lane)
+        elif delay is not None:
+            flush_extraction_batch.apply_async((partition, lane), countdown=delay)
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=3,
+    reject_on_worker_lost=True,
+    soft_time_limit=LLM_TASK_SOFT_TIME_LIMIT,
+    time_limit=LLM_TASK_TIME_LIMIT
+)
+def flush_extraction_batch(self, partition: int = 0, lane: str = LIVE):
+    """
+    Drain up to EXTRACTION_BATCH_SIZE pending segments of a partition,
+    extract them in one LLM request and write every segment's observations,
+    fanned back out to their sessions, in one graph transaction.
+    
+    Stages are checkpointed per segment as in process_interview_segment. A
+    failed batch is handed back to the pending list; when it is flushed
+    again, segments already extracted are not sent to the LLM and segments
+    already written (or spooled) are not written again. The batch stays in
+    the partition's processing list until it is written, so a flush killed
+    mid-way (time limit, crash) is picked up by the next flush, or by the
+    redelivered task (reject_on_worker_lost).
+    """
+    segments = extraction_batcher.pop_batch(partition, lane)
+    if not segments:
+        return {"status": "empty"}
+    
+    started = time.time()
+    try:
+        checkpoints = segment_checkpoints.load_many(seg["id"] for seg in segments)
+        observations_by_id = {
+            segment_id: checkpoint["observations"]
+            for segment_id, checkpoint in checkpoints.items()
+            if reached(checkpoint, EXTRACTED)
+        }
+        to_extract = [seg for seg in segments if seg["id"] not in observations_by_id]
+        if to_extract:
+            extracted = extract_observations_batch(to_extract)
+            segment_checkpoints.save_observations(extracted)
+            observations_by_id.update(extracted)
+        
+        rows = []
+        to_write = []
+        written = set()
+        stages = {}
+        for seg in segments:
+            seg_rows = build_segment_rows(
+                seg["session_id"], seg["text"], observations_by_id[seg["id"]], seg["id"], seg.get("assessment_id")
+            )
+            checkpoint = checkpoints.get(seg["id"], {})
+            stages[seg["id"]] = checkpoint.get("stage") or EXTRACTED
+            if not reached(checkpoint, SPOOLED) and seg_rows:
+                to_write.extend(seg_rows)
+                written.add(seg["id"])
+            rows.extend(seg_rows)
+        stage = write_rows(to_write, sorted(written))
+        segment_checkpoints.mark(written, stage)
+        stages.update(dict.fromkeys(written, stage))
+        extraction_batcher.ack_batch(partition, lane)
+    except Exception as e:
+        # Hand the segments back so the retry (or another flush) sees them
+        extraction_batcher.requeue_batch(partition, lane)
+        raise self.retry(exc=e, countdown=5)
+    
+    # Spooled rows are reported by the spool replayer
+    to_report = [row for row in rows if stages[row["segment_id"]] == WRITTEN]
+    if update_materialised_reports(to_report):
+        segment_checkpoints.mark({row["segment_id"] for row in to_report}, REPORTED)
+    update_cohort_rollups(to_report)
+    publish_match_changes(to_report)
+    record_batch_freshness(segments, written if stage == WRITTEN else set(), started)
+    
+    # Leftovers that arrived while this batch was in flight
+    remaining = extraction_batcher.pending_count(partition, lane)
+    with detached():
+        if remaining >= extraction_batcher.EXTRACTION_BATCH_SIZE:
+            flush_extraction_batch.delay(partition, lane)
+        elif remaining:
+            flush_extraction_batch.apply_async(
+                (partition, lane), countdown=extraction_batcher.EXTRACTION_BATCH_MAX_WAIT_MS / 1000
+            )
+    
+    return {
+        "status": "success",
+        "partition": partition,
+        "segments": len(segments),
+        "sessions": len({seg["session_id"] for seg in segments}),
+        "observations_saved": len(rows),
+        "observations_spooled": len(to_write) if stage == SPOOLED else 0
+    }
+
+
+def record_batch_freshness(segments: list[dict], written: set[str], started: float) -> None:
+    """
+    Close each batched segment's own trace: its wait in the pending list
+    and the moment its evidence became visible, linked to this flush.
+    """
+    links = current_link()
+    for seg in segments:
+        ctx = context_from_carrier(seg.get("trace"))
+        record_interval("extraction.batch_wait", seg["enqueued_at"], started, ctx, segment_id=seg["id"])
+        if seg["id"] in written:
+            lag = record_evidence_visible(ctx, links, segment_id=seg["id"], batch_size=len(segments))
+            record_freshness("batched", lag)
+
+
+@celery_app.task(
+    bind=True, max_retries=3, soft_time_limit=LLM_TASK_SOFT_TIME_LIMIT, time_limit=LLM_TASK_TIME_LIMIT
+)
+def summarise_session_context(self, session_id: str):
+    """
+    Fold chat turns that left the token-budgeted window into the session's
+    rolling summary (context_window.update_rolling_summary). Concurrent
+    requests for the same session collapse into one fold via a short lock.
+    """
+    from backend.chat_service import session_store
+    
+    lock_key = f"{session_store.context_key(session_id)}:lock"
+    if not session_store.client.set(lock_key, self.request.id or "1", nx=True, ex=LLM_TASK_TIME_LIMIT):
+        return {"status": "skipped", "reason": "fold in progress"}
+    
+    try:
+        result = update_rolling_summary(session_store, openai_client, session_id)
+    except Exception as e:
+        raise self.retry(exc=e, countdown=5)
+    finally:
+        session_store.client.delete(lock_key)
+    
+    return {"status": "success", **result}
@@ -1,108 +1,478 @@
-import pandas as pd
+"""
+Build the skills framework data in src/data from the SkillsFuture xlsx.
+
+Two layouts:
+  sharded (default)  src/data/framework/index.json - sector / track / role
+                     ids and labels only - plus one sectors/<id>.json per
+                     sector with that sector's skills, each TSC code's title
+                     and description stored once. The assessment form loads
+                     the index up front and a shard only when a role is
+                     picked (src/data/skillsFramework.ts).
+  single             the original src/data/sectorsData.ts with everything
+                     nested and every description repeated per role.
+
+Parsing the workbook with openpyxl is by far the slowest step, so the two
+sheets used are cached as Parquet under .cache/skills_framework/, keyed on
+the SHA-256 of the xlsx. Both layouts are built with vectorised pandas
+operations (no row iteration), and the whole rebuild is skipped when
+neither the xlsx nor this script changed since the outputs were written.
+
+Usage:
+    python process_excel.py                   # rebuild the sharded layout if needed
+    python process_excel.py --layout both     # also write sectorsData.ts
+    python process_excel.py --force           # rebuild even if up to date
+    python process_excel.py --timings         # time cold (xlsx) vs warm (cache) runs
+    python process_excel.py --layout-report   # payload size / parse time, single vs sharded
+
+Needs pandas, openpyxl and pyarrow (node, if installed, times JSON.parse).
+"""
+
+import argparse
+import gzip
+import hashlib
 import json
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
 
 file_path = 'src/data/jobsandskills-skillsfuture-skills-framework-dataset.xlsx'
+output_file = 'src/data/sectorsData.ts'
+shard_dir = 'src/data/framework'
+cache_dir = '.cache/skills_framework'
+
+ROLES_SHEET = 'Job Role_TCS_CCS'
+KEYS_SHEET = 'TSC_CCS_Key'
+ROLE_COLUMNS = ['Sector', 'Track', 'Job Role', 'TSC_CCS Code', 'TSC_CCS Title', 'Proficiency Level']
+KEY_COLUMNS = ['TSC Code', 'TSC_CCS Description']
+NO_DESCRIPTION = "No description available."
+
 
 def clean_id(text):
     if not isinstance(text, str):
         return str(text)
     return text.lower().replace(' ', '-').replace('/', '-').replace('&', 'and').replace('---', '-').replace('--', '-')
 
-try:
-    xls = pd.ExcelFile(file_path)
-    
-    # Read Data
-    df_roles = pd.read_excel(xls, 'Job Role_TCS_CCS')
-    df_keys = pd.read_excel(xls, 'TSC_CCS_Key')
-    
-    # Clean column names
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def generator_hash():
+    """Changes to this script invalidate the output, not the parsed sheets."""
+    return file_hash(os.path.abspath(__file__))
+
+
+# --- Parsing (cached) ---
+
+def parse_workbook(source):
+    """Read the two sheets this pipeline uses; column names are stripped."""
+    sheets = pd.read_excel(source, sheet_name=[ROLES_SHEET, KEYS_SHEET])
+    df_roles, df_keys = sheets[ROLES_SHEET], sheets[KEYS_SHEET]
     df_roles.columns = df_roles.columns.str.strip()
     df_keys.columns = df_keys.columns.str.strip()
-    
-    print("Roles Columns:", df_roles.columns.tolist())
-    print("Keys Columns:", df_keys.columns.tolist())
-    
-    # Create Description Map: TSC Code -> Description
-    desc_map = dict(zip(df_keys['TSC Code'], df_keys['TSC_CCS Description']))
-    
-    # Filter for Critical Core Skills if needed. 
-    # The user asked for "Critical Core Skills" from TSC_CCS Title.
-    # Usually CCS are distinct from TSC. Let's check types.
-    # For now, I will include ALL skills listed for the role, but I'll prioritize CCS if I can distinguish them.
-    # Actually, the user said "Critical Core Skills from TSC_CCS Title". 
-    # I will assume they want ALL items listed in that tab for the role.
-    # But typically "Critical Core Skills" are a specific subset. 
-    # Let's check if there is a 'ccs' type.
-    # If 'TSC_CCS Type' has 'ccs', I might filter or group them. 
-    # For this request, "make each of the Critical Core Skills a selection box", implies a list.
-    # I will filter for Type == 'ccs' if it exists, otherwise I'll take all.
-    
-    # Check for 'ccs' type (case insensitive)
-    # Check for 'ccs' type (case insensitive)
-    # User reported missing elements. I will include ALL types (tsc and ccs).
-    # if 'TSC_CCS Type' in df_roles.columns:
-    #     has_ccs = 'ccs' in df_roles['TSC_CCS Type'].astype(str).str.lower().unique()
-    #     if has_ccs:
-    #          df_roles = df_roles[df_roles['TSC_CCS Type'].astype(str).str.lower() == 'ccs']
-    
-    # Sort by Proficiency Level
-    # Assuming Proficiency Level is numeric or sortable string
-    if 'Proficiency Level' in df_roles.columns:
-        df_roles['Proficiency Level'] = pd.to_numeric(df_roles['Proficiency Level'], errors='coerce').fillna(0)
-        df_roles = df_roles.sort_values(by=['Sector', 'Track', 'Job Role', 'Proficiency Level'])
-    
+    return df_roles[ROLE_COLUMNS], df_keys[KEY_COLUMNS]
+
+
+def load_sheets(source, source_hash, cache_root=cache_dir):
+    """
+    Parsed sheets for an xlsx, from the Parquet cache when its hash has been
+    seen before. Returns (df_roles, df_keys, cache_hit).
+    """
+    entry = os.path.join(cache_root, source_hash)
+    roles_path = os.path.join(entry, 'roles.parquet')
+    keys_path = os.path.join(entry, 'keys.parquet')
+    if os.path.exists(roles_path) and os.path.exists(keys_path):
+        return pd.read_parquet(roles_path), pd.read_parquet(keys_path), True
+
+    df_roles, df_keys = parse_workbook(source)
+
+    # Mixed-type object columns (codes, levels) are stored as strings; the
+    # build step normalises them anyway. Written to a temp dir and renamed,
+    # so an interrupted run never leaves a half-written cache entry.
+    os.makedirs(cache_root, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=cache_root)
+    for df, path in ((df_roles, 'roles.parquet'), (df_keys, 'keys.parquet')):
+        df.astype({c: 'string' for c in df.columns if df[c].dtype == object}).to_parquet(
+            os.path.join(tmp, path), index=False
+        )
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(tmp, entry)
+
+    # Only the current workbook's sheets are kept
+    for name in os.listdir(cache_root):
+        stale = os.path.join(cache_root, name)
+        if name != source_hash and len(name) == 64 and os.path.isdir(stale):
+            shutil.rmtree(stale, ignore_errors=True)
+    return df_roles, df_keys, False
+
+
+# --- Build (vectorised) ---
+
+def _as_str(series):
+    return series.astype('string').str.strip()
+
+
+def skill_frame(df_roles, df_keys):
+    """
+    One row per role skill, sorted the way the old groupby/iterrows loop
+    emitted them: groups by name, skills by proficiency level within a role,
+    rows with a missing sector, track or role dropped.
+    """
+    desc_map = pd.Series(df_keys['TSC_CCS Description'].to_numpy(), index=_as_str(df_keys['TSC Code']))
+    desc_map = desc_map[~desc_map.index.duplicated(keep='last')]
+
+    df = pd.DataFrame({
+        'sector': _as_str(df_roles['Sector']),
+        'track': _as_str(df_roles['Track']),
+        'role': _as_str(df_roles['Job Role']),
+        'id': _as_str(df_roles['TSC_CCS Code']),
+        'label': df_roles['TSC_CCS Title'],
+        'proficiencyLevel': pd.to_numeric(df_roles['Proficiency Level'], errors='coerce').fillna(0),
+    }).dropna(subset=['sector', 'track', 'role'])
+    df['description'] = df['id'].map(desc_map).fillna(NO_DESCRIPTION)
+    df = df.sort_values(['sector', 'track', 'role', 'proficiencyLevel'], kind='stable')
+
+    if not df.empty:
+        levels = df['proficiencyLevel'].to_numpy()
+        if np.all(levels == np.floor(levels)):
+            df['proficiencyLevel'] = levels.astype(np.int64)
+    return df
+
+
+def group_bounds(df):
+    """
+    Group boundaries of the sorted frame: (new_sector, new_track, role_starts,
+    role_ends), where the first two are masks over rows.
+    """
+    sector = df['sector'].to_numpy()
+    track = df['track'].to_numpy()
+    role = df['role'].to_numpy()
+    new_sector = np.r_[True, sector[1:] != sector[:-1]]
+    new_track = new_sector | np.r_[True, track[1:] != track[:-1]]
+    new_role = new_track | np.r_[True, role[1:] != role[:-1]]
+
+    role_starts = np.flatnonzero(new_role)
+    role_ends = np.r_[role_starts[1:], len(df)]
+    return new_sector, new_track, role_starts.tolist(), role_ends.tolist()
+
+
+def _records(df, columns):
+    """Rows as dicts (or lists) in one call, missing values as null."""
+    records = df[columns].astype(object)
+    return records.where(records.notna(), None)
+
+
+def build_sectors(df_roles, df_keys):
+    """Nested sectors -> tracks -> roles -> skills (the single-file layout)."""
+    df = skill_frame(df_roles, df_keys)
+    if df.empty:
+        return []
+
+    skills = _records(df, ['id', 'label', 'description', 'proficiencyLevel']).to_dict('records')
+    new_sector, new_track, role_starts, role_ends = group_bounds(df)
+    sector, track, role = df['sector'].to_numpy(), df['track'].to_numpy(), df['role'].to_numpy()
+
     sectors_data = []
-    
-    for sector_name, sector_group in df_roles.groupby('Sector'):
-        sector_obj = {
-            'id': clean_id(sector_name),
-            'label': sector_name,
-            'tracks': []
-        }
-        
-        for track_name, track_group in sector_group.groupby('Track'):
-            track_obj = {
-                'id': clean_id(track_name),
-                'label': track_name,
-                'roles': []
-            }
-            
-            for role_name, role_group in track_group.groupby('Job Role'):
-                skills = []
-                for _, row in role_group.iterrows():
-                    # Use TSC_CCS Code for roles dataframe
-                    code = row['TSC_CCS Code']
-                    title = row['TSC_CCS Title']
-                    level = row['Proficiency Level']
-                    # Use code to lookup description from desc_map (which uses TSC Code keys)
-                    desc = desc_map.get(code, "No description available.")
-                    
-                    skills.append({
-                        'id': code,
-                        'label': title,
-                        'description': desc,
-                        'proficiencyLevel': level
-                    })
-                
-                role_obj = {
-                    'id': clean_id(role_name),
-                    'label': role_name,
-                    'skills': skills
-                }
-                track_obj['roles'].append(role_obj)
-            
-            sector_obj['tracks'].append(track_obj)
-        
-        sectors_data.append(sector_obj)
-
-    # Output to TypeScript file
-    output_file = 'src/data/sectorsData.ts'
-    with open(output_file, 'w') as f:
+    for start, end in zip(role_starts, role_ends):
+        if new_sector[start]:
+            sectors_data.append({'id': clean_id(sector[start]), 'label': sector[start], 'tracks': []})
+        tracks = sectors_data[-1]['tracks']
+        if new_track[start]:
+            tracks.append({'id': clean_id(track[start]), 'label': track[start], 'roles': []})
+        tracks[-1]['roles'].append({
+            'id': clean_id(role[start]),
+            'label': role[start],
+            'skills': skills[start:end]
+        })
+    return sectors_data
+
+
+def shard_name(sector_id):
+    """File name of a sector shard; ids are already lower-case and dashed."""
+    safe = ''.join(c if c.isalnum() or c in '-_' else '-' for c in sector_id)
+    return f"{safe}.json"
+
+
+def build_shards(df_roles, df_keys):
+    """
+    The sharded layout: (index, {shard file name: shard}).
+
+    The index holds only sector / track / role ids and labels (plus a skill
+    count per role), which is all the assessment form needs until a role is
+    picked. Each sector shard stores every TSC code's title and description
+    once, in `skills`, and each role as [code, proficiency level] pairs under
+    "<track id>/<role id>" - the same description was otherwise repeated for
+    every role (and level) that uses the skill.
+    """
+    df = skill_frame(df_roles, df_keys)
+    if df.empty:
+        return {'sectors': []}, {}
+
+    pairs = _records(df, ['id', 'proficiencyLevel']).to_numpy().tolist()
+    new_sector, new_track, role_starts, role_ends = group_bounds(df)
+    sector, track, role = df['sector'].to_numpy(), df['track'].to_numpy(), df['role'].to_numpy()
+
+    # Sector row ranges, for the per-shard skill tables
+    sector_starts = np.flatnonzero(new_sector).tolist()
+    sector_ends = sector_starts[1:] + [len(df)]
+    sector_rows = dict(zip(sector_starts, sector_ends))
+
+    index = {'sectors': []}
+    shards = {}
+    for start, end in zip(role_starts, role_ends):
+        if new_sector[start]:
+            sector_id = clean_id(sector[start])
+            shard = shard_name(sector_id)
+            index['sectors'].append({'id': sector_id, 'label': sector[start], 'shard': shard, 'tracks': []})
+            rows = df.iloc[start:sector_rows[start]].drop_duplicates('id', keep='last')
+            table = _records(rows, ['label', 'description']).to_numpy().tolist()
+            shards[shard] = {'id': sector_id, 'skills': dict(zip(rows['id'].tolist(), table)), 'roles': {}}
+        tracks = index['sectors'][-1]['tracks']
+        if new_track[start]:
+            tracks.append({'id': clean_id(track[start]), 'label': track[start], 'roles': []})
+        role_id = clean_id(role[start])
+        tracks[-1]['roles'].append({'id': role_id, 'label': role[start], 'skillCount': end - start})
+        shards[shard]['roles'][f"{tracks[-1]['id']}/{role_id}"] = pairs[start:end]
+    return index, shards
+
+
+def write_sectors(sectors_data, output=output_file):
+    tmp = f"{output}.tmp"
+    with open(tmp, 'w') as f:
         f.write("export const sectors = ")
-        json.dump(sectors_data, f, indent=4)
+        f.write(json.dumps(sectors_data, separators=(',', ':'), ensure_ascii=False))
         f.write(";\n")
-    
-    print(f"Successfully wrote data to {output_file}")
+    os.replace(tmp, output)
+
+
+def _dump(data):
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def write_shards(index, shards, output=shard_dir):
+    """
+    index.json plus sectors/<shard>.json under `output`. The new tree is
+    written next to the old one and swapped in, so shards of sectors that
+    no longer exist are removed and readers never see a mix of both.
+    """
+    parent = os.path.dirname(os.path.abspath(output))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent)
+    os.makedirs(os.path.join(tmp, 'sectors'))
+    for name, shard in shards.items():
+        with open(os.path.join(tmp, 'sectors', name), 'w') as f:
+            f.write(_dump(shard))
+    with open(os.path.join(tmp, 'index.json'), 'w') as f:
+        f.write(_dump(index))
+    shutil.rmtree(output, ignore_errors=True)
+    os.replace(tmp, output)
+
+
+# --- Pipeline ---
+
+def manifest_path(cache_root=cache_dir):
+    return os.path.join(cache_root, 'manifest.json')
+
+
+def is_up_to_date(stamp, output, cache_root=cache_dir):
+    if not os.path.exists(output):
+        return False
+    try:
+        with open(manifest_path(cache_root)) as f:
+            return json.load(f).get(output) == stamp
+    except (OSError, ValueError):
+        return False
+
+
+def record_output(stamp, output, cache_root=cache_dir):
+    try:
+        with open(manifest_path(cache_root)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest[output] = stamp
+    with open(manifest_path(cache_root), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def run(source=file_path, output=output_file, cache_root=cache_dir, force=False, layout='sharded',
+        shards_output=shard_dir):
+    """
+    Rebuild the outputs of `layout` ('sharded', 'single' or 'both') if
+    needed. Returns per-stage timings in seconds.
+    """
+    outputs = {'single': [output], 'sharded': [shards_output], 'both': [output, shards_output]}[layout]
+    timings = {}
+    start = time.perf_counter()
+    source_hash = file_hash(source)
+    stamp = {'source': source_hash, 'generator': generator_hash()}
+    timings['hash_s'] = time.perf_counter() - start
+
+    if not force and all(is_up_to_date(stamp, path, cache_root) for path in outputs):
+        timings['status'] = 'up to date'
+        timings['total_s'] = time.perf_counter() - start
+        return timings
+
+    t = time.perf_counter()
+    df_roles, df_keys, cache_hit = load_sheets(source, source_hash, cache_root)
+    timings['load_s'] = time.perf_counter() - t
+    timings['status'] = 'rebuilt from cache' if cache_hit else 'rebuilt from xlsx'
+
+    t = time.perf_counter()
+    if layout != 'sharded':
+        sectors_data = build_sectors(df_roles, df_keys)
+        timings['sectors'] = len(sectors_data)
+    if layout != 'single':
+        index, shards = build_shards(df_roles, df_keys)
+        timings['sectors'] = len(index['sectors'])
+    timings['build_s'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    if layout != 'sharded':
+        write_sectors(sectors_data, output)
+        record_output(stamp, output, cache_root)
+    if layout != 'single':
+        write_shards(index, shards, shards_output)
+        record_output(stamp, shards_output, cache_root)
+    timings['write_s'] = time.perf_counter() - t
+
+    timings['rows'] = len(df_roles)
+    timings['total_s'] = time.perf_counter() - start
+    return timings
+
+
+def timing_report(source=file_path):
+    """Cold (xlsx), warm (Parquet cache) and unchanged runs, in a scratch cache."""
+    with tempfile.TemporaryDirectory() as scratch:
+        cache_root = os.path.join(scratch, 'cache')
+        output = os.path.join(scratch, 'sectorsData.ts')
+        shards_output = os.path.join(scratch, 'framework')
+        return {
+            'cold': run(source, output, cache_root, force=True, layout='both', shards_output=shards_output),
+            'warm': run(source, output, cache_root, force=True, layout='both', shards_output=shards_output),
+            'unchanged': run(source, output, cache_root, layout='both', shards_output=shards_output),
+        }
+
+
+# --- Layout report ---
+
+NODE_PARSE = """
+const fs = require('fs');
+const [file, repeat] = [process.argv[1], Number(process.argv[2])];
+let text = fs.readFileSync(file, 'utf8');
+if (text.startsWith('export const sectors = ')) text = text.slice(23, text.lastIndexOf(';'));
+const times = [];
+for (let i = 0; i < repeat; i++) {
+  const t = process.hrtime.bigint();
+  JSON.parse(text);
+  times.push(Number(process.hrtime.bigint() - t) / 1e6);
+}
+times.sort((a, b) => a - b);
+console.log(times[Math.floor(times.length / 2)]);
+"""
+
+
+def _payload(path):
+    """(json text, raw bytes, gzip bytes) of an output file."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    text = raw.decode('utf-8')
+    if text.startswith('export const sectors = '):
+        text = text[len('export const sectors = '):text.rindex(';')]
+    return text, len(raw), len(gzip.compress(raw, 6))
+
+
+def _parse_ms(path, text, repeat):
+    """Median parse time in ms: JSON.parse under node when available, else json.loads."""
+    node = shutil.which('node')
+    if node:
+        result = subprocess.run([node, '-e', NODE_PARSE, path, str(repeat)], capture_output=True, text=True)
+        if result.returncode == 0:
+            return float(result.stdout), 'node JSON.parse'
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        json.loads(text)
+        times.append((time.perf_counter() - t) * 1e3)
+    return statistics.median(times), 'python json.loads'
+
+
+def layout_report(source=file_path, repeat=20):
+    """
+    Payload size and parse time of the single-file layout against what the
+    assessment form loads with the sharded one: index.json up front, then
+    one sector shard when a role is picked (the largest and the median
+    shard are reported).
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        output = os.path.join(scratch, 'sectorsData.ts')
+        shards_output = os.path.join(scratch, 'framework')
+        run(source, output, os.path.join(scratch, 'cache'), force=True, layout='both', shards_output=shards_output)
+
+        def measure(path):
+            text, raw, gz = _payload(path)
+            parse_ms, parser = _parse_ms(path, text, repeat)
+            return {'bytes': raw, 'gzip_bytes': gz, 'parse_ms': round(parse_ms, 3)}, parser
+
+        single, parser = measure(output)
+        index, _ = measure(os.path.join(shards_output, 'index.json'))
+        shard_dir_path = os.path.join(shards_output, 'sectors')
+        shards = sorted(
+            (measure(os.path.join(shard_dir_path, name))[0] for name in os.listdir(shard_dir_path)),
+            key=lambda m: m['bytes']
+        )
+        largest, median = shards[-1], shards[len(shards) // 2]
+
+        def first_role(shard):
+            return {k: index[k] + shard[k] for k in index}
+
+        return {
+            'parser': parser,
+            'single': single,
+            'sharded': {
+                'index': index,
+                'shards': len(shards),
+                'total_bytes': index['bytes'] + sum(m['bytes'] for m in shards),
+                'largest_shard': largest,
+                'median_shard': median,
+                'index_plus_largest': first_role(largest),
+                'index_plus_median': first_role(median),
+            },
+            'initial_load_reduction': round(1 - index['bytes'] / single['bytes'], 4),
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the skills framework data for src/data from the xlsx')
+    parser.add_argument('--source', default=file_path)
+    parser.add_argument('--output', default=output_file, help='Single-file layout (sectorsData.ts)')
+    parser.add_argument('--shards-output', default=shard_dir, help='Sharded layout (index.json + sectors/)')
+    parser.add_argument('--layout', choices=['sharded', 'single', 'both'], default='sharded')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if the output is up to date')
+    parser.add_argument('--timings', action='store_true', help='Report cold vs warm timings (does not touch --output)')
+    parser.add_argument('--layout-report', action='store_true',
+                        help='Compare payload size and parse time of both layouts (does not touch --output)')
+    args = parser.parse_args()
 
-except Exception as e:
-    print(f"Error: {e}")
+    try:
+        if args.timings:
+            print(json.dumps(timing_report(args.source), indent=2))
+        elif args.layout_report:
+            print(json.dumps(layout_report(args.source), indent=2))
+        else:
+            timings = run(args.source, args.output, force=args.force, layout=args.layout,
+                          shards_output=args.shards_output)
+            print(f"{args.layout} layout: {timings['status']} in {timings['total_s']:.2f}s")
+            print(json.dumps(timings))
+    except Exception as e:
+        print(f"Error: {e}")
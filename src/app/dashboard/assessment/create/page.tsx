@@ -2,6 +2,7 @@
 
 import { useState, useEffect } from 'react';
 import { sectors, difficultyLevels, timeDurations, interviewTypes, assessmentCategories, personas } from '@/data/mockData';
+import { loadRoleSkills, type Skill } from '@/data/skillsFramework';
 import Combobox from '@/components/ui/Combobox';
 import styles from './create.module.css';
 
@@ -171,7 +172,21 @@ export default function CreateAssessmentPage() {
 
     const currentSector = sectors.find((s) => s.id === selectedSector);
     const currentTrack = currentSector?.tracks.find((t) => t.id === selectedTrack);
-    const currentRoleData = currentTrack?.roles.find((r) => r.id === selectedRole);
+    const currentRole = currentTrack?.roles.find((r) => r.id === selectedRole);
+
+    // The role's skills live in its sector's shard, fetched when the role is picked
+    const [roleSkills, setRoleSkills] = useState<Skill[]>([]);
+    useEffect(() => {
+        setRoleSkills([]);
+        if (!selectedSector || !selectedTrack || !selectedRole) return;
+        let cancelled = false;
+        loadRoleSkills(selectedSector, selectedTrack, selectedRole)
+            .then((skills) => { if (!cancelled) setRoleSkills(skills); })
+            .catch((err) => console.error('Failed to load role skills:', err));
+        return () => { cancelled = true; };
+    }, [selectedSector, selectedTrack, selectedRole]);
+
+    const currentRoleData = currentRole && { ...currentRole, skills: roleSkills };
     const currentCategory = assessmentCategories.find(c => c.id === selectedCategory);
     const currentSubcategory = currentCategory?.templates.find(t => t.id === selectedSubcategory);
 
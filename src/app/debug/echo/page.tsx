@@ -17,6 +17,8 @@ export default function EchoDebugPage() {
 
         socket.onmessage = (event) => {
             const data = JSON.parse(event.data);
+            // Replies stream as 'token' frames, then one complete 'message' frame
+            if (data.type === 'token') return;
             setMessages(prev => [...prev, `📩 ${data.sender}: ${data.text}`]);
         };
 
@@ -1,4 +1,4 @@
-export { sectors } from './sectorsData';
+export { sectors } from './skillsFramework';
 
 export const difficultyLevels = [
     { id: 'intern', label: 'Intern', description: 'Basic concepts and behavioral fit' },
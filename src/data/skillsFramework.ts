@@ -0,0 +1,68 @@
+// Skills framework, sharded (generated by process_excel.py into ./framework).
+// The index - sector / track / role ids and labels - is bundled with the page;
+// a sector's skills are fetched as a separate chunk the first time one of its
+// roles is picked. Skill titles and descriptions are stored once per sector,
+// keyed by TSC code, and expanded here.
+
+import index from './framework/index.json';
+
+export interface Skill {
+    id: string;
+    label: string;
+    description: string;
+    proficiencyLevel: number | string | null;
+}
+
+export interface RoleSummary {
+    id: string;
+    label: string;
+    skillCount: number;
+}
+
+export interface Track {
+    id: string;
+    label: string;
+    roles: RoleSummary[];
+}
+
+export interface Sector {
+    id: string;
+    label: string;
+    shard: string;
+    tracks: Track[];
+}
+
+interface SectorShard {
+    id: string;
+    // TSC code -> [title, description]
+    skills: Record<string, [string, string]>;
+    // "<track id>/<role id>" -> [TSC code, proficiency level][]
+    roles: Record<string, [string, number | string | null][]>;
+}
+
+export const sectors: Sector[] = (index as { sectors: Sector[] }).sectors;
+
+const shards = new Map<string, Promise<SectorShard>>();
+
+function loadShard(sector: Sector): Promise<SectorShard> {
+    let shard = shards.get(sector.shard);
+    if (!shard) {
+        shard = import(`./framework/sectors/${sector.shard}`).then((m) => (m.default ?? m) as SectorShard);
+        // A failed fetch is retried on the next call rather than cached
+        shard.catch(() => shards.delete(sector.shard));
+        shards.set(sector.shard, shard);
+    }
+    return shard;
+}
+
+export async function loadRoleSkills(sectorId: string, trackId: string, roleId: string): Promise<Skill[]> {
+    const sector = sectors.find((s) => s.id === sectorId);
+    if (!sector) return [];
+
+    const shard = await loadShard(sector);
+    const pairs = shard.roles[`${trackId}/${roleId}`] ?? [];
+    return pairs.map(([code, proficiencyLevel]) => {
+        const [label, description] = shard.skills[code] ?? [code, ''];
+        return { id: code, label, description, proficiencyLevel };
+    });
+}